@@ -0,0 +1,420 @@
+import json
+import time
+import uuid
+import asyncio
+from core.llm.factory import LLMFactory
+from core.llm.providers import LLMProvider
+from core.llm.usage import add_usage, USAGE_KEYS
+from core.tool_router import ToolRouter
+from core.prompt_builder import build_system_prompt, stable_tools, load_memories, last_user_text, clear_reasoning_content
+from core.tool_stream import ToolCallAssembler, SpeculativeDispatcher
+from core.artifact_store import spill_tool_result
+
+STOPPED_MESSAGE = "⚠️ Operation stopped by user."
+NO_API_KEY_REASONING = "检测到 API Key 未配置或 OpenAI 库不可用。无法连接到 DeepSeek 模型。"
+NO_API_KEY_MESSAGE = (
+    "⚠️ **未配置 API Key**\n\n"
+    "请点击右上角的 **⚙️ 设置** 按钮配置您的 DeepSeek API Key。\n"
+    "配置完成后，我将能够为您执行复杂的文件操作和代码生成任务。"
+)
+# Same tool set (or the same reasoning) this many turns in a row after the first stops the run
+MAX_REPETITIONS = 3
+
+
+class EventEmitter:
+    """Stands in for a Qt signal in a skill's _context: emit() calls every connected slot."""
+
+    def __init__(self, slot=None):
+        self.slots = [slot] if slot else []
+
+    def connect(self, slot):
+        self.slots.append(slot)
+
+    def emit(self, *args):
+        for slot in list(self.slots):
+            slot(*args)
+
+
+class AgentLoop:
+    """
+    The agent's turn/tool loop: stream a model turn, run the tool calls it
+    made, repeat until it answers. Handles routing, hot reload, pause/stop,
+    time and token budgets, repeated tool call / reasoning detection,
+    speculative tool starts, usage and retry telemetry.
+
+    LLMWorker runs it on a QThread with asyncio.run (sync_provider and
+    inline_tools keep the sync SDK stream and run tools on that thread);
+    AsyncAgent runs many of them on one event loop.
+
+    Progress goes to on_event(dict): thinking/content ({"delta"}),
+    tool_call/tool_result/log ({"data"}) and step/agent_state/skill_used ({"data"}).
+    The signals passed to tools in _context default to EventEmitters feeding on_event.
+    """
+
+    def __init__(self, config_manager, workspace_dir=None, skill_manager=None, parent_agent_id=None,
+                 tool_allowlist=None, system_prompt=None, time_budget=None, token_budget=None,
+                 on_event=None, provider=None, sync_provider=False, inline_tools=False,
+                 step_signal=None, agent_state_signal=None, abort_signal=None):
+        self.config_manager = config_manager
+        self.workspace_dir = workspace_dir
+        self.parent_agent_id = parent_agent_id
+        # Optional per-run limits (used for sub-agents): seconds of wall time and
+        # generated tokens (as reported by the provider, else ~4 chars per token)
+        self.time_budget = time_budget
+        self.token_budget = token_budget
+        self.on_event = on_event or (lambda event: None)
+        self.provider = provider
+        self.sync_provider = sync_provider
+        self.inline_tools = inline_tools
+        self.is_paused = False
+        self.is_stopped = False
+
+        # Sub-agent mode: a SkillManager shared with sibling agents, a fixed tool
+        # subset and a prebuilt system prompt (kept byte-identical across siblings
+        # for provider prompt caching, so hot reload is disabled)
+        self.shared_skill_manager = skill_manager is not None
+        self.tool_allowlist = set(tool_allowlist) if tool_allowlist is not None else None
+        self.system_prompt = system_prompt
+        if skill_manager is None:
+            from core.skill_manager import SkillManager
+            skill_manager = SkillManager(workspace_dir, config_manager)
+        self.skill_manager = skill_manager
+        # Main agent: only core and relevant skills are sent per request (sub-agents have an allowlist)
+        self.router = (ToolRouter.from_config(skill_manager, config_manager)
+                       if self.tool_allowlist is None and system_prompt is None else None)
+        self.routed_skills = None
+        self.tools = self._filter_tools()
+        # Unique per run: agent ids like "Agent-1" repeat across dispatches and retries,
+        # and a fresh run has none of the earlier tool results in its history
+        self.run_id = None
+
+        self.step_signal = step_signal or EventEmitter(lambda text: self._emit("step", data=text))
+        self.agent_state_signal = agent_state_signal or EventEmitter(lambda state: self._emit("agent_state", data=state))
+        self.abort_signal = abort_signal or EventEmitter()
+
+    def _filter_tools(self):
+        tools = self.skill_manager.get_tool_definitions()
+        if self.tool_allowlist is not None:
+            tools = [t for t in tools if t["function"]["name"] in self.tool_allowlist]
+        if self.router and self.routed_skills is not None:
+            tools = self.router.filter_tools(tools, self.routed_skills)
+        return stable_tools(tools)
+
+    def stop(self):
+        self.is_stopped = True
+        self.is_paused = False # Ensure the loop breaks if paused
+        self.abort_signal.emit()
+
+    def _emit(self, type_, **payload):
+        try:
+            self.on_event(dict(payload, type=type_))
+        except Exception as e:
+            print(f"[AgentLoop] Event handler failed: {e}")
+
+    def _step(self, text):
+        self._emit("step", data=text)
+
+    async def _wait_while_paused(self):
+        while self.is_paused and not self.is_stopped:
+            await asyncio.sleep(0.1)
+
+    def _check_budget(self, run_start, tokens_used):
+        """Return a note if the time or token budget is used up, else None."""
+        if self.time_budget and time.time() - run_start >= self.time_budget:
+            return f"Time budget of {self.time_budget}s exhausted."
+        if self.token_budget and tokens_used >= self.token_budget:
+            return f"Token budget of {self.token_budget} tokens exhausted."
+        return None
+
+    def _partial_result(self, generated_messages, note):
+        """Final content when a budget stops the run: the last assistant text, if any, plus the note."""
+        for msg in reversed(generated_messages):
+            if msg.get("role") == "assistant" and msg.get("content"):
+                return f"{msg['content']}\n\n⚠️ Stopped early: {note}"
+        return f"⚠️ Stopped early: {note}"
+
+    def _build_system_prompt(self, messages=None):
+        # Stable content first, date/agent id/per-request memories last, so provider prompt caching can hit
+        memories_text, session_memories_text = load_memories(self.config_manager, last_user_text(messages))
+        return build_system_prompt(
+            self.workspace_dir,
+            self.skill_manager.skill_prompt_map,
+            memories_text=memories_text,
+            session_memories_text=session_memories_text,
+            parent_agent_id=self.parent_agent_id,
+            skills=self.routed_skills,
+            skill_catalog=self.router.catalog(self.routed_skills) if self.routed_skills is not None else "",
+        )
+
+    def _stream(self, messages):
+        if self.provider is None:
+            # Primary + fallbacks, with retries
+            provider = LLMFactory.create_provider_chain(self.config_manager, should_stop=lambda: self.is_stopped)
+        else:
+            provider = self.provider
+        if self.sync_provider:
+            # The base class drives the sync SDK stream from a worker thread
+            return LLMProvider.achat_stream(provider, messages, tools=self.tools)
+        return provider.achat_stream(messages, tools=self.tools)
+
+    async def run(self, messages):
+        """Run until the model answers. Returns the result dict, or {"error": ...} if the loop failed."""
+        try:
+            return await self._run(messages)
+        except Exception as e:
+            print(f"[AgentLoop] Run failed: {e}")
+            return {"error": str(e)}
+
+    async def _run(self, messages):
+        self.run_id = uuid.uuid4().hex
+        # Work on a copy of messages to handle multi-turn locally
+        # CRITICAL: Clear previous reasoning content to avoid duplication/confusion in new turn
+        current_messages = clear_reasoning_content(messages)
+        if self.router:
+            self.routed_skills = self.router.route(messages)
+            self.tools = self._filter_tools()
+        system_prompt = self.system_prompt if self.system_prompt is not None else self._build_system_prompt(messages)
+        current_messages.insert(0, {"role": "system", "content": system_prompt})
+
+        full_reasoning = ""
+        final_content = ""
+        turn_count = 0
+        total_duration = 0
+        generated_messages = []
+        last_tool_signature = None
+        repetition_count = 0
+        last_turn_reasoning = None
+        reasoning_repetition_count = 0
+        run_start = time.time()
+        generated_chars = 0
+        provider_error_message = None
+        usage_totals = dict.fromkeys(USAGE_KEYS, 0)
+        turn_metrics = [] # One normalized usage record per LLM request
+        provider_attempts = [] # Every provider attempt, incl. retries and failovers
+        # Parallel-safe tools start as soon as their arguments finish streaming
+        speculate = bool(self.config_manager.get("speculative_tool_execution", True))
+
+        if self.provider is None and not self.config_manager.get("api_key"):
+            full_reasoning = f"[System]: {NO_API_KEY_REASONING}"
+            self._step(f"System: {NO_API_KEY_REASONING}")
+            final_content = NO_API_KEY_MESSAGE
+
+        while not final_content:
+            await self._wait_while_paused()
+            if self.is_stopped:
+                final_content = STOPPED_MESSAGE
+                break
+
+            # Provider-reported completion tokens, or an estimate if none were reported
+            tokens_used = max(usage_totals["completion_tokens"], generated_chars // 4)
+            budget_note = self._check_budget(run_start, tokens_used)
+            if budget_note:
+                self._step(f"System: {budget_note}")
+                final_content = self._partial_result(generated_messages, budget_note)
+                break
+
+            turn_count += 1
+            self._step(f"Turn {turn_count}: Requesting LLM...")
+
+            # Hot reload: pick up skills added or modified since the last turn
+            if not self.shared_skill_manager and self.skill_manager.check_for_updates():
+                self._step("System: Detecting skill updates... Reloading.")
+                self.skill_manager.load_skills()
+                self.tools = self._filter_tools()
+            elif self.router:
+                # Picks up skills added with load_skill
+                self.tools = self._filter_tools()
+
+            start_time = time.time()
+            reasoning = ""
+            content = ""
+            tool_calls_buffer = ToolCallAssembler() # Index -> ToolCall dict, completed incrementally
+            provider_error_message = None
+            turn_usage = None
+            speculation = SpeculativeDispatcher(self._is_speculable, self._start_tool) if speculate else None
+
+            async for chunk in self._stream(current_messages):
+                await self._wait_while_paused()
+                if self.is_stopped:
+                    break
+                type_ = chunk.get("type")
+                if type_ == "reasoning":
+                    reasoning += chunk["content"]
+                    generated_chars += len(chunk["content"])
+                    self._emit("thinking", delta=chunk["content"])
+                elif type_ == "content":
+                    content += chunk["content"]
+                    generated_chars += len(chunk["content"])
+                    self._emit("content", delta=chunk["content"])
+                elif type_ == "tool_call":
+                    generated_chars += len(chunk["function"].get("arguments") or "")
+                    completed = tool_calls_buffer.feed(chunk)
+                    if speculation and completed:
+                        speculation.on_complete(completed)
+                elif type_ == "usage":
+                    # Token usage (incl. provider prefix-cache hits)
+                    turn_usage = chunk
+                    add_usage(usage_totals, chunk)
+                    turn_metrics.append({
+                        "turn": turn_count,
+                        "provider": self.config_manager.get("llm_provider", "openai"),
+                        "model": self.config_manager.get("model_name"),
+                        **{k: v for k, v in chunk.items() if k != "type"}
+                    })
+                elif type_ == "attempt":
+                    # Retry / failover telemetry
+                    provider_attempts.append({"turn": turn_count, **{k: v for k, v in chunk.items() if k != "type"}})
+                    if chunk["outcome"] == "retry":
+                        self._step(f"系统: {chunk['provider']}/{chunk['model']} 请求失败 ({chunk['error']})，{chunk['delay']:.1f} 秒后重试...")
+                    elif chunk["outcome"] == "failover":
+                        self._step(f"系统: {chunk['provider']}/{chunk['model']} 不可用，切换到下一个备用模型...")
+                elif type_ == "error":
+                    provider_error_message = chunk.get("content") or "Unknown error"
+                    self._emit("log", data=f"Provider Error: {provider_error_message}")
+
+            total_duration += time.time() - start_time
+            if speculation and not provider_error_message and not self.is_stopped:
+                speculation.on_complete(tool_calls_buffer.finish())
+            full_reasoning += reasoning
+
+            # Reasoning loop detection (very short reasonings are ignored)
+            if len(reasoning) > 10:
+                if reasoning == last_turn_reasoning:
+                    reasoning_repetition_count += 1
+                else:
+                    reasoning_repetition_count = 0
+                    last_turn_reasoning = reasoning
+                if reasoning_repetition_count >= MAX_REPETITIONS:
+                    self._step("系统: 🛑 检测到思维死循环 (重复的思考过程)。自动停止。")
+                    final_content = "⚠️ 操作已停止: 检测到思维死循环 (重复的思考过程)。"
+                    break
+
+            if provider_error_message and not content and not tool_calls_buffer:
+                content = f"⚠️ Provider Error: {provider_error_message}"
+
+            tool_calls = tool_calls_buffer.calls()
+            # reasoning_content is the current turn's only (DeepSeek requires it for tool calls
+            # within a turn); 'reasoning' is the same text for the UI
+            assistant_msg = {"role": "assistant", "content": content,
+                             "reasoning_content": reasoning, "reasoning": reasoning}
+            if turn_usage and turn_usage.get("completion_tokens") is not None:
+                assistant_msg["token_count"] = turn_usage["completion_tokens"]
+            if tool_calls:
+                assistant_msg["tool_calls"] = tool_calls
+            current_messages.append(assistant_msg)
+            generated_messages.append(assistant_msg)
+
+            if self.is_stopped:
+                final_content = content or STOPPED_MESSAGE
+                break
+            if not tool_calls:
+                # Final answer
+                final_content = content
+                break
+
+            # Tool call loop detection
+            try:
+                signature = json.dumps(sorted(
+                    [{"name": t["function"]["name"], "args": json.loads(t["function"]["arguments"] or "{}")} for t in tool_calls],
+                    key=lambda x: x["name"]), sort_keys=True)
+            except ValueError:
+                signature = None
+            if signature is not None and signature == last_tool_signature:
+                repetition_count += 1
+            else:
+                repetition_count = 0
+                last_tool_signature = signature
+            if repetition_count >= MAX_REPETITIONS: # Same toolset called 4 times in a row
+                self._step("系统: 🛑 检测到循环 (重复的工具调用)。自动停止。")
+                final_content = "⚠️ 操作已停止: 检测到死循环 (重复的工具调用)。"
+                break
+
+            self._step(f"Tool Calls Detected: {len(tool_calls)}")
+            for tool in tool_calls:
+                await self._wait_while_paused()
+                if self.is_stopped:
+                    break
+                started = speculation.take(tool["id"], tool["function"]["arguments"]) if speculation else None
+                result = await self._call_tool(tool, started)
+                tool_msg = {"role": "tool", "tool_call_id": tool["id"], "content": str(result)}
+                current_messages.append(tool_msg)
+                generated_messages.append(tool_msg)
+            # Loop continues to let the model see the tool results
+
+        result = {
+            "reasoning": full_reasoning.strip(),
+            "content": final_content,
+            "role": "assistant",
+            "duration": total_duration,
+            "generated_messages": generated_messages,
+            "usage": usage_totals,
+            "cache_hit_tokens": usage_totals["cached_tokens"],
+            "turn_metrics": turn_metrics,
+            "provider_attempts": provider_attempts
+        }
+        # The last request failed without producing anything: callers (e.g. the
+        # sub-agent scheduler) use this to decide whether to retry
+        if provider_error_message and final_content == f"⚠️ Provider Error: {provider_error_message}":
+            result["provider_error"] = provider_error_message
+        return result
+
+    def _is_speculable(self, name):
+        """Tools that may start while the model is still streaming (see SpeculativeDispatcher)."""
+        if self.tool_allowlist is not None and name not in self.tool_allowlist:
+            return False
+        is_safe = getattr(self.skill_manager, "is_parallel_safe", None)
+        return bool(is_safe and is_safe(name))
+
+    def _tool_context(self, tool_call_id):
+        return {
+            "step_signal": self.step_signal,
+            "config_manager": self.config_manager,
+            "skill_manager": self.skill_manager,
+            "agent_state_signal": self.agent_state_signal,
+            "tool_call_id": tool_call_id,
+            "agent_id": self.parent_agent_id or "Main",
+            "run_id": self.run_id,
+            "abort_signal": self.abort_signal,
+            "tool_router": self.router
+        }
+
+    def _start_tool(self, name, args, call_id):
+        """Run a tool in the executor now; returns the asyncio future."""
+        return asyncio.get_running_loop().run_in_executor(
+            None, self.skill_manager.call_tool, name, args, self._tool_context(call_id)
+        )
+
+    async def _execute_tool(self, name, args, call_id):
+        """Run a tool that was not started speculatively."""
+        if self.inline_tools:
+            return self.skill_manager.call_tool(name, args, context=self._tool_context(call_id))
+        return await self._start_tool(name, args, call_id)
+
+    async def _call_tool(self, tool, started=None):
+        name = tool["function"]["name"]
+        try:
+            args = json.loads(tool["function"]["arguments"] or "{}")
+        except ValueError as e:
+            args = None
+            result = f"Error: Invalid JSON arguments for {name}: {e}"
+        self._step(f"Executing Tool: {name}({args})")
+        self._emit("tool_call", data={"id": tool["id"], "name": name, "args": args})
+        skill_name = self.skill_manager.tool_to_skill_map.get(name)
+        if skill_name:
+            self._emit("skill_used", data=skill_name)
+
+        if args is None:
+            pass
+        elif started is not None:
+            # Started while the model was still streaming
+            result = await started
+        elif self.tool_allowlist is not None and name not in self.tool_allowlist:
+            result = f"Error: Tool '{name}' is not available to this agent."
+        else:
+            result = await self._execute_tool(name, args, tool["id"])
+        # Oversized results go to the artifact store; the rest of the
+        # pipeline (signals, history, database) only sees a preview + handle
+        result = spill_tool_result(self.config_manager, name, result)
+        self._emit("tool_result", data={"id": tool["id"], "result": str(result)})
+        self._step(f"Tool Result: {result}")
+        return result
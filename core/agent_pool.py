@@ -0,0 +1,108 @@
+import re
+import time
+import random
+from collections import deque
+
+DEFAULT_MAX_CONCURRENT = 4
+DEFAULT_MAX_RETRIES = 2
+BASE_RETRY_DELAY = 2.0
+MAX_RETRY_DELAY = 30.0
+
+# openai/anthropic SDK errors read "Error code: 429 - {...}"; other clients say "status 503"
+_STATUS_RE = re.compile(r'(?:error code|status(?: code)?)[:= ]+(\d{3})', re.IGNORECASE)
+_RETRYABLE_HINTS = ("rate limit", "rate_limit", "too many requests", "overloaded",
+                    "temporarily unavailable", "timed out", "timeout", "connection reset")
+
+
+def error_status(message):
+    """Extract an HTTP status code from a provider error message, if present."""
+    match = _STATUS_RE.search(message or "")
+    return int(match.group(1)) if match else None
+
+
+def is_retryable_error(message):
+    """True for rate limits (429), server errors (5xx) and transient network failures."""
+    if not message:
+        return False
+    status = error_status(message)
+    if status is not None:
+        return status == 429 or 500 <= status < 600
+    lowered = message.lower()
+    return any(hint in lowered for hint in _RETRYABLE_HINTS)
+
+
+def backoff_delay(attempt, base=BASE_RETRY_DELAY, cap=MAX_RETRY_DELAY, rng=random.random):
+    """Full-jitter exponential backoff for the given 1-based retry attempt."""
+    return min(cap, base * (2 ** (attempt - 1))) * (0.5 + rng() / 2)
+
+
+class AgentScheduler:
+    """
+    Work queue for sub-agent tasks with a concurrency cap and retry backoff.
+
+    The scheduler only does bookkeeping; the caller starts a worker for every
+    index returned by take_ready(), reports it back with complete(), and calls
+    take_ready() again after a completion or once next_wakeup() seconds have passed.
+    Results are stored by task index, so they come back in the original task order.
+    """
+
+    def __init__(self, task_count, max_concurrent=DEFAULT_MAX_CONCURRENT,
+                 max_retries=DEFAULT_MAX_RETRIES, clock=time.monotonic, delay_fn=backoff_delay):
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_retries = max(0, int(max_retries))
+        self.clock = clock
+        self.delay_fn = delay_fn
+        self.queue = deque(range(task_count))
+        self.ready_at = {}
+        self.attempts = [0] * task_count
+        self.results = [None] * task_count
+        self.running = set()
+        self.peak_running = 0
+
+    def take_ready(self):
+        """Mark and return the task indexes that may start now."""
+        now = self.clock()
+        started = []
+        for _ in range(len(self.queue)):
+            if len(self.running) >= self.max_concurrent:
+                break
+            index = self.queue.popleft()
+            if self.ready_at.get(index, 0) > now:
+                self.queue.append(index)  # Still backing off
+                continue
+            self.attempts[index] += 1
+            self.running.add(index)
+            started.append(index)
+        self.peak_running = max(self.peak_running, len(self.running))
+        return started
+
+    def complete(self, index, result, error=None):
+        """
+        Record a finished attempt. Returns the retry delay in seconds if the task
+        was re-queued because of a retryable error, otherwise None.
+        """
+        self.running.discard(index)
+        if error and is_retryable_error(error) and self.attempts[index] <= self.max_retries:
+            delay = self.delay_fn(self.attempts[index])
+            self.ready_at[index] = self.clock() + delay
+            self.queue.append(index)
+            return delay
+        self.results[index] = result
+        return None
+
+    def next_wakeup(self):
+        """Seconds until the earliest queued task may start, or None if nothing is queued."""
+        if not self.queue:
+            return None
+        now = self.clock()
+        return max(0.0, min(self.ready_at.get(i, 0) - now for i in self.queue))
+
+    def cancel(self):
+        """Drop queued tasks; returns their indexes."""
+        dropped = list(self.queue)
+        self.queue.clear()
+        return dropped
+
+    @property
+    def done(self):
+        return not self.queue and not self.running
@@ -0,0 +1,129 @@
+import os
+import re
+import hashlib
+import tempfile
+import threading
+
+DEFAULT_THRESHOLD = 20000
+DEFAULT_PREVIEW_CHARS = 2000
+# Upper bound for one read_artifact page; kept below the spill threshold so pages are never spilled again
+MAX_READ_LENGTH = 16000
+HANDLE_PREFIX = "artifact:"
+_HANDLE_RE = re.compile(r"^(?:artifact:)?([0-9a-f]{16,64})$")
+
+
+class ArtifactStore:
+    """
+    Content-addressed store for oversized tool results.
+
+    Each result is written once as UTF-8 text under root/<2 hex>/<sha256>.txt;
+    storing the same text again is a no-op that returns the same handle
+    ("artifact:<sha256>"). The message history only carries a preview and the
+    handle, and read() pages through the full text by character offset.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def _path(self, digest):
+        return os.path.join(self.root, digest[:2], digest + ".txt")
+
+    def put(self, text):
+        data = text.encode("utf-8", errors="replace")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        with self._lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Write-then-rename so a reader never sees a half written artifact
+                fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, path)
+        return HANDLE_PREFIX + digest
+
+    def resolve(self, handle):
+        """File path for a handle (full digest or an unambiguous prefix of at least 16 chars), or None."""
+        match = _HANDLE_RE.match((handle or "").strip().lower())
+        if not match:
+            return None
+        digest = match.group(1)
+        if len(digest) == 64:
+            path = self._path(digest)
+            return path if os.path.exists(path) else None
+        folder = os.path.join(self.root, digest[:2])
+        if not os.path.isdir(folder):
+            return None
+        found = [name for name in os.listdir(folder) if name.startswith(digest) and name.endswith(".txt")]
+        return os.path.join(folder, found[0]) if len(found) == 1 else None
+
+    def read(self, handle, offset=0, length=MAX_READ_LENGTH):
+        """
+        Slice of an artifact as {"handle", "offset", "length", "total", "text"}, or
+        None if the handle is unknown. Offsets and lengths count characters.
+        """
+        path = self.resolve(handle)
+        if path is None:
+            return None
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            text = f.read()
+        offset = max(0, int(offset or 0))
+        length = max(0, min(int(length if length is not None else MAX_READ_LENGTH), MAX_READ_LENGTH))
+        chunk = text[offset:offset + length]
+        return {"handle": HANDLE_PREFIX + os.path.basename(path)[:-4], "offset": offset,
+                "length": len(chunk), "total": len(text), "text": chunk}
+
+    def spill(self, result, threshold=DEFAULT_THRESHOLD, preview_chars=DEFAULT_PREVIEW_CHARS):
+        """
+        Return result as a string, replaced by a head/tail preview plus handle
+        if it is longer than threshold characters.
+        """
+        text = str(result)
+        if len(text) <= threshold:
+            return text
+        handle = self.put(text)
+        head = text[:preview_chars * 3 // 4]
+        tail = text[-(preview_chars - len(head)):] if preview_chars > len(head) else ""
+        return (
+            f"{head}\n\n"
+            f"[... {len(text) - len(head) - len(tail):,} characters omitted. The full result ({len(text):,} characters) "
+            f"is stored as {handle}. Use read_artifact(handle=\"{handle}\", offset=..., length=...) "
+            f"to read up to {MAX_READ_LENGTH:,} characters at a time ...]\n\n"
+            f"{tail}"
+        )
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_artifact_store(config_manager):
+    """Store under the chat history dir, next to the database whose messages reference it."""
+    root = os.path.join(config_manager.get_chat_history_dir(), "artifacts")
+    with _stores_lock:
+        if root not in _stores:
+            _stores[root] = ArtifactStore(root)
+        return _stores[root]
+
+
+def spill_tool_result(config_manager, name, result):
+    """
+    Tool result as the string the agent stores, spilling it to the artifact
+    store if it exceeds 'artifact_threshold' characters (0 disables spilling).
+    """
+    text = str(result)
+    if not config_manager or name == "read_artifact":
+        return text
+    try:
+        threshold = int(config_manager.get("artifact_threshold", DEFAULT_THRESHOLD))
+        preview_chars = int(config_manager.get("artifact_preview_chars", DEFAULT_PREVIEW_CHARS))
+    except (TypeError, ValueError):
+        threshold, preview_chars = DEFAULT_THRESHOLD, DEFAULT_PREVIEW_CHARS
+    if threshold <= 0 or len(text) <= threshold:
+        return text
+    try:
+        return get_artifact_store(config_manager).spill(text, threshold, min(preview_chars, threshold))
+    except OSError as e:
+        print(f"Artifact store unavailable, keeping full tool result: {e}")
+        return text
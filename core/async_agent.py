@@ -0,0 +1,151 @@
+import asyncio
+from core.agent_loop import AgentLoop
+from core.agent_pool import AgentScheduler, DEFAULT_MAX_CONCURRENT, DEFAULT_MAX_RETRIES, backoff_delay
+from core.subagent import SubAgentContext, ROLES, DEFAULT_ROLE
+
+# Same defaults as the agent-manager skill
+DEFAULT_TIME_BUDGET = 900
+DEFAULT_TOKEN_BUDGET = 60000
+
+
+def _config_number(config_manager, key, default):
+    try:
+        value = config_manager.get(key, default)
+        return default if value is None else float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+async def run_many(jobs, max_concurrency=DEFAULT_MAX_CONCURRENT):
+    """
+    Await zero-argument coroutine factories with at most max_concurrency in
+    flight. Results come back in job order; a job that raised returns its exception.
+    """
+    semaphore = asyncio.Semaphore(max(1, int(max_concurrency)))
+
+    async def guarded(job):
+        async with semaphore:
+            return await job()
+
+    return await asyncio.gather(*(guarded(job) for job in jobs), return_exceptions=True)
+
+
+class AsyncAgent(AgentLoop):
+    """
+    AgentLoop on an event loop instead of a QThread, so many conversations
+    and their sub-agents can share one thread. Tools run in the loop's
+    default executor.
+
+    dispatch_agents is handled natively: sub-agents become AsyncAgents on the
+    same loop, sharing one SubAgentContext (prompt prefix and tool subset),
+    scheduled like the agent-manager skill does (concurrency cap, retries with
+    backoff on rate-limit and server errors, results in task order).
+    """
+
+    # Seconds to wait before retry attempt n (1-based) of a sub-agent
+    retry_delay = staticmethod(backoff_delay)
+
+    def __init__(self, config_manager, workspace_dir=None, skill_manager=None, parent_agent_id=None,
+                 tool_allowlist=None, system_prompt=None, time_budget=None, token_budget=None,
+                 on_event=None, provider=None):
+        super().__init__(config_manager, workspace_dir, skill_manager=skill_manager,
+                         parent_agent_id=parent_agent_id, tool_allowlist=tool_allowlist,
+                         system_prompt=system_prompt, time_budget=time_budget,
+                         token_budget=token_budget, on_event=on_event, provider=provider)
+        self.children = []
+
+    def stop(self):
+        for child in self.children:
+            child.stop()
+        super().stop()
+
+    async def _execute_tool(self, name, args, call_id):
+        if name == "dispatch_agents" and name in self.skill_manager.tools:
+            return await self.dispatch_agents(args.get("tasks") or [], args.get("role", DEFAULT_ROLE), call_id)
+        return await super()._execute_tool(name, args, call_id)
+
+    async def dispatch_agents(self, tasks, role=DEFAULT_ROLE, tool_call_id=None):
+        """Run sub-agents for tasks on this event loop; same report format as the agent-manager skill."""
+        if isinstance(tasks, str):
+            tasks = [tasks]
+        if not tasks:
+            return "No tasks provided."
+        if role not in ROLES:
+            return f"Error: Unknown role '{role}'. Available roles: {', '.join(ROLES)}"
+        shared = SubAgentContext(self.skill_manager, self.workspace_dir, role=role)
+        config = self.config_manager
+        max_concurrent = int(_config_number(config, "max_concurrent_agents", DEFAULT_MAX_CONCURRENT))
+        max_retries = int(_config_number(config, "agent_max_retries", DEFAULT_MAX_RETRIES))
+        time_budget = _config_number(config, "agent_time_budget", DEFAULT_TIME_BUDGET) or None
+        token_budget = int(_config_number(config, "agent_token_budget", DEFAULT_TOKEN_BUDGET)) or None
+        scheduler = AgentScheduler(len(tasks), max_concurrent=max_concurrent, max_retries=max_retries,
+                                   delay_fn=self.retry_delay)
+        self._step(f"Manager: Spawning {len(tasks)} sub-agents (max {scheduler.max_concurrent} at a time)...")
+
+        async def run_child(i):
+            agent_id = f"Agent-{i+1}"
+
+            def forward(event):
+                if event["type"] == "step":
+                    self._step(f"[{agent_id}]: {event['data']}")
+
+            self._emit("agent_state", data={"agent_id": agent_id, "status": "running",
+                                            "task": tasks[i], "tool_call_id": tool_call_id})
+            child = AsyncAgent(config, self.workspace_dir, skill_manager=self.skill_manager,
+                               parent_agent_id=agent_id, tool_allowlist=shared.tool_allowlist,
+                               system_prompt=shared.system_prompt, time_budget=time_budget,
+                               token_budget=token_budget, on_event=forward, provider=self.provider)
+            self.children.append(child)
+            try:
+                return await child.run([shared.task_message(agent_id, tasks[i])])
+            finally:
+                self.children.remove(child)
+
+        running = {}
+
+        def finish(future):
+            i = running.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"content": "", "error": str(e)}
+            error = result.get("provider_error") or result.get("error")
+            delay = scheduler.complete(i, result, error=None if self.is_stopped else error)
+            if delay is not None:
+                self._step(f"Manager: Agent-{i+1} hit a retryable error ({error}); retrying in {delay:.1f}s...")
+            else:
+                self._emit("agent_state", data={"agent_id": f"Agent-{i+1}", "status": "completed",
+                                                "content": result.get("content"), "tool_call_id": tool_call_id})
+
+        while not scheduler.done:
+            if self.is_stopped:
+                scheduler.cancel()
+            else:
+                for i in scheduler.take_ready():
+                    running[asyncio.ensure_future(run_child(i))] = i
+            if not running:
+                if scheduler.done:
+                    break
+                # Everything left is backing off
+                await asyncio.sleep(scheduler.next_wakeup() or 0)
+                continue
+            # Wake up for a completion, or when a queued task's backoff ends
+            timeout = scheduler.next_wakeup() if len(scheduler.running) < scheduler.max_concurrent else None
+            done, _ = await asyncio.wait(list(running), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                finish(future)
+        self._step(f"Manager: All sub-agents finished (peak concurrency {scheduler.peak_running}).")
+
+        output = f"## Sub-Agent Results\n\nRole: {role}, shared prompt prefix ≈ {shared.prefix_tokens} tokens\n\n"
+        for i, res in enumerate(scheduler.results):
+            agent_id = f"Agent-{i+1}"
+            if res is None:
+                text = "Not run (cancelled)."
+            else:
+                text = res.get("content", "No content")
+                if "error" in res:
+                    text += f" (Error: {res['error']})"
+                if scheduler.attempts[i] > 1:
+                    text += f" (after {scheduler.attempts[i]} attempts)"
+            output += f"### {agent_id} (prompt ≈ {shared.prompt_tokens(agent_id, tasks[i])} tokens)\n{text}\n\n"
+        return output
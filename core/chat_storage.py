@@ -3,6 +3,65 @@ import os
 import sqlite3
 import time
 import uuid
+import zlib
+import hashlib
+
+TURN_METRIC_FIELDS = (
+    "prompt_tokens", "completion_tokens", "reasoning_tokens", "cached_tokens",
+    "cache_write_tokens", "ttft", "duration", "tokens_per_sec",
+)
+
+PROVIDER_ATTEMPT_FIELDS = (
+    "turn", "provider", "model", "attempt", "fallback", "outcome",
+    "status_code", "error", "delay", "duration",
+)
+
+# Message bodies longer than this (characters) are moved to the blobs table;
+# the messages row keeps only an indexed prefix for FTS and previews
+BLOB_THRESHOLD = 4096
+INDEXED_PREFIX_CHARS = 2048
+# messages column -> column referencing its full body in blobs
+BLOB_COLUMNS = {
+    "content": "content_blob",
+    "tool_calls": "tool_calls_blob",
+    "reasoning_content": "reasoning_blob",
+}
+
+# FTS5 tokenizer for messages_fts. trigram indexes every 3-character sequence,
+# so Chinese text (no spaces between words) is searchable by substring;
+# unicode61 is the fallback for SQLite builds older than 3.34
+FTS_TOKENIZERS = ("trigram", "unicode61")
+FTS_BATCH_SIZE = 2000
+# True while messages.rowid is in (done, target] of an unfinished rebuild;
+# those rows are not in the index yet and the rebuild will add them
+_FTS_PENDING = (
+    "EXISTS (SELECT 1 FROM meta d JOIN meta t ON t.key = 'fts_rebuild_target' "
+    "WHERE d.key = 'fts_rebuild_done' AND {rowid} > d.value AND {rowid} <= t.value)"
+)
+
+
+def fts_state(conn):
+    """Tokenizer of messages_fts and whether its rebuild is still running, read from the meta table."""
+    state = {"tokenizer": None, "pending": False, "done": None, "target": None}
+    try:
+        rows = conn.execute("SELECT key, value FROM meta WHERE key LIKE 'fts_%'").fetchall()
+    except sqlite3.OperationalError:
+        return state
+    values = {row[0]: row[1] for row in rows}
+    state["tokenizer"] = values.get("fts_tokenizer")
+    if "fts_rebuild_target" in values:
+        state.update(pending=True, done=values.get("fts_rebuild_done"), target=values["fts_rebuild_target"])
+    return state
+
+
+def _compress(text):
+    return "zlib", zlib.compress(text.encode("utf-8"), 6)
+
+
+def _decompress(codec, data):
+    if codec == "zlib":
+        return zlib.decompress(data).decode("utf-8")
+    raise ValueError(f"Unknown blob codec '{codec}'")
 
 
 class ChatStorage:
@@ -54,42 +113,189 @@ class ChatStorage:
                 ON messages(conversation_id, position)
                 """
             )
+            # Schema/migration state (FTS tokenizer, rebuild progress, ...)
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)")
+            self._ensure_fts(conn)
+            # Large message bodies, deduplicated by SHA-256 and compressed
             conn.execute(
                 """
-                CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
-                    content,
-                    reasoning_content,
-                    content='messages',
-                    content_rowid='rowid'
+                CREATE TABLE IF NOT EXISTS blobs (
+                    hash TEXT PRIMARY KEY,
+                    codec TEXT NOT NULL,
+                    data BLOB NOT NULL,
+                    raw_size INTEGER,
+                    stored_size INTEGER,
+                    created_at INTEGER
                 )
                 """
             )
+            existing = {row["name"] for row in conn.execute("PRAGMA table_info(messages)")}
+            # body_hash identifies unchanged rows when a conversation is rewritten
+            if "body_hash" not in existing:
+                conn.execute("ALTER TABLE messages ADD COLUMN body_hash TEXT")
+            for blob_column in BLOB_COLUMNS.values():
+                if blob_column not in existing:
+                    conn.execute(f"ALTER TABLE messages ADD COLUMN {blob_column} TEXT")
+                conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_messages_{blob_column} "
+                    f"ON messages({blob_column}) WHERE {blob_column} IS NOT NULL"
+                )
+            # One row per LLM request; kept when a conversation's messages are rewritten
             conn.execute(
                 """
-                CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
-                    INSERT INTO messages_fts(rowid, content, reasoning_content)
-                    VALUES (new.rowid, new.content, new.reasoning_content);
-                END
+                CREATE TABLE IF NOT EXISTS turn_metrics (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    conversation_id TEXT,
+                    turn INTEGER,
+                    provider TEXT,
+                    model TEXT,
+                    prompt_tokens INTEGER,
+                    completion_tokens INTEGER,
+                    reasoning_tokens INTEGER,
+                    cached_tokens INTEGER,
+                    cache_write_tokens INTEGER,
+                    ttft REAL,
+                    duration REAL,
+                    tokens_per_sec REAL,
+                    created_at INTEGER
+                )
                 """
             )
             conn.execute(
                 """
-                CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
-                    INSERT INTO messages_fts(messages_fts, rowid, content, reasoning_content)
-                    VALUES('delete', old.rowid, old.content, old.reasoning_content);
-                END
+                CREATE INDEX IF NOT EXISTS idx_turn_metrics_conversation
+                ON turn_metrics(conversation_id, created_at)
                 """
             )
+            # Retries and failovers of LLM requests (result["provider_attempts"])
             conn.execute(
                 """
-                CREATE TRIGGER IF NOT EXISTS messages_au AFTER UPDATE ON messages BEGIN
-                    INSERT INTO messages_fts(messages_fts, rowid, content, reasoning_content)
-                    VALUES('delete', old.rowid, old.content, old.reasoning_content);
-                    INSERT INTO messages_fts(rowid, content, reasoning_content)
-                    VALUES (new.rowid, new.content, new.reasoning_content);
-                END
+                CREATE TABLE IF NOT EXISTS provider_attempts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    conversation_id TEXT,
+                    turn INTEGER,
+                    provider TEXT,
+                    model TEXT,
+                    attempt INTEGER,
+                    fallback INTEGER,
+                    outcome TEXT,
+                    status_code INTEGER,
+                    error TEXT,
+                    delay REAL,
+                    duration REAL,
+                    created_at INTEGER
+                )
                 """
             )
+            conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_provider_attempts_created
+                ON provider_attempts(created_at)
+                """
+            )
+
+    def _ensure_fts(self, conn):
+        """
+        Create messages_fts with the preferred tokenizer. An index built by an
+        older version (no tokenizer recorded in meta) is dropped and recreated;
+        its rows are re-indexed later by rebuild_fts(), while new writes are
+        indexed by the triggers straight away.
+        """
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='messages_fts'"
+        ).fetchone()
+        if exists and fts_state(conn)["tokenizer"]:
+            return
+        for trigger in ("messages_ai", "messages_ad", "messages_au"):
+            conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        conn.execute("DROP TABLE IF EXISTS messages_fts")
+        for tokenizer in FTS_TOKENIZERS:
+            try:
+                conn.execute(
+                    f"""
+                    CREATE VIRTUAL TABLE messages_fts USING fts5(
+                        content,
+                        reasoning_content,
+                        content='messages',
+                        content_rowid='rowid',
+                        tokenize='{tokenizer}'
+                    )
+                    """
+                )
+                break
+            except sqlite3.OperationalError:
+                continue
+        conn.execute(
+            f"""
+            CREATE TRIGGER messages_ai AFTER INSERT ON messages
+            WHEN NOT {_FTS_PENDING.format(rowid="new.rowid")} BEGIN
+                INSERT INTO messages_fts(rowid, content, reasoning_content)
+                VALUES (new.rowid, new.content, new.reasoning_content);
+            END
+            """
+        )
+        conn.execute(
+            f"""
+            CREATE TRIGGER messages_ad AFTER DELETE ON messages
+            WHEN NOT {_FTS_PENDING.format(rowid="old.rowid")} BEGIN
+                INSERT INTO messages_fts(messages_fts, rowid, content, reasoning_content)
+                VALUES('delete', old.rowid, old.content, old.reasoning_content);
+            END
+            """
+        )
+        conn.execute(
+            f"""
+            CREATE TRIGGER messages_au AFTER UPDATE ON messages
+            WHEN NOT {_FTS_PENDING.format(rowid="old.rowid")} BEGIN
+                INSERT INTO messages_fts(messages_fts, rowid, content, reasoning_content)
+                VALUES('delete', old.rowid, old.content, old.reasoning_content);
+                INSERT INTO messages_fts(rowid, content, reasoning_content)
+                VALUES (new.rowid, new.content, new.reasoning_content);
+            END
+            """
+        )
+        target = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM messages").fetchone()[0]
+        conn.execute("DELETE FROM meta WHERE key LIKE 'fts_%'")
+        conn.executemany(
+            "INSERT INTO meta (key, value) VALUES (?, ?)",
+            [("fts_tokenizer", tokenizer)] + ([("fts_rebuild_done", 0), ("fts_rebuild_target", target)] if target else []),
+        )
+
+    def rebuild_fts(self, batch_size=FTS_BATCH_SIZE, max_batches=None):
+        """
+        Index rows that existed before messages_fts was (re)created, batch_size
+        rows per transaction. Progress is kept in meta, so the rebuild resumes
+        where it stopped after a restart. Returns fts_state() afterwards.
+        """
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            with self._connect() as conn:
+                state = fts_state(conn)
+                if not state["pending"]:
+                    return state
+                done, target = state["done"], state["target"]
+                upper = conn.execute(
+                    "SELECT rowid FROM messages WHERE rowid > ? AND rowid <= ? ORDER BY rowid LIMIT 1 OFFSET ?",
+                    (done, target, batch_size - 1),
+                ).fetchone()
+                upper = upper[0] if upper else target
+                conn.execute(
+                    """
+                    INSERT INTO messages_fts(rowid, content, reasoning_content)
+                    SELECT rowid, content, reasoning_content FROM messages WHERE rowid > ? AND rowid <= ?
+                    """,
+                    (done, upper),
+                )
+                if upper >= target:
+                    conn.execute("DELETE FROM meta WHERE key IN ('fts_rebuild_done', 'fts_rebuild_target')")
+                else:
+                    conn.execute("UPDATE meta SET value = ? WHERE key = 'fts_rebuild_done'", (upper,))
+            batches += 1
+        return self.fts_status()
+
+    def fts_status(self):
+        with self._connect() as conn:
+            return fts_state(conn)
 
     def upsert_conversation(self, conversation_id, title=None, status="active", meta=None):
         now = int(time.time())
@@ -117,38 +323,139 @@ class ChatStorage:
                     (conversation_id, title, now, now, status, meta_json),
                 )
 
+    def _store_body(self, conn, column, text):
+        """
+        (value for the messages column, blob hash or None). Bodies over
+        BLOB_THRESHOLD go to the blobs table; content and reasoning keep an
+        indexed prefix, tool_calls JSON is only useful whole and keeps nothing.
+        """
+        if not isinstance(text, str) or len(text) <= BLOB_THRESHOLD:
+            return text, None
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        if not conn.execute("SELECT 1 FROM blobs WHERE hash = ?", (digest,)).fetchone():
+            codec, data = _compress(text)
+            conn.execute(
+                """
+                INSERT INTO blobs (hash, codec, data, raw_size, stored_size, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (digest, codec, data, len(text), len(data), int(time.time())),
+            )
+        prefix = None if column == "tool_calls" else text[:INDEXED_PREFIX_CHARS]
+        return prefix, digest
+
+    def _blob_refs(self, conn, where, params):
+        refs = set()
+        columns = ", ".join(BLOB_COLUMNS.values())
+        for row in conn.execute(f"SELECT {columns} FROM messages WHERE {where}", params):
+            refs.update(value for value in row if value)
+        return refs
+
+    def _drop_orphans(self, conn, hashes):
+        dropped = 0
+        for digest in hashes:
+            referenced = any(
+                conn.execute(f"SELECT 1 FROM messages WHERE {blob_column} = ? LIMIT 1", (digest,)).fetchone()
+                for blob_column in BLOB_COLUMNS.values()
+            )
+            if not referenced:
+                dropped += conn.execute("DELETE FROM blobs WHERE hash = ?", (digest,)).rowcount
+        return dropped
+
+    @staticmethod
+    def _row_hash(msg, tool_calls_json, reasoning_content):
+        fields = [
+            msg.get("role"), msg.get("content"), tool_calls_json, reasoning_content,
+            msg.get("token_count"), msg.get("tool_call_id"),
+        ]
+        return hashlib.sha256(json.dumps(fields, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
     def replace_messages(self, conversation_id, messages):
+        """
+        Make the stored conversation equal to messages. Rows whose position and
+        body are unchanged are kept as they are (same id, rowid and created_at),
+        so rewriting a conversation after each turn only writes the new tail and
+        incremental consumers of messages (FTS, the embedding indexer) see only
+        what changed.
+        """
         now = int(time.time())
         with self._connect() as conn:
-            conn.execute("DELETE FROM messages WHERE conversation_id = ?", (conversation_id,))
+            previous_refs = self._blob_refs(conn, "conversation_id = ?", (conversation_id,))
+            existing = {
+                row["position"]: (row["id"], row["body_hash"], row["created_at"])
+                for row in conn.execute(
+                    "SELECT id, position, body_hash, created_at FROM messages WHERE conversation_id = ?",
+                    (conversation_id,),
+                )
+            }
+            conn.execute(
+                "DELETE FROM messages WHERE conversation_id = ? AND position >= ?",
+                (conversation_id, len(messages)),
+            )
+            # Rowids only grow (SQLite would reuse the largest one after a delete), so
+            # consumers can follow new rows with a rowid high-water mark
+            last_rowid = conn.execute(
+                "SELECT MAX(COALESCE((SELECT MAX(rowid) FROM messages), 0), "
+                "COALESCE((SELECT value FROM meta WHERE key = 'messages_last_rowid'), 0))"
+            ).fetchone()[0]
             for index, msg in enumerate(messages):
-                msg_id = msg.get("id") or uuid.uuid4().hex
                 tool_calls = msg.get("tool_calls")
                 tool_calls_json = (
                     json.dumps(tool_calls, ensure_ascii=False) if tool_calls is not None else None
                 )
                 reasoning_content = msg.get("reasoning_content") or msg.get("reasoning")
+                body_hash = self._row_hash(msg, tool_calls_json, reasoning_content)
+                old_id, old_hash, old_created_at = existing.get(index, (None, None, None))
+                # Messages read back through get_messages carry no id/created_at; those keep the stored ones
+                if (
+                    old_hash == body_hash
+                    and msg.get("id") in (None, old_id)
+                    and msg.get("created_at") in (None, old_created_at)
+                ):
+                    continue
+                if old_id is not None:
+                    conn.execute("DELETE FROM messages WHERE id = ?", (old_id,))
+                msg_id = msg.get("id") or uuid.uuid4().hex
+                # An explicit id may still be stored at another position of this conversation
+                for position, (row_id, _, _) in list(existing.items()) if msg.get("id") else ():
+                    if row_id == msg_id and position != index:
+                        conn.execute("DELETE FROM messages WHERE id = ?", (msg_id,))
+                        del existing[position]
+                content, content_blob = self._store_body(conn, "content", msg.get("content"))
+                tool_calls_json, tool_calls_blob = self._store_body(conn, "tool_calls", tool_calls_json)
+                reasoning_content, reasoning_blob = self._store_body(conn, "reasoning_content", reasoning_content)
                 conn.execute(
                     """
                     INSERT INTO messages (
-                        id, conversation_id, role, content, tool_calls, reasoning_content,
-                        token_count, tool_call_id, position, created_at
+                        rowid, id, conversation_id, role, content, tool_calls, reasoning_content,
+                        token_count, tool_call_id, position, created_at,
+                        content_blob, tool_calls_blob, reasoning_blob, body_hash
                     )
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                     """,
                     (
+                        last_rowid + 1,
                         msg_id,
                         conversation_id,
                         msg.get("role"),
-                        msg.get("content"),
+                        content,
                         tool_calls_json,
                         reasoning_content,
                         msg.get("token_count"),
                         msg.get("tool_call_id"),
                         index,
                         msg.get("created_at") or now,
+                        content_blob,
+                        tool_calls_blob,
+                        reasoning_blob,
+                        body_hash,
                     ),
                 )
+                last_rowid += 1
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('messages_last_rowid', ?)", (last_rowid,)
+            )
+            self._drop_orphans(conn, previous_refs)
 
     def save_conversation(self, conversation_id, messages, title=None, status="active", meta=None):
         self.upsert_conversation(conversation_id, title=title, status=status, meta=meta)
@@ -168,21 +475,32 @@ class ChatStorage:
         with self._connect() as conn:
             rows = conn.execute(
                 """
-                SELECT role, content, tool_calls, reasoning_content, token_count, tool_call_id
-                FROM messages
-                WHERE conversation_id = ?
-                ORDER BY position ASC
+                SELECT m.role, m.content, m.tool_calls, m.reasoning_content, m.token_count, m.tool_call_id,
+                       bc.codec AS content_codec, bc.data AS content_data,
+                       bt.codec AS tool_calls_codec, bt.data AS tool_calls_data,
+                       br.codec AS reasoning_content_codec, br.data AS reasoning_content_data
+                FROM messages m
+                LEFT JOIN blobs bc ON bc.hash = m.content_blob
+                LEFT JOIN blobs bt ON bt.hash = m.tool_calls_blob
+                LEFT JOIN blobs br ON br.hash = m.reasoning_blob
+                WHERE m.conversation_id = ?
+                ORDER BY m.position ASC
                 """,
                 (conversation_id,),
             ).fetchall()
         messages = []
         for row in rows:
-            msg = {"role": row["role"], "content": row["content"]}
-            if row["tool_calls"]:
-                msg["tool_calls"] = json.loads(row["tool_calls"])
-            if row["reasoning_content"] is not None:
-                msg["reasoning_content"] = row["reasoning_content"]
-                msg["reasoning"] = row["reasoning_content"]
+            body = {
+                column: _decompress(row[f"{column}_codec"], row[f"{column}_data"])
+                if row[f"{column}_data"] is not None else row[column]
+                for column in BLOB_COLUMNS
+            }
+            msg = {"role": row["role"], "content": body["content"]}
+            if body["tool_calls"]:
+                msg["tool_calls"] = json.loads(body["tool_calls"])
+            if body["reasoning_content"] is not None:
+                msg["reasoning_content"] = body["reasoning_content"]
+                msg["reasoning"] = body["reasoning_content"]
             if row["token_count"] is not None:
                 msg["token_count"] = row["token_count"]
             if row["tool_call_id"] is not None:
@@ -190,6 +508,62 @@ class ChatStorage:
             messages.append(msg)
         return messages
 
+    def migrate_blobs(self, batch_size=200):
+        """
+        Move large bodies stored inline by older versions into the blobs table.
+        Works in batches of batch_size rows, one transaction each, so it can be
+        interrupted and resumed. Returns the number of rows rewritten.
+        """
+        condition = " OR ".join(
+            f"({blob_column} IS NULL AND length({column}) > {BLOB_THRESHOLD})"
+            for column, blob_column in BLOB_COLUMNS.items()
+        )
+        moved = 0
+        last_rowid = 0
+        while True:
+            with self._connect() as conn:
+                rows = conn.execute(
+                    f"SELECT rowid, content, tool_calls, reasoning_content, content_blob, tool_calls_blob, reasoning_blob "
+                    f"FROM messages WHERE rowid > ? AND ({condition}) ORDER BY rowid LIMIT ?",
+                    (last_rowid, batch_size),
+                ).fetchall()
+                for row in rows:
+                    updates = {}
+                    for column, blob_column in BLOB_COLUMNS.items():
+                        if row[blob_column] is None:
+                            value, digest = self._store_body(conn, column, row[column])
+                            if digest:
+                                updates[column] = value
+                                updates[blob_column] = digest
+                    if updates:
+                        assignments = ", ".join(f"{column} = ?" for column in updates)
+                        conn.execute(
+                            f"UPDATE messages SET {assignments} WHERE rowid = ?",
+                            (*updates.values(), row["rowid"]),
+                        )
+                        moved += 1
+            if rows:
+                last_rowid = rows[-1]["rowid"]
+            if len(rows) < batch_size:
+                return moved
+
+    def collect_garbage(self):
+        """Delete blobs no message references any more. Returns the number deleted."""
+        referenced = " UNION ".join(
+            f"SELECT {blob_column} FROM messages WHERE {blob_column} IS NOT NULL"
+            for blob_column in BLOB_COLUMNS.values()
+        )
+        with self._connect() as conn:
+            return conn.execute(f"DELETE FROM blobs WHERE hash NOT IN ({referenced})").rowcount
+
+    def get_blob_stats(self):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) AS blobs, COALESCE(SUM(raw_size), 0) AS raw_size, "
+                "COALESCE(SUM(stored_size), 0) AS stored_size FROM blobs"
+            ).fetchone()
+        return dict(row)
+
     def has_conversation(self, conversation_id):
         with self._connect() as conn:
             row = conn.execute(
@@ -197,3 +571,98 @@ class ChatStorage:
                 (conversation_id,),
             ).fetchone()
         return row is not None
+
+    def record_turn_metrics(self, conversation_id, metrics):
+        """Store the per-request usage records returned by LLMWorker (result["turn_metrics"])."""
+        if not metrics:
+            return
+        now = int(time.time())
+        columns = ("conversation_id", "turn", "provider", "model") + TURN_METRIC_FIELDS + ("created_at",)
+        rows = [
+            (conversation_id, m.get("turn"), m.get("provider"), m.get("model"))
+            + tuple(m.get(field) for field in TURN_METRIC_FIELDS)
+            + (m.get("created_at") or now,)
+            for m in metrics
+        ]
+        with self._connect() as conn:
+            conn.executemany(
+                f"INSERT INTO turn_metrics ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                rows,
+            )
+
+    def get_turn_metrics(self, conversation_id):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM turn_metrics WHERE conversation_id = ? ORDER BY id ASC",
+                (conversation_id,),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def record_provider_attempts(self, conversation_id, attempts):
+        """Store the retry/failover telemetry returned by LLMWorker (result["provider_attempts"])."""
+        if not attempts:
+            return
+        now = int(time.time())
+        columns = ("conversation_id",) + PROVIDER_ATTEMPT_FIELDS + ("created_at",)
+        rows = [
+            (conversation_id,) + tuple(a.get(field) for field in PROVIDER_ATTEMPT_FIELDS) + (a.get("created_at") or now,)
+            for a in attempts
+        ]
+        with self._connect() as conn:
+            conn.executemany(
+                f"INSERT INTO provider_attempts ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                rows,
+            )
+
+    def get_provider_health(self, since=None):
+        """Per provider/model attempt counts by outcome, optionally since a unix timestamp."""
+        where, params = ("WHERE created_at >= ?", (int(since),)) if since is not None else ("", ())
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT provider, model, COUNT(*) AS attempts,
+                       SUM(outcome = 'ok') AS ok,
+                       SUM(outcome = 'retry') AS retries,
+                       SUM(outcome IN ('failover', 'failed')) AS failures,
+                       AVG(duration) AS avg_duration
+                FROM provider_attempts {where}
+                GROUP BY provider, model
+                ORDER BY attempts DESC
+                """,
+                params,
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_usage_summary(self, since=None, conversation_id=None):
+        """
+        Aggregate token and latency metrics, optionally since a unix timestamp
+        and/or for one conversation. Averages skip turns that did not report a value.
+        """
+        clauses, params = [], []
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(int(since))
+        if conversation_id is not None:
+            clauses.append("conversation_id = ?")
+            params.append(conversation_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._connect() as conn:
+            row = conn.execute(
+                f"""
+                SELECT COUNT(*) AS turns,
+                       COALESCE(SUM(prompt_tokens), 0) AS prompt_tokens,
+                       COALESCE(SUM(completion_tokens), 0) AS completion_tokens,
+                       COALESCE(SUM(reasoning_tokens), 0) AS reasoning_tokens,
+                       COALESCE(SUM(cached_tokens), 0) AS cached_tokens,
+                       COALESCE(SUM(cache_write_tokens), 0) AS cache_write_tokens,
+                       AVG(ttft) AS avg_ttft,
+                       AVG(tokens_per_sec) AS avg_tokens_per_sec,
+                       COALESCE(SUM(duration), 0) AS total_duration
+                FROM turn_metrics {where}
+                """,
+                params,
+            ).fetchone()
+        summary = dict(row)
+        prompt = summary["prompt_tokens"]
+        summary["cache_hit_rate"] = round(summary["cached_tokens"] / prompt, 3) if prompt else None
+        return summary
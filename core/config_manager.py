@@ -33,7 +33,8 @@ class ConfigManager:
             "llm_provider": "openai",
             "disabled_skills": [],
             "god_mode": False,
-            "default_workspace": ""
+            "default_workspace": "",
+            "max_concurrent_agents": 4
         }
         self.load_config()
 
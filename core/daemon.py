@@ -1,5 +1,6 @@
 import json
 import os
+import asyncio
 import socket
 import socketserver
 import threading
@@ -7,13 +8,17 @@ import time
 import uuid
 from PySide6.QtCore import QCoreApplication, QEventLoop, QTimer, Qt
 from core.agent import LLMWorker
+from core.async_agent import AsyncAgent
 from core.chat_storage import ChatStorage
+from core.embedding_indexer import EmbeddingIndexer, get_embedding_backend
 from core.config_manager import ConfigManager
 from core.interaction import bridge
 
 
 DEFAULT_HOST = "127.0.0.1"
 DEFAULT_PORT = 23333
+# Payload types the stream action forwards (the same set the LLMWorker path sends)
+STREAM_EVENT_TYPES = ("thinking", "content", "tool_call", "tool_result", "log")
 
 
 def _compute_session_title(messages):
@@ -27,6 +32,41 @@ def _compute_session_title(messages):
     return title
 
 
+class AsyncRunner:
+    """One asyncio event loop in a background thread, shared by all async sessions."""
+
+    def __init__(self):
+        self.loop = None
+        self.lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self.lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                threading.Thread(target=self.loop.run_forever, daemon=True, name="daemon-asyncio").start()
+            return self.loop
+
+    def run(self, coro):
+        """Run a coroutine on the shared loop and block the calling thread until it finishes."""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop()).result()
+
+
+def _append_result(messages, result):
+    if "error" in result:
+        return
+    generated_messages = result.get("generated_messages", [])
+    if generated_messages:
+        messages.extend(generated_messages)
+    else:
+        messages.append(
+            {
+                "role": result.get("role", "assistant"),
+                "content": result.get("content", ""),
+                "reasoning": result.get("reasoning", "")
+            }
+        )
+
+
 class DaemonState:
     def __init__(self, config_manager):
         self.config_manager = config_manager
@@ -39,6 +79,35 @@ class DaemonState:
         self.last_activity = time.time()
         idle_minutes = config_manager.get("daemon_idle_minutes", 10)
         self.idle_timeout = max(int(idle_minutes), 1) * 60
+        self.async_runner = AsyncRunner()
+        threading.Thread(target=self._rebuild_fts, daemon=True, name="fts-rebuild").start()
+        self.embedding_stop = threading.Event()
+        self.embedding_indexer = None
+        if config_manager.get("embedding_indexer", True):
+            self.embedding_indexer = EmbeddingIndexer(db_path, get_embedding_backend(config_manager))
+            threading.Thread(
+                target=self.embedding_indexer.run, args=(self.embedding_stop,), daemon=True, name="embedding-indexer"
+            ).start()
+
+    def _rebuild_fts(self):
+        """Re-index old history after an FTS migration, one short transaction at a time so chat writes are not held up."""
+        try:
+            while self.chat_storage.rebuild_fts(max_batches=1)["pending"]:
+                time.sleep(0.05)
+        except Exception as e:
+            print(f"FTS rebuild failed: {e}")
+
+    def use_async(self):
+        """'daemon_async' in config.json: run sessions as AsyncAgents on one event loop instead of a QThread each."""
+        return bool(self.config_manager.get("daemon_async", False))
+
+    def run_llm_async(self, messages, workspace_dir=None, on_event=None):
+        try:
+            # Built here, in the handler thread: loading skills blocks
+            agent = AsyncAgent(self.config_manager, workspace_dir, on_event=on_event)
+            return self.async_runner.run(agent.run(messages))
+        except Exception as e:
+            return {"error": str(e)}
 
     def touch(self):
         self.last_activity = time.time()
@@ -56,6 +125,12 @@ class DaemonState:
                 self.chat_storage.save_conversation(session_id, messages, title=title)
             self.sessions = {}
             self.suspended = True
+            # Idle: move bodies stored inline by older versions into blobs
+            try:
+                self.chat_storage.migrate_blobs()
+                self.chat_storage.collect_garbage()
+            except Exception as e:
+                print(f"Blob maintenance failed: {e}")
 
     def get_session_messages(self, session_id):
         with self.lock:
@@ -75,6 +150,13 @@ class DaemonState:
         title = _compute_session_title(messages)
         self.chat_storage.save_conversation(session_id, messages, title=title)
 
+    def record_metrics(self, session_id, result):
+        try:
+            self.chat_storage.record_turn_metrics(session_id, result.get("turn_metrics"))
+            self.chat_storage.record_provider_attempts(session_id, result.get("provider_attempts"))
+        except Exception as e:
+            print(f"[Daemon] Failed to record turn metrics: {e}")
+
     def run_llm_sync(self, session_id, user_text, workspace_dir=None):
         self.touch()
         try:
@@ -85,31 +167,24 @@ class DaemonState:
         self.idle_timeout = max(int(idle_minutes), 1) * 60
         messages = self.get_session_messages(session_id)
         messages.append({"role": "user", "content": user_text})
-        result_holder = {}
-        loop = QEventLoop()
-
-        def on_finished(result):
-            result_holder["result"] = result
-            loop.quit()
-
-        worker = LLMWorker(messages, self.config_manager, workspace_dir)
-        worker.finished_signal.connect(on_finished)
-        worker.start()
-        loop.exec()
-        result = result_holder.get("result") or {"error": "No response"}
-        if "error" not in result:
-            generated_messages = result.get("generated_messages", [])
-            if generated_messages:
-                messages.extend(generated_messages)
-            else:
-                messages.append(
-                    {
-                        "role": result.get("role", "assistant"),
-                        "content": result.get("content", ""),
-                        "reasoning": result.get("reasoning", "")
-                    }
-                )
+        if self.use_async():
+            result = self.run_llm_async(messages, workspace_dir)
+        else:
+            result_holder = {}
+            loop = QEventLoop()
+
+            def on_finished(result):
+                result_holder["result"] = result
+                loop.quit()
+
+            worker = LLMWorker(messages, self.config_manager, workspace_dir)
+            worker.finished_signal.connect(on_finished)
+            worker.start()
+            loop.exec()
+            result = result_holder.get("result") or {"error": "No response"}
+        _append_result(messages, result)
         self.save_session(session_id)
+        self.record_metrics(session_id, result)
         self.touch()
         return result
 
@@ -135,7 +210,8 @@ class DaemonRequestHandler(socketserver.StreamRequestHandler):
                     "status": "ok",
                     "suspended": state.suspended,
                     "last_activity": state.last_activity,
-                    "sessions": len(state.sessions)
+                    "sessions": len(state.sessions),
+                    "embedding_index": state.embedding_indexer.status() if state.embedding_indexer else None
                 }
             )
             return
@@ -177,38 +253,36 @@ class DaemonRequestHandler(socketserver.StreamRequestHandler):
                 except Exception:
                     pass
 
-            result_holder = {}
-            done = threading.Event()
+            if state.use_async():
+                def on_event(event):
+                    if event["type"] in STREAM_EVENT_TYPES:
+                        send_stream(event)
 
-            def on_finished(result):
-                result_holder["result"] = result
+                result = state.run_llm_async(messages, workspace_dir, on_event=on_event)
                 send_stream({"type": "final", "result": result})
-                done.set()
-
-            worker = LLMWorker(messages, state.config_manager, workspace_dir)
-            worker.thinking_signal.connect(lambda text: send_stream({"type": "thinking", "delta": text}), Qt.DirectConnection)
-            worker.content_signal.connect(lambda text: send_stream({"type": "content", "delta": text}), Qt.DirectConnection)
-            worker.tool_call_signal.connect(lambda data: send_stream({"type": "tool_call", "data": data}), Qt.DirectConnection)
-            worker.tool_result_signal.connect(lambda data: send_stream({"type": "tool_result", "data": data}), Qt.DirectConnection)
-            worker.output_signal.connect(lambda text: send_stream({"type": "log", "data": text}), Qt.DirectConnection)
-            worker.finished_signal.connect(on_finished, Qt.DirectConnection)
-            worker.start()
-            done.wait()
-            worker.wait(2000)
-            result = result_holder.get("result") or {"error": "No response"}
-            if "error" not in result:
-                generated_messages = result.get("generated_messages", [])
-                if generated_messages:
-                    messages.extend(generated_messages)
-                else:
-                    messages.append(
-                        {
-                            "role": result.get("role", "assistant"),
-                            "content": result.get("content", ""),
-                            "reasoning": result.get("reasoning", "")
-                        }
-                    )
+            else:
+                result_holder = {}
+                done = threading.Event()
+
+                def on_finished(result):
+                    result_holder["result"] = result
+                    send_stream({"type": "final", "result": result})
+                    done.set()
+
+                worker = LLMWorker(messages, state.config_manager, workspace_dir)
+                worker.thinking_signal.connect(lambda text: send_stream({"type": "thinking", "delta": text}), Qt.DirectConnection)
+                worker.content_signal.connect(lambda text: send_stream({"type": "content", "delta": text}), Qt.DirectConnection)
+                worker.tool_call_signal.connect(lambda data: send_stream({"type": "tool_call", "data": data}), Qt.DirectConnection)
+                worker.tool_result_signal.connect(lambda data: send_stream({"type": "tool_result", "data": data}), Qt.DirectConnection)
+                worker.output_signal.connect(lambda text: send_stream({"type": "log", "data": text}), Qt.DirectConnection)
+                worker.finished_signal.connect(on_finished, Qt.DirectConnection)
+                worker.start()
+                done.wait()
+                worker.wait(2000)
+                result = result_holder.get("result") or {"error": "No response"}
+            _append_result(messages, result)
             state.save_session(session_id)
+            state.record_metrics(session_id, result)
             state.touch()
             return
         if action == "shutdown":
@@ -0,0 +1,284 @@
+import re
+import json
+import math
+import sqlite3
+import hashlib
+import threading
+from .history_search import ensure_vec_table, load_vec_extension, PREVIEW_CHARS
+
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_HASHING_DIM = 256
+DEFAULT_INTERVAL = 30.0
+DEFAULT_MODEL = "BAAI/bge-small-zh-v1.5"
+# Only the start of long messages is embedded (and the column holds a prefix anyway)
+MAX_EMBED_CHARS = 2000
+INDEXED_ROLES = ("user", "assistant")
+
+_TOKEN_RE = re.compile(r"[a-z0-9_]+|[㐀-鿿豈-﫿]+")
+
+
+class HashingEmbeddingBackend:
+    """
+    Deterministic, dependency-free embeddings: signed feature hashing of
+    Latin words plus CJK character unigrams and bigrams, L2-normalised.
+    Captures lexical overlap only; a stand-in for tests and for machines
+    without a local model.
+    """
+
+    # Similar vectors mean shared words, not shared meaning
+    semantic = False
+
+    def __init__(self, dim=DEFAULT_HASHING_DIM):
+        self.dim = int(dim)
+        self.name = "hashing"
+
+    @staticmethod
+    def _features(text):
+        for token in _TOKEN_RE.findall((text or "").lower()):
+            if token[0] < "㐀":
+                yield token
+                continue
+            for i, char in enumerate(token):
+                yield char
+                if i + 1 < len(token):
+                    yield token[i:i + 2]
+
+    def embed(self, texts):
+        vectors = []
+        for text in texts:
+            vector = [0.0] * self.dim
+            for feature in self._features(text):
+                digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+                vector[digest % self.dim] += 1.0 if digest >> 63 else -1.0
+            norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+            vectors.append([v / norm for v in vector])
+        return vectors
+
+
+class SentenceTransformerBackend:
+    """Local CPU embeddings from a sentence-transformers model (installed and loaded on first use)."""
+
+    semantic = True
+
+    def __init__(self, model_name=DEFAULT_MODEL):
+        self.model_name = model_name
+        self.name = f"sentence-transformers:{model_name}"
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        with self._lock:
+            if self._model is None:
+                from .env_utils import ensure_package_installed
+                ensure_package_installed("sentence-transformers", "sentence_transformers")
+                from sentence_transformers import SentenceTransformer
+                self._model = SentenceTransformer(self.model_name, device="cpu")
+            return self._model
+
+    @property
+    def dim(self):
+        return self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts):
+        return self.model.encode(list(texts), normalize_embeddings=True).tolist()
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_embedding_backend(config_manager=None):
+    """
+    Backend named by 'embedding_backend' in config: "hashing" (default) or
+    "sentence-transformers" (model from 'embedding_model'). Shared per setting.
+    """
+    kind = config_manager.get("embedding_backend", "hashing") if config_manager else "hashing"
+    if kind == "sentence-transformers":
+        key = (kind, config_manager.get("embedding_model", DEFAULT_MODEL))
+    else:
+        dim = config_manager.get("embedding_dim", DEFAULT_HASHING_DIM) if config_manager else DEFAULT_HASHING_DIM
+        key = ("hashing", int(dim))
+    with _backends_lock:
+        if key not in _backends:
+            _backends[key] = (SentenceTransformerBackend(key[1]) if key[0] == "sentence-transformers"
+                              else HashingEmbeddingBackend(key[1]))
+        return _backends[key]
+
+
+def embed_query(db_path, backend, text):
+    """
+    Embed a search query with backend, or None if messages_vec was not built
+    by that backend (its vectors would not be comparable).
+    """
+    conn = sqlite3.connect(db_path, timeout=10)
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'embedding_backend'").fetchone()
+    except sqlite3.OperationalError:
+        row = None
+    finally:
+        conn.close()
+    if not row or not str(row[0]).startswith(f"{backend.name}:"):
+        return None
+    return backend.embed([text])[0]
+
+
+class SqliteVecStore:
+    """messages_vec on one connection; vector rows share the rowid of the message they embed."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    @classmethod
+    def open(cls, conn):
+        load_vec_extension(conn)
+        return cls(conn)
+
+    def replace(self, dim, rows):
+        """rows: (rowid, vector, message_id, conversation_id, content, created_at)."""
+        ensure_vec_table(self.conn, dim)
+        self.delete([row[0] for row in rows])
+        self.conn.executemany(
+            "INSERT INTO messages_vec (rowid, embedding, message_id, conversation_id, content, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(rowid, json.dumps(vector), *rest) for rowid, vector, *rest in rows],
+        )
+
+    def delete(self, rowids):
+        self.conn.executemany("DELETE FROM messages_vec WHERE rowid = ?", [(r,) for r in rowids])
+
+    def rowids(self):
+        if not self.conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='messages_vec'").fetchone():
+            return []
+        return [row[0] for row in self.conn.execute("SELECT rowid FROM messages_vec")]
+
+    def drop(self):
+        self.conn.execute("DROP TABLE IF EXISTS messages_vec")
+
+
+class EmbeddingIndexer:
+    """
+    Embeds new chat messages into messages_vec in batches.
+
+    Progress is a high-water mark (the last messages.rowid looked at) kept in
+    the meta table, so each pass only reads rows added since the previous one
+    and a restart resumes where it stopped. ChatStorage keeps rowids of
+    unchanged messages when it rewrites a conversation, so only new or edited
+    messages get (re-)embedded. prune() removes vectors of deleted messages.
+    Switching to a backend with another name or dimension rebuilds the index
+    from scratch, since vectors of different models are not comparable.
+    """
+
+    def __init__(self, db_path, backend, batch_size=DEFAULT_BATCH_SIZE, store_factory=SqliteVecStore.open):
+        self.db_path = db_path
+        self.backend = backend
+        self.batch_size = batch_size
+        self.store_factory = store_factory
+        self.indexed = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)")
+        return conn
+
+    @staticmethod
+    def _meta(conn, key, default=None):
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    @staticmethod
+    def _set_meta(conn, key, value):
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _signature(self):
+        return f"{self.backend.name}:{self.backend.dim}"
+
+    def _check_backend(self, conn, store):
+        if self._meta(conn, "embedding_backend") != self._signature():
+            store.drop()
+            self._set_meta(conn, "embedding_backend", self._signature())
+            self._set_meta(conn, "embedding_hwm", 0)
+
+    def index_batch(self):
+        """Embed up to batch_size messages past the high-water mark. Returns the number of rows read."""
+        conn = self._connect()
+        try:
+            store = self.store_factory(conn)
+            with conn:
+                self._check_backend(conn, store)
+            hwm = self._meta(conn, "embedding_hwm", 0)
+            rows = conn.execute(
+                """
+                SELECT rowid, id, conversation_id, role, content, created_at
+                FROM messages WHERE rowid > ? ORDER BY rowid LIMIT ?
+                """,
+                (hwm, self.batch_size),
+            ).fetchall()
+            if not rows:
+                return 0
+            todo = [row for row in rows if row["role"] in INDEXED_ROLES and (row["content"] or "").strip()]
+            # Embed outside the write transaction; a model can take a while
+            vectors = self.backend.embed([row["content"][:MAX_EMBED_CHARS] for row in todo]) if todo else []
+            with conn:
+                if todo:
+                    store.replace(self.backend.dim, [
+                        (row["rowid"], vector, row["id"], row["conversation_id"],
+                         row["content"][:PREVIEW_CHARS], row["created_at"])
+                        for row, vector in zip(todo, vectors)
+                    ])
+                self._set_meta(conn, "embedding_hwm", rows[-1]["rowid"])
+            self.indexed += len(todo)
+            return len(rows)
+        finally:
+            conn.close()
+
+    def run_once(self, max_batches=None):
+        """Index until caught up (or max_batches). Returns the number of rows read."""
+        total, batches = 0, 0
+        while max_batches is None or batches < max_batches:
+            count = self.index_batch()
+            total += count
+            batches += 1
+            if count < self.batch_size:
+                break
+        return total
+
+    def prune(self):
+        """Delete vectors whose message no longer exists. Returns the number deleted."""
+        conn = self._connect()
+        try:
+            store = self.store_factory(conn)
+            rowids = store.rowids()
+            stale = []
+            for start in range(0, len(rowids), 500):
+                chunk = rowids[start:start + 500]
+                live = {row[0] for row in conn.execute(
+                    f"SELECT rowid FROM messages WHERE rowid IN ({','.join('?' * len(chunk))})", chunk)}
+                stale += [r for r in chunk if r not in live]
+            with conn:
+                store.delete(stale)
+            return len(stale)
+        finally:
+            conn.close()
+
+    def status(self):
+        conn = self._connect()
+        try:
+            hwm = self._meta(conn, "embedding_hwm", 0)
+            backlog = conn.execute("SELECT COUNT(*) FROM messages WHERE rowid > ?", (hwm,)).fetchone()[0]
+            return {"backend": self._meta(conn, "embedding_backend"), "high_water_mark": hwm,
+                    "backlog": backlog, "indexed": self.indexed}
+        finally:
+            conn.close()
+
+    def run(self, stop_event, interval=DEFAULT_INTERVAL):
+        """Background loop: catch up, prune, then wait for interval seconds or until stop_event is set."""
+        while not stop_event.is_set():
+            try:
+                if self.run_once():
+                    self.prune()
+            except Exception as e:
+                print(f"[EmbeddingIndexer] Stopped: {e}")
+                return
+            stop_event.wait(interval)
@@ -0,0 +1,163 @@
+import os
+import csv
+import time
+import tempfile
+import uuid
+import zipfile
+import threading
+from .env_utils import ensure_package_installed
+
+# Streams left open longer than this are saved and closed on the next start_stream()
+STREAM_IDLE_TIMEOUT = 30 * 60
+# Existing workbooks at least this large are rewritten with write_sheet() instead of
+# being loaded whole (which costs many times the file size in memory)
+STREAM_REWRITE_MIN_BYTES = 20 * 1024 * 1024
+# Package parts a values-only copy would drop
+_DRAWING_PARTS = ("xl/drawings/", "xl/charts/", "xl/media/")
+
+
+class ExcelStreamWriter:
+    """
+    Append-only spreadsheet writer with bounded memory.
+
+    .xlsx files use an openpyxl write-only workbook (rows are flushed to a temp
+    file as they are appended); .csv files are written directly with the csv module.
+    The file is complete once close() is called.
+    """
+
+    def __init__(self, abs_path, sheet_name='Sheet1'):
+        self.abs_path = abs_path
+        self.sheet_name = sheet_name
+        self.rows_written = 0
+        self.last_used = time.time()
+        self.is_csv = abs_path.lower().endswith('.csv')
+        self._csv_file = None
+        self._wb = None
+        self._ws = None
+        if self.is_csv:
+            self._csv_file = open(abs_path, 'w', newline='', encoding='utf-8-sig')
+            self._csv_writer = csv.writer(self._csv_file)
+        else:
+            ensure_package_installed("openpyxl")
+            import openpyxl
+            self._wb = openpyxl.Workbook(write_only=True)
+            self._ws = self._wb.create_sheet(sheet_name)
+
+    def append(self, rows):
+        if self.is_csv:
+            self._csv_writer.writerows(rows)
+            count = len(rows)
+        else:
+            count = 0
+            for row in rows:
+                self._ws.append(row)
+                count += 1
+        self.rows_written += count
+        self.last_used = time.time()
+        return count
+
+    def close(self):
+        if self.is_csv:
+            self._csv_file.close()
+        else:
+            self._wb.save(self.abs_path)
+            self._wb.close()
+
+
+_streams = {}
+_streams_lock = threading.Lock()
+
+
+def _close_idle_streams():
+    now = time.time()
+    for cursor, writer in list(_streams.items()):
+        if now - writer.last_used > STREAM_IDLE_TIMEOUT:
+            try:
+                writer.close()
+            except Exception as e:
+                print(f"[ExcelStream] Failed to close idle stream {cursor}: {e}")
+            del _streams[cursor]
+
+
+def start_stream(abs_path, sheet_name='Sheet1'):
+    """Open a writer for abs_path (overwriting it) and return its cursor id."""
+    with _streams_lock:
+        _close_idle_streams()
+        for writer in _streams.values():
+            if writer.abs_path == abs_path:
+                raise ValueError("A stream is already open for this file. Finish it first.")
+        writer = ExcelStreamWriter(abs_path, sheet_name)
+        cursor = uuid.uuid4().hex[:12]
+        _streams[cursor] = writer
+    return cursor
+
+
+def get_stream(cursor):
+    with _streams_lock:
+        writer = _streams.get(cursor)
+    if writer is None:
+        raise KeyError(f"Unknown or expired stream cursor '{cursor}'.")
+    return writer
+
+
+def finish_stream(cursor):
+    """Save and close the stream. Returns the finished writer."""
+    with _streams_lock:
+        writer = _streams.pop(cursor, None)
+    if writer is None:
+        raise KeyError(f"Unknown or expired stream cursor '{cursor}'.")
+    writer.close()
+    return writer
+
+
+def has_drawings(abs_path):
+    """Whether an .xlsx file contains charts or images."""
+    with zipfile.ZipFile(abs_path) as archive:
+        return any(name.startswith(_DRAWING_PARTS) for name in archive.namelist())
+
+
+def write_sheet(abs_path, sheet_name, rows, append=False):
+    """
+    Write rows to one sheet of an existing .xlsx file with bounded memory.
+
+    Every sheet is copied row by row from a read-only workbook into a
+    write-only one, then the copy replaces the file. sheet_name keeps its
+    rows when append is True and is replaced otherwise (it is added at the
+    end if missing). Only cell values are copied: styles, merged cells,
+    column widths and data validation of the existing file are not kept, so
+    callers only use it for large files or on request. Workbooks with charts
+    or images raise ValueError instead of losing them.
+    Returns the number of rows sheet_name ends up with.
+    """
+    ensure_package_installed("openpyxl")
+    import openpyxl
+    if has_drawings(abs_path):
+        raise ValueError("the workbook contains charts or images, which a streamed copy would drop")
+    fd, tmp_path = tempfile.mkstemp(suffix='.xlsx', dir=os.path.dirname(abs_path) or '.')
+    os.close(fd)
+    source = openpyxl.load_workbook(abs_path, read_only=True)
+    try:
+        target = openpyxl.Workbook(write_only=True)
+        names = source.sheetnames + ([] if sheet_name in source.sheetnames else [sheet_name])
+        total = 0
+        for name in names:
+            ws = target.create_sheet(name)
+            count = 0
+            if name in source.sheetnames and (name != sheet_name or append):
+                for row in source[name].iter_rows(values_only=True):
+                    ws.append(row)
+                    count += 1
+            if name == sheet_name:
+                for row in rows:
+                    ws.append(row)
+                    count += 1
+                total = count
+        target.save(tmp_path)
+        target.close()
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    finally:
+        source.close()
+    os.replace(tmp_path, abs_path)
+    return total
@@ -0,0 +1,247 @@
+import os
+import re
+import json
+import math
+import time
+import sqlite3
+import hashlib
+from .embedding_indexer import get_embedding_backend
+
+# With a semantic embedding backend, lessons this similar to an existing one of the
+# same skill reinforce it instead of being added (lexical backends need the same text)
+DUPLICATE_SIMILARITY = 0.85
+DEFAULT_BUDGET_TOKENS = 300
+# compact() keeps at most this many lessons per skill (the best scoring ones)
+MAX_PER_SKILL = 50
+COMPACT_INTERVAL = 24 * 3600
+RECENCY_HALF_LIFE = 30 * 24 * 3600
+
+
+def _tokens(text):
+    # Same ~4 characters per token heuristic as subagent.estimate_tokens
+    return len(text) // 4
+
+
+def _text_hash(text):
+    return hashlib.sha256(" ".join(text.split()).lower().encode("utf-8")).hexdigest()
+
+
+def _normalize(text):
+    """Lowercase words only: lessons differing in case, spacing or punctuation are the same."""
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+def _cosine(a, b):
+    return sum(x * y for x, y in zip(a, b))
+
+
+class ExperienceStore:
+    """
+    Lessons learned per skill ("experience"), kept in SQLite instead of the
+    SKILL.md frontmatter.
+
+    A new lesson with the same normalized text as one already stored
+    reinforces it (hits + 1) instead of adding a row. With a semantic
+    embedding backend, a lesson at least DUPLICATE_SIMILARITY alike also
+    reinforces it and its newer wording is kept, since it is usually a
+    correction. Lexical similarity is not used: "Always pass X" and "Never pass
+    X", or a docx lesson and its pptx twin, share nearly every word.
+
+    select() ranks lessons by reinforcement, use and recency and returns the
+    best ones within a per-skill token budget; compact() merges duplicates by
+    the same rule and trims each skill to MAX_PER_SKILL. Experience lists
+    already in SKILL.md files are imported when they change.
+    """
+
+    def __init__(self, db_path, backend=None, clock=time.time):
+        self.db_path = db_path
+        self.backend = backend or get_embedding_backend()
+        self.clock = clock
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS experiences (
+                    id INTEGER PRIMARY KEY,
+                    skill TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    embedding TEXT,
+                    embedding_backend TEXT,
+                    hits INTEGER DEFAULT 1,
+                    uses INTEGER DEFAULT 0,
+                    created_at INTEGER,
+                    updated_at INTEGER,
+                    last_used_at INTEGER,
+                    UNIQUE (skill, text_hash)
+                )
+                """
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _signature(self):
+        return f"{self.backend.name}:{self.backend.dim}"
+
+    def _same_lesson(self, a, b):
+        if _normalize(a["text"]) == _normalize(b["text"]):
+            return True
+        return getattr(self.backend, "semantic", False) and _cosine(a["vector"], b["vector"]) >= DUPLICATE_SIMILARITY
+
+    def _rows(self, conn, skill):
+        rows = [dict(row) for row in conn.execute("SELECT * FROM experiences WHERE skill = ? ORDER BY id", (skill,))]
+        stale = [row for row in rows if row["embedding_backend"] != self._signature() or not row["embedding"]]
+        if stale:
+            for row, vector in zip(stale, self.backend.embed([row["text"] for row in stale])):
+                row["embedding"], row["embedding_backend"] = json.dumps(vector), self._signature()
+                conn.execute("UPDATE experiences SET embedding = ?, embedding_backend = ? WHERE id = ?",
+                             (row["embedding"], row["embedding_backend"], row["id"]))
+        for row in rows:
+            row["vector"] = json.loads(row["embedding"])
+        return rows
+
+    def _add(self, conn, skill, texts):
+        now = int(self.clock())
+        rows = self._rows(conn, skill)
+        added = 0
+        texts = [t.strip() for t in texts if isinstance(t, str) and t.strip()]
+        for text, vector in zip(texts, self.backend.embed(texts) if texts else []):
+            digest = _text_hash(text)
+            lesson = {"text": text, "vector": vector}
+            same = next((row for row in rows if _normalize(row["text"]) == _normalize(text)), None)
+            if same is None:
+                similar = [row for row in rows if self._same_lesson(row, lesson)]
+                same = max(similar, key=lambda row: _cosine(vector, row["vector"]), default=None)
+                if same is not None:
+                    # A reworded lesson is usually a correction: keep the newer text
+                    conn.execute("UPDATE experiences SET text = ?, text_hash = ?, embedding = ? WHERE id = ?",
+                                 (text, digest, json.dumps(vector), same["id"]))
+                    same.update(text=text, text_hash=digest, vector=vector)
+            if same is not None:
+                conn.execute("UPDATE experiences SET hits = hits + 1, updated_at = ? WHERE id = ?", (now, same["id"]))
+                continue
+            cursor = conn.execute(
+                """
+                INSERT INTO experiences (skill, text, text_hash, embedding, embedding_backend, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (skill, text, digest, json.dumps(vector), self._signature(), now, now),
+            )
+            rows.append({"id": cursor.lastrowid, "text": text, "text_hash": digest, "vector": vector})
+            added += 1
+        return added
+
+    def add(self, skill, experience):
+        """Add one lesson or a list of them. Returns the number of new rows (the rest were duplicates)."""
+        texts = experience if isinstance(experience, list) else [experience]
+        with self._connect() as conn:
+            return self._add(conn, skill, texts)
+
+    def replace(self, skill, experience):
+        texts = experience if isinstance(experience, list) else [experience]
+        with self._connect() as conn:
+            conn.execute("DELETE FROM experiences WHERE skill = ?", (skill,))
+            return self._add(conn, skill, texts)
+
+    def import_frontmatter(self, skill, experience):
+        """Import a SKILL.md 'experience' list, once per distinct list."""
+        if not experience or not isinstance(experience, list):
+            return 0
+        key = f"frontmatter:{skill}"
+        digest = hashlib.sha256(json.dumps(experience, ensure_ascii=False).encode("utf-8")).hexdigest()
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+            if row and row[0] == digest:
+                return 0
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, digest))
+            # Lessons seen before are not reinforced again just because the file changed
+            known = {r[0] for r in conn.execute("SELECT text_hash FROM experiences WHERE skill = ?", (skill,))}
+            return self._add(conn, skill, [t for t in experience if _text_hash(str(t)) not in known])
+
+    def score(self, row, now=None):
+        """Reinforcement and use, decayed by time since the lesson was last reinforced or used."""
+        now = self.clock() if now is None else now
+        last = max(row["updated_at"] or 0, row["last_used_at"] or 0)
+        recency = 0.5 ** (max(now - last, 0) / RECENCY_HALF_LIFE)
+        return (1 + math.log1p(row["hits"] or 0) + 0.5 * math.log1p(row["uses"] or 0)) * (0.5 + recency)
+
+    def list(self, skill):
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute(
+                "SELECT id, text, hits, uses, created_at, updated_at, last_used_at FROM experiences "
+                "WHERE skill = ? ORDER BY id", (skill,))]
+
+    def select(self, skill, budget_tokens=DEFAULT_BUDGET_TOKENS):
+        """The best scoring lessons of skill that fit budget_tokens, best first."""
+        now = self.clock()
+        ranked = sorted(self.list(skill), key=lambda row: (-self.score(row, now), row["id"]))
+        chosen, used = [], 0
+        for row in ranked:
+            cost = _tokens(row["text"]) + 1
+            if used + cost > budget_tokens:
+                continue
+            chosen.append(row)
+            used += cost
+        return chosen
+
+    def record_use(self, ids):
+        """Count a use of these lessons (their skill's tool was called while they were in the prompt)."""
+        if not ids:
+            return
+        with self._connect() as conn:
+            conn.executemany("UPDATE experiences SET uses = uses + 1, last_used_at = ? WHERE id = ?",
+                             [(int(self.clock()), i) for i in ids])
+
+    def compact(self, skill=None):
+        """
+        Merge duplicate lessons (see _same_lesson) and trim each skill to
+        MAX_PER_SKILL. Duplicates are merged into the best scoring one, which
+        takes over their hits, uses and timestamps and the most recently
+        added wording. Returns the number removed.
+        """
+        removed = 0
+        with self._connect() as conn:
+            skills = [skill] if skill else [r[0] for r in conn.execute("SELECT DISTINCT skill FROM experiences")]
+            now = self.clock()
+            for name in skills:
+                rows = sorted(self._rows(conn, name), key=lambda row: (-self.score(row, now), row["id"]))
+                kept = []
+                for row in rows:
+                    target = next((k for k in kept if self._same_lesson(k, row)), None)
+                    if target is None:
+                        row["newest"] = row
+                        kept.append(row)
+                        continue
+                    conn.execute("DELETE FROM experiences WHERE id = ?", (row["id"],))
+                    newest = max(target["newest"], row, key=lambda r: (r["created_at"] or 0, r["id"]))
+                    target["newest"] = newest
+                    conn.execute(
+                        """
+                        UPDATE experiences SET hits = hits + ?, uses = uses + ?,
+                            created_at = MIN(created_at, ?), updated_at = MAX(updated_at, ?),
+                            last_used_at = MAX(COALESCE(last_used_at, 0), ?),
+                            text = ?, text_hash = ?, embedding = ?
+                        WHERE id = ?
+                        """,
+                        (row["hits"] or 0, row["uses"] or 0, row["created_at"] or 0, row["updated_at"] or 0,
+                         row["last_used_at"] or 0, newest["text"], newest["text_hash"], newest["embedding"],
+                         target["id"]),
+                    )
+                    removed += 1
+                for row in kept[MAX_PER_SKILL:]:
+                    conn.execute("DELETE FROM experiences WHERE id = ?", (row["id"],))
+                    removed += 1
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_compaction', ?)", (int(now),))
+        return removed
+
+    def maybe_compact(self, interval=COMPACT_INTERVAL):
+        """compact() if it has not run in the last interval seconds. Returns the number removed, or None."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'last_compaction'").fetchone()
+        if row and self.clock() - row[0] < interval:
+            return None
+        return self.compact()
@@ -0,0 +1,285 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from .env_utils import get_app_data_dir
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+_HASH_BLOCK = 1024 * 1024
+
+
+class ExtractionCache:
+    """
+    Disk-backed cache for text extracted from documents (PDF pages, DOCX paragraphs, ...).
+
+    Entries are keyed by the SHA-256 of the file content plus a reader-specific
+    variant string (e.g. "pdf:page:12"), so renamed or copied files still hit.
+    A (path, size, mtime) fingerprint table avoids re-hashing unchanged files.
+    Text is stored zlib-compressed; least recently used entries are evicted once
+    the compressed total exceeds max_bytes.
+    """
+
+    def __init__(self, db_path, max_bytes=DEFAULT_MAX_BYTES):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._ensure_schema()
+
+    @contextmanager
+    def _connect(self):
+        """One connection per call: commits (or rolls back) the transaction and closes it."""
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _ensure_schema(self):
+        with self._connect() as conn:
+            # Persistent in the database file, so it only needs setting once
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS fingerprints (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER,
+                    mtime_ns INTEGER,
+                    content_hash TEXT
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    content_hash TEXT NOT NULL,
+                    variant TEXT NOT NULL,
+                    data BLOB,
+                    raw_size INTEGER,
+                    stored_size INTEGER,
+                    created_at INTEGER,
+                    last_access REAL,
+                    PRIMARY KEY (content_hash, variant)
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS stats (key TEXT PRIMARY KEY, value INTEGER)"
+            )
+
+    def content_hash(self, abs_path):
+        """Return the content hash of a file, re-hashing only if size or mtime changed."""
+        st = os.stat(abs_path)
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT size, mtime_ns, content_hash FROM fingerprints WHERE path = ?",
+                (abs_path,),
+            ).fetchone()
+            if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+                return row[2]
+
+            digest = hashlib.sha256()
+            with open(abs_path, 'rb') as f:
+                for block in iter(lambda: f.read(_HASH_BLOCK), b''):
+                    digest.update(block)
+            content_hash = digest.hexdigest()
+            conn.execute(
+                "INSERT OR REPLACE INTO fingerprints (path, size, mtime_ns, content_hash) VALUES (?, ?, ?, ?)",
+                (abs_path, st.st_size, st.st_mtime_ns, content_hash),
+            )
+        return content_hash
+
+    def missing(self, content_hash, variants):
+        """Return the variants not cached yet, without touching hit/miss statistics."""
+        variants = list(variants)
+        present = set()
+        with self._connect() as conn:
+            for i in range(0, len(variants), 500):
+                batch = variants[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT variant FROM entries WHERE content_hash = ? AND variant IN ({placeholders})",
+                    [content_hash] + batch,
+                ).fetchall()
+                present.update(row[0] for row in rows)
+        return [v for v in variants if v not in present]
+
+    def document(self, abs_path):
+        """Return a handle bound to the current content of abs_path."""
+        return CachedDocument(self, self.content_hash(abs_path))
+
+    def get(self, content_hash, variant):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT data FROM entries WHERE content_hash = ? AND variant = ?",
+                (content_hash, variant),
+            ).fetchone()
+            hit = row is not None
+            if hit:
+                conn.execute(
+                    "UPDATE entries SET last_access = ? WHERE content_hash = ? AND variant = ?",
+                    (time.time(), content_hash, variant),
+                )
+            conn.execute(
+                "INSERT INTO stats (key, value) VALUES (?, 1) ON CONFLICT(key) DO UPDATE SET value = value + 1",
+                ("hits" if hit else "misses",),
+            )
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if not hit:
+            return None
+        return zlib.decompress(row[0]).decode('utf-8')
+
+    def put(self, content_hash, variant, text):
+        raw = text.encode('utf-8')
+        data = zlib.compress(raw, 6)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO entries
+                    (content_hash, variant, data, raw_size, stored_size, created_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (content_hash, variant, data, len(raw), len(data), int(now), now),
+            )
+            self._evict(conn)
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(stored_size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Trim to 90% of the cap so eviction does not run on every insert
+        target = int(self.max_bytes * 0.9)
+        rows = conn.execute(
+            "SELECT content_hash, variant, stored_size FROM entries ORDER BY last_access ASC"
+        )
+        doomed = []
+        for content_hash, variant, stored_size in rows:
+            if total <= target:
+                break
+            doomed.append((content_hash, variant))
+            total -= stored_size
+        conn.executemany("DELETE FROM entries WHERE content_hash = ? AND variant = ?", doomed)
+
+    def stats(self):
+        with self._connect() as conn:
+            count, raw_size, stored_size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(raw_size), 0), COALESCE(SUM(stored_size), 0) FROM entries"
+            ).fetchone()
+            totals = dict(conn.execute("SELECT key, value FROM stats").fetchall())
+        lookups = self.hits + self.misses
+        return {
+            "session_hits": self.hits,
+            "session_misses": self.misses,
+            "session_hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "total_hits": totals.get("hits", 0),
+            "total_misses": totals.get("misses", 0),
+            "entries": count,
+            "raw_bytes": raw_size,
+            "stored_bytes": stored_size,
+            "max_bytes": self.max_bytes,
+        }
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM entries")
+            conn.execute("DELETE FROM fingerprints")
+            conn.execute("DELETE FROM stats")
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+class CachedDocument:
+    """Cache view for one file content; variants name what was extracted."""
+
+    def __init__(self, cache, content_hash):
+        self.cache = cache
+        self.content_hash = content_hash
+
+    def get(self, variant):
+        return self.cache.get(self.content_hash, variant)
+
+    def put(self, variant, text):
+        self.cache.put(self.content_hash, variant, text)
+
+    def missing(self, variants):
+        return self.cache.missing(self.content_hash, variants)
+
+    def get_or_extract(self, variant, extract):
+        text = self.get(variant)
+        if text is None:
+            text = extract()
+            self.put(variant, text)
+        return text
+
+    def get_or_extract_list(self, variant, extract):
+        """Like get_or_extract for a list of strings (stored as JSON)."""
+        cached = self.get(variant)
+        if cached is not None:
+            return json.loads(cached)
+        items = extract()
+        self.put(variant, json.dumps(items, ensure_ascii=False))
+        return items
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_extraction_cache(config_manager=None):
+    """Shared cache under the app data dir. Size cap: 'extraction_cache_max_mb' in config."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            max_bytes = DEFAULT_MAX_BYTES
+            if config_manager:
+                try:
+                    max_bytes = int(float(config_manager.get("extraction_cache_max_mb", 256)) * 1024 * 1024)
+                except (TypeError, ValueError):
+                    pass
+            db_path = os.path.join(get_app_data_dir(), "cache", "extraction_cache.sqlite")
+            _cache = ExtractionCache(db_path, max_bytes=max_bytes)
+        return _cache
+
+
+class UncachedDocument:
+    """Drop-in for CachedDocument when the cache is unavailable; always extracts."""
+
+    def get(self, variant):
+        return None
+
+    def put(self, variant, text):
+        pass
+
+    def missing(self, variants):
+        return list(variants)
+
+    def get_or_extract(self, variant, extract):
+        return extract()
+
+    def get_or_extract_list(self, variant, extract):
+        return extract()
+
+
+def open_document(abs_path, config_manager=None):
+    """Cache handle for abs_path; falls back to no caching if the cache cannot be used."""
+    try:
+        return get_extraction_cache(config_manager).document(abs_path)
+    except Exception as e:
+        print(f"[ExtractionCache] Disabled for {abs_path}: {e}")
+        return UncachedDocument()
@@ -0,0 +1,99 @@
+import os
+import time
+import fnmatch
+import threading
+from .workspace_walker import walk_files
+
+DEFAULT_MAX_AGE = 300  # Seconds before a finished index is rebuilt in the background
+
+_GLOB_CHARS = set('*?[')
+
+
+class FileIndex:
+    """
+    In-memory filename index for one root directory, built by a background thread.
+    Used as the search_files fallback where Everything is not available.
+    """
+
+    def __init__(self, root, max_age=DEFAULT_MAX_AGE, respect_ignore=True):
+        self.root = os.path.abspath(root)
+        self.max_age = max_age
+        self.respect_ignore = respect_ignore
+        self.paths = []  # Relative paths, '/'-separated
+        self.built_at = 0
+        self.ready = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def is_building(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start (or restart) the background build unless one is already running."""
+        with self._lock:
+            if self.is_building:
+                return
+            self._thread = threading.Thread(target=self._build, name=f"FileIndex[{self.root}]", daemon=True)
+            self._thread.start()
+
+    def ensure_fresh(self):
+        if not self.ready.is_set() or time.time() - self.built_at > self.max_age:
+            self.start()
+
+    def _build(self):
+        paths = []
+        # Names are indexed regardless of size; only ignore rules prune the walk
+        for abs_path in walk_files(self.root, max_file_size=None, respect_ignore=self.respect_ignore):
+            paths.append(os.path.relpath(abs_path, self.root).replace(os.sep, '/'))
+            if len(paths) % 5000 == 0:
+                # Publish partial progress for queries issued before the build finishes
+                if not self.ready.is_set():
+                    with self._lock:
+                        self.paths = list(paths)
+        with self._lock:
+            self.paths = paths
+            self.built_at = time.time()
+        self.ready.set()
+
+    def query(self, query, limit=200):
+        """
+        Match file names against a glob (when the query contains * ? [) or a
+        case-insensitive substring. Queries containing '/' match the relative path.
+        """
+        query = query.strip()
+        with self._lock:
+            paths = self.paths
+        use_path = '/' in query or os.sep in query
+        query = query.replace(os.sep, '/')
+        is_glob = any(c in _GLOB_CHARS for c in query)
+        needle = query.lower()
+
+        results = []
+        for rel in paths:
+            target = rel if use_path else rel.rsplit('/', 1)[-1]
+            if is_glob:
+                matched = fnmatch.fnmatch(target.lower(), needle)
+            else:
+                matched = needle in target.lower()
+            if matched:
+                results.append(os.path.join(self.root, rel))
+                if len(results) >= limit:
+                    break
+        return results
+
+
+_INDEXES = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_index(root):
+    """Return the shared index for root, starting or refreshing its background build."""
+    key = os.path.abspath(root)
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(key)
+        if index is None:
+            index = FileIndex(key)
+            _INDEXES[key] = index
+    index.ensure_fresh()
+    return index
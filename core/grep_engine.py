@@ -0,0 +1,219 @@
+import os
+import re
+import mmap
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from itertools import islice
+
+# Escapes whose meaning differs between str and bytes patterns (ASCII-only in bytes mode)
+_UNICODE_SENSITIVE = re.compile(r'\\[wWbBdDsS]')
+# A pattern token: an escape pair or a single character
+_TOKEN = re.compile(r'\\.|.', re.DOTALL)
+# Unescaped tokens that count bytes instead of characters over a UTF-8 buffer
+# ('.', negated classes, quantifiers that may repeat them)
+_WIDTH_SENSITIVE = {'.', '*', '+', '?', '{'}
+# Anchors that would refer to the whole file instead of the line being matched
+_STRING_ANCHORS = {'\\A', '\\Z'}
+
+DEFAULT_BATCH_SIZE = 64
+
+
+def _compile(pattern):
+    """
+    Compile the user pattern for whole-buffer scanning.
+    Returns (buffer_regex, line_regex, is_bytes).
+    - buffer_regex runs over the whole mmap'd file and only proposes candidate lines.
+    - line_regex re-checks each candidate line, so results match a line-by-line scan.
+    A bytes regex is used when it cannot miss a line the str regex would match.
+    buffer_regex is None for patterns with \\A or \\Z, which need the line scan.
+    """
+    line_regex = re.compile(pattern)
+    tokens = _TOKEN.findall(pattern)
+    if _STRING_ANCHORS.intersection(tokens):
+        return None, line_regex, False
+    negated_class = any(a == '[' and b == '^' for a, b in zip(tokens, tokens[1:]))
+    width_sensitive = negated_class or _WIDTH_SENSITIVE.intersection(tokens)
+    if pattern.isascii() and not width_sensitive and not _UNICODE_SENSITIVE.search(pattern):
+        try:
+            return re.compile(pattern.encode('ascii'), re.MULTILINE), line_regex, True
+        except re.error:
+            pass
+    return re.compile(pattern, re.MULTILINE), line_regex, False
+
+
+def _decode(raw):
+    return bytes(raw).decode('utf-8', errors='ignore')
+
+
+def _scan_buffer(buf, buffer_regex, line_regex, newline, decode, limit, stop_event):
+    """
+    Run the regex over a whole buffer (mmap or str) and map matching offsets
+    back to line numbers. Newlines are only counted up to matching offsets.
+    """
+    matches = []
+    pos = 0
+    counted_pos = 0
+    line_no = 1
+    size = len(buf)
+
+    while pos <= size:
+        if stop_event is not None and stop_event.is_set():
+            break
+        m = buffer_regex.search(buf, pos)
+        if not m:
+            break
+        line_start = buf.rfind(newline, 0, m.start()) + 1
+        if line_start == size:
+            # Empty match after the final newline: not a line (readlines() has none there)
+            break
+        line_end = buf.find(newline, m.start())
+        line_end = size if line_end == -1 else line_end + 1  # Keep the newline, like readlines()
+
+        # mmap has no count(); slicing only the gap keeps the total copy O(file size)
+        line_no += buf[counted_pos:line_start].count(newline)
+        counted_pos = line_start
+
+        line = decode(buf[line_start:line_end]).replace('\r\n', '\n')
+        if line_regex.search(line):
+            matches.append((line_no, line.strip()))
+            if limit is not None and len(matches) >= limit:
+                break
+
+        # Continue on the next line; a line is reported at most once. Stop after
+        # the last one, or an empty match at the end would be found again forever
+        if line_end >= size:
+            break
+        pos = line_end
+    return matches
+
+
+def _scan_lines(file_path, line_regex, limit):
+    """Legacy line-by-line scan, used when whole-buffer semantics could differ."""
+    matches = []
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        for i, line in enumerate(f):
+            if line_regex.search(line):
+                matches.append((i + 1, line.strip()))
+                if limit is not None and len(matches) >= limit:
+                    break
+    return matches
+
+
+def _scan_file(file_path, compiled, limit=None, stop_event=None):
+    buffer_regex, line_regex, is_bytes = compiled
+    try:
+        with open(file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                first_page = mm[:mmap.PAGESIZE]
+                if b'\0' in first_page:
+                    return []
+
+                if buffer_regex is None:
+                    return _scan_lines(file_path, line_regex, limit)
+
+                # '$' does not match before '\r' in a raw buffer; keep text-mode semantics
+                if b'\r' in first_page and '$' in line_regex.pattern:
+                    return _scan_lines(file_path, line_regex, limit)
+
+                if is_bytes:
+                    return _scan_buffer(mm, buffer_regex, line_regex, b'\n', _decode, limit, stop_event)
+
+                # Unicode-sensitive pattern: decode once, still a single pass over the buffer
+                text = _decode(mm[:])
+                return _scan_buffer(text, buffer_regex, line_regex, '\n', lambda s: s, limit, stop_event)
+    except (OSError, ValueError):
+        return []
+
+
+def scan_file(file_path, pattern, limit=None):
+    """
+    Search a single file and return a list of (line_number, stripped_line).
+    Binary files (NUL byte in the first page) yield no matches.
+    """
+    return _scan_file(file_path, _compile(pattern), limit)
+
+
+def _scan_batch(file_paths, pattern, limit, stop_event=None):
+    """Scan a batch of files in order. Top-level so it can run in a process pool."""
+    compiled = _compile(pattern)
+    results = []
+    found = 0
+    for path in file_paths:
+        if stop_event is not None and stop_event.is_set():
+            break
+        matches = _scan_file(path, compiled, limit - found, stop_event)
+        if matches:
+            results.append((path, matches))
+            found += len(matches)
+            if found >= limit:
+                break
+    return results
+
+
+def search(file_paths, pattern, max_matches=1000, workers=None, use_processes=False, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Search many files with a thread or process pool.
+
+    Args:
+        file_paths (iterable): Files to scan, in the order results should be reported.
+            May be a lazy iterator (e.g. fed by os.walk); it is consumed incrementally.
+        pattern (str): Regex pattern, matched per line like the legacy grep.
+        max_matches (int): Stop once this many matching lines have been collected.
+        workers (int): Pool size. Defaults to cpu_count + 4 threads, or cpu_count processes.
+        use_processes (bool): Use a process pool for CPU-heavy patterns on many cores.
+        batch_size (int): Number of files handed to a worker at a time.
+
+    Returns:
+        (results, truncated): results is a list of (file_path, line_number, line_text)
+        in file order; truncated is True when max_matches was reached.
+    """
+    re.compile(pattern)  # Surface re.error to the caller before spawning workers
+
+    if use_processes:
+        workers = workers or (os.cpu_count() or 1)
+        executor = ProcessPoolExecutor(max_workers=workers)
+        stop_event = None  # Cannot be shared with processes; pending batches are cancelled instead
+    else:
+        workers = workers or min(32, (os.cpu_count() or 1) + 4)
+        executor = ThreadPoolExecutor(max_workers=workers)
+        stop_event = threading.Event()
+
+    paths_iter = iter(file_paths)
+    pending = []
+    results = []
+    truncated = False
+
+    def submit_next():
+        batch = list(islice(paths_iter, batch_size))
+        if not batch:
+            return False
+        args = (batch, pattern, max_matches) if stop_event is None else (batch, pattern, max_matches, stop_event)
+        pending.append(executor.submit(_scan_batch, *args))
+        return True
+
+    try:
+        # Keep a bounded window in flight so an early stop does not walk the whole tree
+        for _ in range(workers * 2):
+            if not submit_next():
+                break
+
+        # Consume in submission order so output order matches a sequential scan
+        while pending and not truncated:
+            for path, matches in pending.pop(0).result():
+                for line_no, line in matches:
+                    results.append((path, line_no, line))
+                    if len(results) >= max_matches:
+                        truncated = True
+                        break
+                if truncated:
+                    break
+            if not truncated:
+                submit_next()
+    finally:
+        if stop_event is not None:
+            stop_event.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    return results, truncated
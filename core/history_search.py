@@ -0,0 +1,362 @@
+import re
+import json
+import time
+import queue
+import sqlite3
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from .chat_storage import fts_state
+
+DEFAULT_POOL_SIZE = 4
+# Standard RRF constant: damps the weight of the very top ranks of either list
+RRF_K = 60
+# Each retriever contributes this many candidates per requested result
+CANDIDATE_FACTOR = 4
+SNIPPET_CHARS = 64
+PREVIEW_CHARS = 500
+
+
+def keyword_terms(keywords):
+    """Keywords as a list: a list argument as-is, a string split on commas."""
+    if keywords is None:
+        return []
+    if isinstance(keywords, list):
+        return [str(k).strip() for k in keywords if str(k).strip()]
+    return [p.strip() for p in str(keywords).split(",") if p.strip()]
+
+
+def fts_query(terms):
+    escaped = [t.replace('"', '""') for t in terms]
+    return " OR ".join([f'"{t}"' for t in escaped])
+
+
+def highlight(text, terms, width=SNIPPET_CHARS):
+    """Python counterpart of FTS snippet() for rows matched with LIKE; "" if no term occurs in text."""
+    if not text:
+        return ""
+    lowered = text.lower()
+    hits = [pos for pos in (lowered.find(t.lower()) for t in terms) if pos >= 0]
+    if not hits:
+        return ""
+    pos = min(hits)
+    start = max(0, pos - width // 3)
+    window = text[start:start + width]
+    for t in terms:
+        window = re.sub(re.escape(t), lambda m: f"[{m.group(0)}]", window, flags=re.IGNORECASE)
+    return ("…" if start > 0 else "") + window + ("…" if start + width < len(text) else "")
+
+
+def load_vec_extension(conn):
+    """Load sqlite-vec into conn. Raises if the package or extension loading is unavailable."""
+    from .env_utils import ensure_package_installed
+    ensure_package_installed("sqlite-vec", "sqlite_vec")
+    import sqlite_vec
+    conn.enable_load_extension(True)
+    try:
+        sqlite_vec.load(conn)
+    finally:
+        conn.enable_load_extension(False)
+
+
+def ensure_vec_table(conn, embedding_dim):
+    """Create messages_vec (vec0) for vectors of embedding_dim floats if it does not exist."""
+    row = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type='table' AND name='messages_vec'"
+    ).fetchone()
+    if row:
+        return
+    conn.execute(
+        f"CREATE VIRTUAL TABLE messages_vec USING vec0(embedding float[{embedding_dim}], +message_id TEXT, +conversation_id TEXT, +content TEXT, +created_at INTEGER)"
+    )
+
+
+def rrf_fuse(ranked_lists, k=RRF_K):
+    """
+    Reciprocal rank fusion: score(id) = sum over lists of 1 / (k + rank), ranks
+    starting at 1. Returns [(id, score)] best first; ties keep first-seen order.
+    """
+    scores = {}
+    for ranked in ranked_lists:
+        for rank, item_id in enumerate(ranked, start=1):
+            scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: -item[1])
+
+
+class ConnectionPool:
+    """
+    A fixed set of SQLite connections shared across threads. sqlite-vec is
+    loaded into a connection the first time it serves a vector query (not on
+    every call), and the first failure to load it is remembered.
+    """
+
+    def __init__(self, db_path, size=DEFAULT_POOL_SIZE):
+        self.db_path = db_path
+        self.size = size
+        self.vec_available = None # unknown until a vector query first needs it
+        self.vec_error = None
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._vec_loaded = set() # id() of connections with the extension loaded
+        self._lock = threading.Lock()
+
+    def _open(self):
+        conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _load_vec(self, conn):
+        if id(conn) in self._vec_loaded or self.vec_available is False:
+            return
+        try:
+            load_vec_extension(conn)
+            self._vec_loaded.add(id(conn))
+            self.vec_available = True
+        except Exception as e:
+            self.vec_available = False
+            self.vec_error = str(e)
+
+    @contextmanager
+    def connection(self, vec=False):
+        """Borrow a connection; with vec=True, vec_available tells whether sqlite-vec is loaded in it."""
+        conn = None
+        with self._lock:
+            if self._idle.empty() and self._created < self.size:
+                self._created += 1
+                conn = self._open()
+        if conn is None:
+            conn = self._idle.get()
+        try:
+            if vec:
+                self._load_vec(conn)
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    def close(self):
+        while not self._idle.empty():
+            self._idle.get().close()
+
+
+class HistorySearch:
+    """
+    Retrieval over the chat history database.
+
+    lexical() is the trigram FTS / LIKE search behind query_history; vector()
+    is a k-NN query on the sqlite-vec table messages_vec. search() runs both
+    at once on pooled connections, fuses the two rankings with reciprocal
+    rank fusion, applies date and conversation filters and reports how long
+    each stage took.
+    """
+
+    def __init__(self, db_path, pool_size=DEFAULT_POOL_SIZE):
+        self.db_path = db_path
+        self.pool = ConnectionPool(db_path, size=pool_size)
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="history-search")
+
+    @staticmethod
+    def _filters(alias, start_ts, end_ts, conversation_id):
+        clauses, params = [], []
+        if start_ts is not None:
+            clauses.append(f"{alias}.created_at >= ?")
+            params.append(start_ts)
+        if end_ts is not None:
+            clauses.append(f"{alias}.created_at <= ?")
+            params.append(end_ts)
+        if conversation_id:
+            clauses.append(f"{alias}.conversation_id = ?")
+            params.append(conversation_id)
+        return clauses, params
+
+    def lexical(self, terms, start_ts=None, end_ts=None, conversation_id=None, limit=10):
+        """Message rows (dicts) for any of terms, best first; recent first if there are no terms."""
+        with self.pool.connection() as conn:
+            fts_exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name='messages_fts'"
+            ).fetchone()
+            state = fts_state(conn)
+
+            # The trigram index only matches terms of 3+ characters (most 2-character
+            # Chinese words are shorter); those terms, and every term while the index
+            # is still being rebuilt, are matched with LIKE instead
+            fts_terms, like_terms = [], terms
+            if terms and fts_exists and not state["pending"]:
+                if state["tokenizer"] == "trigram":
+                    fts_terms = [t for t in terms if len(t) >= 3]
+                    like_terms = [t for t in terms if len(t) < 3]
+                else:
+                    fts_terms, like_terms = terms, []
+
+            where_clauses = []
+            params = []
+
+            if fts_terms and not like_terms:
+                # BM25 ranking and highlighting straight from the index
+                sql = f"""
+                    SELECT m.id, m.conversation_id, m.role, m.content, m.reasoning_content, m.created_at, m.position,
+                           bm25(messages_fts) AS rank,
+                           snippet(messages_fts, -1, '[', ']', '…', {SNIPPET_CHARS // 4}) AS snippet
+                    FROM messages_fts f
+                    JOIN messages m ON m.rowid = f.rowid
+                """
+                where_clauses.append("messages_fts MATCH ?")
+                params.append(fts_query(fts_terms))
+                order = " ORDER BY rank, m.created_at DESC"
+            else:
+                sql = """
+                    SELECT m.id, m.conversation_id, m.role, m.content, m.reasoning_content, m.created_at, m.position,
+                           NULL AS rank, NULL AS snippet
+                    FROM messages m
+                """
+                alternatives = []
+                if fts_terms:
+                    alternatives.append("m.rowid IN (SELECT rowid FROM messages_fts WHERE messages_fts MATCH ?)")
+                    params.append(fts_query(fts_terms))
+                for term in like_terms:
+                    alternatives.append("(m.content LIKE ? OR m.reasoning_content LIKE ?)")
+                    like = f"%{term}%"
+                    params.extend([like, like])
+                if alternatives:
+                    where_clauses.append("(" + " OR ".join(alternatives) + ")")
+                order = " ORDER BY m.created_at DESC, m.position DESC"
+
+            clauses, filter_params = self._filters("m", start_ts, end_ts, conversation_id)
+            where_clauses += clauses
+            params += filter_params
+            if where_clauses:
+                sql += " WHERE " + " AND ".join(where_clauses)
+            sql += order + " LIMIT ?"
+            params.append(limit)
+            rows = conn.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def vector(self, embedding, start_ts=None, end_ts=None, conversation_id=None, limit=10):
+        """[(message_id, distance)] nearest first; [] if sqlite-vec or messages_vec is unavailable."""
+        if not embedding:
+            return []
+        with self.pool.connection(vec=True) as conn:
+            if not self.pool.vec_available:
+                return []
+            if not conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name='messages_vec'"
+            ).fetchone():
+                return []
+            filtered = start_ts is not None or end_ts is not None or conversation_id
+            # The filter columns are auxiliary (not indexed), so over-fetch and filter afterwards
+            k = limit * CANDIDATE_FACTOR if filtered else limit
+            try:
+                rows = conn.execute(
+                    """
+                    SELECT message_id, conversation_id, created_at, distance
+                    FROM messages_vec
+                    WHERE embedding MATCH ? AND k = ?
+                    ORDER BY distance
+                    """,
+                    (json.dumps(embedding), k),
+                ).fetchall()
+            except sqlite3.OperationalError as e:
+                # e.g. the index was built with another embedding backend (dimension mismatch)
+                print(f"[HistorySearch] Vector query failed: {e}")
+                return []
+        hits = []
+        for row in rows:
+            if start_ts is not None and (row["created_at"] or 0) < start_ts:
+                continue
+            if end_ts is not None and (row["created_at"] or 0) > end_ts:
+                continue
+            if conversation_id and row["conversation_id"] != conversation_id:
+                continue
+            hits.append((row["message_id"], row["distance"]))
+        return hits[:limit]
+
+    def _messages(self, message_ids):
+        if not message_ids:
+            return {}
+        placeholders = ",".join("?" * len(message_ids))
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT id, conversation_id, role, content, reasoning_content, created_at, position
+                FROM messages WHERE id IN ({placeholders})
+                """,
+                list(message_ids),
+            ).fetchall()
+        return {row["id"]: dict(row) for row in rows}
+
+    def search(self, query=None, embedding=None, start_ts=None, end_ts=None, conversation_id=None, limit=10):
+        """
+        Hybrid search. Returns {"results": [...], "timings": {stage: ms}, "retrievers": [...]}.
+        Each result has the fused 'score' and its 'lexical_rank' / 'vector_rank' (None if that
+        retriever did not return it).
+        """
+        started = time.perf_counter()
+        terms = keyword_terms(query)
+        candidates = limit * CANDIDATE_FACTOR
+        timings = {}
+
+        def timed(name, func, *args):
+            t0 = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                timings[f"{name}_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+
+        filters = (start_ts, end_ts, conversation_id, candidates)
+        lexical_future = self._executor.submit(timed, "lexical", self.lexical, terms, *filters) if terms else None
+        vector_future = self._executor.submit(timed, "vector", self.vector, embedding, *filters) if embedding else None
+        lexical_rows = lexical_future.result() if lexical_future else []
+        vector_hits = vector_future.result() if vector_future else []
+
+        t0 = time.perf_counter()
+        lexical_ids = [row["id"] for row in lexical_rows]
+        vector_ids = [message_id for message_id, _ in vector_hits]
+        fused = rrf_fuse([lexical_ids, vector_ids])[:limit]
+        rows = {row["id"]: row for row in lexical_rows}
+        rows.update(self._messages([i for i, _ in fused if i not in rows]))
+        lexical_rank = {message_id: rank for rank, message_id in enumerate(lexical_ids, start=1)}
+        vector_rank = {message_id: rank for rank, message_id in enumerate(vector_ids, start=1)}
+        distance = dict(vector_hits)
+
+        results = []
+        for message_id, score in fused:
+            row = rows.get(message_id)
+            if row is None: # vector entry whose message was deleted
+                continue
+            content = row["content"] or ""
+            reasoning = row["reasoning_content"] or ""
+            result = {
+                "message_id": message_id,
+                "conversation_id": row["conversation_id"],
+                "role": row["role"],
+                "content": content[:PREVIEW_CHARS],
+                "created_at": row["created_at"],
+                "created_at_iso": datetime.fromtimestamp(row["created_at"]).isoformat() if row["created_at"] else None,
+                "score": round(score, 6),
+                "lexical_rank": lexical_rank.get(message_id),
+                "vector_rank": vector_rank.get(message_id),
+            }
+            if message_id in distance:
+                result["distance"] = distance[message_id]
+            if terms:
+                result["snippet"] = (row.get("snippet") or highlight(content, terms)
+                                     or highlight(reasoning, terms) or content[:SNIPPET_CHARS])
+            results.append(result)
+        timings["fusion_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+        timings["total_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        retrievers = (["lexical"] if terms else []) + (["vector"] if embedding and self.pool.vec_available else [])
+        return {"results": results, "timings": timings, "retrievers": retrievers}
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_history_search(db_path):
+    """Shared engine (and connection pool) per database file."""
+    with _engines_lock:
+        if db_path not in _engines:
+            _engines[db_path] = HistorySearch(db_path)
+        return _engines[db_path]
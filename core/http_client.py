@@ -0,0 +1,255 @@
+import os
+import re
+import json
+import time
+import zlib
+import sqlite3
+import threading
+import urllib.parse
+from collections import defaultdict
+from contextlib import contextmanager
+import requests
+from requests.adapters import HTTPAdapter
+from .env_utils import get_app_data_dir
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+DEFAULT_TIMEOUT = (5, 15)  # (connect, read) seconds
+DEFAULT_TTL = 3600
+DEFAULT_PER_HOST_LIMIT = 4
+DEFAULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+_MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+
+
+class HttpResponse:
+    """Minimal response object shared by network and cache hits."""
+
+    def __init__(self, url, status_code, headers, content, from_cache=False):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.from_cache = from_cache
+
+    @property
+    def text(self):
+        charset = None
+        content_type = self.headers.get("Content-Type") or self.headers.get("content-type") or ""
+        match = re.search(r'charset=([\w-]+)', content_type)
+        if match:
+            charset = match.group(1)
+        return self.content.decode(charset or "utf-8", errors="replace")
+
+
+class ResponseCache:
+    """
+    On-disk cache of GET responses with TTL and ETag/Last-Modified revalidation.
+    Once the compressed bodies exceed max_bytes, the oldest fetched entries are dropped.
+    """
+
+    def __init__(self, db_path, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._connect() as conn:
+            # Persistent for the database file, so it is set once rather than per connection
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    url TEXT PRIMARY KEY,
+                    status_code INTEGER,
+                    headers TEXT,
+                    body BLOB,
+                    etag TEXT,
+                    last_modified TEXT,
+                    fetched_at REAL,
+                    expires_at REAL
+                )
+                """
+            )
+
+    @contextmanager
+    def _connect(self):
+        """One connection per call: commits (or rolls back) the transaction and closes it."""
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, url):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT status_code, headers, body, etag, last_modified, expires_at FROM responses WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if not row:
+            return None
+        status_code, headers, body, etag, last_modified, expires_at = row
+        response = HttpResponse(url, status_code, json.loads(headers), zlib.decompress(body), from_cache=True)
+        return response, etag, last_modified, expires_at
+
+    def put(self, response, ttl):
+        headers = dict(response.headers)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO responses
+                    (url, status_code, headers, body, etag, last_modified, fetched_at, expires_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    response.url,
+                    response.status_code,
+                    json.dumps(headers),
+                    zlib.compress(response.content),
+                    headers.get("ETag") or headers.get("etag"),
+                    headers.get("Last-Modified") or headers.get("last-modified"),
+                    now,
+                    now + ttl,
+                ),
+            )
+            self._evict(conn)
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(LENGTH(body)), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Trim to 90% of the cap so eviction does not run on every insert
+        target = int(self.max_bytes * 0.9)
+        doomed = []
+        for url, size in conn.execute("SELECT url, LENGTH(body) FROM responses ORDER BY fetched_at ASC"):
+            if total <= target:
+                break
+            doomed.append((url,))
+            total -= size
+        conn.executemany("DELETE FROM responses WHERE url = ?", doomed)
+
+    def touch(self, url, ttl):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE responses SET expires_at = ? WHERE url = ?",
+                (time.time() + ttl, url),
+            )
+
+    def purge_expired(self, older_than=7 * 24 * 3600):
+        """Drop entries that expired long enough ago that revalidation is unlikely to help."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses WHERE expires_at < ?", (time.time() - older_than,))
+
+
+def _cache_control(headers):
+    return (headers.get("Cache-Control") or headers.get("cache-control") or "").lower()
+
+
+def _response_ttl(headers, default_ttl):
+    """Seconds a response stays fresh: None for no-store, 0 (revalidate every time) for no-cache."""
+    cache_control = _cache_control(headers)
+    if "no-store" in cache_control:
+        return None
+    if "no-cache" in cache_control:
+        return 0
+    match = _MAX_AGE_RE.search(cache_control)
+    if match:
+        return int(match.group(1))
+    return default_ttl
+
+
+class HttpClient:
+    """
+    Shared HTTP layer: one pooled requests.Session, a per-host concurrency cap,
+    default timeouts and an optional on-disk response cache for GET requests.
+    """
+
+    def __init__(self, cache_path=None, timeout=DEFAULT_TIMEOUT, default_ttl=DEFAULT_TTL,
+                 per_host_limit=DEFAULT_PER_HOST_LIMIT, pool_size=32, session=None,
+                 cache_max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        self.timeout = timeout
+        self.default_ttl = default_ttl
+        self.session = session or requests.Session()
+        if session is None:
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            self.session.mount("http://", adapter)
+            self.session.mount("https://", adapter)
+            self.session.headers["User-Agent"] = DEFAULT_USER_AGENT
+        self.cache = ResponseCache(cache_path, max_bytes=cache_max_bytes) if cache_path else None
+        self._host_slots = defaultdict(lambda: threading.BoundedSemaphore(per_host_limit))
+        self._host_lock = threading.Lock()
+
+    def _slot(self, url):
+        host = urllib.parse.urlsplit(url).netloc.lower()
+        with self._host_lock:
+            return self._host_slots[host]
+
+    def get(self, url, headers=None, timeout=None, ttl=None, use_cache=True):
+        """
+        GET a URL. Fresh cache entries are returned without a request; stale ones
+        are revalidated with If-None-Match / If-Modified-Since. Cache-Control in
+        headers is honoured: no-store skips the cache, no-cache revalidates.
+
+        Args:
+            ttl (int): Freshness lifetime in seconds when the server sends no max-age.
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        request_headers = dict(headers or {})
+        request_cache_control = _cache_control(request_headers)
+        use_cache = use_cache and "no-store" not in request_cache_control
+        cached = self.cache.get(url) if (self.cache and use_cache) else None
+        if cached:
+            cached_response, etag, last_modified, expires_at = cached
+            if time.time() < expires_at and "no-cache" not in request_cache_control:
+                return cached_response
+            if etag:
+                request_headers["If-None-Match"] = etag
+            if last_modified:
+                request_headers["If-Modified-Since"] = last_modified
+
+        with self._slot(url):
+            raw = self.session.get(url, headers=request_headers, timeout=timeout or self.timeout)
+
+        if cached and raw.status_code == 304:
+            # A 304 updates the stored headers; a no-cache entry stays no-cache
+            merged = {k.lower(): v for k, v in list(cached[0].headers.items()) + list(raw.headers.items())}
+            refreshed_ttl = _response_ttl(merged, ttl)
+            self.cache.touch(url, ttl if refreshed_ttl is None else refreshed_ttl)
+            return cached[0]
+
+        response = HttpResponse(raw.url or url, raw.status_code, dict(raw.headers), raw.content)
+        if self.cache and use_cache and raw.status_code == 200:
+            response_ttl = _response_ttl(raw.headers, ttl)
+            if response_ttl is not None:
+                # Key by the requested URL so redirects still hit next time
+                response.url = url
+                self.cache.put(response, response_ttl)
+        return response
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client(config_manager=None):
+    """
+    Process-wide client. Config keys: 'http_timeout' (read timeout, seconds),
+    'http_cache_ttl' (seconds), 'http_per_host_limit', 'http_cache_max_mb'.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            get = config_manager.get if config_manager else (lambda key, default=None: default)
+            try:
+                timeout = (DEFAULT_TIMEOUT[0], float(get("http_timeout", DEFAULT_TIMEOUT[1])))
+                ttl = int(get("http_cache_ttl", DEFAULT_TTL))
+                per_host = int(get("http_per_host_limit", DEFAULT_PER_HOST_LIMIT))
+                max_bytes = int(float(get("http_cache_max_mb", 64)) * 1024 * 1024)
+            except (TypeError, ValueError):
+                timeout, ttl, per_host = DEFAULT_TIMEOUT, DEFAULT_TTL, DEFAULT_PER_HOST_LIMIT
+                max_bytes = DEFAULT_CACHE_MAX_BYTES
+            cache_path = os.path.join(get_app_data_dir(), "cache", "http_cache.sqlite")
+            _client = HttpClient(cache_path=cache_path, timeout=timeout, default_ttl=ttl, per_host_limit=per_host,
+                                 cache_max_bytes=max_bytes)
+            _client.cache.purge_expired()
+        return _client
@@ -1,4 +1,5 @@
 from .providers import OpenAIProvider, AnthropicProvider, MoonshotProvider
+from .resilient import ResilientProvider, DEFAULT_MAX_RETRIES, DEFAULT_BASE_DELAY, DEFAULT_MAX_DELAY
 
 class LLMFactory:
     @staticmethod
@@ -10,10 +11,52 @@ class LLMFactory:
 
         # Allow per-model config override if implemented in ConfigManager later
         # For now, we use the global keys but support the 'llm_provider' switch
+        return LLMFactory.build(provider_type, api_key, base_url, model_name)
 
+    @staticmethod
+    def build(provider_type, api_key, base_url, model_name):
         if provider_type == "anthropic":
             return AnthropicProvider(api_key, base_url, model_name)
         elif provider_type in ["moonshot", "kimi"]:
             return MoonshotProvider(api_key, base_url, model_name)
         else:
             return OpenAIProvider(api_key, base_url, model_name)
+
+    @staticmethod
+    def provider_entries(config_manager):
+        """
+        The primary provider followed by the 'llm_fallbacks' list from config.json.
+        Each fallback is a dict with any of llm_provider, model_name, api_key and
+        base_url; keys it leaves out are taken from the primary settings.
+        """
+        primary = {
+            "llm_provider": config_manager.get("llm_provider", "openai"),
+            "model_name": config_manager.get("model_name", "deepseek-reasoner"),
+            "api_key": config_manager.get("api_key"),
+            "base_url": config_manager.get("base_url"),
+        }
+        settings = [primary]
+        for fallback in config_manager.get("llm_fallbacks", []) or []:
+            if isinstance(fallback, dict):
+                settings.append(dict(primary, **{k: v for k, v in fallback.items() if v not in (None, "")}))
+
+        entries = []
+        for s in settings:
+            provider_type = (s["llm_provider"] or "openai").lower()
+            entries.append({
+                "provider": provider_type,
+                "model": s["model_name"],
+                "create": lambda s=s, t=provider_type: LLMFactory.build(t, s["api_key"], s["base_url"], s["model_name"]),
+            })
+        return entries
+
+    @staticmethod
+    def create_provider_chain(config_manager, should_stop=None):
+        """Primary provider plus fallbacks behind retry/backoff/failover (see ResilientProvider)."""
+        return ResilientProvider(
+            LLMFactory.provider_entries(config_manager),
+            max_retries=config_manager.get("llm_max_retries", DEFAULT_MAX_RETRIES),
+            base_delay=config_manager.get("llm_retry_base_delay", DEFAULT_BASE_DELAY),
+            max_delay=config_manager.get("llm_retry_max_delay", DEFAULT_MAX_DELAY),
+            should_stop=should_stop,
+        )
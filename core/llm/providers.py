@@ -1,7 +1,72 @@
 from abc import ABC, abstractmethod
 import os
+import asyncio
 import json
 import time
+from email.utils import parsedate_to_datetime
+from core.prompt_builder import split_stable_prefix
+from .usage import UsageMeter
+
+CACHE_CONTROL = {"type": "ephemeral"}
+
+# Error types Anthropic sends inside an already-open stream, as HTTP statuses
+STREAM_ERROR_STATUS = {
+    "invalid_request_error": 400,
+    "authentication_error": 401,
+    "permission_error": 403,
+    "not_found_error": 404,
+    "request_too_large": 413,
+    "rate_limit_error": 429,
+    "api_error": 500,
+    "overloaded_error": 529,
+}
+
+# SDK/transport exceptions raised when a connection drops or times out
+TRANSIENT_ERRORS = ("APIConnectionError", "APITimeoutError", "RemoteProtocolError",
+                    "ReadTimeout", "ConnectTimeout", "ConnectError", "ReadError",
+                    "ConnectionError", "TimeoutError")
+
+
+class ProviderStreamError(Exception):
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def parse_retry_after(headers):
+    """Seconds to wait from retry-after-ms / Retry-After (delta-seconds or HTTP date) headers, or None."""
+    if not headers:
+        return None
+    try:
+        value = headers.get("retry-after-ms")
+        if value is not None:
+            return max(0.0, float(value) / 1000)
+        value = headers.get("retry-after")
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def error_chunk(exc):
+    """
+    Error chunk for a failed request: the message plus, when known, the HTTP
+    status_code and the server's retry_after (seconds). retryable marks
+    dropped connections and timeouts, which carry no status.
+    """
+    response = getattr(exc, "response", None)
+    status = getattr(exc, "status_code", None) or getattr(response, "status_code", None)
+    return {
+        "type": "error",
+        "content": str(exc),
+        "status_code": status,
+        "retry_after": parse_retry_after(getattr(response, "headers", None)),
+        "retryable": status is None and any(cls.__name__ in TRANSIENT_ERRORS for cls in type(exc).__mro__),
+    }
 
 class LLMProvider(ABC):
     @abstractmethod
@@ -9,66 +74,133 @@ class LLMProvider(ABC):
         """
         Yields chunks of response.
         Each chunk should be a dict with:
-        - type: 'content' | 'reasoning' | 'tool_call'
+        - type: 'content' | 'reasoning' | 'tool_call' | 'usage' | 'error'
         - content: str (for content/reasoning)
         - tool_call: dict (for tool_call, partial or complete)
+        The last chunk is always a normalized 'usage' chunk (see UsageMeter):
+        prompt/completion/reasoning/cached/cache_write token counts plus ttft,
+        duration and tokens_per_sec.
         """
         pass
 
+    async def achat_stream(self, messages, tools=None):
+        """
+        Async variant of chat_stream yielding the same chunks. Providers with an
+        async SDK client override this; the default drives chat_stream from a
+        worker thread so any provider can run on an event loop.
+        """
+        loop = asyncio.get_running_loop()
+        iterator = iter(self.chat_stream(messages, tools=tools))
+        done = object()
+        while True:
+            chunk = await loop.run_in_executor(None, next, iterator, done)
+            if chunk is done:
+                return
+            yield chunk
+
 class OpenAIProvider(LLMProvider):
     def __init__(self, api_key, base_url, model_name):
         from openai import OpenAI
         self.client = OpenAI(api_key=api_key, base_url=base_url)
+        self.client_args = {"api_key": api_key, "base_url": base_url}
+        self.async_client = None # AsyncOpenAI, created on first achat_stream
         self.model_name = model_name
 
+    def _request_params(self, messages, tools):
+        # Clean messages for OpenAI (remove internal keys if any)
+        clean_messages = self._prepare_messages(messages)
+
+        # Common params
+        params = {
+            "model": self.model_name,
+            "messages": clean_messages,
+            "stream": True,
+            # Final chunk carries token usage, including prefix-cache hits
+            "stream_options": {"include_usage": True}
+        }
+        if tools:
+            params["tools"] = tools
+        return params
+
     def chat_stream(self, messages, tools=None):
         try:
-            # Clean messages for OpenAI (remove internal keys if any)
-            clean_messages = self._prepare_messages(messages)
-            
-            # Prepare tools
-            api_tools = tools if tools else None
-            
-            # Common params
-            params = {
-                "model": self.model_name,
-                "messages": clean_messages,
-                "stream": True
-            }
-            if api_tools:
-                params["tools"] = api_tools
-
+            params = self._request_params(messages, tools)
+            meter = UsageMeter()
             stream = self.client.chat.completions.create(**params)
-
             for chunk in stream:
-                if not chunk.choices:
-                    continue
-                    
-                delta = chunk.choices[0].delta
-                
-                # 1. Reasoning (DeepSeek style)
-                if hasattr(delta, 'reasoning_content') and delta.reasoning_content:
-                    yield {"type": "reasoning", "content": delta.reasoning_content}
-                
-                # 2. Content
-                if delta.content:
-                    yield {"type": "content", "content": delta.content}
-                
-                # 3. Tool Calls
-                if delta.tool_calls:
-                    for tc in delta.tool_calls:
-                        yield {
-                            "type": "tool_call",
-                            "index": tc.index,
-                            "id": tc.id,
-                            "function": {
-                                "name": tc.function.name,
-                                "arguments": tc.function.arguments
-                            }
-                        }
-                        
+                yield from self._parse_chunk(chunk, meter)
+            yield meter.chunk()
+
         except Exception as e:
-            yield {"type": "error", "content": str(e)}
+            yield error_chunk(e)
+
+    async def achat_stream(self, messages, tools=None):
+        try:
+            params = self._request_params(messages, tools)
+            meter = UsageMeter()
+            if getattr(self, "async_client", None) is None:
+                from openai import AsyncOpenAI
+                self.async_client = AsyncOpenAI(**self.client_args)
+            stream = await self.async_client.chat.completions.create(**params)
+            async for chunk in stream:
+                for out in self._parse_chunk(chunk, meter):
+                    yield out
+            yield meter.chunk()
+
+        except Exception as e:
+            yield error_chunk(e)
+
+    def _parse_chunk(self, chunk, meter):
+        """Normalize one ChatCompletionChunk (shared by the sync and async streams)."""
+        usage = getattr(chunk, "usage", None)
+        if usage:
+            meter.update(**self._usage_counts(usage))
+        if not chunk.choices:
+            return
+
+        delta = chunk.choices[0].delta
+
+        # 1. Reasoning (DeepSeek style)
+        if hasattr(delta, 'reasoning_content') and delta.reasoning_content:
+            meter.mark_token()
+            yield {"type": "reasoning", "content": delta.reasoning_content}
+
+        # 2. Content
+        if delta.content:
+            meter.mark_token()
+            yield {"type": "content", "content": delta.content}
+
+        # 3. Tool Calls
+        if delta.tool_calls:
+            meter.mark_token()
+            for tc in delta.tool_calls:
+                yield {
+                    "type": "tool_call",
+                    "index": tc.index,
+                    "id": tc.id,
+                    "function": {
+                        "name": tc.function.name,
+                        "arguments": tc.function.arguments
+                    }
+                }
+
+    def _usage_counts(self, usage):
+        # OpenAI reports cache hits in prompt_tokens_details.cached_tokens,
+        # DeepSeek in prompt_cache_hit_tokens; both report reasoning tokens in
+        # completion_tokens_details (they are included in completion_tokens)
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", None) if details else None
+        if cached is None:
+            cached = getattr(usage, "prompt_cache_hit_tokens", None)
+        completion_details = getattr(usage, "completion_tokens_details", None)
+        reasoning = getattr(completion_details, "reasoning_tokens", None) if completion_details else None
+        return {
+            "prompt_tokens": getattr(usage, "prompt_tokens", None),
+            "completion_tokens": getattr(usage, "completion_tokens", None),
+            "reasoning_tokens": reasoning,
+            "cached_tokens": cached or 0,
+            "cache_write_tokens": 0
+        }
 
     def _prepare_messages(self, messages):
         # Deep copy and clean
@@ -77,6 +209,7 @@ class OpenAIProvider(LLMProvider):
             m = msg.copy()
             # Remove internal keys
             m.pop("reasoning", None)
+            m.pop("token_count", None)
             
             # DeepSeek Reasoner requires reasoning_content in some contexts (e.g. tool calls)
             # Standard OpenAI does not support it.
@@ -109,6 +242,7 @@ class MoonshotProvider(OpenAIProvider):
             # Moonshot strictly does not support 'reasoning_content' or 'reasoning' fields
             m.pop("reasoning", None)
             m.pop("reasoning_content", None)
+            m.pop("token_count", None)
             
             # Kimi requires strictly valid tool_calls
             if "tool_calls" in m and not m["tool_calls"]:
@@ -126,62 +260,177 @@ class AnthropicProvider(LLMProvider):
         from anthropic import Anthropic
         # Anthropic SDK handles base_url differently usually, but we can pass it
         self.client = Anthropic(api_key=api_key, base_url=base_url)
+        self.client_args = {"api_key": api_key, "base_url": base_url}
+        self.async_client = None # AsyncAnthropic, created on first achat_stream
         self.model_name = model_name
 
+    def _request_params(self, messages, tools):
+        system_prompt, api_messages = self._prepare_messages(messages)
+
+        # Convert tools to Anthropic format
+        api_tools = self._convert_tools(tools) if tools else None
+
+        # Anthropic parameters
+        kwargs = {
+            "model": self.model_name,
+            "messages": api_messages,
+            "stream": True,
+            "max_tokens": 8192 # Required by Anthropic
+        }
+        if system_prompt:
+            kwargs["system"] = self._system_blocks(system_prompt)
+        if api_tools:
+            # Breakpoint on the last tool caches the whole tool list
+            api_tools[-1] = dict(api_tools[-1], cache_control=CACHE_CONTROL)
+            kwargs["tools"] = api_tools
+        self._mark_last_message(api_messages)
+        return kwargs
+
     def chat_stream(self, messages, tools=None):
         try:
-            system_prompt, api_messages = self._prepare_messages(messages)
-            
-            # Convert tools to Anthropic format
-            api_tools = self._convert_tools(tools) if tools else None
-            
-            # Anthropic parameters
-            kwargs = {
-                "model": self.model_name,
-                "messages": api_messages,
-                "stream": True,
-                "max_tokens": 8192 # Required by Anthropic
-            }
-            if system_prompt:
-                kwargs["system"] = system_prompt
-            if api_tools:
-                kwargs["tools"] = api_tools
-
-            with self.client.messages.stream(**kwargs) as stream:
-                for event in stream:
-                    if event.type == "content_block_delta":
-                        if event.delta.type == "text_delta":
-                            yield {"type": "content", "content": event.delta.text}
-                        elif event.delta.type == "input_json_delta":
-                            # Streaming tool args
-                            # We need to track index manually or assume single tool call per block?
-                            # Anthropic SDK stream helper might be easier, but let's use raw events for fine control
-                            # actually 'index' is in content_block_start
-                            pass 
-                            
-                    elif event.type == "content_block_start":
-                        if event.content_block.type == "tool_use":
-                            yield {
-                                "type": "tool_call",
-                                "index": event.index,
-                                "id": event.content_block.id,
-                                "function": {
-                                    "name": event.content_block.name,
-                                    "arguments": "" # Start
-                                }
-                            }
-                            
-                    elif event.type == "content_block_delta" and event.delta.type == "input_json_delta":
-                         yield {
-                            "type": "tool_call",
-                            "index": event.index, 
-                            "function": {
-                                "arguments": event.delta.partial_json
-                            }
-                        }
+            kwargs = self._request_params(messages, tools)
+            meter = UsageMeter()
+            state = self._stream_state()
+            # Raw event stream; the messages.stream() helper would interleave its
+            # own accumulated events with these.
+            stream = self.client.messages.create(**kwargs)
+            for event in stream:
+                yield from self._parse_event(event, state, meter)
+            yield meter.chunk()
+
+        except Exception as e:
+            yield error_chunk(e)
+
+    async def achat_stream(self, messages, tools=None):
+        try:
+            kwargs = self._request_params(messages, tools)
+            meter = UsageMeter()
+            state = self._stream_state()
+            if getattr(self, "async_client", None) is None:
+                from anthropic import AsyncAnthropic
+                self.async_client = AsyncAnthropic(**self.client_args)
+            stream = await self.async_client.messages.create(**kwargs)
+            async for event in stream:
+                for out in self._parse_event(event, state, meter):
+                    yield out
+            yield meter.chunk()
 
         except Exception as e:
-            yield {"type": "error", "content": str(e)}
+            yield error_chunk(e)
+
+    def _stream_state(self):
+        # content block index -> tool call index, and tool calls that received arguments
+        return {"tool_indices": {}, "tool_has_args": set()}
+
+    def _parse_event(self, event, state, meter):
+        """
+        Normalize one Anthropic stream event (shared by the sync and async streams).
+
+        Content block indices count text and thinking blocks too, so tool_use
+        blocks are renumbered 0, 1, ... to match the OpenAI tool_call indices.
+        A tool called without arguments streams no input_json_delta at all;
+        it gets "{}" on content_block_stop so its arguments always parse.
+        """
+        etype = event.type
+        if etype == "content_block_delta":
+            delta = event.delta
+            dtype = delta.type
+            if dtype == "text_delta":
+                meter.mark_token()
+                yield {"type": "content", "content": delta.text}
+            elif dtype == "input_json_delta":
+                index = state["tool_indices"].get(event.index)
+                if index is None or not delta.partial_json:
+                    return
+                state["tool_has_args"].add(index)
+                yield {
+                    "type": "tool_call",
+                    "index": index,
+                    "id": None,
+                    "function": {"name": None, "arguments": delta.partial_json}
+                }
+            elif dtype == "thinking_delta":
+                meter.mark_token()
+                yield {"type": "reasoning", "content": delta.thinking}
+            # signature_delta only authenticates the thinking block
+
+        elif etype == "content_block_start":
+            block = event.content_block
+            if block.type == "tool_use":
+                meter.mark_token()
+                index = state["tool_indices"][event.index] = len(state["tool_indices"])
+                yield {
+                    "type": "tool_call",
+                    "index": index,
+                    "id": block.id,
+                    "function": {"name": block.name, "arguments": ""}
+                }
+            elif block.type == "text" and block.text:
+                meter.mark_token()
+                yield {"type": "content", "content": block.text}
+            elif block.type == "thinking" and block.thinking:
+                meter.mark_token()
+                yield {"type": "reasoning", "content": block.thinking}
+
+        elif etype == "content_block_stop":
+            index = state["tool_indices"].get(event.index)
+            if index is not None and index not in state["tool_has_args"]:
+                state["tool_has_args"].add(index)
+                yield {
+                    "type": "tool_call",
+                    "index": index,
+                    "id": None,
+                    "function": {"name": None, "arguments": "{}"}
+                }
+
+        elif etype == "message_start":
+            u = getattr(event.message, "usage", None)
+            if u:
+                cached = getattr(u, "cache_read_input_tokens", 0) or 0
+                written = getattr(u, "cache_creation_input_tokens", 0) or 0
+                meter.update(
+                    # input_tokens excludes cache reads and writes
+                    prompt_tokens=(getattr(u, "input_tokens", 0) or 0) + cached + written,
+                    cached_tokens=cached,
+                    cache_write_tokens=written
+                )
+
+        elif etype == "message_delta":
+            u = getattr(event, "usage", None)
+            if u:
+                meter.update(completion_tokens=getattr(u, "output_tokens", None))
+
+        elif etype == "error":
+            error = getattr(event, "error", None)
+            raise ProviderStreamError(getattr(error, "message", None) or str(error),
+                                      STREAM_ERROR_STATUS.get(getattr(error, "type", None)))
+
+    def _system_blocks(self, system_prompt):
+        """
+        System prompt as content blocks with a cache breakpoint after the stable
+        prefix; the session section (date etc.) follows uncached.
+        """
+        stable, session = split_stable_prefix(system_prompt)
+        blocks = [{"type": "text", "text": stable, "cache_control": CACHE_CONTROL}]
+        if session:
+            blocks.append({"type": "text", "text": session})
+        return blocks
+
+    def _mark_last_message(self, api_messages):
+        """Cache breakpoint on the newest message, so the next turn of a tool loop reuses the conversation."""
+        if not api_messages:
+            return
+        last = api_messages[-1]
+        content = last["content"]
+        if isinstance(content, str):
+            if not content:
+                return
+            content = [{"type": "text", "text": content}]
+        elif not content:
+            return
+        content = list(content)
+        content[-1] = dict(content[-1], cache_control=CACHE_CONTROL)
+        last["content"] = content
 
     def _prepare_messages(self, messages):
         """
@@ -256,7 +505,7 @@ class AnthropicProvider(LLMProvider):
                         "type": "tool_use",
                         "id": tc["id"],
                         "name": tc["function"]["name"],
-                        "input": json.loads(tc["function"]["arguments"])
+                        "input": json.loads(tc["function"]["arguments"] or "{}")
                     })
                 
                 api_messages.append({
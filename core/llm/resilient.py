@@ -0,0 +1,200 @@
+import time
+import random
+import asyncio
+from core.agent_pool import backoff_delay, is_retryable_error
+from .providers import LLMProvider, error_chunk
+
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 30.0
+# A Retry-After longer than this moves on to the next provider instead of waiting
+DEFAULT_MAX_RETRY_AFTER = 60.0
+
+# Chunk types that mean the model has started answering
+OUTPUT_TYPES = ("content", "reasoning", "tool_call")
+
+
+def is_retryable(chunk):
+    """Decide from an error chunk whether the same provider is worth another try."""
+    status = chunk.get("status_code")
+    if status is not None:
+        return status in (408, 409, 429) or 500 <= status < 600
+    if chunk.get("retryable"):
+        return True
+    return is_retryable_error(chunk.get("content"))
+
+
+class ResilientProvider(LLMProvider):
+    """
+    Wraps an ordered list of provider entries (primary first, then fallbacks).
+
+    A request that fails before the first output token is retried on the same
+    entry with full-jitter exponential backoff, or after the server's
+    Retry-After. Once retries are used up, or the error is not transient, the
+    request fails over to the next entry. A stream that breaks after output
+    has started cannot be replayed transparently, so that error is passed on.
+
+    Besides the wrapped provider's chunks, the stream carries one
+    {"type": "attempt"} chunk per attempt for telemetry. The final usage chunk
+    names the provider and model that answered.
+
+    entries: dicts with "provider" (llm_provider name), "model" and "create"
+    (a callable returning the LLMProvider; called lazily, once).
+    """
+
+    def __init__(self, entries, max_retries=DEFAULT_MAX_RETRIES, base_delay=DEFAULT_BASE_DELAY,
+                 max_delay=DEFAULT_MAX_DELAY, max_retry_after=DEFAULT_MAX_RETRY_AFTER,
+                 sleep=time.sleep, clock=time.monotonic, rng=random.random, should_stop=None):
+        if not entries:
+            raise ValueError("ResilientProvider needs at least one provider entry")
+        self.entries = [dict(entry) for entry in entries]
+        self.max_retries = max(0, int(max_retries))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.sleep = sleep
+        self.clock = clock
+        self.rng = rng
+        self.should_stop = should_stop or (lambda: False)
+
+    @property
+    def model_name(self):
+        return self.entries[0]["model"]
+
+    def _provider(self, entry):
+        if "instance" not in entry:
+            entry["instance"] = entry["create"]()
+        return entry["instance"]
+
+    def _wait(self, delay):
+        """Sleep in short slices so a stopped agent is not held up by a long backoff."""
+        deadline = self.clock() + delay
+        while not self.should_stop():
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                return True
+            self.sleep(min(remaining, 0.2))
+        return False
+
+    async def _await(self, delay):
+        deadline = self.clock() + delay
+        while not self.should_stop():
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                return True
+            await asyncio.sleep(min(remaining, 0.2))
+        return False
+
+    def _retry_delay(self, error, attempt):
+        retry_after = error.get("retry_after")
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_retry_after else None
+        return backoff_delay(attempt, base=self.base_delay, cap=self.max_delay, rng=self.rng)
+
+    def _attempt_record(self, entry, position, attempt, started, error, output_started, is_last_entry):
+        """Telemetry chunk for a finished attempt; its outcome says what happens next."""
+        record = {
+            "type": "attempt",
+            "provider": entry["provider"],
+            "model": entry["model"],
+            "attempt": attempt,
+            "fallback": position,
+            "duration": self.clock() - started,
+            "status_code": error.get("status_code") if error else None,
+            "error": error.get("content") if error else None,
+            "delay": None,
+        }
+        if error is None:
+            return dict(record, outcome="ok")
+        if output_started or self.should_stop():
+            # Partial output was already streamed; replaying would duplicate it
+            return dict(record, outcome="failed")
+        if attempt <= self.max_retries and is_retryable(error):
+            delay = self._retry_delay(error, attempt)
+            if delay is not None:
+                return dict(record, outcome="retry", delay=delay)
+        return dict(record, outcome="failed" if is_last_entry else "failover")
+
+    def _track(self, entry, chunk, progress):
+        """Inspect a passing chunk: remember errors/output, label usage. Returns the chunk to yield or None."""
+        chunk_type = chunk.get("type")
+        if chunk_type == "error":
+            progress["error"] = chunk
+            return None
+        if chunk_type in OUTPUT_TYPES:
+            progress["output_started"] = True
+        elif chunk_type == "usage":
+            chunk = dict(chunk, provider=entry["provider"], model=entry["model"])
+        return chunk
+
+    def chat_stream(self, messages, tools=None):
+        error = None
+        for position, entry in enumerate(self.entries):
+            attempt = 0
+            while True:
+                attempt += 1
+                started = self.clock()
+                progress = {"error": None, "output_started": False}
+                try:
+                    for chunk in self._provider(entry).chat_stream(messages, tools=tools):
+                        chunk = self._track(entry, chunk, progress)
+                        if chunk is None:
+                            break
+                        yield chunk
+                except Exception as e:
+                    progress["error"] = error_chunk(e)
+
+                error = progress["error"]
+                record = self._attempt_record(entry, position, attempt, started, error,
+                                              progress["output_started"], position == len(self.entries) - 1)
+                yield record
+                if record["outcome"] == "ok":
+                    return
+                if record["outcome"] == "retry":
+                    if not self._wait(record["delay"]):
+                        break
+                    continue
+                if record["outcome"] == "failed":
+                    yield error
+                    return
+                break # failover
+            if record["outcome"] == "retry": # stopped while backing off
+                yield error
+                return
+        yield error
+
+    async def achat_stream(self, messages, tools=None):
+        error = None
+        for position, entry in enumerate(self.entries):
+            attempt = 0
+            while True:
+                attempt += 1
+                started = self.clock()
+                progress = {"error": None, "output_started": False}
+                try:
+                    async for chunk in self._provider(entry).achat_stream(messages, tools=tools):
+                        chunk = self._track(entry, chunk, progress)
+                        if chunk is None:
+                            break
+                        yield chunk
+                except Exception as e:
+                    progress["error"] = error_chunk(e)
+
+                error = progress["error"]
+                record = self._attempt_record(entry, position, attempt, started, error,
+                                              progress["output_started"], position == len(self.entries) - 1)
+                yield record
+                if record["outcome"] == "ok":
+                    return
+                if record["outcome"] == "retry":
+                    if not await self._await(record["delay"]):
+                        break
+                    continue
+                if record["outcome"] == "failed":
+                    yield error
+                    return
+                break # failover
+            if record["outcome"] == "retry": # stopped while backing off
+                yield error
+                return
+        yield error
@@ -0,0 +1,53 @@
+import time
+
+USAGE_KEYS = ("prompt_tokens", "completion_tokens", "reasoning_tokens", "cached_tokens", "cache_write_tokens")
+
+
+class UsageMeter:
+    """
+    Collects token counts and timing for one streamed request and turns them
+    into the normalized 'usage' chunk every provider yields last:
+
+        {"type": "usage", "prompt_tokens", "completion_tokens", "reasoning_tokens",
+         "cached_tokens", "cache_write_tokens", "ttft", "duration", "tokens_per_sec"}
+
+    Token counts are None when the provider did not report them. ttft is the
+    time to the first streamed token; tokens_per_sec covers generation only
+    (first token to end of stream).
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.started_at = clock()
+        self.first_token_at = None
+        self.counts = dict.fromkeys(USAGE_KEYS)
+
+    def mark_token(self):
+        if self.first_token_at is None:
+            self.first_token_at = self.clock()
+
+    def update(self, **counts):
+        for key, value in counts.items():
+            if value is not None:
+                self.counts[key] = value
+
+    def chunk(self):
+        finished_at = self.clock()
+        ttft = self.first_token_at - self.started_at if self.first_token_at is not None else None
+        generation_time = finished_at - (self.first_token_at if self.first_token_at is not None else self.started_at)
+        completion = self.counts["completion_tokens"]
+        tokens_per_sec = completion / generation_time if completion and generation_time > 0 else None
+        return dict(
+            self.counts,
+            type="usage",
+            ttft=ttft,
+            duration=finished_at - self.started_at,
+            tokens_per_sec=tokens_per_sec,
+        )
+
+
+def add_usage(totals, usage):
+    """Accumulate a usage chunk's token counts into totals (unknown counts are skipped)."""
+    for key in USAGE_KEYS:
+        totals[key] = (totals.get(key) or 0) + (usage.get(key) or 0)
+    return totals
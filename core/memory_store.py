@@ -0,0 +1,259 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from .embedding_indexer import get_embedding_backend
+
+DEFAULT_BUDGET_TOKENS = 1000
+DEFAULT_TOP_K = 20
+LEGACY_FILENAME = "memories.md"
+
+_BULLET_RE = re.compile(r"^(?:[-*+]|\d+[.)])\s+(.*)$")
+
+
+def _tokens(text):
+    # Same ~4 characters per token heuristic as subagent.estimate_tokens
+    return len(text) // 4
+
+
+def parse_memories(text):
+    """
+    Split memories.md-style text into [(section, content)]: one entry per list
+    item or paragraph, section being the last heading line above it (or None).
+    """
+    entries, section, current = [], None, None
+    for line in (text or "").splitlines():
+        stripped = line.strip()
+        if not stripped:
+            current = None
+            continue
+        if stripped.startswith("#"):
+            section, current = stripped, None
+            continue
+        match = _BULLET_RE.match(stripped)
+        if match:
+            current = [section, match.group(1)]
+            entries.append(current)
+        elif current is not None:
+            current[1] += "\n" + stripped
+        else:
+            current = [section, stripped]
+            entries.append(current)
+    return [(section, content) for section, content in entries if content.strip()]
+
+
+def render_memories(rows):
+    """Markdown for memory rows, grouped under their section headings."""
+    lines, section = [], None
+    for row in rows:
+        if row["section"] != section:
+            section = row["section"]
+            if section:
+                lines += ["", section] if lines else [section]
+        lines.append("- " + row["content"].replace("\n", "\n  "))
+    return "\n".join(lines)
+
+
+def _fits(rows, budget_tokens):
+    return budget_tokens is not None and sum(_tokens(row["content"]) + 1 for row in rows) <= budget_tokens
+
+
+def _content_hash(content):
+    return hashlib.sha256(" ".join(content.split()).lower().encode("utf-8")).hexdigest()
+
+
+class MemoryStore:
+    """
+    Long-term memories, one row per entry, in the chat history database.
+
+    Replaces memories.md: the file is imported once (and renamed to
+    memories.md.bak). Appending inserts rows instead of rewriting a file, and
+    select() picks only the memories relevant to a query when they do not all
+    fit the prompt budget. Embeddings are computed with the configured
+    embedding backend when a memory is written, and recomputed lazily if the
+    backend changes.
+    """
+
+    def __init__(self, db_path, backend=None, legacy_path=None):
+        self.db_path = db_path
+        self.backend = backend or get_embedding_backend()
+        self.legacy_path = legacy_path
+        self._init_db()
+
+    @contextmanager
+    def _connect(self):
+        """One connection per call: commits (or rolls back) the transaction and closes it."""
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS memories (
+                    id INTEGER PRIMARY KEY,
+                    section TEXT,
+                    content TEXT NOT NULL,
+                    content_hash TEXT UNIQUE,
+                    embedding TEXT,
+                    embedding_backend TEXT,
+                    created_at INTEGER,
+                    updated_at INTEGER
+                )
+                """
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)")
+            imported = conn.execute("SELECT 1 FROM meta WHERE key = 'memories_imported'").fetchone()
+            if imported:
+                return
+            if self.legacy_path and os.path.exists(self.legacy_path):
+                with open(self.legacy_path, "r", encoding="utf-8") as f:
+                    self._insert(conn, parse_memories(f.read()))
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('memories_imported', 1)")
+        if self.legacy_path and os.path.exists(self.legacy_path):
+            os.replace(self.legacy_path, self.legacy_path + ".bak")
+
+    def _signature(self):
+        return f"{self.backend.name}:{self.backend.dim}"
+
+    def _insert(self, conn, entries):
+        """Insert (section, content) entries; a memory already stored is only touched. Returns new row ids."""
+        now = int(time.time())
+        new = {}
+        for section, content in entries:
+            content = (content or "").strip()
+            if not content:
+                continue
+            digest = _content_hash(content)
+            if conn.execute("UPDATE memories SET updated_at = ? WHERE content_hash = ?", (now, digest)).rowcount:
+                continue
+            new.setdefault(digest, (section, content))
+        vectors = self.backend.embed([content for _, content in new.values()]) if new else []
+        ids = []
+        for (digest, (section, content)), vector in zip(new.items(), vectors):
+            cursor = conn.execute(
+                """
+                INSERT INTO memories (section, content, content_hash, embedding, embedding_backend, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (section, content, digest, json.dumps(vector), self._signature(), now, now),
+            )
+            ids.append(cursor.lastrowid)
+        return ids
+
+    def add(self, text, section=None):
+        """Append memories from markdown text. Entries without a heading of their own get section."""
+        entries = [(own or section, content) for own, content in parse_memories(text)]
+        with self._connect() as conn:
+            return self._insert(conn, entries)
+
+    def replace(self, text):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM memories")
+            return self._insert(conn, parse_memories(text))
+
+    def delete(self, memory_id):
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM memories WHERE id = ?", (memory_id,)).rowcount
+
+    def rows(self):
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute("SELECT * FROM memories ORDER BY id")]
+
+    def read(self):
+        return render_memories(self.rows())
+
+    def _embeddings(self, rows):
+        """Vectors for rows, re-embedding (and saving) those written with another backend."""
+        stale = [row for row in rows if row["embedding_backend"] != self._signature() or not row["embedding"]]
+        if stale:
+            vectors = self.backend.embed([row["content"] for row in stale])
+            with self._connect() as conn:
+                for row, vector in zip(stale, vectors):
+                    row["embedding"] = json.dumps(vector)
+                    row["embedding_backend"] = self._signature()
+                    conn.execute(
+                        "UPDATE memories SET embedding = ?, embedding_backend = ? WHERE id = ?",
+                        (row["embedding"], row["embedding_backend"], row["id"]),
+                    )
+        return [json.loads(row["embedding"]) for row in rows]
+
+    def select(self, query=None, budget_tokens=DEFAULT_BUDGET_TOKENS, top_k=DEFAULT_TOP_K):
+        """
+        Memories to put in the prompt, in stored order. All of them while they
+        fit budget_tokens (so the prompt stays the same from turn to turn);
+        otherwise up to top_k ranked by similarity to query (newest first
+        without a query), as many as fit the budget (None: no budget).
+        """
+        rows = self.rows()
+        if _fits(rows, budget_tokens):
+            return rows
+        ranked = sorted(rows, key=lambda row: (row["updated_at"] or 0, row["id"]), reverse=True)
+        if query and query.strip():
+            query_vector = self.backend.embed([query])[0]
+            scores = {
+                row["id"]: sum(a * b for a, b in zip(query_vector, vector))
+                for row, vector in zip(rows, self._embeddings(rows))
+            }
+            ranked.sort(key=lambda row: scores[row["id"]], reverse=True)
+        chosen, used = [], 0
+        for row in ranked:
+            if len(chosen) >= top_k:
+                break
+            cost = _tokens(row["content"]) + 1
+            if budget_tokens is not None and used + cost > budget_tokens:
+                continue
+            chosen.append(row)
+            used += cost
+        return sorted(chosen, key=lambda row: row["id"])
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_memory_store(config_manager):
+    """The MemoryStore for config_manager's history directory (memories.md is imported on first use)."""
+    history_dir = config_manager.get_chat_history_dir()
+    backend = get_embedding_backend(config_manager)
+    key = (history_dir, id(backend))
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = MemoryStore(
+                os.path.join(history_dir, "chat_history.sqlite"),
+                backend,
+                legacy_path=os.path.join(history_dir, LEGACY_FILENAME),
+            )
+        return _stores[key]
+
+
+def prompt_memories(config_manager, query=None):
+    """
+    (text, per_query) for the system prompt within 'memory_budget_tokens'
+    (default 1000) and 'memory_top_k' (default 20) from config. per_query is
+    True when not all memories fit and text is the selection for query, which
+    changes from request to request.
+    """
+    store = get_memory_store(config_manager)
+    budget_tokens = int(config_manager.get("memory_budget_tokens", DEFAULT_BUDGET_TOKENS))
+    rows = store.rows()
+    if _fits(rows, budget_tokens):
+        return render_memories(rows), False
+    rows = store.select(query, budget_tokens=budget_tokens,
+                        top_k=int(config_manager.get("memory_top_k", DEFAULT_TOP_K)))
+    return render_memories(rows), bool(query and query.strip())
+
+
+def memories_for_prompt(config_manager, query=None):
+    """Rendered memories relevant to query (see prompt_memories)."""
+    return prompt_memories(config_manager, query)[0]
@@ -0,0 +1,70 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Below this many pages a process pool costs more (spawn + re-parsing the PDF) than it saves.
+# Well above read_pdf's default window of 20 pages, so only explicit large ranges use it.
+MIN_PARALLEL_PAGES = 64
+PAGES_PER_WORKER = 8
+MAX_WORKERS = 8
+
+
+def choose_worker_count(page_count, cpu_count=None, min_pages=MIN_PARALLEL_PAGES,
+                        pages_per_worker=PAGES_PER_WORKER, max_workers=MAX_WORKERS):
+    """
+    Pick a process pool size for extracting page_count pages.
+    Returns 1 (extract in-process) for small jobs or single-core machines.
+    """
+    cpu_count = cpu_count or os.cpu_count() or 1
+    if page_count < min_pages or cpu_count < 2:
+        return 1
+    workers = min(cpu_count, max_workers, -(-page_count // pages_per_worker))
+    return max(1, workers)
+
+
+def _split_runs(page_numbers, chunks):
+    """Split sorted page numbers into at most `chunks` runs of roughly equal size."""
+    pages = sorted(page_numbers)
+    size = -(-len(pages) // chunks)
+    return [pages[i:i + size] for i in range(0, len(pages), size)]
+
+
+def _extract_run(path, pages):
+    """Worker entry point: open the PDF once and extract a run of 1-based page numbers."""
+    from pypdf import PdfReader
+    reader = PdfReader(path)
+    return [(n, reader.pages[n - 1].extract_text() or "") for n in pages]
+
+
+def extract_pages(path, page_numbers, workers=None):
+    """
+    Extract text for the given 1-based page numbers.
+
+    With more than one worker, pages are split into runs handled by a process
+    pool (each worker opens its own PdfReader) and reassembled in page order.
+    Workers are spawned, not forked: the caller may be a threaded Qt process.
+    Falls back to in-process extraction if the pool cannot be used.
+
+    Returns:
+        dict: page number -> extracted text, in ascending page order.
+    """
+    page_numbers = list(page_numbers)
+    if not page_numbers:
+        return {}
+    if workers is None:
+        workers = choose_worker_count(len(page_numbers))
+
+    if workers > 1:
+        # Twice as many runs as workers evens out pages with very different costs
+        runs = _split_runs(page_numbers, workers * 2)
+        try:
+            results = {}
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+                for run in executor.map(_extract_run, [path] * len(runs), runs):
+                    results.update(run)
+            return results
+        except Exception as e:
+            print(f"[PDF] Parallel extraction failed, falling back to sequential: {e}")
+
+    return dict(_extract_run(path, sorted(page_numbers)))
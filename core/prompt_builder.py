@@ -0,0 +1,134 @@
+import os
+import sys
+import platform
+from datetime import datetime
+from .memory_store import prompt_memories
+
+# Everything before this heading is stable across requests (and cacheable by the
+# provider); the session section after it carries per-run values such as the date.
+SESSION_HEADING = "# Session"
+SESSION_SEPARATOR = "\n\n" + SESSION_HEADING + "\n"
+
+POLICY_LINES = [
+    "注意: 你正在指定的工作区内操作。除非明确允许使用绝对路径，否则所有文件操作都应相对于此路径。",
+    "能力: 你可以使用 'create_new_skill' 创建新的技能/工具。",
+    "策略 [技能创建]:",
+    "1. 鼓励创建新技能来封装可复用的任务（例如：特定的文件处理、复杂计算、数据转换、系统操作等）。",
+    "2. 当你发现某个任务可能在未来被再次使用，或者通过代码实现比通过纯文本生成更可靠时，请果断创建技能。",
+    "3. 不要受到过度限制，灵活运用技能来增强你的能力。",
+    "",
+    "策略 [自我进化]:",
+    "1. 你拥有 'update_experience' 工具，用于记录重要的经验教训、配置偏好或特定的工具使用技巧。",
+    "2. 当你成功解决一个难题、发现某个工具的最佳实践或遇到并修复了错误时，请务必使用 'update_experience' 记录下来。",
+    "3. 这些经验将在未来类似场景中自动注入，帮助你变得更聪明。",
+    "",
+    "策略 [记忆]:",
+    "1. 你拥有 'read_memories' 与 'write_memories' 工具，用于读取/更新长期记忆（每条记忆一行列表项；下方只注入与当前问题相关的部分）。",
+    "2. 在每次对话结束后，若出现长期稳定偏好、重要背景、持续项目约定、用户身份/环境信息，才更新记忆；否则不要更新。",
+    "3. 避免写入敏感信息或临时细节；默认追加，只有在需要整体整理时才使用替换模式。",
+    "",
+    "策略 [交互]: 如果你需要向用户提问或获取确认（例如：删除文件、澄清需求或下一步操作），你必须使用 'ask_user_confirmation' 工具。",
+    "不要在文本回复中直接提问。文本回复仅用于展示推理过程和最终答案。请使用工具来触发弹出对话框。",
+    "",
+    "策略 [思考规范]:",
+    "1. 你的思考过程 (Reasoning) 仅用于分析问题、规划步骤和反思结果。",
+    "2. 严禁将最终给用户的回复（如任务总结、文件列表、结果汇报）放在思考过程中。",
+    "3. 思考过程对用户是折叠的，用户主要阅读的是你的最终 Content 回复。",
+]
+
+
+def environment_lines(workspace_dir):
+    return [
+        f"当前工作区: {workspace_dir}",
+        f"操作系统: {platform.system()} {platform.release()}",
+        f"Python 版本: {sys.version.split()[0]}",
+    ]
+
+
+def skill_prompt_section(skill_prompt_map, skills=None):
+    """Skill guidelines ordered by skill name, independent of directory listing order."""
+    names = sorted(skill_prompt_map if skills is None else skills)
+    prompts = [skill_prompt_map[name] for name in names if skill_prompt_map.get(name)]
+    if not prompts:
+        return []
+    return ["\n# Skill Capabilities & Guidelines"] + prompts
+
+
+def load_memories(config_manager, query=None):
+    """
+    (stable, per_query) memories text for build_system_prompt: all memories
+    while they fit the budget go in the stable prefix; a selection for query
+    goes in the session section instead, so it does not change the prefix.
+    """
+    if not config_manager:
+        return "", ""
+    try:
+        text, per_query = prompt_memories(config_manager, query)
+    except Exception:
+        return "", ""
+    return ("", text.strip()) if per_query else (text.strip(), "")
+
+
+def last_user_text(messages):
+    """Text of the last user message, the query memories are selected for."""
+    for msg in reversed(messages or []):
+        if msg.get("role") == "user" and isinstance(msg.get("content"), str):
+            return msg["content"]
+    return None
+
+
+def clear_reasoning_content(messages):
+    """
+    Helper to clear reasoning content from messages list to prevent repetition.
+    Returns a new list of cleaned messages (shallow copy of dicts with keys removed).
+    """
+    cleaned = []
+    for msg in messages:
+        clean_msg = msg.copy()
+        if 'reasoning_content' in clean_msg:
+            del clean_msg['reasoning_content']
+        if 'reasoning' in clean_msg: # Also clear our internal key
+            del clean_msg['reasoning']
+        cleaned.append(clean_msg)
+    return cleaned
+
+
+def build_system_prompt(workspace_dir, skill_prompt_map, memories_text="", parent_agent_id=None, now=None,
+                        skills=None, skill_catalog="", session_memories_text=""):
+    """
+    Assemble the main agent's system prompt, most stable content first:
+    environment and policies, skill guidelines (sorted; only skills if given),
+    the catalog of skills left out, memories, then a session section with the
+    current time, agent id and session_memories_text (memories selected for
+    this request).
+    """
+    lines = environment_lines(workspace_dir) + POLICY_LINES
+    lines += skill_prompt_section(skill_prompt_map, skills)
+    if skill_catalog:
+        lines.append("\n# Other Skills\n以下技能未加载。如需使用，请先调用 'load_skill' 加载对应技能：\n" + skill_catalog)
+    if memories_text:
+        lines.append("\n# Memories\n" + memories_text)
+
+    now = now or datetime.now()
+    session = [f"当前日期: {now.strftime('%Y-%m-%d %H:%M:%S')}"]
+    if parent_agent_id:
+        session.append(f"Note: You are a sub-agent (ID: {parent_agent_id}). Perform your assigned task efficiently.")
+    if session_memories_text:
+        session.append("\n## Memories\n" + session_memories_text)
+    return "\n".join(lines) + SESSION_SEPARATOR + "\n".join(session)
+
+
+def split_stable_prefix(system_prompt):
+    """Split a system prompt into (stable prefix, session section); the latter may be ''."""
+    stable, sep, session = system_prompt.partition(SESSION_SEPARATOR)
+    if not sep:
+        return system_prompt, ""
+    return stable, SESSION_HEADING + "\n" + session
+
+
+def stable_tools(tools):
+    """Tool definitions sorted by name so the serialized tool list does not depend on load order."""
+    if not tools:
+        return tools
+    return sorted(tools, key=lambda t: t.get("function", {}).get("name", ""))
+
@@ -0,0 +1,197 @@
+import re
+import time
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+DEFAULT_BUDGET = 8.0
+DEFAULT_HEDGE_DELAY = 0.5
+_EWMA_ALPHA = 0.3
+
+
+class EngineStats:
+    """Per-engine EWMA latency and error rate; lower score() ranks first."""
+
+    def __init__(self, alpha=_EWMA_ALPHA):
+        self.alpha = alpha
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, latency, ok):
+        with self._lock:
+            entry = self._data.get(name)
+            if entry is None:
+                self._data[name] = {"latency": latency, "error_rate": 0.0 if ok else 1.0, "calls": 1}
+                return
+            a = self.alpha
+            entry["latency"] = a * latency + (1 - a) * entry["latency"]
+            entry["error_rate"] = a * (0.0 if ok else 1.0) + (1 - a) * entry["error_rate"]
+            entry["calls"] += 1
+
+    def score(self, name):
+        with self._lock:
+            entry = self._data.get(name)
+        if entry is None:
+            return 0.0  # Untried engines go first so they get measured
+        # An engine that fails half the time costs roughly a retry on another one
+        return entry["latency"] * (1 + 2 * entry["error_rate"])
+
+    def rank(self, names):
+        """Sort names by score; ties keep the given (registration) order."""
+        return sorted(names, key=self.score)
+
+    def snapshot(self):
+        with self._lock:
+            return {name: dict(entry) for name, entry in self._data.items()}
+
+
+def normalize_url(url):
+    """Key used to dedupe results: scheme-less, no fragment, no trailing slash, lowercase host."""
+    parts = urllib.parse.urlsplit(url or "")
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    path = parts.path.rstrip("/")
+    return f"{host}{path}?{parts.query}" if parts.query else f"{host}{path}"
+
+
+def merge_results(result_lists, max_results):
+    """Interleave ranked result lists, dropping duplicate URLs."""
+    merged, seen = [], set()
+    for rank in range(max((len(r) for r in result_lists), default=0)):
+        for results in result_lists:
+            if rank >= len(results):
+                continue
+            item = results[rank]
+            key = normalize_url(item.get("href"))
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(item)
+            if len(merged) >= max_results:
+                return merged
+    return merged
+
+
+class SearchRace:
+    """
+    Runs several search engines concurrently.
+
+    Engines are callables (query, max_results) -> list of {"title", "href", "body"}
+    that raise on failure. They are tried in the order given by EngineStats.
+    """
+
+    def __init__(self, stats=None):
+        self.engines = {}
+        self.stats = stats or EngineStats()
+
+    def register(self, name, func):
+        self.engines[name] = func
+
+    def unregister(self, name):
+        self.engines.pop(name, None)
+
+    def _timed(self, name, func, query, max_results):
+        start = time.perf_counter()
+        try:
+            results = func(query, max_results) or []
+        except Exception:
+            self.stats.record(name, time.perf_counter() - start, ok=False)
+            raise
+        # Empty result lists count as failures: they never win a race
+        self.stats.record(name, time.perf_counter() - start, ok=bool(results))
+        return results
+
+    def search(self, query, max_results=5, mode="race", budget=DEFAULT_BUDGET,
+               hedge_delay=DEFAULT_HEDGE_DELAY, engines=None):
+        """
+        Args:
+            mode (str): "race" returns the first non-empty result. The best-ranked engine
+                starts immediately and the next one starts after hedge_delay seconds, or
+                as soon as a running engine fails. "merge" starts all engines at once and
+                merges whatever returned within the budget, deduplicated by URL.
+            budget (float): Overall latency budget in seconds.
+
+        Returns:
+            (results, info): info has the winning/contributing engines and per-engine errors.
+        """
+        names = self.stats.rank([n for n in (engines or self.engines) if n in self.engines])
+        info = {"mode": mode, "order": names, "engines": [], "errors": {}}
+        if not names:
+            return [], info
+
+        deadline = time.monotonic() + budget
+        executor = ThreadPoolExecutor(max_workers=len(names), thread_name_prefix="search")
+        futures = {}
+        pending = list(names)
+
+        def launch(name):
+            future = executor.submit(self._timed, name, self.engines[name], query, max_results)
+            futures[future] = name
+            return future
+
+        try:
+            if mode == "merge":
+                for name in pending:
+                    launch(name)
+                pending = []
+                done, _ = wait(list(futures), timeout=budget)
+                collected = {}
+                for future in done:
+                    name = futures[future]
+                    try:
+                        collected[name] = future.result()
+                    except Exception as e:
+                        info["errors"][name] = str(e)
+                ordered = [collected[n] for n in names if collected.get(n)]
+                info["engines"] = [n for n in names if collected.get(n)]
+                return merge_results(ordered, max_results), info
+
+            running = {launch(pending.pop(0))}
+            while running or pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                timeout = min(hedge_delay, remaining) if pending else remaining
+                done, running = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = futures[future]
+                    try:
+                        results = future.result()
+                    except Exception as e:
+                        info["errors"][name] = str(e)
+                        continue
+                    if results:
+                        info["engines"] = [name]
+                        return results[:max_results], info
+                    info["errors"][name] = "no results"
+                # Hedge: a timeout or a failure both start the next engine. running stays
+                # wait()'s not-done set, so one that finished since is read next round
+                if pending:
+                    running.add(launch(pending.pop(0)))
+            return [], info
+        finally:
+            # Stragglers finish in the background and still update the stats
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def make_local_engine(documents):
+    """
+    Offline stand-in engine over a list of {"title", "href", "body"} dicts.
+    Ranks documents by how many query terms they contain.
+    """
+    def engine(query, max_results=5):
+        terms = [t for t in re.findall(r"\w+", query.lower()) if t]
+        scored = []
+        for index, doc in enumerate(documents):
+            text = f"{doc.get('title', '')} {doc.get('body', '')}".lower()
+            hits = sum(1 for t in terms if t in text)
+            if hits:
+                scored.append((-hits, index, doc))
+        scored.sort(key=lambda item: item[:2])
+        return [doc for _, _, doc in scored[:max_results]]
+    return engine
+
+
+# Shared across skill reloads so latency/error history survives between runs
+engine_stats = EngineStats()
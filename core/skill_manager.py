@@ -5,9 +5,11 @@ import inspect
 import sys
 import shutil
 from .env_utils import get_app_data_dir, ensure_package_installed
+from .tool_cache import ToolResultCache, DEFAULT_TTL, MIN_REFERENCE_LENGTH
+from .experience_store import ExperienceStore, DEFAULT_BUDGET_TOKENS as DEFAULT_EXPERIENCE_TOKENS
 
 class SkillManager:
-    def __init__(self, workspace_dir=None, config_manager=None):
+    def __init__(self, workspace_dir=None, config_manager=None, experience_store=None):
         self.workspace_dir = workspace_dir
         self.config_manager = config_manager
         
@@ -19,6 +21,9 @@ class SkillManager:
         self.skills_dirs.append(os.path.join(data_dir, "skills"))
         self.skills_dirs.append(os.path.join(data_dir, "ai_skills"))
 
+        # Learned experience of all skills (bundled skill folders may be read-only)
+        self.experience_store = experience_store or ExperienceStore(os.path.join(data_dir, "experiences.sqlite"))
+
         # Determine the base directory
         if getattr(sys, 'frozen', False):
             # If running as a PyInstaller bundle
@@ -60,8 +65,11 @@ class SkillManager:
         self.tools = {} # name -> function
         self.tool_definitions = [] # JSON schemas for LLM
         self.skill_prompts = [] # Markdown content from SKILL.md
+        self.skill_prompt_map = {} # skill_name -> prompt content
         self.tool_to_skill_map = {} # tool_name -> skill_name
         self.loaded_skills_meta = {} # skill_name -> metadata dict
+        self.tool_cache = ToolResultCache()
+        self.injected_experience = {} # skill_name -> ids of experience rows in its prompt
         self.last_load_time = 0
         
         self.load_skills()
@@ -162,6 +170,8 @@ class SkillManager:
                             skill_info["description"] = meta["description"]
                         # Merge all other meta fields
                         skill_info.update(meta)
+                        self.experience_store.import_frontmatter(skill_name, meta.get("experience"))
+                    skill_info["experience"] = [row["text"] for row in self.experience_store.list(skill_name)]
                 
                 # Force 'ai_generated' if folder name suggests (optional fallback)
                 # or if user explicitly created it via tool (which we can't easily track without meta)
@@ -202,6 +212,7 @@ class SkillManager:
     def update_skill(self, skill_name, description=None, instructions=None, experience=None, replace_experience=False):
         """
         Generic update for skill metadata and content.
+        Experience goes to the experience store; description and instructions to SKILL.md.
         """
         # 1. Find the skill path
         skill_path = None
@@ -219,11 +230,20 @@ class SkillManager:
             return False, f"SKILL.md not found for '{skill_name}'."
 
         try:
-            # 2. Read existing content
+            # 2. Record experience (a repeated lesson only reinforces the existing one)
+            if experience:
+                if replace_experience:
+                    self.experience_store.replace(skill_name, experience)
+                else:
+                    self.experience_store.add(skill_name, experience)
+            if not description and instructions is None:
+                return True, f"Skill '{skill_name}' updated successfully."
+
+            # 3. Read existing content
             with open(md_path, 'r', encoding='utf-8') as f:
                 content = f.read()
             
-            # 3. Parse Frontmatter
+            # 4. Parse Frontmatter
             match = re.match(r'^---\s*\n(.*?)\n---\s*\n(.*)', content, re.DOTALL)
             if not match:
                 return False, "Invalid SKILL.md format (missing frontmatter)."
@@ -233,43 +253,13 @@ class SkillManager:
             
             lines = frontmatter_raw.split('\n')
             new_lines = []
-            
-            # Track what we've handled
             desc_updated = False
-            exp_updated = False
             
-            # 4. Update Frontmatter
+            # 5. Update Frontmatter
             for line in lines:
                 if description and line.strip().startswith('description:'):
                     new_lines.append(f'description: {description}')
                     desc_updated = True
-                elif experience and line.strip().startswith('experience:'):
-                    if replace_experience:
-                        # Replace mode
-                        if isinstance(experience, list):
-                            quoted_exp = [f'"{e.replace("\"", "\\\"")}"' for e in experience]
-                            new_lines.append(f'experience: [{", ".join(quoted_exp)}]')
-                        else:
-                            quoted_exp = f'"{experience.replace("\"", "\\\"")}"'
-                            new_lines.append(f'experience: [{quoted_exp}]')
-                    else:
-                        # Append mode (default behavior)
-                        key, val = line.split(':', 1)
-                        val = val.strip()
-                        current_exp = []
-                        if val.startswith('[') and val.endswith(']'):
-                            inner = val[1:-1]
-                            if inner.strip():
-                                current_exp = [v.strip().strip('"\'') for v in inner.split(',')]
-                        
-                        to_add = experience if isinstance(experience, list) else [experience]
-                        for item in to_add:
-                            if item not in current_exp:
-                                current_exp.append(item)
-                        
-                        quoted_exp = [f'"{e.replace("\"", "\\\"")}"' for e in current_exp]
-                        new_lines.append(f'experience: [{", ".join(quoted_exp)}]')
-                    exp_updated = True
                 else:
                     new_lines.append(line)
             
@@ -277,18 +267,10 @@ class SkillManager:
             if description and not desc_updated:
                 # Insert description at top if not found (though it should be there)
                 new_lines.insert(0, f'description: {description}')
-                
-            if experience and not exp_updated:
-                 if isinstance(experience, list):
-                    quoted_exp = [f'"{e.replace("\"", "\\\"")}"' for e in experience]
-                    new_lines.append(f'experience: [{", ".join(quoted_exp)}]')
-                 else:
-                    quoted_exp = f'"{experience.replace("\"", "\\\"")}"'
-                    new_lines.append(f'experience: [{quoted_exp}]')
 
             new_frontmatter = "\n".join(new_lines)
             
-            # 5. Update Body
+            # 6. Update Body
             new_body = instructions if instructions is not None else body
             
             new_content = f"---\n{new_frontmatter}\n---\n{new_body}"
@@ -303,7 +285,7 @@ class SkillManager:
 
     def update_skill_experience(self, skill_name, experience_text):
         """
-        Append a new experience string to the SKILL.md of the given skill.
+        Record a new experience string for the given skill in the experience store.
         This enables 'Self-Evolving' capabilities.
         """
         return self.update_skill(skill_name, experience=experience_text, replace_experience=False)
@@ -347,12 +329,20 @@ class SkillManager:
         self.tools = {}
         self.tool_definitions = []
         self.skill_prompts = []
+        self.skill_prompt_map = {}
         self.tool_to_skill_map = {}
         self.loaded_skills_meta = {}
+        self.tool_cache = ToolResultCache()
+        self.injected_experience = {}
         
         # Update timestamp before loading
         import time
         self.last_load_time = time.time()
+
+        try:
+            self.experience_store.maybe_compact()
+        except Exception as e:
+            print(f"Experience compaction failed: {e}")
         
         for skills_dir in self.skills_dirs:
             if not os.path.exists(skills_dir):
@@ -424,21 +414,34 @@ class SkillManager:
             if meta:
                 self.loaded_skills_meta[skill_name] = meta
             
-            # Inject Experience into Prompt if available
+            # Inject the best scoring experience within the per-skill budget
             prompt_content = body
-            if meta and 'experience' in meta:
-                exp_list = meta['experience']
-                if isinstance(exp_list, list) and exp_list:
-                    exp_text = "\n\n### 🧠 Learned Experience (Self-Evolution)\nThe following lessons have been learned from previous executions:\n"
-                    for exp in exp_list:
-                        exp_text += f"- {exp}\n"
-                    prompt_content += exp_text
+            exp_rows = self._select_experience(skill_name, meta.get('experience') if meta else None)
+            if exp_rows:
+                exp_text = "\n\n### 🧠 Learned Experience (Self-Evolution)\nThe following lessons have been learned from previous executions:\n"
+                for row in exp_rows:
+                    exp_text += f"- {row['text']}\n"
+                prompt_content += exp_text
+                self.injected_experience[skill_name] = [row["id"] for row in exp_rows]
             
             if prompt_content:
                 self.skill_prompts.append(prompt_content)
+                self.skill_prompt_map[skill_name] = prompt_content
         except Exception as e:
             print(f"Error parsing {md_path}: {e}")
 
+    def _select_experience(self, skill_name, frontmatter_experience=None):
+        """Experience rows for the skill's prompt, within 'experience_budget_tokens' from config."""
+        budget = DEFAULT_EXPERIENCE_TOKENS
+        if self.config_manager:
+            budget = int(self.config_manager.get("experience_budget_tokens", DEFAULT_EXPERIENCE_TOKENS))
+        try:
+            self.experience_store.import_frontmatter(skill_name, frontmatter_experience)
+            return self.experience_store.select(skill_name, budget_tokens=budget)
+        except Exception as e:
+            print(f"Error loading experience of {skill_name}: {e}")
+            return []
+
     def _load_implementation(self, skill_name, impl_path):
         """Dynamic import of python module"""
         try:
@@ -518,6 +521,9 @@ class SkillManager:
                     if param_name == 'tasks':
                         param_type = "array"
                         description = "List of tasks"
+                    elif param_name == 'urls':
+                        param_type = "array"
+                        description = "List of URLs"
                     elif param_name in ['limit', 'offset']:
                         param_type = "integer"
                     elif param_name == 'recursive':
@@ -556,6 +562,35 @@ class SkillManager:
     def get_skill_of_tool(self, tool_name):
         return self.tool_to_skill_map.get(tool_name)
 
+    @staticmethod
+    def _meta_list(value):
+        """Frontmatter list value: an inline [a, b] list or a comma/space separated string."""
+        if not value:
+            return []
+        if isinstance(value, list):
+            return value
+        return [v.strip().strip('"\'') for v in re.split(r'[,\s]+', value) if v.strip()]
+
+    def is_parallel_safe(self, tool_name):
+        """True if the tool's SKILL.md lists it under 'parallel-safe-tools' (no side effects, safe to run concurrently)."""
+        meta = self.loaded_skills_meta.get(self.tool_to_skill_map.get(tool_name)) or {}
+        return tool_name in self._meta_list(meta.get("parallel-safe-tools"))
+
+    def cache_ttl(self, tool_name):
+        """
+        Seconds a result of this tool may be reused, or None if the tool is not
+        listed under 'cacheable-tools' in its SKILL.md. 'cache-ttl' sets the TTL.
+        """
+        meta = self.loaded_skills_meta.get(self.tool_to_skill_map.get(tool_name)) or {}
+        if tool_name not in self._meta_list(meta.get("cacheable-tools")):
+            return None
+        try:
+            return float(meta.get("cache-ttl", DEFAULT_TTL))
+        except (TypeError, ValueError):
+            return DEFAULT_TTL
+
+    def _cache_enabled(self):
+        return not self.config_manager or self.config_manager.get("tool_result_cache", True)
 
     def get_tool_definitions(self):
         return self.tool_definitions
@@ -568,6 +603,14 @@ class SkillManager:
             return f"Error: Tool '{name}' not found."
         
         func = self.tools[name]
+
+        # The skill's injected lessons were in the prompt when it was used
+        experience_ids = self.injected_experience.pop(self.tool_to_skill_map.get(name), None)
+        if experience_ids:
+            try:
+                self.experience_store.record_use(experience_ids)
+            except Exception as e:
+                print(f"Error recording experience use: {e}")
         
         # Inject workspace_dir if the function expects it
         sig = inspect.signature(func)
@@ -582,6 +625,29 @@ class SkillManager:
             # unless we know the function signature is flexible.
             # But for our system, we can define a standard: tools wanting context should accept `_context`.
             
+        ttl = self.cache_ttl(name) if self._cache_enabled() else None
+        if ttl is None:
+            if not self.is_parallel_safe(name):
+                # The tool may have side effects; nothing cached is trusted past it
+                self.tool_cache.clear()
+            return self._run_tool(name, func, args)
+
+        key, hit, result = self.tool_cache.lookup(name, args, self.workspace_dir)
+        if not hit:
+            result = self._run_tool(name, func, args)
+            if isinstance(result, str) and result.startswith("Error"):
+                return result
+            self.tool_cache.store(key, result, args, self.workspace_dir, ttl=ttl)
+
+        if context and len(str(result)) > MIN_REFERENCE_LENGTH:
+            # Only calls from the same run are in the model's history
+            scope = context.get("run_id") or context.get("agent_id")
+            reference = self.tool_cache.reference(scope, key, result, context.get("tool_call_id"))
+            if reference:
+                return reference
+        return result
+
+    def _run_tool(self, name, func, args):
         try:
             return func(**args)
         except Exception as e:
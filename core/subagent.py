@@ -0,0 +1,81 @@
+import json
+from datetime import datetime
+from .prompt_builder import environment_lines, skill_prompt_section, stable_tools, SESSION_SEPARATOR
+
+# Skills a sub-agent may use, per role. None means every loaded skill except EXCLUDED_SKILLS.
+ROLES = {
+    "general": {
+        "skills": None,
+        "guidance": "你是通用子代理。独立完成分配的任务，最后给出简洁、完整的结果汇报。",
+    },
+    "research": {
+        "skills": ["web-search", "file-system", "system-tools", "history-query", "artifact-reader"],
+        "guidance": "你是调研子代理。搜索并阅读资料，汇报要点并注明来源 URL 或文件路径。不要修改文件。",
+    },
+    "coder": {
+        "skills": ["file-system", "system-tools", "python-runner", "artifact-reader"],
+        "guidance": "你是编码子代理。在工作区内编写、运行并验证代码，汇报修改了哪些文件以及验证结果。",
+    },
+}
+DEFAULT_ROLE = "general"
+
+# Sub-agents never spawn further agents or write the user's long-term memories
+EXCLUDED_SKILLS = {"agent-manager", "memory-manager"}
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token) used for prompt size reporting."""
+    return len(text) // 4
+
+
+class SubAgentContext:
+    """
+    Read-only context shared by all sub-agents of one dispatch.
+
+    The system prompt and tool list are built once and handed to every worker
+    unchanged, so sibling requests start with a byte-identical prefix that
+    provider-side prompt caching can reuse. Anything agent-specific (the agent
+    id and its task) goes into the user message instead.
+    """
+
+    def __init__(self, skill_manager, workspace_dir, role=DEFAULT_ROLE):
+        if role not in ROLES:
+            raise ValueError(f"Unknown sub-agent role '{role}'. Available: {', '.join(ROLES)}")
+        self.skill_manager = skill_manager
+        self.workspace_dir = workspace_dir
+        self.role = role
+        self.skills = self._select_skills()
+        self.tool_allowlist = sorted(
+            name for name, skill in skill_manager.tool_to_skill_map.items() if skill in self.skills
+        )
+        allowed = set(self.tool_allowlist)
+        self.tools = stable_tools([t for t in skill_manager.get_tool_definitions() if t["function"]["name"] in allowed])
+        self.system_prompt = self._build_system_prompt()
+        self.prefix_tokens = estimate_tokens(self.system_prompt) + estimate_tokens(
+            json.dumps(self.tools, ensure_ascii=False)
+        )
+
+    def _select_skills(self):
+        loaded = set(self.skill_manager.tool_to_skill_map.values()) | set(self.skill_manager.skill_prompt_map)
+        wanted = ROLES[self.role]["skills"]
+        if wanted is None:
+            return loaded - EXCLUDED_SKILLS
+        return loaded & set(wanted)
+
+    def _build_system_prompt(self):
+        lines = environment_lines(self.workspace_dir) + [
+            "注意: 你正在指定的工作区内操作。除非明确允许使用绝对路径，否则所有文件操作都应相对于此路径。",
+            "",
+            "Note: You are a sub-agent working for a manager agent. Your ID and task are in the user message.",
+            ROLES[self.role]["guidance"],
+        ]
+        lines += skill_prompt_section(self.skill_manager.skill_prompt_map, self.skills)
+        # Day granularity keeps the prompt identical for the whole dispatch
+        return "\n".join(lines) + SESSION_SEPARATOR + f"当前日期: {datetime.now().strftime('%Y-%m-%d')}"
+
+    def task_message(self, agent_id, task):
+        return {"role": "user", "content": f"[Sub-agent {agent_id}]\n{task}"}
+
+    def prompt_tokens(self, agent_id, task):
+        """Estimated size of the first request for this agent: shared prefix + its own message."""
+        return self.prefix_tokens + estimate_tokens(self.task_message(agent_id, task)["content"])
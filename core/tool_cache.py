@@ -0,0 +1,99 @@
+import os
+import json
+import time
+import threading
+
+DEFAULT_TTL = 300
+# Only results longer than this are worth replacing with a reference
+MIN_REFERENCE_LENGTH = 200
+# Argument names holding workspace paths whose mtime invalidates a cached result
+PATH_ARGS = ("path", "file_path", "fallback_path")
+INJECTED_ARGS = ("workspace_dir", "_context")
+
+
+def canonical_args(args):
+    """Stable cache key for tool arguments: sorted JSON, injected arguments left out."""
+    clean = {k: v for k, v in (args or {}).items() if k not in INJECTED_ARGS}
+    return json.dumps(clean, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def path_stamp(args, workspace_dir):
+    """(path, mtime_ns, size) for every path argument; missing paths stamp as None."""
+    stamp = []
+    for key in PATH_ARGS:
+        value = (args or {}).get(key)
+        if not isinstance(value, str):
+            continue
+        full = value if os.path.isabs(value) or not workspace_dir else os.path.join(workspace_dir, value)
+        try:
+            st = os.stat(full)
+            stamp.append((key, st.st_mtime_ns, st.st_size))
+        except OSError:
+            stamp.append((key, None, None))
+    return tuple(stamp)
+
+
+class ToolResultCache:
+    """
+    Memoized results of idempotent tools for one agent session.
+
+    A cached result is reused while it is younger than its TTL and the
+    mtime/size of every path argument is unchanged. lookup()/store() are
+    keyed by (tool name, canonical arguments). Any call to a tool with side
+    effects should clear() the cache, since it may have changed what the
+    cached tools would see.
+
+    The cache also remembers which tool call first delivered each result to
+    each agent run (scope), so a repeat with identical text can be answered with
+    a short reference instead of the full result.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.entries = {} # key -> (result, stamp, expires_at)
+        self.delivered = {} # (scope, key) -> (result text, tool call id)
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, name, args, workspace_dir):
+        key = (name, canonical_args(args))
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                result, stamp, expires_at = entry
+                if self.clock() < expires_at and stamp == path_stamp(args, workspace_dir):
+                    self.hits += 1
+                    return key, True, result
+                del self.entries[key]
+            self.misses += 1
+        return key, False, None
+
+    def store(self, key, result, args, workspace_dir, ttl=DEFAULT_TTL):
+        # Stamp after the call: a tool that touched its own path sees its own write
+        with self.lock:
+            self.entries[key] = (result, path_stamp(args, workspace_dir), self.clock() + ttl)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def reference(self, scope, key, result, call_id):
+        """
+        A short 'unchanged since call X' note if this scope already received
+        the same result text from an earlier call, else None (and remember
+        this call as the one that delivered it).
+        """
+        text = str(result)
+        with self.lock:
+            previous = self.delivered.get((scope, key))
+            if previous and previous[0] == text and previous[1] != call_id:
+                return (f"[Unchanged since call {previous[1]}: {key[0]} returned exactly the same result "
+                        f"({len(text)} chars) as that earlier call. Refer to it instead of calling again.]")
+            if call_id:
+                self.delivered[(scope, key)] = (text, call_id)
+        return None
+
+    def stats(self):
+        with self.lock:
+            return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,172 @@
+import re
+import json
+import hashlib
+from .embedding_indexer import get_embedding_backend
+
+# Always sent: file and shell basics, user interaction, and the self-management
+# tools the system prompt policies refer to (load_skill lives in meta-tools)
+DEFAULT_CORE_SKILLS = ["file-system", "system-tools", "interaction", "meta-tools", "skill_creator",
+                       "memory-manager", "artifact-reader"]
+DEFAULT_TOP_K = 3
+# Skills scoring below this are not routed even if there is room in top_k
+MIN_SCORE = 0.2
+KEYWORD_WEIGHT = 2.0
+# Messages (from the end) whose text and tool calls count as recent context
+RECENT_MESSAGES = 8
+MAX_QUERY_CHARS = 2000
+
+
+def _meta_values(value):
+    if not value:
+        return []
+    if isinstance(value, list):
+        return [v for v in value if v]
+    return [v.strip().strip('"\'') for v in re.split(r'[,\s]+', value) if v.strip()]
+
+
+class ToolRouter:
+    """
+    Chooses which skills a request gets, instead of sending every tool schema
+    and SKILL.md body.
+
+    A request gets the core skills, the skills whose tools were used in the
+    recent messages, the skills pulled in with load_skill anywhere in the
+    conversation (a new router is built per request, so these are read back
+    from the history rather than kept on the router), and the top_k
+    other skills scored against the recent conversation text. A skill scores
+    KEYWORD_WEIGHT for each of its frontmatter 'keywords' (or tool names) found
+    in the text, plus the embedding similarity between the text and the
+    skill's name and descriptions. Everything else is listed in a short
+    catalog so the model knows it can load it.
+    """
+
+    def __init__(self, skill_manager, core_skills=None, top_k=DEFAULT_TOP_K, backend=None):
+        self.skill_manager = skill_manager
+        self.core_skills = set(DEFAULT_CORE_SKILLS if core_skills is None else core_skills)
+        self.top_k = top_k
+        self.backend = backend or get_embedding_backend()
+        self.requested = set()
+        self._vectors = {}
+
+    @classmethod
+    def from_config(cls, skill_manager, config_manager):
+        """A router per 'tool_routing' (default on), 'core_skills' and 'tool_routing_top_k' in config, or None."""
+        if not config_manager.get("tool_routing", True):
+            return None
+        return cls(
+            skill_manager,
+            core_skills=config_manager.get("core_skills", DEFAULT_CORE_SKILLS),
+            top_k=int(config_manager.get("tool_routing_top_k", DEFAULT_TOP_K)),
+            backend=get_embedding_backend(config_manager),
+        )
+
+    def skills(self):
+        """Names of all loaded skills (with a SKILL.md body or tools)."""
+        return set(self.skill_manager.skill_prompt_map) | set(self.skill_manager.tool_to_skill_map.values())
+
+    def _meta(self, skill):
+        return self.skill_manager.loaded_skills_meta.get(skill) or {}
+
+    def _tool_names(self, skill):
+        return sorted(tool for tool, owner in self.skill_manager.tool_to_skill_map.items() if owner == skill)
+
+    def description(self, skill):
+        meta = self._meta(skill)
+        return meta.get("description") or meta.get("description_cn") or ""
+
+    def _skill_vector(self, skill):
+        meta = self._meta(skill)
+        text = " ".join([skill, meta.get("name", ""), meta.get("description", ""), meta.get("description_cn", "")]
+                        + _meta_values(meta.get("keywords")))
+        key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        if key not in self._vectors:
+            self._vectors[key] = self.backend.embed([text])[0]
+        return self._vectors[key]
+
+    @staticmethod
+    def context_text(messages):
+        """User/assistant text of the recent messages, newest first, capped at MAX_QUERY_CHARS."""
+        parts = []
+        for msg in reversed((messages or [])[-RECENT_MESSAGES:]):
+            if msg.get("role") in ("user", "assistant") and isinstance(msg.get("content"), str):
+                parts.append(msg["content"])
+        return "\n".join(parts)[:MAX_QUERY_CHARS]
+
+    def recently_used(self, messages):
+        """Skills whose tools were called in the recent messages."""
+        used = set()
+        for msg in (messages or [])[-RECENT_MESSAGES:]:
+            for call in msg.get("tool_calls") or []:
+                skill = self.skill_manager.tool_to_skill_map.get((call.get("function") or {}).get("name"))
+                if skill:
+                    used.add(skill)
+        return used
+
+    @staticmethod
+    def loaded_skills(messages):
+        """Skills requested with load_skill anywhere in messages."""
+        loaded = set()
+        for msg in messages or []:
+            for call in msg.get("tool_calls") or []:
+                function = call.get("function") or {}
+                if function.get("name") != "load_skill":
+                    continue
+                try:
+                    skill = json.loads(function.get("arguments") or "{}").get("skill_name")
+                except (ValueError, AttributeError):
+                    continue
+                if isinstance(skill, str):
+                    loaded.add(skill)
+        return loaded
+
+    def score(self, text, skills=None):
+        """{skill: relevance of the skill to text}."""
+        lowered = (text or "").lower()
+        query_vector = self.backend.embed([text])[0] if lowered.strip() else None
+        scores = {}
+        for skill in sorted(self.skills() if skills is None else skills):
+            keywords = _meta_values(self._meta(skill).get("keywords")) + self._tool_names(skill)
+            hits = sum(1 for keyword in keywords if keyword.lower() in lowered)
+            similarity = (sum(a * b for a, b in zip(query_vector, self._skill_vector(skill)))
+                          if query_vector else 0.0)
+            scores[skill] = KEYWORD_WEIGHT * hits + similarity
+        return scores
+
+    def route(self, messages):
+        """The set of skills to offer for a request continuing messages."""
+        available = self.skills()
+        self.requested |= self.loaded_skills(messages) & available
+        chosen = (self.core_skills | self.recently_used(messages) | self.requested) & available
+        scores = self.score(self.context_text(messages), available - chosen)
+        ranked = sorted(scores, key=lambda skill: (-scores[skill], skill))
+        chosen |= {skill for skill in ranked[:self.top_k] if scores[skill] >= MIN_SCORE}
+        return chosen
+
+    def filter_tools(self, tools, skills):
+        """Tool definitions belonging to skills or to skills requested with load_skill."""
+        skills = set(skills) | self.requested
+        owners = self.skill_manager.tool_to_skill_map
+        return [t for t in tools if owners.get(t["function"]["name"]) in skills]
+
+    def catalog(self, skills):
+        """One line per skill not in skills, for the system prompt."""
+        lines = []
+        for skill in sorted(self.skills() - set(skills)):
+            description = self.description(skill)
+            lines.append(f"- {skill}: {description}" if description else f"- {skill}")
+        return "\n".join(lines)
+
+    def load(self, skill_name):
+        """
+        Add a skill to the rest of this request; later requests find the
+        load_skill call in the history. Returns its
+        SKILL.md guidance and tool names, or None if no such skill is loaded.
+        """
+        if skill_name not in self.skills():
+            return None
+        self.requested.add(skill_name)
+        return {
+            "skill": skill_name,
+            "tools": self._tool_names(skill_name),
+            "guidance": self.skill_manager.skill_prompt_map.get(skill_name, ""),
+        }
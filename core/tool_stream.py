@@ -0,0 +1,97 @@
+import json
+
+
+class ToolCallAssembler:
+    """
+    Incrementally rebuilds tool calls from streamed 'tool_call' chunks.
+
+    feed() returns the calls whose argument JSON became complete with that
+    chunk. A call is complete when a later index starts streaming, or as soon
+    as its arguments parse as a JSON object (a complete object cannot be
+    extended into another valid one). finish() completes whatever is left
+    when the stream ends. calls() gives every call in index order, in the
+    same dict shape LLMWorker has always stored in the message history.
+    """
+
+    def __init__(self):
+        self.buffer = {} # index -> {"id", "type", "function": {"name", "arguments"}}
+        self.completed = set()
+
+    def feed(self, chunk):
+        index = chunk.get("index", 0)
+        function = chunk.get("function") or {}
+        call = self.buffer.get(index)
+        if call is None:
+            call = self.buffer[index] = {
+                "id": chunk.get("id"),
+                "type": "function",
+                "function": {"name": function.get("name") or "", "arguments": ""}
+            }
+        fragment = function.get("arguments") or ""
+        call["function"]["arguments"] += fragment
+
+        done = [i for i in self.buffer if i < index and i not in self.completed]
+        # Only try to parse when the fragment could close the object
+        if fragment.rstrip().endswith("}") and index not in self.completed and self._parses(call):
+            done.append(index)
+        return self._complete(done)
+
+    def finish(self):
+        return self._complete([i for i in self.buffer if i not in self.completed])
+
+    def calls(self):
+        return [self.buffer[i] for i in sorted(self.buffer)]
+
+    def __bool__(self):
+        return bool(self.buffer)
+
+    def _complete(self, indices):
+        self.completed.update(indices)
+        return [(i, self.buffer[i]) for i in sorted(indices)]
+
+    @staticmethod
+    def _parses(call):
+        try:
+            return isinstance(json.loads(call["function"]["arguments"]), dict)
+        except ValueError:
+            return False
+
+
+class SpeculativeDispatcher:
+    """
+    Starts parallel-safe tool calls while the model is still streaming.
+
+    The assembler completes calls in index order; a call is only started while
+    every earlier call of the turn was parallel-safe too, so a speculative read
+    never runs ahead of a write the model asked for first. submit(name, args,
+    call_id) starts the call and returns a handle (e.g. a Future) that the tool loop
+    collects with take(call_id, arguments). Handles that are never taken (the turn was
+    abandoned) are dropped; only side-effect-free tools ever get here.
+    """
+
+    def __init__(self, is_safe, submit):
+        self.is_safe = is_safe
+        self.submit = submit
+        self.blocked = False
+        self.pending = {} # tool call id -> (arguments it was started with, handle)
+
+    def on_complete(self, completed):
+        for _, call in completed:
+            if self.blocked:
+                return
+            name = call["function"]["name"]
+            try:
+                args = json.loads(call["function"]["arguments"] or "{}")
+            except ValueError:
+                args = None
+            if not call["id"] or not isinstance(args, dict) or not self.is_safe(name):
+                self.blocked = True
+                return
+            self.pending[call["id"]] = (call["function"]["arguments"], self.submit(name, args, call["id"]))
+
+    def take(self, call_id, arguments):
+        """The handle for a started call, or None (also if its final arguments differ from the speculated ones)."""
+        started = self.pending.pop(call_id, None)
+        if started is None or started[0] != arguments:
+            return None
+        return started[1]
@@ -0,0 +1,252 @@
+import os
+import re
+import fnmatch
+import threading
+from collections import OrderedDict
+
+IGNORE_FILES = (".gitignore", ".ignore")
+
+# Directories that are never worth descending into, even without ignore files
+DEFAULT_EXCLUDES = {'.git', '.idea', '__pycache__', 'node_modules', '.venv', 'venv', 'dist', 'build'}
+
+DEFAULT_MAX_FILE_SIZE = 20 * 1024 * 1024
+
+
+def _glob_to_regex(glob):
+    """Translate a gitignore glob (with ** support) into a regex over '/'-separated paths."""
+    i, n = 0, len(glob)
+    out = []
+    while i < n:
+        c = glob[i]
+        if c == '*':
+            if glob[i:i + 3] == '**/':
+                out.append('(?:.*/)?')
+                i += 3
+                continue
+            if glob[i:i + 2] == '**':
+                out.append('.*')
+                i += 2
+                continue
+            out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            j = glob.find(']', i + 1)
+            if j == -1:
+                out.append(re.escape(c))
+            else:
+                body = glob[i + 1:j]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                out.append(f'[{body}]')
+                i = j
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            out.append(re.escape(glob[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return ''.join(out)
+
+
+class IgnoreRules:
+    """Rules parsed from one .gitignore/.ignore file, relative to the directory holding it."""
+
+    def __init__(self, base_dir, lines):
+        self.base_dir = base_dir
+        self.rules = []  # (regex, negated, dir_only)
+        for raw in lines:
+            line = raw.rstrip('\n').rstrip('\r')
+            if not line.strip() or line.startswith('#'):
+                continue
+            if not line.endswith('\\ '):
+                line = line.rstrip()
+            negated = line.startswith('!')
+            if negated:
+                line = line[1:]
+            elif line.startswith('\\#') or line.startswith('\\!'):
+                line = line[1:]
+            dir_only = line.endswith('/')
+            line = line.rstrip('/')
+            if not line:
+                continue
+            # A slash anywhere but the end anchors the pattern to base_dir
+            anchored = '/' in line
+            line = line.lstrip('/')
+            body = _glob_to_regex(line)
+            prefix = '' if anchored else '(?:.*/)?'
+            self.rules.append((re.compile(f'^{prefix}{body}$'), negated, dir_only))
+
+    @classmethod
+    def load(cls, directory):
+        lines = []
+        for name in IGNORE_FILES:
+            path = os.path.join(directory, name)
+            if os.path.isfile(path):
+                try:
+                    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                        lines.extend(f.readlines())
+                except OSError:
+                    continue
+        return cls(directory, lines) if lines else None
+
+    def match(self, abs_path, is_dir):
+        """Return True (ignored), False (re-included by '!') or None (no rule applies)."""
+        rel = os.path.relpath(abs_path, self.base_dir).replace(os.sep, '/')
+        result = None
+        for regex, negated, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(rel):
+                result = not negated
+        return result
+
+
+def is_ignored(rule_stack, abs_path, is_dir):
+    ignored = False
+    for rules in rule_stack:
+        verdict = rules.match(abs_path, is_dir)
+        if verdict is not None:
+            ignored = verdict
+    return ignored
+
+
+class DirListingCache:
+    """
+    LRU cache of directory listings keyed by path and validated by directory mtime.
+    Entries are (name, is_dir) tuples; file sizes are not cached since in-place edits
+    do not change the directory mtime.
+    """
+
+    def __init__(self, max_entries=20000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def list(self, directory):
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            return []
+        with self._lock:
+            cached = self._entries.get(directory)
+            if cached and cached[0] == mtime:
+                self._entries.move_to_end(directory)
+                return cached[1]
+        entries = []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    entries.append((entry.name, is_dir))
+        except OSError:
+            return []
+        entries.sort()
+        with self._lock:
+            self._entries[directory] = (mtime, entries)
+            self._entries.move_to_end(directory)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entries
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+dir_cache = DirListingCache()
+
+
+def walk_files(start_dir, include="*", excludes=None, recursive=True,
+               max_file_size=DEFAULT_MAX_FILE_SIZE, respect_ignore=True, on_skip=None):
+    """
+    Yield absolute file paths under start_dir in a stable (sorted) order.
+
+    Args:
+        start_dir (str): Directory to walk.
+        include (str): Glob matched against file names.
+        excludes (set): Names of files/directories to skip. Defaults to DEFAULT_EXCLUDES.
+        recursive (bool): Descend into subdirectories.
+        max_file_size (int): Skip files larger than this many bytes (None or 0 disables).
+        respect_ignore (bool): Honour .gitignore/.ignore files found during the walk
+            (and in parents of start_dir up to the nearest repository root).
+        on_skip (callable): Optional callback(path, reason) for skipped oversized files.
+    """
+    excludes = DEFAULT_EXCLUDES if excludes is None else excludes
+    start_dir = os.path.abspath(start_dir)
+
+    base_stack = []
+    if respect_ignore:
+        base_stack = _parent_rules(start_dir)
+
+    stack = [(start_dir, base_stack)]
+    while stack:
+        directory, rule_stack = stack.pop()
+        if respect_ignore:
+            own = IgnoreRules.load(directory)
+            if own:
+                rule_stack = rule_stack + [own]
+
+        subdirs = []
+        for name, is_dir in dir_cache.list(directory):
+            if name in excludes:
+                continue
+            path = os.path.join(directory, name)
+            if rule_stack and is_ignored(rule_stack, path, is_dir):
+                continue
+            if is_dir:
+                if recursive:
+                    subdirs.append(path)
+                continue
+            if not fnmatch.fnmatch(name, include):
+                continue
+            if max_file_size:
+                try:
+                    size = os.path.getsize(path)
+                except OSError:
+                    continue
+                if size > max_file_size:
+                    if on_skip:
+                        on_skip(path, f"larger than {max_file_size} bytes")
+                    continue
+            yield path
+
+        # Reverse so the pop() order visits subdirectories alphabetically
+        for sub in reversed(subdirs):
+            stack.append((sub, rule_stack))
+
+
+def _parent_rules(start_dir):
+    """Collect ignore rules from parent directories up to (and including) the repo root."""
+    if os.path.isdir(os.path.join(start_dir, '.git')):
+        return []
+    parents = []
+    current = os.path.dirname(start_dir)
+    while current and current != os.path.dirname(current):
+        parents.append(current)
+        if os.path.isdir(os.path.join(current, '.git')):
+            break
+        current = os.path.dirname(current)
+    else:
+        # No repository root above start_dir: only the walked tree's own rules apply
+        return []
+    rules = []
+    for directory in reversed(parents):
+        loaded = IgnoreRules.load(directory)
+        if loaded:
+            rules.append(loaded)
+    return rules
+
+
+def get_max_file_size(config_manager=None):
+    """Size cap for content scans, configurable via 'search_max_file_size_mb'."""
+    if config_manager:
+        try:
+            mb = float(config_manager.get("search_max_file_size_mb", DEFAULT_MAX_FILE_SIZE / (1024 * 1024)))
+            return int(mb * 1024 * 1024) if mb > 0 else None
+        except (TypeError, ValueError):
+            pass
+    return DEFAULT_MAX_FILE_SIZE
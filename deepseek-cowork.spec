@@ -28,7 +28,19 @@ a = Analysis(
         'markdown',
         'qtawesome',
         'anthropic',
-        'openai'
+        'openai',
+        # core modules imported only by skills (skills are bundled as data)
+        'core.grep_engine',
+        'core.workspace_walker',
+        'core.file_index',
+        'core.extraction_cache',
+        'core.pdf_extract',
+        'core.excel_stream',
+        'core.http_client',
+        'core.search_race',
+        'core.agent_pool',
+        'core.subagent',
+        'core.history_search'
     ],
     hookspath=[],
     hooksconfig={},
@@ -11,6 +11,7 @@ import uuid
 import glob
 import markdown
 import socket
+import multiprocessing
 from datetime import datetime
 from core.config_manager import ConfigManager
 from core.skill_manager import SkillManager
@@ -3959,6 +3960,13 @@ class MainWindow(QMainWindow):
                 "reasoning": reasoning
             })
         self.save_chat_history()
+        # The daemon records its own runs
+        if not result.get("_from_daemon"):
+            try:
+                self.chat_storage.record_turn_metrics(state.session_id, result.get("turn_metrics"))
+                self.chat_storage.record_provider_attempts(state.session_id, result.get("provider_attempts"))
+            except Exception:
+                pass
         self.update_session_tab_title(state.session_id)
 
         code_match = re.search(r'```\s*python(.*?)```', content, re.DOTALL | re.IGNORECASE)
@@ -4017,6 +4025,8 @@ class MainWindow(QMainWindow):
         self.code_worker.provide_input(response)
 
 if __name__ == "__main__":
+    # Required for process pools (e.g. parallel PDF extraction) in the frozen executable
+    multiprocessing.freeze_support()
     if "--daemon" in sys.argv:
         port = DEFAULT_PORT
         for arg in sys.argv:
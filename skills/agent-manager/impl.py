@@ -1,14 +1,45 @@
 import json
-from PySide6.QtCore import QEventLoop, QObject
+from PySide6.QtCore import QEventLoop, QObject, QTimer, Signal, Slot
 from core.agent import LLMWorker
+from core.agent_pool import AgentScheduler, DEFAULT_MAX_CONCURRENT, DEFAULT_MAX_RETRIES
+from core.skill_manager import SkillManager
+from core.subagent import SubAgentContext, ROLES, DEFAULT_ROLE
 
-def dispatch_agents(workspace_dir, tasks, _context=None):
+DEFAULT_TIME_BUDGET = 900 # seconds per sub-agent
+DEFAULT_TOKEN_BUDGET = 60000 # generated tokens per sub-agent
+
+def _config_number(config_manager, key, default):
+    try:
+        value = config_manager.get(key, default)
+        return default if value is None else float(value)
+    except (TypeError, ValueError):
+        return default
+
+class _FinishRelay(QObject):
+    """Created in the manager's thread, so worker completions are queued back to it."""
+    finished = Signal(int, object)
+
+    def __init__(self, callback):
+        super().__init__()
+        self.callback = callback
+        self.finished.connect(self._on_finished)
+
+    @Slot(int, object)
+    def _on_finished(self, index, result):
+        self.callback(index, result)
+
+def dispatch_agents(workspace_dir, tasks, role=DEFAULT_ROLE, _context=None):
     """
     Spawn multiple sub-agents to execute tasks in parallel.
     
+    At most 'max_concurrent_agents' (config) run at once; the rest wait in a queue.
+    Rate-limit and server errors are retried with backoff, and results are
+    returned in task order.
+    
     Args:
         workspace_dir (str): The workspace directory.
         tasks (list): A list of task descriptions (strings).
+        role (str): Sub-agent role: "general", "research" (search/read only) or "coder" (files + Python).
         _context (dict, optional): System context containing signal emitters and config.
     
     Returns:
@@ -29,7 +60,20 @@ def dispatch_agents(workspace_dir, tasks, _context=None):
     if not config_manager:
         return "Error: ConfigManager not found in context."
 
-    results = {}
+    if role not in ROLES:
+        return f"Error: Unknown role '{role}'. Available roles: {', '.join(ROLES)}"
+
+    # Built once and shared read-only by every sub-agent: same prompt prefix and
+    # tool list for all siblings, and no per-agent SkillManager
+    skill_manager = _context.get('skill_manager') or SkillManager(workspace_dir, config_manager)
+    shared = SubAgentContext(skill_manager, workspace_dir, role=role)
+
+    max_concurrent = int(_config_number(config_manager, "max_concurrent_agents", DEFAULT_MAX_CONCURRENT))
+    max_retries = int(_config_number(config_manager, "agent_max_retries", DEFAULT_MAX_RETRIES))
+    time_budget = _config_number(config_manager, "agent_time_budget", DEFAULT_TIME_BUDGET) or None
+    token_budget = int(_config_number(config_manager, "agent_token_budget", DEFAULT_TOKEN_BUDGET)) or None
+
+    scheduler = AgentScheduler(len(tasks), max_concurrent=max_concurrent, max_retries=max_retries)
     workers = []
     
     # Helper QObject to handle signals in the current thread context if needed
@@ -37,23 +81,34 @@ def dispatch_agents(workspace_dir, tasks, _context=None):
     # we can create sub-threads (LLMWorkers) and wait for them.
     # Note: QThread.wait() blocks the calling thread (the Manager Agent), which is what we want.
     
-    step_signal.emit(f"Manager: Spawning {len(tasks)} sub-agents...")
+    step_signal.emit(f"Manager: Spawning {len(tasks)} sub-agents (max {scheduler.max_concurrent} at a time)...")
+    step_signal.emit(
+        f"Manager: Role '{role}' with {len(shared.tools)} tools; shared prompt prefix ≈ {shared.prefix_tokens} tokens."
+    )
     
-    for i, task in enumerate(tasks):
-        agent_id = f"Agent-{i+1}"
-        messages = [{"role": "user", "content": task}]
-        
-        # Report initial status
-        if agent_state_signal:
+    # Report initial status
+    if agent_state_signal:
+        for i, task in enumerate(tasks):
              agent_state_signal.emit({
-                 "agent_id": agent_id,
+                 "agent_id": f"Agent-{i+1}",
                  "status": "pending",
                  "task": task,
                  "tool_call_id": tool_call_id
              })
 
+    loop = QEventLoop()
+    aborted = False
+
+    def start_worker(i):
+        task = tasks[i]
+        agent_id = f"Agent-{i+1}"
+        messages = [shared.task_message(agent_id, task)]
+
         # Create Worker
-        worker = LLMWorker(messages, config_manager, workspace_dir, parent_agent_id=agent_id)
+        worker = LLMWorker(messages, config_manager, workspace_dir, parent_agent_id=agent_id,
+                           time_budget=time_budget, token_budget=token_budget,
+                           skill_manager=skill_manager, tool_allowlist=shared.tool_allowlist,
+                           system_prompt=shared.system_prompt)
         
         # Connect signals to a local handler to capture output
         # We use a closure to capture agent_id
@@ -69,9 +124,9 @@ def dispatch_agents(workspace_dir, tasks, _context=None):
                         "tool_call_id": tool_call_id
                     })
             return logger
-            
-        worker.step_signal.connect(make_logger(agent_id))
         
+        worker.step_signal.connect(make_logger(agent_id))
+    
         # Forward agent state signals
         if agent_state_signal:
              # State tracker for this agent to avoid spamming signals
@@ -114,43 +169,44 @@ def dispatch_agents(workspace_dir, tasks, _context=None):
                 return forwarder
              worker.tool_call_signal.connect(make_tool_forwarder(agent_id, state_tracker))
 
-        # We need to capture the result. 
-        # Since LLMWorker.finished_signal emits a dict, we need a slot.
-        # But we can't easily define slots in a function.
-        # We'll attach a custom attribute to the worker to store the result?
-        # No, signals don't work like that.
-        # We can use a container list/dict and a lambda.
-        
-        def make_finisher(aid, container):
-            def finisher(res):
-                container[aid] = res.get("content", "No content")
-                if "error" in res:
-                    container[aid] += f" (Error: {res['error']})"
-            return finisher
-
-        worker.finished_signal.connect(make_finisher(agent_id, results))
+        worker.finished_signal.connect(lambda res, i=i: relay.finished.emit(i, res))
         
         worker.start()
         workers.append(worker)
-        step_signal.emit(f"Manager: Started {agent_id} on task: {task[:30]}...")
+        step_signal.emit(
+            f"Manager: Started {agent_id} (prompt ≈ {shared.prompt_tokens(agent_id, task)} tokens) on task: {task[:30]}..."
+        )
+
+    def on_finished(i, res):
+        error = res.get("provider_error") or res.get("error")
+        delay = scheduler.complete(i, res, error=error)
+        if delay is not None:
+            step_signal.emit(f"Manager: Agent-{i+1} hit a retryable error ({error}); retrying in {delay:.1f}s...")
+        pump()
+
+    relay = _FinishRelay(on_finished)
 
     # Wait for all workers to finish using an event loop to allow signal processing
     # This ensures that signals (logs, results) from sub-agents are processed by the current thread.
-    loop = QEventLoop()
-    active_count = len(workers)
-    
-    def on_finished(res):
-        nonlocal active_count
-        active_count -= 1
-        if active_count <= 0:
+    def pump():
+        if aborted:
+            return
+        for i in scheduler.take_ready():
+            start_worker(i)
+        if scheduler.done:
             loop.quit()
-            
-    for worker in workers:
-        worker.finished_signal.connect(on_finished)
+            return
+        wakeup = scheduler.next_wakeup()
+        if wakeup is not None and len(scheduler.running) < scheduler.max_concurrent:
+            # A queued task is backing off; check again once it is due
+            QTimer.singleShot(int(wakeup * 1000) + 1, pump)
 
     # Handle Abort Signal from Parent
     def on_abort():
+        nonlocal aborted
+        aborted = True
         step_signal.emit("Manager: Received stop signal. Terminating sub-agents...")
+        scheduler.cancel()
         for w in workers:
             if w.isRunning():
                 w.stop() # Set flags
@@ -175,14 +231,24 @@ def dispatch_agents(workspace_dir, tasks, _context=None):
         bridge = SignalBridge(on_abort)
         abort_signal.connect(bridge.trigger)
 
-    if active_count > 0:
+    pump()
+    if not scheduler.done:
         loop.exec()
         
-    step_signal.emit("Manager: All sub-agents finished.")
+    step_signal.emit(f"Manager: All sub-agents finished (peak concurrency {scheduler.peak_running}).")
     
-    # Format Output
-    output = "## Sub-Agent Results\n\n"
-    for agent_id, result in results.items():
-        output += f"### {agent_id}\n{result}\n\n"
+    # Format Output (in task order)
+    output = f"## Sub-Agent Results\n\nRole: {role}, shared prompt prefix ≈ {shared.prefix_tokens} tokens\n\n"
+    for i, res in enumerate(scheduler.results):
+        agent_id = f"Agent-{i+1}"
+        if res is None:
+            result = "Not run (cancelled)."
+        else:
+            result = res.get("content", "No content")
+            if "error" in res:
+                result += f" (Error: {res['error']})"
+            if scheduler.attempts[i] > 1:
+                result += f" (after {scheduler.attempts[i]} attempts)"
+        output += f"### {agent_id} (prompt ≈ {shared.prompt_tokens(agent_id, tasks[i])} tokens)\n{result}\n\n"
         
     return output
@@ -0,0 +1,22 @@
+from core.artifact_store import get_artifact_store, MAX_READ_LENGTH
+
+
+def read_artifact(handle, offset=0, length=MAX_READ_LENGTH, _context=None):
+    """Read part of an oversized tool result stored as an artifact (handle from the result preview)."""
+    config_manager = _context.get("config_manager") if _context else None
+    if not config_manager:
+        return "Error: Config manager not available."
+    try:
+        offset = int(offset)
+        length = int(length)
+    except (TypeError, ValueError):
+        return "Error: offset and length must be integers."
+
+    page = get_artifact_store(config_manager).read(handle, offset, length)
+    if page is None:
+        return f"Error: Unknown artifact handle '{handle}'."
+    end = page["offset"] + page["length"]
+    header = f"[{page['handle']} characters {page['offset']:,}-{end:,} of {page['total']:,}"
+    if end < page["total"]:
+        header += f"; next page: offset={end}"
+    return header + "]\n" + page["text"]
@@ -1,11 +1,15 @@
 import os
 import json
+import csv
+import functools
 from docx import Document
 from pptx import Presentation
 from pptx.util import Inches
 from pypdf import PdfReader
 from core.env_utils import ensure_package_installed
 from core.interaction import ask_user
+from core.extraction_cache import open_document, get_extraction_cache
+from core import pdf_extract, excel_stream
 
 # Lazy import helpers
 def get_openpyxl():
@@ -13,6 +17,55 @@ def get_openpyxl():
     import openpyxl
     return openpyxl
 
+# Upper bound for a single reader result, so one call cannot flood the context window
+MAX_CHUNK_CHARS = 50000
+
+def _to_int(value, default):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+def _continuation(unit, first, last, total, tool, param):
+    """Footer telling the agent which range was returned and how to read the next chunk."""
+    total_text = f" of {total}" if total else ""
+    return (f"\n\n[Showing {unit}s {first}-{last}{total_text}. "
+            f"To continue, call {tool} with {param}={last + 1}]")
+
+def _out_of_range(unit, param, start, total):
+    """Same error from every paged reader, so an empty chunk is not mistaken for an empty document."""
+    total_text = f" ({total})" if total is not None else ""
+    return f"Error: {param} {start} is beyond the last {unit}{total_text}."
+
+def _collect_chunk(items, start, max_items, total=None):
+    """
+    Take (number, text) pairs until max_items or MAX_CHUNK_CHARS is reached.
+    Returns (texts, last_number, has_more). The first item is always included,
+    truncated if it alone exceeds the budget. When total is unknown, one extra
+    item is pulled to find out whether more remain.
+    """
+    texts = []
+    used = 0
+    last = start - 1
+    items = iter(items)
+    for number, text in items:
+        if texts and used + len(text) > MAX_CHUNK_CHARS:
+            return texts, last, True
+        if not texts and len(text) > MAX_CHUNK_CHARS:
+            text = text[:MAX_CHUNK_CHARS] + "\n... (Truncated)"
+        texts.append(text)
+        used += len(text)
+        last = number
+        if len(texts) >= max_items:
+            break
+    if total:
+        return texts, last, last < total
+    return texts, last, next(items, None) is not None
+
+def _open_cache(abs_path, context):
+    config_manager = context.get('config_manager') if context else None
+    return open_document(abs_path, config_manager)
+
 def _is_god_mode(context):
     if context and 'config_manager' in context:
         return context['config_manager'].get_god_mode()
@@ -95,13 +148,13 @@ def read_file(workspace_dir, path, _context=None):
         ext = ext.lower()
         
         if ext == '.docx':
-            return read_docx(workspace_dir, path, _context)
+            return read_docx(workspace_dir, path, _context=_context)
         elif ext == '.pptx':
-            return read_pptx(workspace_dir, path, _context)
+            return read_pptx(workspace_dir, path, _context=_context)
         elif ext == '.xlsx':
-            return read_excel(workspace_dir, path, None, _context)
+            return read_excel(workspace_dir, path, sheet_name=None, _context=_context)
         elif ext == '.pdf':
-            return read_pdf(workspace_dir, path, _context)
+            return read_pdf(workspace_dir, path, _context=_context)
 
         abs_path = _validate_path(workspace_dir, path, _context, must_exist=True)
         
@@ -144,22 +197,36 @@ def delete_file(workspace_dir, path, _context=None):
 
 # --- Office Suite Functions ---
 
-def read_docx(workspace_dir, path, _context=None):
+def read_docx(workspace_dir, path, start_paragraph=1, max_paragraphs=500, _context=None):
     """
-    Read text content from a DOCX file.
+    Read text content from a DOCX file, a range of paragraphs at a time.
     
     Args:
         workspace_dir (str): Root workspace directory.
         path (str): Relative path to the DOCX file.
+        start_paragraph (int): First paragraph to return (1-based, default 1).
+        max_paragraphs (int): Maximum number of paragraphs to return (default 500).
     """
     try:
         abs_path = _validate_path(workspace_dir, path, _context, must_exist=True)
+        start = max(1, _to_int(start_paragraph, 1))
+        limit = max(1, _to_int(max_paragraphs, 500))
             
-        doc = Document(abs_path)
-        full_text = []
-        for para in doc.paragraphs:
-            full_text.append(para.text)
-        return '\n'.join(full_text)
+        cached = _open_cache(abs_path, _context)
+        paragraphs = cached.get_or_extract_list(
+            "docx:paragraphs",
+            lambda: [para.text for para in Document(abs_path).paragraphs]
+        )
+        total = len(paragraphs)
+        if start > max(total, 1):
+            return _out_of_range("paragraph", "start_paragraph", start, total)
+        items = ((i + 1, paragraphs[i]) for i in range(start - 1, total))
+        texts, last, has_more = _collect_chunk(items, start, limit, total)
+
+        result = '\n'.join(texts)
+        if has_more:
+            result += _continuation("paragraph", start, last, total, "read_docx", "start_paragraph")
+        return result
     except Exception as e:
         return f"Error reading DOCX: {str(e)}"
 
@@ -190,28 +257,50 @@ def write_docx(workspace_dir, path, content, mode='w', _context=None):
     except Exception as e:
         return f"Error writing DOCX: {str(e)}"
 
-def read_pptx(workspace_dir, path, _context=None):
+def read_pptx(workspace_dir, path, start_slide=1, max_slides=20, _context=None):
     """
-    Read text content from a PPTX file.
+    Read text content from a PPTX file, a range of slides at a time.
     
     Args:
         workspace_dir (str): Root workspace directory.
         path (str): Relative path to the PPTX file.
+        start_slide (int): First slide to return (1-based, default 1).
+        max_slides (int): Maximum number of slides to return (default 20).
     """
     try:
         abs_path = _validate_path(workspace_dir, path, _context, must_exist=True)
+        start = max(1, _to_int(start_slide, 1))
+        limit = max(1, _to_int(max_slides, 20))
             
-        prs = Presentation(abs_path)
-        text_content = []
-        
-        for i, slide in enumerate(prs.slides):
+        cached = _open_cache(abs_path, _context)
+
+        # The presentation is only parsed if some slide is not cached yet
+        @functools.lru_cache(maxsize=None)
+        def load_slides():
+            return Presentation(abs_path).slides
+
+        def extract_slide(i):
             slide_text = []
-            for shape in slide.shapes:
+            for shape in load_slides()[i].shapes:
                 if hasattr(shape, "text"):
                     slide_text.append(shape.text)
-            text_content.append(f"Slide {i+1}:\n" + "\n".join(slide_text))
-            
-        return "\n\n".join(text_content)
+            return f"Slide {i+1}:\n" + "\n".join(slide_text)
+
+        total = int(cached.get_or_extract("pptx:slide_count", lambda: str(len(load_slides()))))
+        if start > max(total, 1):
+            return _out_of_range("slide", "start_slide", start, total)
+
+        def iter_slides():
+            # Shapes are only walked for slides inside the requested range
+            for i in range(start - 1, total):
+                yield i + 1, cached.get_or_extract(f"pptx:slide:{i+1}", lambda: extract_slide(i))
+
+        texts, last, has_more = _collect_chunk(iter_slides(), start, limit, total)
+
+        result = "\n\n".join(texts)
+        if has_more:
+            result += _continuation("slide", start, last, total, "read_pptx", "start_slide")
+        return result
     except Exception as e:
         return f"Error reading PPTX: {str(e)}"
 
@@ -255,74 +344,127 @@ def create_pptx(workspace_dir, path, slides_data, _context=None):
     except Exception as e:
         return f"Error creating PPTX: {str(e)}"
 
-def read_excel(workspace_dir, path, sheet_name=None, _context=None):
+def read_excel(workspace_dir, path, sheet_name=None, start_row=1, max_rows=500, _context=None):
     """
-    Read data from an Excel file.
+    Read data from an Excel file, a range of rows at a time.
     
     Args:
         workspace_dir (str): Root workspace directory.
         path (str): Relative path to the XLSX file.
         sheet_name (str): Optional sheet name to read.
+        start_row (int): First row to return (1-based, default 1).
+        max_rows (int): Maximum number of rows to return (default 500).
     """
     try:
         abs_path = _validate_path(workspace_dir, path, _context, must_exist=True)
+        start = max(1, _to_int(start_row, 1))
+        limit = max(1, _to_int(max_rows, 500))
             
-        # Use openpyxl for lightweight reading
+        cached = _open_cache(abs_path, _context)
+        variant = f"xlsx:{sheet_name or ''}:{start}:{limit}:{MAX_CHUNK_CHARS}"
+        hit = cached.get(variant)
+        if hit is not None:
+            return hit
+
+        # Read-only mode streams rows from the sheet XML instead of loading every cell
         openpyxl = get_openpyxl()
-        wb = openpyxl.load_workbook(abs_path, data_only=True)
-        
-        if sheet_name:
-            if sheet_name not in wb.sheetnames:
-                 return f"Error: Sheet '{sheet_name}' not found. Available: {wb.sheetnames}"
-            sheet = wb[sheet_name]
-        else:
-            sheet = wb.active
-            
-        rows = []
-        for row in sheet.iter_rows(values_only=True):
-            # Convert None to empty string for better display
-            cleaned_row = [str(cell) if cell is not None else "" for cell in row]
-            rows.append("\t".join(cleaned_row))
-            
-        return "\n".join(rows)
+        wb = openpyxl.load_workbook(abs_path, read_only=True, data_only=True)
+        try:
+            if sheet_name:
+                if sheet_name not in wb.sheetnames:
+                     return f"Error: Sheet '{sheet_name}' not found. Available: {wb.sheetnames}"
+                sheet = wb[sheet_name]
+            else:
+                sheet = wb.active
+
+            def iter_rows():
+                for offset, row in enumerate(sheet.iter_rows(min_row=start, values_only=True)):
+                    # Convert None to empty string for better display
+                    cleaned_row = [str(cell) if cell is not None else "" for cell in row]
+                    yield start + offset, "\t".join(cleaned_row)
+
+            texts, last, has_more = _collect_chunk(iter_rows(), start, limit)
+            total = sheet.max_row
+            if not texts and start > 1:
+                # Files written without dimensions report no max_row; only counted on this path
+                if total is None:
+                    total = sum(1 for _ in sheet.iter_rows(values_only=True))
+                return _out_of_range("row", "start_row", start, total)
+        finally:
+            wb.close()
+
+        result = "\n".join(texts)
+        if has_more:
+            result += _continuation("row", start, last, total, "read_excel", "start_row")
+        cached.put(variant, result)
+        return result
     except Exception as e:
         return f"Error reading Excel: {str(e)}"
 
-def write_excel(workspace_dir, path, data, sheet_name='Sheet1', _context=None):
+def _parse_rows(data):
+    """Accept a list of rows or its JSON encoding; raise ValueError otherwise."""
+    if isinstance(data, str):
+        try:
+            data = json.loads(data)
+        except Exception:
+            raise ValueError("data must be a JSON list of lists.")
+    if not isinstance(data, list):
+        raise ValueError("data must be a JSON list of lists.")
+    return data
+
+def write_excel(workspace_dir, path, data, sheet_name='Sheet1', mode='w', stream=False, _context=None):
     """
-    Write data to an Excel file.
+    Write data to an Excel file (or a CSV file if the path ends with .csv).
     
     Args:
         workspace_dir (str): Root workspace directory.
-        path (str): Relative path to the XLSX file.
+        path (str): Relative path to the XLSX or CSV file.
         data (list): List of lists representing rows.
         sheet_name (str): Name of the sheet.
+        mode (str): 'w' to replace the sheet, 'a' to append rows to it.
+        stream (bool): Rewrite an existing XLSX through a streamed copy (bounded memory,
+            cell values only; formatting is lost). Used automatically for files of 20 MB or more.
     """
     try:
         abs_path = _validate_path(workspace_dir, path, _context, must_exist=False)
         
         # Ensure data is a list
-        if isinstance(data, str):
-            try:
-                data = json.loads(data)
-            except:
-                return "Error: data must be a JSON list of lists."
+        try:
+            data = _parse_rows(data)
+        except ValueError as e:
+            return f"Error: {str(e)}"
+
+        # CSV fast path: no workbook at all
+        if abs_path.lower().endswith('.csv'):
+            with open(abs_path, 'a' if mode == 'a' else 'w', newline='', encoding='utf-8-sig') as f:
+                csv.writer(f).writerows(data)
+            return f"Success: Written {len(data)} rows to '{path}'."
         
         openpyxl = get_openpyxl()
         
         # Check if file exists to append or create
         if os.path.exists(abs_path):
-             wb = openpyxl.load_workbook(abs_path)
-             if sheet_name in wb.sheetnames:
-                 # If sheet exists, maybe we should clear it or append?
-                 # For simplicity, let's create a new sheet if it exists or overwrite?
-                 # Let's remove the old sheet and create new one to match 'overwrite' behavior
-                 del wb[sheet_name]
-             ws = wb.create_sheet(sheet_name)
+            large = os.path.getsize(abs_path) >= excel_stream.STREAM_REWRITE_MIN_BYTES
+            if stream or large:
+                # Stream the sheets through a copy instead of loading the whole workbook
+                if not excel_stream.has_drawings(abs_path):
+                    excel_stream.write_sheet(abs_path, sheet_name, data, append=(mode == 'a'))
+                    return f"Success: Written to '{path}' (streamed copy: cell values only, formatting not kept)."
+                if stream:
+                    return (f"Error: '{path}' contains charts or images, which a streamed copy would drop. "
+                            f"Write it without stream=True.")
+            wb = openpyxl.load_workbook(abs_path)
+            if sheet_name in wb.sheetnames and mode == 'a':
+                ws = wb[sheet_name]
+            else:
+                if sheet_name in wb.sheetnames:
+                    # Remove the old sheet and create a new one to match 'overwrite' behavior
+                    del wb[sheet_name]
+                ws = wb.create_sheet(sheet_name)
         else:
-            wb = openpyxl.Workbook()
-            ws = wb.active
-            ws.title = sheet_name
+            # New file: write-only mode streams rows instead of building cell objects
+            wb = openpyxl.Workbook(write_only=True)
+            ws = wb.create_sheet(sheet_name)
         
         for row in data:
             ws.append(row)
@@ -332,23 +474,120 @@ def write_excel(workspace_dir, path, data, sheet_name='Sheet1', _context=None):
     except Exception as e:
         return f"Error writing Excel: {str(e)}"
 
-def read_pdf(workspace_dir, path, _context=None):
+def start_excel_stream(workspace_dir, path, sheet_name='Sheet1', header=None, _context=None):
+    """
+    Start writing a large XLSX/CSV file in chunks. Returns a cursor for append_excel_rows.
+    
+    Args:
+        workspace_dir (str): Root workspace directory.
+        path (str): Relative path to the XLSX or CSV file (overwritten).
+        sheet_name (str): Name of the sheet (XLSX only).
+        header (list): Optional header row.
+    """
+    try:
+        abs_path = _validate_path(workspace_dir, path, _context, must_exist=False)
+        cursor = excel_stream.start_stream(abs_path, sheet_name)
+        if header:
+            if isinstance(header, str):
+                header = json.loads(header)
+            excel_stream.get_stream(cursor).append([header])
+        return (f"Success: Stream started for '{path}'. cursor={cursor}\n"
+                f"Call append_excel_rows(cursor='{cursor}', data=...) for each chunk, then finish_excel_stream(cursor='{cursor}').")
+    except Exception as e:
+        return f"Error starting Excel stream: {str(e)}"
+
+def append_excel_rows(cursor, data, _context=None):
+    """
+    Append a chunk of rows to a stream opened with start_excel_stream.
+    
+    Args:
+        cursor (str): Cursor returned by start_excel_stream.
+        data (list): List of lists representing rows.
+    """
+    try:
+        rows = _parse_rows(data)
+        writer = excel_stream.get_stream(cursor)
+        count = writer.append(rows)
+        return f"Success: Appended {count} rows ({writer.rows_written} total)."
+    except Exception as e:
+        return f"Error appending rows: {str(e)}"
+
+def finish_excel_stream(cursor, _context=None):
     """
-    Read text from a PDF file.
+    Save and close a stream opened with start_excel_stream.
+    
+    Args:
+        cursor (str): Cursor returned by start_excel_stream.
+    """
+    try:
+        writer = excel_stream.finish_stream(cursor)
+        return f"Success: Saved {writer.rows_written} rows to '{writer.abs_path}'."
+    except Exception as e:
+        return f"Error finishing Excel stream: {str(e)}"
+
+def read_pdf(workspace_dir, path, start_page=1, max_pages=20, _context=None):
+    """
+    Read text from a PDF file, a range of pages at a time.
     
     Args:
         workspace_dir (str): Root workspace directory.
         path (str): Relative path to the PDF file.
+        start_page (int): First page to return (1-based, default 1).
+        max_pages (int): Maximum number of pages to return (default 20).
     """
     try:
         abs_path = _validate_path(workspace_dir, path, _context, must_exist=True)
+        start = max(1, _to_int(start_page, 1))
+        limit = max(1, _to_int(max_pages, 20))
             
-        reader = PdfReader(abs_path)
-        text_content = []
-        
-        for i, page in enumerate(reader.pages):
-            text_content.append(f"--- Page {i+1} ---\n" + page.extract_text())
-            
-        return "\n".join(text_content)
+        cached = _open_cache(abs_path, _context)
+
+        # PdfReader parses pages lazily, so only uncached pages in the range are extracted
+        @functools.lru_cache(maxsize=None)
+        def load_reader():
+            return PdfReader(abs_path)
+
+        total = int(cached.get_or_extract("pdf:page_count", lambda: str(len(load_reader().pages))))
+        if start > max(total, 1):
+            return _out_of_range("page", "start_page", start, total)
+
+        # Large uncached ranges are extracted up front by a process pool
+        end = min(total, start + limit - 1)
+        missing = [int(v.rsplit(":", 1)[1]) for v in cached.missing(f"pdf:page:{n}" for n in range(start, end + 1))]
+        prefetched = {}
+        workers = pdf_extract.choose_worker_count(len(missing))
+        if workers > 1:
+            if _context and _context.get('step_signal'):
+                _context['step_signal'].emit(f"PDF: extracting {len(missing)} pages with {workers} worker processes...")
+            prefetched = pdf_extract.extract_pages(abs_path, missing, workers=workers)
+            for n, text in prefetched.items():
+                cached.put(f"pdf:page:{n}", text)
+
+        def extract_page(n):
+            if n in prefetched:
+                return prefetched[n]
+            return load_reader().pages[n - 1].extract_text() or ""
+
+        def iter_pages():
+            for n in range(start, total + 1):
+                text = cached.get_or_extract(f"pdf:page:{n}", lambda: extract_page(n))
+                yield n, f"--- Page {n} ---\n" + text
+
+        texts, last, has_more = _collect_chunk(iter_pages(), start, limit, total)
+
+        result = "\n".join(texts)
+        if has_more:
+            result += _continuation("page", start, last, total, "read_pdf", "start_page")
+        return result
     except Exception as e:
         return f"Error reading PDF: {str(e)}"
+
+def get_extraction_cache_stats(_context=None):
+    """
+    Show hit/miss statistics and size of the extracted-text cache used by the document readers.
+    """
+    try:
+        config_manager = _context.get('config_manager') if _context else None
+        return json.dumps(get_extraction_cache(config_manager).stats(), indent=2)
+    except Exception as e:
+        return f"Error: {str(e)}"
@@ -1,9 +1,10 @@
 import json
 import os
-import sqlite3
 import time
 from datetime import datetime
-from core.env_utils import ensure_package_installed
+from core.history_search import (get_history_search, ensure_vec_table, keyword_terms, highlight,
+                                 SNIPPET_CHARS, PREVIEW_CHARS)
+from core.embedding_indexer import get_embedding_backend, embed_query
 
 
 def _get_db_path(_context):
@@ -31,36 +32,24 @@ def _parse_date(value):
             return None
 
 
-def _normalize_keywords(keywords):
-    if keywords is None:
-        return None
-    if isinstance(keywords, list):
-        parts = [str(k).strip() for k in keywords if str(k).strip()]
-    else:
-        parts = [p.strip() for p in str(keywords).split(",") if p.strip()]
-    if not parts:
-        return None
-    escaped = [p.replace('"', '""') for p in parts]
-    return " OR ".join([f'"{p}"' for p in escaped])
-
-
-def _load_sqlite_vec(conn):
-    conn.enable_load_extension(True)
-    ensure_package_installed("sqlite-vec", "sqlite_vec")
-    import sqlite_vec
-    sqlite_vec.load(conn)
-    conn.enable_load_extension(False)
+def _parse_embedding(embedding):
+    """(list, None) or (None, error message)."""
+    if isinstance(embedding, str):
+        try:
+            embedding = json.loads(embedding)
+        except Exception:
+            return None, "Error: embedding must be a JSON array."
+    if not isinstance(embedding, list):
+        return None, "Error: embedding must be a list."
+    return embedding, None
 
 
-def _ensure_vec_table(conn, embedding_dim):
-    row = conn.execute(
-        "SELECT sql FROM sqlite_master WHERE type='table' AND name='messages_vec'"
-    ).fetchone()
-    if row:
-        return
-    conn.execute(
-        f"CREATE VIRTUAL TABLE messages_vec USING vec0(embedding float[{embedding_dim}], +message_id TEXT, +conversation_id TEXT, +content TEXT, +created_at INTEGER)"
-    )
+def _parse_limit(limit):
+    try:
+        limit = int(limit)
+    except Exception:
+        limit = 10
+    return max(1, min(limit, 100))
 
 
 def query_history(keywords=None, start_date=None, end_date=None, limit=10, _context=None):
@@ -77,74 +66,34 @@ def query_history(keywords=None, start_date=None, end_date=None, limit=10, _cont
     if end_ts is not None:
         end_ts = end_ts + 86399
 
-    try:
-        limit = int(limit)
-    except Exception:
-        limit = 10
-    limit = max(1, min(limit, 100))
-
-    keyword_query = _normalize_keywords(keywords)
-
-    with sqlite3.connect(db_path) as conn:
-        conn.row_factory = sqlite3.Row
-        fts_exists = conn.execute(
-            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='messages_fts'"
-        ).fetchone()
-
-        where_clauses = []
-        params = []
-
-        if start_ts is not None:
-            where_clauses.append("m.created_at >= ?")
-            params.append(start_ts)
-        if end_ts is not None:
-            where_clauses.append("m.created_at <= ?")
-            params.append(end_ts)
-
-        if keyword_query and fts_exists:
-            sql = """
-                SELECT m.id, m.conversation_id, m.role, m.content, m.reasoning_content, m.created_at, m.position
-                FROM messages_fts f
-                JOIN messages m ON m.rowid = f.rowid
-            """
-            where_clauses.insert(0, "messages_fts MATCH ?")
-            params = [keyword_query] + params
-        else:
-            sql = """
-                SELECT m.id, m.conversation_id, m.role, m.content, m.reasoning_content, m.created_at, m.position
-                FROM messages m
-            """
-            if keyword_query:
-                where_clauses.insert(0, "(m.content LIKE ? OR m.reasoning_content LIKE ?)")
-                like_query = f"%{keyword_query.replace('\"', '').replace(' OR ', ' ')}%"
-                params = [like_query, like_query] + params
-
-        if where_clauses:
-            sql += " WHERE " + " AND ".join(where_clauses)
-
-        sql += " ORDER BY m.created_at DESC, m.position DESC LIMIT ?"
-        params.append(limit)
-
-        rows = conn.execute(sql, params).fetchall()
+    limit = _parse_limit(limit)
+
+    terms = keyword_terms(keywords)
+    rows = get_history_search(db_path).lexical(terms, start_ts, end_ts, limit=limit)
 
     results = []
     for row in rows:
         content = row["content"] or ""
         reasoning = row["reasoning_content"] or ""
-        results.append(
-            {
-                "message_id": row["id"],
-                "conversation_id": row["conversation_id"],
-                "role": row["role"],
-                "content": content[:500],
-                "reasoning_content": reasoning[:500],
-                "created_at": row["created_at"],
-                "position": row["position"],
-                "created_at_iso": datetime.fromtimestamp(row["created_at"]).isoformat()
-                if row["created_at"]
-                else None,
-            }
-        )
+        result = {
+            "message_id": row["id"],
+            "conversation_id": row["conversation_id"],
+            "role": row["role"],
+            "content": content[:PREVIEW_CHARS],
+            "reasoning_content": reasoning[:PREVIEW_CHARS],
+            "created_at": row["created_at"],
+            "position": row["position"],
+            "created_at_iso": datetime.fromtimestamp(row["created_at"]).isoformat()
+            if row["created_at"]
+            else None,
+        }
+        if terms:
+            result["snippet"] = (row["snippet"] or highlight(content, terms)
+                                 or highlight(reasoning, terms) or content[:SNIPPET_CHARS])
+            if row["rank"] is not None:
+                # bm25() is lower-is-better; report a positive relevance score
+                result["score"] = -row["rank"]
+        results.append(result)
 
     return json.dumps(results, ensure_ascii=False, indent=2)
 
@@ -155,26 +104,36 @@ def upsert_message_embedding(message_id, embedding=[], conversation_id=None, con
         return "Error: Chat history database not found."
     if not embedding:
         return "Error: embedding is required."
-    if isinstance(embedding, str):
-        try:
-            embedding = json.loads(embedding)
-        except Exception:
-            return "Error: embedding must be a JSON array."
-    if not isinstance(embedding, list):
-        return "Error: embedding must be a list."
+    embedding, error = _parse_embedding(embedding)
+    if error:
+        return error
 
+    engine = get_history_search(db_path)
     try:
-        with sqlite3.connect(db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            _load_sqlite_vec(conn)
-            _ensure_vec_table(conn, len(embedding))
-            if not created_at:
-                created_at = int(time.time())
-            conn.execute("DELETE FROM messages_vec WHERE message_id = ?", (message_id,))
+        with engine.pool.connection(vec=True) as conn:
+            if not engine.pool.vec_available:
+                return f"Error: sqlite-vec is not available: {engine.pool.vec_error}"
+            # Vectors are keyed by messages.rowid, like the ones the background indexer writes
+            message = conn.execute(
+                "SELECT rowid, conversation_id, content, created_at FROM messages WHERE id = ?", (message_id,)
+            ).fetchone()
+            if message is None:
+                return f"Error: Message '{message_id}' not found."
+            ensure_vec_table(conn, len(embedding))
+            conn.execute("DELETE FROM messages_vec WHERE rowid = ?", (message["rowid"],))
             conn.execute(
-                "INSERT INTO messages_vec (embedding, message_id, conversation_id, content, created_at) VALUES (?, ?, ?, ?, ?)",
-                (json.dumps(embedding), message_id, conversation_id, content, created_at),
+                "INSERT INTO messages_vec (rowid, embedding, message_id, conversation_id, content, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    message["rowid"],
+                    json.dumps(embedding),
+                    message_id,
+                    conversation_id or message["conversation_id"],
+                    (content or message["content"] or "")[:PREVIEW_CHARS],
+                    created_at or message["created_at"] or int(time.time()),
+                ),
             )
+            conn.commit()
     except Exception as e:
         return f"Error: {str(e)}"
     return "OK"
@@ -186,25 +145,19 @@ def query_history_vector(embedding=[], limit=10, _context=None):
         return "Error: Chat history database not found."
     if not embedding:
         return "Error: embedding is required."
-    if isinstance(embedding, str):
-        try:
-            embedding = json.loads(embedding)
-        except Exception:
-            return "Error: embedding must be a JSON array."
-    if not isinstance(embedding, list):
-        return "Error: embedding must be a list."
+    embedding, error = _parse_embedding(embedding)
+    if error:
+        return error
 
-    try:
-        limit = int(limit)
-    except Exception:
-        limit = 10
-    limit = max(1, min(limit, 100))
+    limit = _parse_limit(limit)
 
+    engine = get_history_search(db_path)
     try:
-        with sqlite3.connect(db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            _load_sqlite_vec(conn)
-            _ensure_vec_table(conn, len(embedding))
+        with engine.pool.connection(vec=True) as conn:
+            if not engine.pool.vec_available:
+                return f"Error: sqlite-vec is not available: {engine.pool.vec_error}"
+            ensure_vec_table(conn, len(embedding))
+            conn.commit()
             rows = conn.execute(
                 """
                 SELECT rowid, distance, message_id, conversation_id, content, created_at
@@ -226,7 +179,7 @@ def query_history_vector(embedding=[], limit=10, _context=None):
                 "distance": row["distance"],
                 "message_id": row["message_id"],
                 "conversation_id": row["conversation_id"],
-                "content": row["content"][:500] if row["content"] else None,
+                "content": row["content"][:PREVIEW_CHARS] if row["content"] else None,
                 "created_at": row["created_at"],
                 "created_at_iso": datetime.fromtimestamp(row["created_at"]).isoformat()
                 if row["created_at"]
@@ -234,3 +187,38 @@ def query_history_vector(embedding=[], limit=10, _context=None):
             }
         )
     return json.dumps(results, ensure_ascii=False, indent=2)
+
+
+def search_history(query=None, start_date=None, end_date=None, conversation_id=None, limit=10, embedding=[], _context=None):
+    """Search chat history by keywords and/or embedding, fusing full-text and vector rankings; preferred over query_history."""
+    db_path = _get_db_path(_context)
+    if not db_path or not os.path.exists(db_path):
+        return "Error: Chat history database not found."
+
+    start_ts = _parse_date(start_date)
+    end_ts = _parse_date(end_date)
+    if start_date and start_ts is None:
+        return "Error: Invalid start_date format."
+    if end_date and end_ts is None:
+        return "Error: Invalid end_date format."
+    if end_ts is not None:
+        end_ts = end_ts + 86399
+
+    if embedding:
+        embedding, error = _parse_embedding(embedding)
+        if error:
+            return error
+    if not query and not embedding:
+        return "Error: query or embedding is required."
+
+    try:
+        config_manager = _context.get("config_manager")
+        if not embedding and config_manager.get("embedding_indexer", True):
+            # Vector side from the background index, embedded with the same backend
+            embedding = embed_query(db_path, get_embedding_backend(config_manager), query)
+        found = get_history_search(db_path).search(
+            query, embedding or None, start_ts, end_ts, conversation_id or None, _parse_limit(limit)
+        )
+    except Exception as e:
+        return f"Error: {str(e)}"
+    return json.dumps(found, ensure_ascii=False, indent=2)
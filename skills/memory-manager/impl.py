@@ -1,41 +1,36 @@
-import os
+from core.memory_store import get_memory_store, render_memories
 
 
-def _get_memories_path(_context):
+def _get_store(_context):
     if not _context:
         return None
     config_manager = _context.get("config_manager")
     if not config_manager:
         return None
-    history_dir = config_manager.get_chat_history_dir()
-    return os.path.join(history_dir, "memories.md")
+    return get_memory_store(config_manager)
 
 
-def read_memories(_context=None):
-    path = _get_memories_path(_context)
-    if not path:
+def read_memories(query=None, limit=20, _context=None):
+    """Read long-term memories as a markdown list; with query, only the most relevant ones."""
+    store = _get_store(_context)
+    if not store:
         return "Error: Config manager not available."
-    if not os.path.exists(path):
-        return ""
-    with open(path, "r", encoding="utf-8") as f:
-        return f.read()
+    if not query:
+        return store.read()
+    try:
+        limit = max(int(limit), 1)
+    except (TypeError, ValueError):
+        limit = 20
+    return render_memories(store.select(query, budget_tokens=None, top_k=limit))
 
 
 def write_memories(content, mode="append", _context=None):
-    path = _get_memories_path(_context)
-    if not path:
+    """Append memories (one per list item or paragraph), or replace all of them with mode="replace"."""
+    store = _get_store(_context)
+    if not store:
         return "Error: Config manager not available."
-    os.makedirs(os.path.dirname(path), exist_ok=True)
     if mode == "replace":
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(content or "")
-        return "OK"
-    existing = ""
-    if os.path.exists(path):
-        with open(path, "r", encoding="utf-8") as f:
-            existing = f.read()
-    if existing and not existing.endswith("\n"):
-        existing += "\n"
-    with open(path, "w", encoding="utf-8") as f:
-        f.write(existing + (content or ""))
+        store.replace(content or "")
+    else:
+        store.add(content or "")
     return "OK"
@@ -29,3 +29,24 @@ def update_experience(skill_name, experience=None, description=None, instruction
         return f"Successfully updated '{skill_name}': {', '.join(updates)}"
     else:
         return f"Failed to update '{skill_name}': {message}"
+
+
+def load_skill(skill_name, _context=None):
+    """
+    Load a skill listed under "Other Skills" so its tools are available from the next step on.
+
+    Args:
+        skill_name (str): Name of the skill to load.
+    """
+    if not _context:
+        return "Error: Context not available."
+
+    router = _context.get('tool_router')
+    if not router:
+        return "All skills are already loaded."
+
+    loaded = router.load(skill_name)
+    if loaded is None:
+        return f"Error: Skill '{skill_name}' not found. Available: {', '.join(sorted(router.skills()))}"
+    tools = ", ".join(loaded["tools"]) or "none"
+    return f"Loaded skill '{skill_name}'. Tools: {tools}\n\n{loaded['guidance']}".strip()
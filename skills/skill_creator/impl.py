@@ -153,7 +153,7 @@ def convert_claude_skill(source_path, skill_name=None):
     except Exception as e:
         return f"Error converting skill: {str(e)}"
 
-def create_new_skill(workspace_dir, skill_name, description, tools_list, tool_code, usage_guidelines, description_cn=None):
+def create_new_skill(workspace_dir, skill_name, description, tools_list, tool_code, usage_guidelines, description_cn=None, keywords=None):
     """
     Create a new local skill or update an existing one.
     
@@ -166,6 +166,7 @@ def create_new_skill(workspace_dir, skill_name, description, tools_list, tool_co
         tool_code (str): Complete Python code implementation for impl.py.
         usage_guidelines (str): Detailed usage instructions, flows, and examples (body of SKILL.md).
         description_cn (str, optional): Chinese description of the skill.
+        keywords (str, optional): Comma-separated words (Chinese and English) that suggest the skill is needed.
     """
     try:
         # Use persistent User Data Directory for new skills
@@ -199,6 +200,10 @@ def create_new_skill(workspace_dir, skill_name, description, tools_list, tool_co
         
         # Create SKILL.md content
         desc_cn_line = f"description_cn: {description_cn}\n" if description_cn else ""
+        if isinstance(keywords, str):
+            keywords = [k.strip() for k in keywords.replace("，", ",").split(",")]
+        keywords = [k for k in (keywords or []) if k]
+        keywords_line = f"keywords: [{', '.join(keywords)}]\n" if keywords else ""
         
         md_content = f"""---
 name: {skill_name}
@@ -207,7 +212,7 @@ description: {description}
 type: ai_generated
 created_by: ai
 allowed-tools: [{allowed_tools_str}]
----
+{keywords_line}---
 
 # {skill_name.capitalize()} Skill
 
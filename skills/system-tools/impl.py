@@ -1,8 +1,9 @@
 import os
 import subprocess
 import re
-import fnmatch
 import shutil
+from core import grep_engine, workspace_walker
+from core.file_index import get_index
 
 def _is_god_mode(context):
     if context and 'config_manager' in context:
@@ -45,7 +46,7 @@ def bash(workspace_dir, command, _context=None):
     except Exception as e:
         return f"Error executing command: {str(e)}"
 
-def grep(workspace_dir, pattern, path=".", include="*", exclude=None, recursive=True, _context=None):
+def grep(workspace_dir, pattern, path=".", include="*", exclude=None, recursive=True, respect_ignore=True, _context=None):
     """
     Search for a text pattern in files using regex.
     
@@ -56,6 +57,7 @@ def grep(workspace_dir, pattern, path=".", include="*", exclude=None, recursive=
         include (str): Glob pattern for files to include (default: "*").
         exclude (str): Glob pattern for files to exclude.
         recursive (bool): Whether to search recursively (default: True).
+        respect_ignore (bool): Skip paths listed in .gitignore/.ignore files (default: True).
     """
     if not workspace_dir:
         return "Error: Workspace not selected."
@@ -64,59 +66,42 @@ def grep(workspace_dir, pattern, path=".", include="*", exclude=None, recursive=
     results = []
     
     # Common ignore patterns
-    default_excludes = {'.git', '.idea', '__pycache__', 'node_modules', '.venv', 'venv', 'dist', 'build'}
     if exclude:
-        exclude_patterns = set(exclude.split(',')) | default_excludes
+        exclude_patterns = set(exclude.split(',')) | workspace_walker.DEFAULT_EXCLUDES
     else:
-        exclude_patterns = default_excludes
+        exclude_patterns = workspace_walker.DEFAULT_EXCLUDES
 
     try:
-        regex = re.compile(pattern)
+        re.compile(pattern)
     except re.error as e:
         return f"Error: Invalid regex pattern - {str(e)}"
 
-    match_count = 0
     max_matches = 1000
+    config_manager = _context.get('config_manager') if _context else None
+    max_file_size = workspace_walker.get_max_file_size(config_manager)
+    skipped = []
+
+    files = workspace_walker.walk_files(
+        start_dir,
+        include=include,
+        excludes=exclude_patterns,
+        recursive=recursive,
+        max_file_size=max_file_size,
+        respect_ignore=respect_ignore,
+        on_skip=lambda p, reason: skipped.append(p)
+    )
 
     try:
-        for root, dirs, files in os.walk(start_dir):
-            # Prune excluded directories
-            dirs[:] = [d for d in dirs if d not in exclude_patterns]
-            
-            for file in files:
-                if file in exclude_patterns:
-                    continue
-                
-                # Check include pattern
-                if not fnmatch.fnmatch(file, include):
-                    continue
-                    
-                file_path = os.path.join(root, file)
-                
-                # Check binary
-                try:
-                    # Quick check for binary
-                    with open(file_path, 'rb') as f:
-                        is_binary = b'\0' in f.read(1024)
-                    if is_binary:
-                        continue
-                        
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        lines = f.readlines()
-                        for i, line in enumerate(lines):
-                            if regex.search(line):
-                                rel_path = os.path.relpath(file_path, workspace_dir)
-                                results.append(f"{rel_path}:{i+1}: {line.strip()}")
-                                match_count += 1
-                                if match_count >= max_matches:
-                                    results.append("... (Truncated due to match limit)")
-                                    return "\n".join(results)
-                                    
-                except Exception:
-                    continue
-            
-            if not recursive:
-                break
+        # Files are mmap'd and scanned by a worker pool; binary files are skipped
+        matches, truncated = grep_engine.search(files, pattern, max_matches=max_matches)
+
+        for file_path, line_no, line in matches:
+            rel_path = os.path.relpath(file_path, workspace_dir)
+            results.append(f"{rel_path}:{line_no}: {line}")
+        if truncated:
+            results.append("... (Truncated due to match limit)")
+        if skipped:
+            results.append(f"... (Skipped {len(skipped)} file(s) above the {max_file_size // (1024 * 1024)} MB size limit)")
                 
         if not results:
             return "No matches found."
@@ -148,17 +133,28 @@ def _run_everything_search(query, limit=200):
     except Exception as e:
         return None, str(e)
 
-def search_files(workspace_dir, query, limit=200, fallback_path=".", use_grep_fallback=True, _context=None):
+def _search_file_index(root, query, limit, wait=10):
+    """Query the background filename index for root, waiting briefly for the first build."""
+    index = get_index(root)
+    index.ready.wait(timeout=wait)
+    lines = index.query(str(query), limit=limit)
+    note = None
+    if not index.ready.is_set():
+        note = f"(Index still building; searched {len(index.paths)} files so far)"
+    return lines, note
+
+def search_files(workspace_dir, query, limit=200, fallback_path=".", use_grep_fallback=True, fallback_mode="index", _context=None):
     """
     Search for files and folders using Everything CLI when available.
-    Falls back to grep in the workspace when Everything is unavailable.
+    Falls back to a filename index of the workspace when Everything is unavailable.
     
     Args:
         workspace_dir (str): Root workspace (used for fallback only).
-        query (str): Search query (Everything syntax supported).
+        query (str): Search query (Everything syntax supported; fallback supports globs and substrings).
         limit (int): Maximum results to return (default 200).
-        fallback_path (str): Workspace-relative path for fallback grep.
-        use_grep_fallback (bool): Whether to fall back to grep (default True).
+        fallback_path (str): Workspace-relative path for the fallback search.
+        use_grep_fallback (bool): Whether to fall back when Everything is unavailable (default True).
+        fallback_mode (str): 'index' to match file names (default) or 'grep' to search file contents.
     """
     if not query or not str(query).strip():
         return "Error: Query cannot be empty."
@@ -169,13 +165,22 @@ def search_files(workspace_dir, query, limit=200, fallback_path=".", use_grep_fa
         return "\n".join(results)
     if not use_grep_fallback:
         return f"Everything unavailable: {error}"
-    fallback = grep(
-        workspace_dir,
-        pattern=query,
-        path=fallback_path,
-        include="*",
-        exclude=None,
-        recursive=True,
-        _context=_context
-    )
-    return f"Everything unavailable, fallback to grep in workspace.\n{fallback}"
+    if fallback_mode == "grep":
+        fallback = grep(
+            workspace_dir,
+            pattern=query,
+            path=fallback_path,
+            include="*",
+            exclude=None,
+            recursive=True,
+            _context=_context
+        )
+        return f"Everything unavailable, fallback to grep in workspace.\n{fallback}"
+    if not workspace_dir:
+        return "Error: Workspace not selected."
+    root = os.path.abspath(os.path.join(workspace_dir, fallback_path))
+    lines, note = _search_file_index(root, query, limit)
+    body = "\n".join(lines) if lines else "No matches found."
+    if note:
+        body += f"\n{note}"
+    return f"Everything unavailable, fallback to filename index of workspace.\n{body}"
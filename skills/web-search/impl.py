@@ -1,7 +1,13 @@
 import json
-import requests
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 from core.env_utils import ensure_package_installed
+from core.http_client import get_http_client
+from core.search_race import SearchRace, engine_stats, make_local_engine, DEFAULT_BUDGET
+
+# Search result pages change quickly; articles use the client's default TTL
+SEARCH_CACHE_TTL = 600
+MAX_ARTICLE_WORKERS = 8
 
 def get_bs4():
     ensure_package_installed("beautifulsoup4", "bs4")
@@ -18,78 +24,143 @@ def get_trafilatura():
     import trafilatura
     return trafilatura
 
-def _search_bing_fallback(query, max_results=5):
+def _config(_context, key, default):
+    config_manager = _context.get('config_manager') if _context else None
+    return config_manager.get(key, default) if config_manager else default
+
+def _get_client(_context=None):
+    config_manager = _context.get('config_manager') if _context else None
+    return get_http_client(config_manager)
+
+def _search_ddg(query, max_results=5):
+    DDGS = get_ddgs()
+    with DDGS() as ddgs:
+        # text() returns an iterator
+        return list(ddgs.text(query, max_results=max_results))
+
+def _search_bing(query, max_results=5, _context=None):
     """
-    Fallback search using Bing scraping.
+    Search by scraping Bing. Raises on HTTP errors.
     """
-    try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-        # Use cn.bing.com for better accessibility in China
-        url = f"https://cn.bing.com/search?q={urllib.parse.quote(query)}"
-        response = requests.get(url, headers=headers, timeout=10)
-        
-        if response.status_code != 200:
-            return f"Error: Bing returned status {response.status_code}"
-            
-        BeautifulSoup = get_bs4()
-        soup = BeautifulSoup(response.text, 'html.parser')
-        results = []
+    # Use cn.bing.com for better accessibility in China
+    url = f"https://cn.bing.com/search?q={urllib.parse.quote(query)}"
+    response = _get_client(_context).get(url, ttl=SEARCH_CACHE_TTL)
+    
+    if response.status_code != 200:
+        raise RuntimeError(f"Bing returned status {response.status_code}")
         
-        # Bing search results are usually in <li class="b_algo">
-        for item in soup.select('li.b_algo'):
-            if len(results) >= max_results:
-                break
-                
-            title_tag = item.select_one('h2 > a')
-            if not title_tag:
-                continue
-                
-            link = title_tag.get('href')
-            title = title_tag.get_text()
-            
-            snippet_tag = item.select_one('.b_caption p')
-            snippet = snippet_tag.get_text() if snippet_tag else ""
+    BeautifulSoup = get_bs4()
+    soup = BeautifulSoup(response.text, 'html.parser')
+    results = []
+    
+    # Bing search results are usually in <li class="b_algo">
+    for item in soup.select('li.b_algo'):
+        if len(results) >= max_results:
+            break
             
-            results.append({
-                "title": title,
-                "href": link,
-                "body": snippet
-            })
+        title_tag = item.select_one('h2 > a')
+        if not title_tag:
+            continue
             
-        return results
+        link = title_tag.get('href')
+        title = title_tag.get_text()
+        
+        snippet_tag = item.select_one('.b_caption p')
+        snippet = snippet_tag.get_text() if snippet_tag else ""
+        
+        results.append({
+            "title": title,
+            "href": link,
+            "body": snippet
+        })
+        
+    return results
+
+def _search_bing_fallback(query, max_results=5, _context=None):
+    """
+    Fallback search using Bing scraping.
+    """
+    try:
+        return _search_bing(query, max_results, _context)
     except Exception as e:
         return []
 
-def search_web(query, max_results=5):
+def _load_local_corpus(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"[Search] Ignoring local corpus {path}: {e}")
+        return None
+
+def _build_race(_context=None):
+    race = SearchRace(stats=engine_stats)
+    # Resolve optional packages here, not concurrently inside the engine threads
+    try:
+        get_ddgs()
+        race.register("duckduckgo", _search_ddg)
+    except Exception as e:
+        print(f"[Search] DuckDuckGo unavailable: {e}")
+    try:
+        get_bs4()
+        race.register("bing", lambda q, n: _search_bing(q, n, _context))
+    except Exception as e:
+        print(f"[Search] Bing unavailable: {e}")
+    # Offline stand-in (testing / air-gapped use): a JSON list of {title, href, body}
+    corpus_path = _config(_context, "search_local_corpus", None)
+    if corpus_path:
+        documents = _load_local_corpus(corpus_path)
+        if documents is not None:
+            race.register("local", make_local_engine(documents))
+    return race
+
+def search_web(query, max_results=5, mode="race", _context=None):
     """
-    Search the web using DuckDuckGo, falling back to Bing if needed.
+    Search the web using DuckDuckGo and Bing concurrently.
     
     Args:
         query (str): The search query.
         max_results (int): Maximum number of results to return (default 5).
+        mode (str): "race" (first engine with results wins), "merge" (combine engines, dedupe by URL) or "fallback" (DuckDuckGo, then Bing).
     """
     results = []
     
-    # 1. Try DuckDuckGo
-    try:
-        DDGS = get_ddgs()
-        with DDGS() as ddgs:
-            # text() returns an iterator
-            for r in ddgs.text(query, max_results=max_results):
-                results.append(r)
-    except Exception as e:
-        # 2. Fallback to Bing
-        print(f"DuckDuckGo failed ({str(e)}), trying Bing...")
-        results = _search_bing_fallback(query, max_results)
+    if mode == "fallback":
+        # 1. Try DuckDuckGo
+        try:
+            results = _search_ddg(query, max_results)
+        except Exception as e:
+            # 2. Fallback to Bing
+            print(f"DuckDuckGo failed ({str(e)}), trying Bing...")
+            results = _search_bing_fallback(query, max_results, _context)
+    else:
+        if mode not in ("race", "merge"):
+            return f"Error: Unknown search mode '{mode}'. Use race, merge or fallback."
+        try:
+            budget = float(_config(_context, "search_latency_budget", DEFAULT_BUDGET))
+        except (TypeError, ValueError):
+            budget = DEFAULT_BUDGET
+        results, info = _build_race(_context).search(query, max_results, mode=mode, budget=budget)
+        if info["errors"]:
+            print(f"[Search] {mode}: engines={info['engines']} errors={info['errors']}")
         
     if not results:
          return "Error: No results found or search failed."
          
     return json.dumps(results, ensure_ascii=False)
 
-def read_article(url):
+def _fetch_article(client, url):
+    """Fetch a page through the shared client and extract its main text."""
+    response = client.get(url)
+    if response.status_code != 200:
+        raise RuntimeError(f"Could not fetch URL (HTTP {response.status_code}).")
+    # Raw bytes, so trafilatura detects the encoding of pages without a charset header (e.g. GBK)
+    text = get_trafilatura().extract(response.content, url=url)
+    if text is None:
+        raise RuntimeError("Could not extract text content from the page.")
+    return text
+
+def read_article(url, _context=None):
     """
     Extract the main text content from a web page URL.
     
@@ -97,15 +168,37 @@ def read_article(url):
         url (str): The URL of the article to read.
     """
     try:
-        trafilatura = get_trafilatura()
-        downloaded = trafilatura.fetch_url(url)
-        if downloaded is None:
-            return "Error: Could not fetch URL (404 or blocked)."
-            
-        text = trafilatura.extract(downloaded)
-        if text is None:
-            return "Error: Could not extract text content from the page."
-            
-        return text
+        return _fetch_article(_get_client(_context), url)
     except Exception as e:
         return f"Error reading article: {str(e)}"
+
+def read_articles(urls, _context=None):
+    """
+    Fetch and extract several web pages in parallel.
+    
+    Args:
+        urls (list): The URLs to read. Returns a JSON list of {url, content} or {url, error}.
+    """
+    if isinstance(urls, str):
+        try:
+            urls = json.loads(urls)
+        except json.JSONDecodeError:
+            urls = urls.replace(',', '\n').split()
+    urls = [u.strip() for u in urls if u and u.strip()]
+    if not urls:
+        return "Error: No URLs provided."
+
+    client = _get_client(_context)
+    get_trafilatura()  # install once up front rather than racing in workers
+
+    def fetch(url):
+        try:
+            return {"url": url, "content": _fetch_article(client, url)}
+        except Exception as e:
+            return {"url": url, "error": str(e)}
+
+    # Per-host limits are enforced by the client, so pages on one site queue up
+    # while other hosts proceed
+    with ThreadPoolExecutor(max_workers=min(MAX_ARTICLE_WORKERS, len(urls))) as executor:
+        results = list(executor.map(fetch, urls))
+    return json.dumps(results, ensure_ascii=False)
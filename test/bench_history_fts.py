@@ -0,0 +1,114 @@
+"""
+Benchmark: query_history latency on a large chat history.
+
+Usage:
+    python test/bench_history_fts.py [message_count]
+
+Fills a temp chat_history.sqlite (default 1M messages of mixed Chinese and
+English text) through the ChatStorage schema, so messages_fts uses the
+trigram tokenizer. A unicode61 index over the same rows stands in for the
+previous schema. For each keyword the benchmark times the trigram MATCH
+behind query_history, the old unicode61 MATCH, a full LIKE scan, and the
+query_history tool end to end, and prints the number of hits of each. The
+hit counts show where unicode61 misses Chinese words that LIKE finds.
+Terms shorter than 3 characters are not in the trigram index; query_history
+answers them with LIKE, which the "tool" column includes.
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import sqlite3
+import tempfile
+import importlib.util
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.chat_storage import ChatStorage
+
+spec = importlib.util.spec_from_file_location(
+    "history_query_impl",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "skills", "history-query", "impl.py"),
+)
+impl = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(impl)
+
+WORDS = ["数据库", "迁移", "服务器", "报表", "销售", "季度", "合同", "客户", "接口", "部署",
+         "今天", "我们", "需要", "检查", "一下", "文件", "配置", "python", "excel", "deploy",
+         "error", "report", "timeout", "的", "了", "和", "在"]
+QUERIES = ["数据库迁移", "季度销售报表", "客户合同", "timeout", "部署"]
+
+class FakeConfig:
+    def __init__(self, history_dir):
+        self.history_dir = history_dir
+
+    def get_chat_history_dir(self):
+        return self.history_dir
+
+def fill(db_path, message_count, seed=7, batch=20000):
+    rng = random.Random(seed)
+    now = int(time.time())
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("INSERT INTO conversations (id, title) VALUES ('bench', 'bench')")
+        for start in range(0, message_count, batch):
+            rows = []
+            for i in range(start, min(start + batch, message_count)):
+                # Chinese runs without spaces, Latin words space-separated
+                text = "".join(w if w[0] > "\u2e80" else f" {w} " for w in rng.choices(WORDS, k=rng.randint(8, 40)))
+                rows.append((f"m{i}", "user" if i % 2 == 0 else "assistant", text, i, now - message_count + i))
+            conn.executemany(
+                "INSERT INTO messages (id, conversation_id, role, content, position, created_at) "
+                "VALUES (?, 'bench', ?, ?, ?, ?)",
+                rows,
+            )
+        # The index the trigram migration replaces, for comparison
+        conn.execute("CREATE VIRTUAL TABLE legacy_fts USING fts5(content, content='messages', content_rowid='rowid')")
+        conn.execute("INSERT INTO legacy_fts(legacy_fts) VALUES ('rebuild')")
+
+def timed(func, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    message_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    root = tempfile.mkdtemp(prefix="fts_bench_")
+    try:
+        db_path = os.path.join(root, "chat_history.sqlite")
+        ChatStorage(db_path)
+        print(f"Inserting {message_count} messages into {db_path}...")
+        start = time.perf_counter()
+        fill(db_path, message_count)
+        print(f"  {time.perf_counter() - start:.1f}s, {os.path.getsize(db_path) / 1e6:.0f} MB")
+
+        context = {"config_manager": FakeConfig(root)}
+        conn = sqlite3.connect(db_path)
+        print(f"{'query':<14} {'trigram ms':>11} {'unicode61 ms':>13} {'LIKE ms':>9} {'tool ms':>9}   hits (trigram/unicode61/LIKE)")
+        for query in QUERIES:
+            phrase = f'"{query}"'
+            t_tri, _ = timed(lambda: conn.execute(
+                "SELECT rowid FROM messages_fts WHERE messages_fts MATCH ? ORDER BY bm25(messages_fts) LIMIT 10",
+                (phrase,)).fetchall())
+            tri_hits = conn.execute("SELECT COUNT(*) FROM messages_fts WHERE messages_fts MATCH ?", (phrase,)).fetchone()[0]
+            t_old, _ = timed(lambda: conn.execute(
+                "SELECT rowid FROM legacy_fts WHERE legacy_fts MATCH ? LIMIT 10", (phrase,)).fetchall())
+            old_hits = conn.execute("SELECT COUNT(*) FROM legacy_fts WHERE legacy_fts MATCH ?", (phrase,)).fetchone()[0]
+            t_like, _ = timed(lambda: conn.execute(
+                "SELECT rowid FROM messages WHERE content LIKE ? ORDER BY created_at DESC LIMIT 10",
+                (f"%{query}%",)).fetchall(), repeat=1)
+            like_hits = conn.execute("SELECT COUNT(*) FROM messages WHERE content LIKE ?", (f"%{query}%",)).fetchone()[0]
+            t_tool, _ = timed(lambda: impl.query_history(query, limit=10, _context=context))
+            print(f"{query:<14} {t_tri * 1000:11.2f} {t_old * 1000:13.2f} {t_like * 1000:9.1f} {t_tool * 1000:9.2f}"
+                  f"   {tri_hits}/{old_hits}/{like_hits}")
+        conn.close()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark: sequential vs process-pool PDF page extraction.
+
+Usage:
+    python test/bench_pdf_extract.py [page_count] [max_workers]
+
+Writes a synthetic text-only PDF (default 1000 pages) and times extraction of
+every page with 1, 2, 4, ... workers up to max_workers (default: cpu count).
+Requires pypdf.
+"""
+import os
+import sys
+import time
+import tempfile
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import pdf_extract
+
+def write_synthetic_pdf(path, page_count, lines_per_page=40):
+    """Minimal PDF writer: one Helvetica text stream per page."""
+    objects = []
+    page_ids = []
+    font_id = 3
+    objects.append(None)  # 1: catalog (filled in below)
+    objects.append(None)  # 2: pages
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    for p in range(page_count):
+        lines = [f"({'Page %d line %d lorem ipsum dolor sit amet consectetur' % (p + 1, i)}) Tj 0 -14 Td" for i in range(lines_per_page)]
+        stream = ("BT /F1 11 Tf 50 780 Td " + " ".join(lines) + " ET").encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (content_id, font_id)
+        )
+        page_ids.append(len(objects))
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    kids = b" ".join(b"%d 0 R" % i for i in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % page_count
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for i, body in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n" % i + body + b"\nendobj\n")
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for off in offsets:
+            f.write(b"%010d 00000 n \n" % off)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+
+def main():
+    page_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    os.close(fd)
+    try:
+        write_synthetic_pdf(path, page_count)
+        pages = list(range(1, page_count + 1))
+        print(f"{page_count} pages, heuristic picks {pdf_extract.choose_worker_count(page_count)} workers")
+
+        baseline = None
+        workers = 1
+        while workers <= max_workers:
+            start = time.perf_counter()
+            texts = pdf_extract.extract_pages(path, pages, workers=workers)
+            elapsed = time.perf_counter() - start
+            assert len(texts) == page_count
+            baseline = baseline or elapsed
+            print(f"workers={workers:<3} {elapsed:8.2f}s  speedup x{baseline / elapsed:.2f}")
+            workers *= 2
+    finally:
+        os.remove(path)
+
+if __name__ == "__main__":
+    main()
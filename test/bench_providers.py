@@ -0,0 +1,92 @@
+"""
+Benchmark: per-chunk overhead of the provider stream adapters.
+
+Usage:
+    python test/bench_providers.py [delta_count]
+
+Synthesizes one long recorded turn per wire format (default 50k text deltas
+followed by a tool call streamed in small argument fragments), checks that
+each LLMProvider subclass normalizes it to the same chunk sequence, then times
+SSE decoding and chunk normalization separately, in microseconds per event.
+"""
+import os
+import sys
+import json
+import time
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from provider_fixtures import parse_sse, provider_classes, wire_format, make_provider, normalize
+
+def openai_sse(delta_count, arg_fragments):
+    lines = []
+    def emit(delta, **extra):
+        lines.append("data: " + json.dumps({"id": "c", "choices": [{"index": 0, "delta": delta}], **extra}))
+    for i in range(delta_count):
+        emit({"content": f"tok{i} "})
+    emit({"tool_calls": [{"index": 0, "id": "call_1", "type": "function", "function": {"name": "write_file", "arguments": ""}}]})
+    for fragment in arg_fragments:
+        emit({"tool_calls": [{"index": 0, "function": {"arguments": fragment}}]})
+    lines.append("data: " + json.dumps({"id": "c", "choices": [], "usage": {"prompt_tokens": 100, "completion_tokens": delta_count}}))
+    lines.append("data: [DONE]")
+    return "\n\n".join(lines)
+
+def anthropic_sse(delta_count, arg_fragments):
+    events = [
+        {"type": "message_start", "message": {"usage": {"input_tokens": 100, "output_tokens": 1}}},
+        {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}},
+    ]
+    events += [{"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": f"tok{i} "}}
+               for i in range(delta_count)]
+    events += [
+        {"type": "content_block_stop", "index": 0},
+        {"type": "content_block_start", "index": 1, "content_block": {"type": "tool_use", "id": "call_1", "name": "write_file", "input": {}}},
+    ]
+    events += [{"type": "content_block_delta", "index": 1, "delta": {"type": "input_json_delta", "partial_json": f}}
+               for f in arg_fragments]
+    events += [
+        {"type": "content_block_stop", "index": 1},
+        {"type": "message_delta", "delta": {"stop_reason": "tool_use"}, "usage": {"output_tokens": delta_count}},
+        {"type": "message_stop"},
+    ]
+    return "\n\n".join(f"event: {e['type']}\ndata: {json.dumps(e)}" for e in events)
+
+BUILDERS = {"openai": openai_sse, "anthropic": anthropic_sse}
+
+def timed(fn, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    delta_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    arguments = json.dumps({"path": "out.txt", "content": "x" * 4000})
+    arg_fragments = [arguments[i:i + 16] for i in range(0, len(arguments), 16)]
+    transcripts = {wire: build(delta_count, arg_fragments) for wire, build in BUILDERS.items()}
+
+    reference = None
+    print(f"{delta_count} text deltas + {len(arg_fragments)} argument fragments per stream")
+    print(f"{'provider':<20} {'events':>8} {'decode us/ev':>13} {'adapter us/ev':>14}")
+    for cls in provider_classes():
+        wire = wire_format(cls)
+        decode_time, events = timed(lambda: parse_sse(transcripts[wire]))
+        adapter_time, chunks = timed(
+            lambda: list(make_provider(cls, events).chat_stream([{"role": "user", "content": "go"}]))
+        )
+        chunks = normalize(chunks)
+        if chunks and chunks[0].get("type") == "error":
+            print(f"{cls.__name__}: {chunks[0]['content']}")
+            continue
+        if reference is None:
+            reference = chunks
+        status = "" if chunks == reference else "  MISMATCH"
+        per_event = 1e6 / len(events)
+        print(f"{cls.__name__:<20} {len(events):>8} {decode_time * per_event:>13.2f} {adapter_time * per_event:>14.2f}{status}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+Recorded SSE streams for the provider conformance test and benchmark.
+
+Each scenario holds the same model turn as it arrives over each wire format,
+plus the normalized chunk sequence every LLMProvider subclass must yield for
+it. Timing fields of the final usage chunk are dropped before comparing.
+"""
+import os
+import sys
+import json
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.llm.providers import LLMProvider, OpenAIProvider, AnthropicProvider
+from core.llm.resilient import ResilientProvider
+
+TIMING_FIELDS = ("ttft", "duration", "tokens_per_sec")
+
+# Wire format spoken by each provider family; subclasses inherit their parent's
+WIRE_FORMATS = {
+    OpenAIProvider: "openai",
+    AnthropicProvider: "anthropic",
+}
+
+# Providers that delegate to another provider instead of speaking a wire format
+WRAPPERS = (ResilientProvider,)
+
+def usage(prompt, completion, reasoning=None, cached=0, cache_write=0):
+    return {"type": "usage", "prompt_tokens": prompt, "completion_tokens": completion,
+            "reasoning_tokens": reasoning, "cached_tokens": cached, "cache_write_tokens": cache_write}
+
+def tool_start(index, call_id, name):
+    return {"type": "tool_call", "index": index, "id": call_id, "function": {"name": name, "arguments": ""}}
+
+def tool_args(index, arguments):
+    return {"type": "tool_call", "index": index, "id": None, "function": {"name": None, "arguments": arguments}}
+
+SCENARIOS = {
+    "text_then_two_tools": {
+        "openai": """
+data: {"id":"c1","choices":[{"index":0,"delta":{"role":"assistant","content":""}}]}
+
+data: {"id":"c1","choices":[{"index":0,"delta":{"content":"Let me "}}]}
+
+data: {"id":"c1","choices":[{"index":0,"delta":{"content":"check."}}]}
+
+data: {"id":"c1","choices":[{"index":0,"delta":{"tool_calls":[{"index":0,"id":"call_a","type":"function","function":{"name":"read_file","arguments":""}}]}}]}
+
+data: {"id":"c1","choices":[{"index":0,"delta":{"tool_calls":[{"index":0,"function":{"arguments":"{\\"path\\": "}}]}}]}
+
+data: {"id":"c1","choices":[{"index":0,"delta":{"tool_calls":[{"index":0,"function":{"arguments":"\\"a.txt\\"}"}}]}}]}
+
+data: {"id":"c1","choices":[{"index":0,"delta":{"tool_calls":[{"index":1,"id":"call_b","type":"function","function":{"name":"list_files","arguments":""}}]}}]}
+
+data: {"id":"c1","choices":[{"index":0,"delta":{"tool_calls":[{"index":1,"function":{"arguments":"{}"}}]}}]}
+
+data: {"id":"c1","choices":[{"index":0,"delta":{},"finish_reason":"tool_calls"}]}
+
+data: {"id":"c1","choices":[],"usage":{"prompt_tokens":1200,"completion_tokens":40,"prompt_tokens_details":{"cached_tokens":1024}}}
+
+data: [DONE]
+""",
+        "anthropic": """
+event: message_start
+data: {"type":"message_start","message":{"id":"m1","type":"message","role":"assistant","content":[],"usage":{"input_tokens":176,"cache_read_input_tokens":1024,"cache_creation_input_tokens":0,"output_tokens":1}}}
+
+event: content_block_start
+data: {"type":"content_block_start","index":0,"content_block":{"type":"text","text":""}}
+
+event: content_block_delta
+data: {"type":"content_block_delta","index":0,"delta":{"type":"text_delta","text":"Let me "}}
+
+event: ping
+data: {"type":"ping"}
+
+event: content_block_delta
+data: {"type":"content_block_delta","index":0,"delta":{"type":"text_delta","text":"check."}}
+
+event: content_block_stop
+data: {"type":"content_block_stop","index":0}
+
+event: content_block_start
+data: {"type":"content_block_start","index":1,"content_block":{"type":"tool_use","id":"call_a","name":"read_file","input":{}}}
+
+event: content_block_delta
+data: {"type":"content_block_delta","index":1,"delta":{"type":"input_json_delta","partial_json":""}}
+
+event: content_block_delta
+data: {"type":"content_block_delta","index":1,"delta":{"type":"input_json_delta","partial_json":"{\\"path\\": "}}
+
+event: content_block_delta
+data: {"type":"content_block_delta","index":1,"delta":{"type":"input_json_delta","partial_json":"\\"a.txt\\"}"}}
+
+event: content_block_stop
+data: {"type":"content_block_stop","index":1}
+
+event: content_block_start
+data: {"type":"content_block_start","index":2,"content_block":{"type":"tool_use","id":"call_b","name":"list_files","input":{}}}
+
+event: content_block_stop
+data: {"type":"content_block_stop","index":2}
+
+event: message_delta
+data: {"type":"message_delta","delta":{"stop_reason":"tool_use"},"usage":{"output_tokens":40}}
+
+event: message_stop
+data: {"type":"message_stop"}
+""",
+        "expected": [
+            {"type": "content", "content": "Let me "},
+            {"type": "content", "content": "check."},
+            tool_start(0, "call_a", "read_file"),
+            tool_args(0, '{"path": '),
+            tool_args(0, '"a.txt"}'),
+            tool_start(1, "call_b", "list_files"),
+            tool_args(1, "{}"),
+            usage(1200, 40, cached=1024),
+        ],
+    },
+    "reasoning_then_answer": {
+        "openai": """
+data: {"id":"c2","choices":[{"index":0,"delta":{"role":"assistant","content":null,"reasoning_content":"User wants "}}]}
+
+data: {"id":"c2","choices":[{"index":0,"delta":{"content":null,"reasoning_content":"a sum."}}]}
+
+data: {"id":"c2","choices":[{"index":0,"delta":{"content":"2 + 2 = 4","reasoning_content":null}}]}
+
+data: {"id":"c2","choices":[{"index":0,"delta":{"content":""},"finish_reason":"stop"}],"usage":{"prompt_tokens":30,"completion_tokens":12,"completion_tokens_details":{"reasoning_tokens":6},"prompt_cache_hit_tokens":0,"prompt_cache_miss_tokens":30}}
+
+data: [DONE]
+""",
+        "anthropic": """
+event: message_start
+data: {"type":"message_start","message":{"id":"m2","type":"message","role":"assistant","content":[],"usage":{"input_tokens":20,"cache_read_input_tokens":0,"cache_creation_input_tokens":10,"output_tokens":1}}}
+
+event: content_block_start
+data: {"type":"content_block_start","index":0,"content_block":{"type":"thinking","thinking":""}}
+
+event: content_block_delta
+data: {"type":"content_block_delta","index":0,"delta":{"type":"thinking_delta","thinking":"User wants "}}
+
+event: content_block_delta
+data: {"type":"content_block_delta","index":0,"delta":{"type":"thinking_delta","thinking":"a sum."}}
+
+event: content_block_delta
+data: {"type":"content_block_delta","index":0,"delta":{"type":"signature_delta","signature":"EqQBCgIYAhIM"}}
+
+event: content_block_stop
+data: {"type":"content_block_stop","index":0}
+
+event: content_block_start
+data: {"type":"content_block_start","index":1,"content_block":{"type":"text","text":""}}
+
+event: content_block_delta
+data: {"type":"content_block_delta","index":1,"delta":{"type":"text_delta","text":"2 + 2 = 4"}}
+
+event: content_block_stop
+data: {"type":"content_block_stop","index":1}
+
+event: message_delta
+data: {"type":"message_delta","delta":{"stop_reason":"end_turn"},"usage":{"output_tokens":12}}
+
+event: message_stop
+data: {"type":"message_stop"}
+""",
+        # Anthropic does not break out thinking tokens, so reasoning_tokens is
+        # only comparable across providers that report it
+        "expected": [
+            {"type": "reasoning", "content": "User wants "},
+            {"type": "reasoning", "content": "a sum."},
+            {"type": "content", "content": "2 + 2 = 4"},
+            usage(30, 12, reasoning=6),
+        ],
+        "expected_overrides": {
+            "anthropic": {-1: usage(30, 12, cache_write=10)},
+        },
+    },
+}
+
+
+class Record:
+    """Attribute view of a decoded SSE payload; absent fields read as None, like SDK models."""
+
+    def __init__(self, data):
+        for key, value in data.items():
+            setattr(self, key, to_record(value))
+
+    def __getattr__(self, name):
+        return None
+
+def to_record(value):
+    if isinstance(value, dict):
+        return Record(value)
+    if isinstance(value, list):
+        return [to_record(v) for v in value]
+    return value
+
+def parse_sse(text):
+    """Decode the data lines of an SSE transcript into Record events."""
+    events = []
+    for line in text.splitlines():
+        if not line.startswith("data:"):
+            continue
+        payload = line[len("data:"):].strip()
+        if payload == "[DONE]":
+            break
+        events.append(to_record(json.loads(payload)))
+    return events
+
+
+class _Namespace:
+    pass
+
+class FakeClient:
+    """Stands in for both SDK clients: create() returns the recorded events whatever the request."""
+
+    def __init__(self, events):
+        self.events = events
+        self.requests = []
+        self.chat = _Namespace()
+        self.chat.completions = self
+        self.messages = self
+
+    def create(self, **kwargs):
+        self.requests.append(kwargs)
+        return iter(self.events)
+
+
+class _AsyncEvents:
+    def __init__(self, events):
+        self.events = iter(events)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self.events)
+        except StopIteration:
+            raise StopAsyncIteration
+
+class FakeAsyncClient(FakeClient):
+    """Async SDK stand-in: awaiting create() gives an async iterator over the recorded events."""
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        return _AsyncEvents(self.events)
+
+
+def provider_classes():
+    """
+    Every provider defined under core that speaks a wire format. Wrappers and
+    fakes defined by other tests (which may already be imported) are skipped.
+    """
+    found = []
+    pending = list(LLMProvider.__subclasses__())
+    while pending:
+        cls = pending.pop(0)
+        pending.extend(cls.__subclasses__())
+        if cls.__module__.startswith("core.") and not issubclass(cls, WRAPPERS):
+            found.append(cls)
+    return found
+
+def wire_format(cls):
+    for base in cls.__mro__:
+        if base in WIRE_FORMATS:
+            return WIRE_FORMATS[base]
+    return None
+
+def make_provider(cls, events, model_name="test-model"):
+    """Provider instance wired to a fake client, bypassing the SDK constructors."""
+    provider = object.__new__(cls)
+    provider.client = FakeClient(events)
+    provider.async_client = FakeAsyncClient(events)
+    provider.model_name = model_name
+    return provider
+
+def expected_chunks(scenario, wire):
+    expected = list(scenario["expected"])
+    for position, chunk in scenario.get("expected_overrides", {}).get(wire, {}).items():
+        expected[position] = chunk
+    return expected
+
+def normalize(chunks):
+    return [{k: v for k, v in chunk.items() if k not in TIMING_FIELDS} for chunk in chunks]
@@ -0,0 +1,86 @@
+import os
+import sys
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.agent_pool import AgentScheduler, is_retryable_error, error_status, backoff_delay
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestAgentPool(unittest.TestCase):
+    def test_retryable_errors(self):
+        self.assertTrue(is_retryable_error("Error code: 429 - {'error': 'rate limited'}"))
+        self.assertTrue(is_retryable_error("Error code: 503 - Service Unavailable"))
+        self.assertTrue(is_retryable_error("Request timed out."))
+        self.assertFalse(is_retryable_error("Error code: 401 - invalid api key"))
+        self.assertFalse(is_retryable_error("Error code: 400 - bad request (timeout param)"))
+        self.assertFalse(is_retryable_error(None))
+        self.assertEqual(error_status("status 502"), 502)
+
+    def test_backoff_grows_and_is_capped(self):
+        self.assertEqual(backoff_delay(1, base=2, cap=30, rng=lambda: 1.0), 2)
+        self.assertEqual(backoff_delay(3, base=2, cap=30, rng=lambda: 1.0), 8)
+        self.assertEqual(backoff_delay(10, base=2, cap=30, rng=lambda: 1.0), 30)
+        self.assertEqual(backoff_delay(1, base=2, cap=30, rng=lambda: 0.0), 1)
+
+    def test_concurrency_cap_and_task_order(self):
+        scheduler = AgentScheduler(30, max_concurrent=4)
+        finished = []
+        while not scheduler.done:
+            started = scheduler.take_ready()
+            self.assertLessEqual(len(scheduler.running), 4)
+            # Finish in reverse start order to scramble completion order
+            for index in reversed(sorted(scheduler.running)):
+                scheduler.complete(index, {"content": f"result {index}"})
+                finished.append(index)
+                break
+        self.assertEqual(scheduler.peak_running, 4)
+        self.assertNotEqual(finished, sorted(finished))
+        self.assertEqual([r["content"] for r in scheduler.results], [f"result {i}" for i in range(30)])
+
+    def test_retry_with_backoff(self):
+        clock = FakeClock()
+        scheduler = AgentScheduler(2, max_concurrent=2, max_retries=2, clock=clock, delay_fn=lambda attempt: 5.0 * attempt)
+        self.assertEqual(scheduler.take_ready(), [0, 1])
+        scheduler.complete(1, {"content": "ok"})
+        delay = scheduler.complete(0, {"content": ""}, error="Error code: 429 - slow down")
+        self.assertEqual(delay, 5.0)
+        self.assertFalse(scheduler.done)
+        # Still backing off
+        self.assertEqual(scheduler.take_ready(), [])
+        self.assertEqual(scheduler.next_wakeup(), 5.0)
+        clock.now = 5.0
+        self.assertEqual(scheduler.take_ready(), [0])
+        self.assertEqual(scheduler.complete(0, {"content": ""}, error="Error code: 500"), 10.0)
+        clock.now = 15.0
+        scheduler.take_ready()
+        # Retries exhausted: the error result is kept
+        self.assertIsNone(scheduler.complete(0, {"content": "", "error": "Error code: 500"}, error="Error code: 500"))
+        self.assertTrue(scheduler.done)
+        self.assertEqual(scheduler.attempts, [3, 1])
+        self.assertEqual(scheduler.results[0]["error"], "Error code: 500")
+
+    def test_non_retryable_error_is_final(self):
+        scheduler = AgentScheduler(1)
+        scheduler.take_ready()
+        self.assertIsNone(scheduler.complete(0, {"error": "Error code: 401"}, error="Error code: 401"))
+        self.assertTrue(scheduler.done)
+
+    def test_cancel_drops_queue(self):
+        scheduler = AgentScheduler(5, max_concurrent=2)
+        scheduler.take_ready()
+        self.assertEqual(scheduler.cancel(), [2, 3, 4])
+        scheduler.complete(0, {"content": "a"})
+        scheduler.complete(1, {"content": "b"})
+        self.assertTrue(scheduler.done)
+        self.assertIsNone(scheduler.results[4])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import importlib.util
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.artifact_store import ArtifactStore, spill_tool_result, MAX_READ_LENGTH
+
+# Load module dynamically because of hyphen in name
+spec = importlib.util.spec_from_file_location(
+    "artifact_reader_impl",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "skills", "artifact-reader", "impl.py"),
+)
+reader = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(reader)
+
+class FakeConfig:
+    def __init__(self, history_dir, **values):
+        self.history_dir = history_dir
+        self.values = values
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+    def get_chat_history_dir(self):
+        return self.history_dir
+
+class TestArtifactStore(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.store = ArtifactStore(os.path.join(self.root, "artifacts"))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_put_is_content_addressed(self):
+        a = self.store.put("same text")
+        b = self.store.put("same text")
+        self.assertEqual(a, b)
+        self.assertTrue(a.startswith("artifact:"))
+        self.assertNotEqual(a, self.store.put("other text"))
+        files = [f for _, _, names in os.walk(self.store.root) for f in names]
+        self.assertEqual(len(files), 2)
+
+    def test_read_pages_and_prefix_handles(self):
+        text = "".join(f"line {i}\n" for i in range(5000))
+        handle = self.store.put(text)
+        page = self.store.read(handle, offset=10, length=20)
+        self.assertEqual(page["text"], text[10:30])
+        self.assertEqual(page["total"], len(text))
+        self.assertEqual(self.store.read(handle[:len("artifact:") + 16], 0, 5)["text"], text[:5])
+        self.assertEqual(len(self.store.read(handle, 0, 10 ** 9)["text"]), MAX_READ_LENGTH)
+        self.assertIsNone(self.store.read("artifact:" + "0" * 64))
+        self.assertIsNone(self.store.read("../../etc/passwd"))
+
+    def test_spill_keeps_small_results(self):
+        self.assertEqual(self.store.spill("short", threshold=100), "short")
+
+    def test_spill_large_result(self):
+        text = "A" * 3000 + "B" * 50000 + "C" * 1000
+        preview = self.store.spill(text, threshold=20000, preview_chars=2000)
+        self.assertLess(len(preview), 2500)
+        self.assertTrue(preview.startswith("A" * 1500))
+        self.assertTrue(preview.endswith("C" * 500))
+        handle = preview.split("stored as ")[1].split(".")[0]
+        self.assertEqual(self.store.read(handle, 0, 3000)["text"], "A" * 3000)
+
+class TestSpillToolResult(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_threshold_from_config(self):
+        config = FakeConfig(self.root, artifact_threshold=100, artifact_preview_chars=40)
+        self.assertEqual(spill_tool_result(config, "bash", "x" * 100), "x" * 100)
+        spilled = spill_tool_result(config, "bash", "x" * 101)
+        self.assertIn("read_artifact", spilled)
+        # Pages of an artifact are never spilled again
+        self.assertEqual(spill_tool_result(config, "read_artifact", "y" * 500), "y" * 500)
+        # 0 disables spilling
+        self.assertEqual(spill_tool_result(FakeConfig(self.root, artifact_threshold=0), "bash", "z" * 50000), "z" * 50000)
+
+    def test_read_artifact_tool(self):
+        config = FakeConfig(self.root, artifact_threshold=100)
+        text = "".join(str(i % 10) for i in range(1000))
+        spilled = spill_tool_result(config, "read_excel", text)
+        handle = spilled.split("stored as ")[1].split(".")[0]
+
+        page = reader.read_artifact(handle, offset=100, length=50, _context={"config_manager": config})
+        header, body = page.split("\n", 1)
+        self.assertEqual(body, text[100:150])
+        self.assertIn("of 1,000", header)
+        self.assertIn("next page: offset=150", header)
+        last = reader.read_artifact(handle, offset=990, length=50, _context={"config_manager": config})
+        self.assertNotIn("next page", last)
+        self.assertTrue(reader.read_artifact("artifact:nope", _context={"config_manager": config}).startswith("Error"))
+
+if __name__ == '__main__':
+    unittest.main()
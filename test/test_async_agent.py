@@ -0,0 +1,339 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import threading
+import unittest
+import importlib.util
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.async_agent import AsyncAgent, run_many
+from core.llm.providers import LLMProvider
+
+USAGE = {"type": "usage", "prompt_tokens": 100, "completion_tokens": 10}
+
+class FakeConfig:
+    def __init__(self, **values):
+        self.values = dict({"api_key": "k", "max_concurrent_agents": 2}, **values)
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+    def get_chat_history_dir(self):
+        return "/nonexistent"
+
+class FakeSkillManager:
+    def __init__(self):
+        self.tools = {"echo": self.echo, "dispatch_agents": None}
+        self.tool_to_skill_map = {"echo": "util", "dispatch_agents": "agent-manager"}
+        self.skill_prompt_map = {"util": "# util"}
+        self.loaded_skills_meta = {}
+        self.threads = set()
+
+    def echo(self, text):
+        self.threads.add(threading.get_ident())
+        return f"echo: {text}"
+
+    def get_tool_definitions(self):
+        return [{"type": "function", "function": {"name": name, "description": name, "parameters": {}}}
+                for name in self.tools]
+
+    def call_tool(self, name, args, context=None):
+        return self.tools[name](**args)
+
+    def is_parallel_safe(self, name):
+        return name == "echo"
+
+def tool_call(name, args, call_id="t1"):
+    return [{"type": "tool_call", "index": 0, "id": call_id, "function": {"name": name, "arguments": ""}},
+            {"type": "tool_call", "index": 0, "id": None, "function": {"name": None, "arguments": json.dumps(args)}}]
+
+class ReplyProvider(LLMProvider):
+    """Async-native fake: asks for a tool once per conversation, then answers. Tracks peak concurrency."""
+
+    def __init__(self, first_turn, delay=0.01):
+        self.first_turn = first_turn
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+
+    def chat_stream(self, messages, tools=None):
+        raise AssertionError("sync path not expected")
+
+    async def achat_stream(self, messages, tools=None):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            if messages[-1]["role"] == "tool":
+                yield {"type": "content", "content": "done: " + messages[-1]["content"]}
+            else:
+                for chunk in self.first_turn(messages):
+                    yield chunk
+            yield USAGE
+        finally:
+            self.active -= 1
+
+class TestAsyncAgent(unittest.TestCase):
+    def test_tool_loop(self):
+        provider = ReplyProvider(lambda m: tool_call("echo", {"text": "hi"}))
+        events = []
+        agent = AsyncAgent(FakeConfig(), "/ws", skill_manager=FakeSkillManager(), provider=provider,
+                           on_event=events.append)
+        result = asyncio.run(agent.run([{"role": "user", "content": "go"}]))
+        self.assertEqual(result["content"], "done: echo: hi")
+        self.assertEqual([m["role"] for m in result["generated_messages"]], ["assistant", "tool", "assistant"])
+        self.assertEqual(result["usage"]["prompt_tokens"], 200)
+        self.assertEqual(len(result["turn_metrics"]), 2)
+        types = [e["type"] for e in events]
+        self.assertIn("tool_call", types)
+        self.assertIn("tool_result", types)
+
+    def test_many_conversations_share_one_loop(self):
+        provider = ReplyProvider(lambda m: [{"type": "content", "content": "answer"}], delay=0.05)
+        manager = FakeSkillManager()
+
+        async def main():
+            jobs = [lambda: AsyncAgent(FakeConfig(), "/ws", skill_manager=manager, provider=provider).run(
+                [{"role": "user", "content": "q"}]) for _ in range(20)]
+            return await run_many(jobs, max_concurrency=8)
+
+        start = time.perf_counter()
+        results = asyncio.run(main())
+        elapsed = time.perf_counter() - start
+        self.assertEqual([r["content"] for r in results], ["answer"] * 20)
+        self.assertEqual(provider.peak, 8)
+        self.assertLess(elapsed, 20 * 0.05)
+
+    def test_dispatch_agents_runs_sub_agents_on_the_loop(self):
+        def first_turn(messages):
+            if messages[-1]["content"].startswith("[Sub-agent"):
+                return [{"type": "content", "content": "sub result for " + messages[-1]["content"].split("\n")[1]}]
+            return tool_call("dispatch_agents", {"tasks": ["a", "b", "c"]})
+
+        provider = ReplyProvider(first_turn)
+        events = []
+        agent = AsyncAgent(FakeConfig(), "/ws", skill_manager=FakeSkillManager(), provider=provider,
+                           on_event=events.append)
+        result = asyncio.run(agent.run([{"role": "user", "content": "split it"}]))
+        report = result["generated_messages"][1]["content"]
+        self.assertIn("### Agent-1", report)
+        self.assertIn("sub result for c", report)
+        self.assertLess(report.index("Agent-1"), report.index("Agent-3"))
+        self.assertLessEqual(provider.peak, 2)
+        completed = [e for e in events if e["type"] == "agent_state" and e["data"]["status"] == "completed"]
+        self.assertEqual(len(completed), 3)
+
+    def test_dispatch_agents_retries_rate_limited_sub_agents(self):
+        attempts = {}
+
+        class Flaky(ReplyProvider):
+            async def achat_stream(self, messages, tools=None):
+                task = messages[-1]["content"]
+                if not task.startswith("[Sub-agent"):
+                    async for chunk in super().achat_stream(messages, tools):
+                        yield chunk
+                    return
+                attempts[task] = attempts.get(task, 0) + 1
+                if "flaky" in task and attempts[task] == 1:
+                    yield {"type": "error", "content": "Error code: 429 - rate limited"}
+                    return
+                yield {"type": "content", "content": "ok"}
+
+        provider = Flaky(lambda m: tool_call("dispatch_agents", {"tasks": ["flaky", "steady", "quick"]}))
+        agent = AsyncAgent(FakeConfig(agent_max_retries=1), "/ws", skill_manager=FakeSkillManager(),
+                           provider=provider)
+        agent.retry_delay = lambda attempt: 0.01
+        result = asyncio.run(agent.run([{"role": "user", "content": "split it"}]))
+        report = result["generated_messages"][1]["content"]
+        self.assertIn("### Agent-1 (prompt", report)
+        self.assertIn("ok (after 2 attempts)", report)
+        self.assertEqual(sorted(attempts.values()), [1, 1, 2])
+
+    def test_exception_is_reported(self):
+        class Broken(ReplyProvider):
+            async def achat_stream(self, messages, tools=None):
+                raise RuntimeError("connection refused")
+                yield
+
+        agent = AsyncAgent(FakeConfig(), "/ws", skill_manager=FakeSkillManager(), provider=Broken(None))
+        self.assertEqual(asyncio.run(agent.run([{"role": "user", "content": "go"}])), {"error": "connection refused"})
+
+    def test_parallel_safe_tool_starts_during_stream(self):
+        manager = FakeSkillManager()
+        started_during_stream = []
+
+        class SlowTail(ReplyProvider):
+            async def achat_stream(self, messages, tools=None):
+                if messages[-1]["role"] == "tool":
+                    yield {"type": "content", "content": "ok"}
+                    return
+                for chunk in tool_call("echo", {"text": "early"}):
+                    yield chunk
+                await asyncio.sleep(0.05) # model keeps generating
+                started_during_stream.append(bool(manager.threads))
+                yield {"type": "content", "content": "trailing text"}
+
+        agent = AsyncAgent(FakeConfig(), "/ws", skill_manager=manager, provider=SlowTail(None))
+        result = asyncio.run(agent.run([{"role": "user", "content": "go"}]))
+        self.assertEqual(started_during_stream, [True])
+        self.assertEqual(result["generated_messages"][1]["content"], "echo: early")
+
+    def test_provider_error(self):
+        class Failing(ReplyProvider):
+            async def achat_stream(self, messages, tools=None):
+                yield {"type": "error", "content": "Error code: 401"}
+        agent = AsyncAgent(FakeConfig(), "/ws", skill_manager=FakeSkillManager(), provider=Failing(None))
+        result = asyncio.run(agent.run([{"role": "user", "content": "go"}]))
+        self.assertEqual(result["provider_error"], "Error code: 401")
+
+    def test_sync_provider_adapter(self):
+        class SyncOnly(LLMProvider):
+            def chat_stream(self, messages, tools=None):
+                yield {"type": "content", "content": "sync"}
+                yield USAGE
+
+        async def collect():
+            return [c async for c in SyncOnly().achat_stream([])]
+
+        self.assertEqual([c["type"] for c in asyncio.run(collect())], ["content", "usage"])
+
+    def test_run_many_returns_exceptions_in_order(self):
+        async def ok():
+            return 1
+
+        async def boom():
+            raise ValueError("x")
+
+        results = asyncio.run(run_many([ok, boom, ok], max_concurrency=1))
+        self.assertEqual(results[0], 1)
+        self.assertIsInstance(results[1], ValueError)
+
+class ReloadingSkillManager(FakeSkillManager):
+    def __init__(self):
+        super().__init__()
+        self.reloads = 0
+
+    def check_for_updates(self):
+        return self.reloads == 0
+
+    def load_skills(self):
+        self.reloads += 1
+
+class TestAgentLoop(unittest.TestCase):
+    """Behaviour LLMWorker and AsyncAgent share through AgentLoop."""
+
+    def test_repeated_reasoning_stops_the_run(self):
+        class Ruminating(ReplyProvider):
+            async def achat_stream(self, messages, tools=None):
+                self.calls = getattr(self, "calls", 0) + 1
+                yield {"type": "reasoning", "content": "I should list the files again."}
+                for chunk in tool_call("echo", {"text": str(self.calls)}):
+                    yield chunk
+
+        provider = Ruminating(None)
+        agent = AsyncAgent(FakeConfig(), "/ws", skill_manager=FakeSkillManager(), provider=provider)
+        result = asyncio.run(agent.run([{"role": "user", "content": "go"}]))
+        self.assertIn("思维死循环", result["content"])
+        self.assertEqual(provider.calls, 4)
+
+    def test_pause_holds_the_next_turn(self):
+        provider = ReplyProvider(lambda m: tool_call("echo", {"text": "hi"}))
+        agent = AsyncAgent(FakeConfig(), "/ws", skill_manager=FakeSkillManager(), provider=provider)
+        seen = []
+
+        def on_event(event):
+            if event["type"] == "tool_result":
+                agent.is_paused = True
+            elif event["type"] == "step" and event["data"].startswith("Turn"):
+                seen.append((event["data"], time.perf_counter()))
+
+        agent.on_event = on_event
+
+        async def main():
+            task = asyncio.ensure_future(agent.run([{"role": "user", "content": "go"}]))
+            await asyncio.sleep(0.3)
+            self.assertFalse(task.done())
+            resumed = time.perf_counter()
+            agent.is_paused = False
+            return await task, resumed
+
+        result, resumed = asyncio.run(main())
+        self.assertEqual(result["content"], "done: echo: hi")
+        self.assertEqual([text for text, _ in seen], ["Turn 1: Requesting LLM...", "Turn 2: Requesting LLM..."])
+        self.assertGreaterEqual(seen[1][1], resumed)
+
+    def test_stop_while_paused(self):
+        provider = ReplyProvider(lambda m: [{"type": "content", "content": "never"}])
+        agent = AsyncAgent(FakeConfig(), "/ws", skill_manager=FakeSkillManager(), provider=provider)
+        agent.is_paused = True
+
+        async def main():
+            task = asyncio.ensure_future(agent.run([{"role": "user", "content": "go"}]))
+            await asyncio.sleep(0.2)
+            agent.stop()
+            return await task
+
+        self.assertEqual(asyncio.run(main())["content"], "⚠️ Operation stopped by user.")
+
+    def test_hot_reload_for_own_skill_manager(self):
+        manager = ReloadingSkillManager()
+        provider = ReplyProvider(lambda m: [{"type": "content", "content": "ok"}])
+        agent = AsyncAgent(FakeConfig(), "/ws", skill_manager=manager, provider=provider)
+        asyncio.run(agent.run([{"role": "user", "content": "go"}]))
+        # A shared SkillManager (sub-agents) is never reloaded
+        self.assertEqual(manager.reloads, 0)
+        agent.shared_skill_manager = False
+        asyncio.run(agent.run([{"role": "user", "content": "go"}]))
+        self.assertEqual(manager.reloads, 1)
+
+    def test_each_run_has_its_own_tool_scope(self):
+        runs = []
+
+        class Recording(FakeSkillManager):
+            def call_tool(self, name, args, context=None):
+                runs.append((context["agent_id"], context["run_id"]))
+                return super().call_tool(name, args, context)
+
+        provider = ReplyProvider(lambda m: tool_call("echo", {"text": "hi"}))
+        agent = AsyncAgent(FakeConfig(), "/ws", skill_manager=Recording(), provider=provider,
+                           parent_agent_id="Agent-1")
+        for _ in range(2):
+            asyncio.run(agent.run([{"role": "user", "content": "go"}]))
+        # Same agent id on a retry or the next dispatch, but the earlier results are not in its history
+        self.assertEqual([agent_id for agent_id, _ in runs], ["Agent-1", "Agent-1"])
+        self.assertNotEqual(runs[0][1], runs[1][1])
+
+    @unittest.skipUnless(importlib.util.find_spec("PySide6"), "PySide6 not installed")
+    def test_llm_worker_adapter(self):
+        from core.agent import LLMWorker
+
+        class SyncProvider(LLMProvider):
+            def chat_stream(self, messages, tools=None):
+                if messages[-1]["role"] == "tool":
+                    yield {"type": "content", "content": "done"}
+                else:
+                    yield from tool_call("echo", {"text": "hi"})
+                yield USAGE
+
+        manager = FakeSkillManager()
+        config = FakeConfig(speculative_tool_execution=False)
+        worker = LLMWorker([{"role": "user", "content": "go"}], config, "/ws", skill_manager=manager,
+                           tool_allowlist=["echo"], system_prompt="sys")
+        worker.agent.provider = SyncProvider()
+        finished, tool_results, states = [], [], []
+        worker.finished_signal.connect(finished.append)
+        worker.tool_result_signal.connect(tool_results.append)
+        worker.agent_state_signal.connect(states.append)
+        worker.run() # on this thread, so the signals are delivered directly
+        self.assertEqual(finished[0]["content"], "done")
+        self.assertEqual(tool_results, [{"id": "t1", "result": "echo: hi"}])
+        self.assertEqual(states[-1]["status"], "completed")
+        # Tools that were not started speculatively run on the worker's own thread
+        self.assertEqual(manager.threads, {threading.get_ident()})
+
+if __name__ == '__main__':
+    unittest.main()
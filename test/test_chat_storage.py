@@ -0,0 +1,215 @@
+import os
+import sys
+import json
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.chat_storage import ChatStorage, BLOB_THRESHOLD, INDEXED_PREFIX_CHARS
+
+class TestChatStorage(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.storage = ChatStorage(os.path.join(self.tmp, "chat_history.sqlite"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_round_trip_keeps_token_count(self):
+        messages = [
+            {"role": "user", "content": "hello"},
+            {"role": "assistant", "content": "hi", "reasoning": "greet", "token_count": 42},
+        ]
+        self.storage.save_conversation("c1", messages, title="t")
+        loaded = self.storage.get_messages("c1")
+        self.assertEqual(loaded[0], {"role": "user", "content": "hello"})
+        self.assertEqual(loaded[1]["token_count"], 42)
+        self.assertEqual(loaded[1]["reasoning_content"], "greet")
+
+    def test_turn_metrics(self):
+        self.storage.save_conversation("c1", [{"role": "user", "content": "q"}])
+        self.storage.record_turn_metrics("c1", [
+            {"turn": 1, "provider": "openai", "model": "m", "prompt_tokens": 1000, "completion_tokens": 100,
+             "reasoning_tokens": 40, "cached_tokens": 800, "ttft": 0.5, "duration": 2.0, "tokens_per_sec": 66.7},
+            {"turn": 2, "provider": "openai", "model": "m", "prompt_tokens": 1200, "completion_tokens": 50,
+             "cached_tokens": 1000, "ttft": None, "duration": 1.0, "tokens_per_sec": None},
+        ])
+        self.storage.record_turn_metrics("c2", [{"turn": 1, "prompt_tokens": 10, "completion_tokens": 1}])
+        self.storage.record_turn_metrics("c2", [])
+
+        rows = self.storage.get_turn_metrics("c1")
+        self.assertEqual([r["turn"] for r in rows], [1, 2])
+        self.assertEqual(rows[0]["reasoning_tokens"], 40)
+        self.assertIsNone(rows[1]["ttft"])
+
+        summary = self.storage.get_usage_summary(conversation_id="c1")
+        self.assertEqual(summary["turns"], 2)
+        self.assertEqual(summary["prompt_tokens"], 2200)
+        self.assertEqual(summary["cached_tokens"], 1800)
+        self.assertAlmostEqual(summary["avg_ttft"], 0.5)
+        self.assertEqual(summary["cache_hit_rate"], round(1800 / 2200, 3))
+        self.assertEqual(self.storage.get_usage_summary()["turns"], 3)
+
+        # Rewriting messages does not drop metrics
+        self.storage.save_conversation("c1", [{"role": "user", "content": "q2"}])
+        self.assertEqual(len(self.storage.get_turn_metrics("c1")), 2)
+    def test_provider_attempts(self):
+        self.storage.record_provider_attempts("c1", [
+            {"turn": 1, "provider": "openai", "model": "a", "attempt": 1, "fallback": 0, "outcome": "retry",
+             "status_code": 429, "error": "rate limited", "delay": 2.0, "duration": 0.1},
+            {"turn": 1, "provider": "openai", "model": "a", "attempt": 2, "fallback": 0, "outcome": "failover",
+             "status_code": 503, "error": "down", "delay": None, "duration": 0.2},
+            {"turn": 1, "provider": "anthropic", "model": "b", "attempt": 1, "fallback": 1, "outcome": "ok",
+             "duration": 3.0},
+        ])
+        health = {(h["provider"], h["model"]): h for h in self.storage.get_provider_health()}
+        self.assertEqual(health[("openai", "a")]["retries"], 1)
+        self.assertEqual(health[("openai", "a")]["failures"], 1)
+        self.assertEqual(health[("anthropic", "b")]["ok"], 1)
+        self.assertEqual(self.storage.get_provider_health(since=10**12), [])
+
+    def test_large_bodies_round_trip_through_blobs(self):
+        big = "line of a long file\n" * 2000
+        calls = [{"id": "call_1", "type": "function",
+                  "function": {"name": "write_file", "arguments": json.dumps({"content": big})}}]
+        messages = [
+            {"role": "user", "content": "read it"},
+            {"role": "assistant", "content": "", "tool_calls": calls, "reasoning": "think " * 2000},
+            {"role": "tool", "tool_call_id": "call_1", "content": big},
+        ]
+        self.storage.save_conversation("c1", messages)
+        # The same file read in another conversation is stored once
+        self.storage.save_conversation("c2", [{"role": "tool", "tool_call_id": "x", "content": big}])
+
+        loaded = self.storage.get_messages("c1")
+        self.assertEqual(loaded[1]["tool_calls"], calls)
+        self.assertEqual(loaded[1]["reasoning_content"], "think " * 2000)
+        self.assertEqual(loaded[2]["content"], big)
+        self.assertEqual(self.storage.get_messages("c2")[0]["content"], big)
+
+        stats = self.storage.get_blob_stats()
+        self.assertEqual(stats["blobs"], 3)
+        self.assertLess(stats["stored_size"], stats["raw_size"] / 10)
+
+        with sqlite3.connect(self.storage.db_path) as conn:
+            inline = conn.execute("SELECT length(content) FROM messages WHERE tool_call_id = 'call_1'").fetchone()[0]
+            hits = conn.execute("SELECT COUNT(*) FROM messages_fts WHERE messages_fts MATCH 'file'").fetchone()[0]
+        self.assertEqual(inline, INDEXED_PREFIX_CHARS)
+        self.assertEqual(hits, 2)
+
+    def test_rewriting_drops_orphaned_blobs(self):
+        big = "x" * (BLOB_THRESHOLD + 1)
+        self.storage.save_conversation("c1", [{"role": "tool", "content": big}])
+        self.storage.save_conversation("c2", [{"role": "tool", "content": big}])
+        self.storage.save_conversation("c1", [{"role": "tool", "content": "small"}])
+        self.assertEqual(self.storage.get_blob_stats()["blobs"], 1)
+        self.storage.save_conversation("c2", [{"role": "tool", "content": "y" * (BLOB_THRESHOLD + 1)}])
+        self.assertEqual(self.storage.get_blob_stats()["blobs"], 1)
+        self.assertEqual(self.storage.get_messages("c2")[0]["content"], "y" * (BLOB_THRESHOLD + 1))
+
+        with sqlite3.connect(self.storage.db_path) as conn:
+            conn.execute("DELETE FROM messages")
+        self.assertEqual(self.storage.collect_garbage(), 1)
+        self.assertEqual(self.storage.get_blob_stats()["blobs"], 0)
+
+    def test_migrate_inline_bodies(self):
+        big = "legacy reasoning " * 1000
+        self.storage.save_conversation("c1", [{"role": "user", "content": "q"}])
+        with sqlite3.connect(self.storage.db_path) as conn:
+            for i in range(5):
+                conn.execute(
+                    "INSERT INTO messages (id, conversation_id, role, content, reasoning_content, position) "
+                    "VALUES (?, 'c1', 'assistant', ?, ?, ?)",
+                    (f"m{i}", f"answer {i}", big, i + 1),
+                )
+        self.assertEqual(self.storage.migrate_blobs(batch_size=2), 5)
+        self.assertEqual(self.storage.migrate_blobs(batch_size=2), 0)
+        loaded = self.storage.get_messages("c1")
+        self.assertEqual([m.get("reasoning_content") for m in loaded[1:]], [big] * 5)
+        self.assertEqual(self.storage.get_blob_stats()["blobs"], 1)
+        with sqlite3.connect(self.storage.db_path) as conn:
+            hits = conn.execute("SELECT COUNT(*) FROM messages_fts WHERE messages_fts MATCH 'legacy'").fetchone()[0]
+        self.assertEqual(hits, 5)
+
+    def test_fts_migrates_to_trigram_and_rebuilds_in_batches(self):
+        # Database written by a version with the default unicode61 index
+        path = os.path.join(self.tmp, "old.sqlite")
+        with sqlite3.connect(path) as conn:
+            conn.execute("CREATE TABLE conversations (id TEXT PRIMARY KEY, title TEXT, created_at INTEGER, "
+                         "updated_at INTEGER, status TEXT, meta TEXT)")
+            conn.execute("CREATE TABLE messages (id TEXT PRIMARY KEY, conversation_id TEXT NOT NULL, role TEXT NOT NULL, "
+                         "content TEXT, tool_calls TEXT, reasoning_content TEXT, token_count INTEGER, "
+                         "tool_call_id TEXT, position INTEGER, created_at INTEGER)")
+            conn.execute("CREATE VIRTUAL TABLE messages_fts USING fts5(content, reasoning_content, "
+                         "content='messages', content_rowid='rowid')")
+            conn.execute("INSERT INTO conversations (id) VALUES ('c1')")
+            conn.executemany(
+                "INSERT INTO messages (id, conversation_id, role, content, position) VALUES (?, 'c1', 'user', ?, ?)",
+                [(f"m{i}", f"第{i}次讨论数据库迁移", i) for i in range(10)],
+            )
+
+        storage = ChatStorage(path)
+        status = storage.fts_status()
+        self.assertEqual(status["tokenizer"], "trigram")
+        self.assertTrue(status["pending"])
+
+        # Writes while the rebuild is pending: rows not indexed yet are left to the rebuild
+        with sqlite3.connect(path) as conn:
+            conn.execute("UPDATE messages SET content = '已修改的数据库迁移' WHERE id = 'm8'")
+            conn.execute("DELETE FROM messages WHERE id = 'm9'")
+            conn.execute("INSERT INTO messages (id, conversation_id, role, content, position) "
+                         "VALUES ('new', 'c1', 'user', '新的数据库迁移', 20)")
+
+        self.assertTrue(storage.rebuild_fts(batch_size=3, max_batches=1)["pending"])
+        self.assertFalse(storage.rebuild_fts(batch_size=3)["pending"])
+        with sqlite3.connect(path) as conn:
+            conn.execute("INSERT INTO messages_fts(messages_fts, rank) VALUES ('integrity-check', 1)")
+            hits = conn.execute("SELECT COUNT(*) FROM messages_fts WHERE messages_fts MATCH '数据库'").fetchone()[0]
+            modified = conn.execute("SELECT COUNT(*) FROM messages_fts WHERE messages_fts MATCH '已修改'").fetchone()[0]
+        self.assertEqual(hits, 10)
+        self.assertEqual(modified, 1)
+
+        # Reopening does not rebuild again
+        self.assertFalse(ChatStorage(path).fts_status()["pending"])
+
+    def test_rewrite_keeps_unchanged_rows(self):
+        messages = [
+            {"role": "user", "content": "q1", "created_at": 100},
+            {"role": "assistant", "content": "a1"},
+        ]
+        self.storage.save_conversation("c1", messages)
+        rows = lambda: [tuple(r) for r in sqlite3.connect(self.storage.db_path).execute(
+            "SELECT rowid, id, position, content FROM messages ORDER BY position")]
+        before = rows()
+
+        messages = messages + [{"role": "user", "content": "q2"}]
+        self.storage.save_conversation("c1", messages)
+        after = rows()
+        self.assertEqual(after[:2], before)
+        self.assertEqual(after[2][3], "q2")
+
+        # An edited message is replaced, a dropped tail is deleted
+        self.storage.save_conversation("c1", [messages[0], {"role": "assistant", "content": "a1 (edited)"}])
+        final = rows()
+        self.assertEqual(final[0], before[0])
+        self.assertEqual([r[3] for r in final], ["q1", "a1 (edited)"])
+        self.assertNotEqual(final[1][1], before[1][1])
+        # Rowids of deleted rows (here the dropped q2) are never handed out again
+        self.assertGreater(final[1][0], after[2][0])
+        # Messages read back without ids are kept too
+        self.storage.save_conversation("c1", self.storage.get_messages("c1"))
+        self.assertEqual(rows(), final)
+        self.assertEqual([m["content"] for m in self.storage.get_messages("c1")], ["q1", "a1 (edited)"])
+
+    def test_rewrite_with_explicit_ids_moving_position(self):
+        self.storage.save_conversation("c1", [{"id": "x", "role": "user", "content": "hello"}])
+        self.storage.save_conversation("c1", [{"role": "system", "content": "sys"},
+                                              {"id": "x", "role": "user", "content": "hello"}])
+        self.assertEqual([m["content"] for m in self.storage.get_messages("c1")], ["sys", "hello"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import os
+import sys
+import math
+import shutil
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.chat_storage import ChatStorage
+from core.embedding_indexer import EmbeddingIndexer, HashingEmbeddingBackend, embed_query
+
+class FakeVecStore:
+    """In-memory stand-in for messages_vec (sqlite-vec is not needed to test the indexer)."""
+    rows = {}
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def replace(self, dim, rows):
+        for rowid, vector, message_id, *_ in rows:
+            assert len(vector) == dim
+            FakeVecStore.rows[rowid] = message_id
+
+    def delete(self, rowids):
+        for rowid in rowids:
+            FakeVecStore.rows.pop(rowid, None)
+
+    def rowids(self):
+        return list(FakeVecStore.rows)
+
+    def drop(self):
+        FakeVecStore.rows.clear()
+
+def cosine(a, b):
+    return sum(x * y for x, y in zip(a, b))
+
+class TestHashingBackend(unittest.TestCase):
+    def test_deterministic_and_normalised(self):
+        backend = HashingEmbeddingBackend(dim=64)
+        a, b = backend.embed(["数据库迁移 report", "数据库迁移 report"])
+        self.assertEqual(a, b)
+        self.assertEqual(len(a), 64)
+        self.assertAlmostEqual(math.sqrt(sum(v * v for v in a)), 1.0)
+
+    def test_overlap_is_more_similar(self):
+        query, near, far = HashingEmbeddingBackend().embed(["数据库迁移", "把数据库迁移到新服务器", "季度销售报表"])
+        self.assertGreater(cosine(query, near), cosine(query, far))
+
+class TestEmbeddingIndexer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp, "chat_history.sqlite")
+        self.storage = ChatStorage(self.db_path)
+        self.storage.save_conversation("c1", [
+            {"id": "m1", "role": "user", "content": "数据库迁移"},
+            {"id": "m2", "role": "assistant", "content": "好的"},
+            {"id": "m3", "role": "tool", "content": "tool output"},
+            {"id": "m4", "role": "assistant", "content": ""},
+        ])
+        FakeVecStore.rows = {}
+        self.backend = HashingEmbeddingBackend(dim=32)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def indexer(self, backend=None):
+        return EmbeddingIndexer(self.db_path, backend or self.backend, batch_size=2, store_factory=FakeVecStore)
+
+    def indexed_ids(self):
+        return sorted(FakeVecStore.rows.values())
+
+    def test_indexes_user_and_assistant_text_only(self):
+        indexer = self.indexer()
+        self.assertEqual(indexer.run_once(), 4)
+        self.assertEqual(self.indexed_ids(), ["m1", "m2"])
+        self.assertEqual(indexer.status()["backlog"], 0)
+
+    def test_incremental_and_resumes(self):
+        self.indexer().run_once(max_batches=1)
+        self.assertEqual(self.indexed_ids(), ["m1", "m2"])
+        messages = self.storage.get_messages("c1") + [{"id": "m5", "role": "user", "content": "新的问题"}]
+        self.storage.save_conversation("c1", messages)
+        # A fresh indexer picks up from the stored high-water mark
+        indexer = self.indexer()
+        self.assertEqual(indexer.status()["backlog"], 3)
+        indexer.run_once()
+        self.assertEqual(self.indexed_ids(), ["m1", "m2", "m5"])
+        self.assertEqual(indexer.indexed, 1)
+
+    def test_edited_message_is_reindexed_and_deleted_pruned(self):
+        indexer = self.indexer()
+        indexer.run_once()
+        messages = self.storage.get_messages("c1")
+        messages[0]["content"] = "数据库迁移到新服务器"
+        self.storage.save_conversation("c1", messages[:2])
+        indexer.run_once()
+        # The old vector of the edited message is stale; the new row is embedded
+        self.assertEqual(indexer.prune(), 1)
+        self.assertEqual(len(FakeVecStore.rows), 2)
+        self.assertIn("m2", self.indexed_ids())
+        self.assertNotIn("m1", self.indexed_ids())
+        self.assertEqual(indexer.indexed, 3)
+
+    def test_backend_change_rebuilds(self):
+        self.indexer().run_once()
+        indexer = self.indexer(HashingEmbeddingBackend(dim=16))
+        self.assertEqual(indexer.status()["backlog"], 0)
+        indexer.index_batch()
+        self.assertEqual(indexer.status()["backend"], "hashing:16")
+        indexer.run_once()
+        self.assertEqual(indexer.indexed, 2)
+
+    def test_embed_query_requires_matching_index(self):
+        self.assertIsNone(embed_query(self.db_path, self.backend, "数据库"))
+        self.indexer().run_once()
+        self.assertEqual(len(embed_query(self.db_path, self.backend, "数据库")), 32)
+
+if __name__ == '__main__':
+    unittest.main()
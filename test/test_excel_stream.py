@@ -0,0 +1,87 @@
+import unittest
+import os
+import sys
+import csv
+import tempfile
+import shutil
+import importlib.util
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import excel_stream
+
+class TestExcelStream(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_csv_stream_in_chunks(self):
+        path = os.path.join(self.temp_dir, "out.csv")
+        cursor = excel_stream.start_stream(path)
+        excel_stream.get_stream(cursor).append([["id", "name"]])
+        for chunk in range(3):
+            excel_stream.get_stream(cursor).append([[chunk * 10 + i, f"row{i}"] for i in range(10)])
+        writer = excel_stream.finish_stream(cursor)
+        self.assertEqual(writer.rows_written, 31)
+
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0], ["id", "name"])
+        self.assertEqual(rows[-1], ["29", "row9"])
+
+        with self.assertRaises(KeyError):
+            excel_stream.get_stream(cursor)
+
+    def test_one_stream_per_file(self):
+        path = os.path.join(self.temp_dir, "dup.csv")
+        cursor = excel_stream.start_stream(path)
+        with self.assertRaises(ValueError):
+            excel_stream.start_stream(path)
+        excel_stream.finish_stream(cursor)
+
+    @unittest.skipUnless(importlib.util.find_spec("openpyxl"), "openpyxl is not installed")
+    def test_write_sheet_streams_existing_workbook(self):
+        import openpyxl
+        path = os.path.join(self.temp_dir, "book.xlsx")
+        wb = openpyxl.Workbook()
+        wb.active.title = "Data"
+        wb.active.append(["id", "name"])
+        wb.active.append([1, "a"])
+        wb.create_sheet("Notes").append(["keep me"])
+        wb.save(path)
+
+        self.assertEqual(excel_stream.write_sheet(path, "Data", [[2, "b"], [3, "c"]], append=True), 4)
+        self.assertEqual(excel_stream.write_sheet(path, "Notes", [["replaced"]]), 1)
+        self.assertEqual(excel_stream.write_sheet(path, "New", [["x"]]), 1)
+
+        wb = openpyxl.load_workbook(path, read_only=True)
+        self.assertEqual(wb.sheetnames, ["Data", "Notes", "New"])
+        self.assertEqual(list(wb["Data"].iter_rows(values_only=True)),
+                         [("id", "name"), (1, "a"), (2, "b"), (3, "c")])
+        self.assertEqual(list(wb["Notes"].iter_rows(values_only=True)), [("replaced",)])
+        wb.close()
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ["book.xlsx"])
+
+    @unittest.skipUnless(importlib.util.find_spec("openpyxl"), "openpyxl is not installed")
+    def test_write_sheet_refuses_workbooks_with_charts(self):
+        import openpyxl
+        from openpyxl.chart import BarChart, Reference
+        path = os.path.join(self.temp_dir, "chart.xlsx")
+        wb = openpyxl.Workbook()
+        for i in range(3):
+            wb.active.append([i])
+        chart = BarChart()
+        chart.add_data(Reference(wb.active, min_col=1, min_row=1, max_row=3))
+        wb.active.add_chart(chart, "C1")
+        wb.save(path)
+
+        self.assertTrue(excel_stream.has_drawings(path))
+        with self.assertRaises(ValueError):
+            excel_stream.write_sheet(path, "Sheet", [[9]], append=True)
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ["chart.xlsx"])
+
+if __name__ == "__main__":
+    unittest.main()
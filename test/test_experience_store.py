@@ -0,0 +1,126 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import experience_store
+from core.experience_store import ExperienceStore
+from core.embedding_indexer import HashingEmbeddingBackend
+
+class Clock:
+    def __init__(self, now=1_000_000):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+class SemanticBackend(HashingEmbeddingBackend):
+    """Treats the hashing vectors as if they were semantic, to exercise that path."""
+    semantic = True
+
+    def __init__(self):
+        super().__init__()
+        self.name = "semantic-test"
+
+class TestExperienceStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.clock = Clock()
+        self.store = ExperienceStore(os.path.join(self.tmp, "experiences.sqlite"), clock=self.clock)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def texts(self, skill="s"):
+        return [row["text"] for row in self.store.list(skill)]
+
+    def test_near_duplicates_reinforce(self):
+        self.assertEqual(self.store.add("s", "Install yt-dlp with pip when it is missing."), 1)
+        self.assertEqual(self.store.add("s", ["install yt-dlp with pip when it is missing", "Quote paths with spaces."]), 1)
+        self.assertEqual(self.texts(), ["Install yt-dlp with pip when it is missing.", "Quote paths with spaces."])
+        self.assertEqual(self.store.list("s")[0]["hits"], 2)
+        # Skills are independent
+        self.assertEqual(self.store.add("other", "Quote paths with spaces."), 1)
+
+    def test_frontmatter_imported_once_per_list(self):
+        legacy = ["Use absolute paths.", "Check the exit code."]
+        self.assertEqual(self.store.import_frontmatter("s", legacy), 2)
+        self.assertEqual(self.store.import_frontmatter("s", legacy), 0)
+        self.assertEqual(self.store.import_frontmatter("s", legacy + ["Retry on timeout."]), 1)
+        self.assertEqual([row["hits"] for row in self.store.list("s")], [1, 1, 1])
+
+    def test_select_prefers_reinforced_and_recent_within_budget(self):
+        self.store.add("s", ["old lesson about encodings", "lesson about retries"])
+        self.clock.now += 90 * 24 * 3600
+        self.store.add("s", ["fresh lesson about timeouts"])
+        self.store.add("s", ["lesson about retries"])
+        chosen = [row["text"] for row in self.store.select("s", budget_tokens=100)]
+        self.assertEqual(chosen, ["lesson about retries", "fresh lesson about timeouts", "old lesson about encodings"])
+        self.assertEqual(len(self.store.select("s", budget_tokens=8)), 1)
+
+    def test_record_use(self):
+        self.store.add("s", ["a lesson", "another lesson entirely"])
+        ids = [row["id"] for row in self.store.list("s")]
+        self.store.record_use(ids[:1])
+        self.assertEqual([row["uses"] for row in self.store.list("s")], [1, 0])
+
+    def test_corrections_and_skill_specific_lessons_are_kept(self):
+        lessons = ["Always pass encoding=utf-8 when reading CSV files",
+                   "Never pass encoding=utf-8 when reading CSV files",
+                   "Use python-docx to read .docx files, not the docx package",
+                   "Use python-pptx to read .pptx files, not the pptx package"]
+        self.assertEqual(self.store.add("s", lessons), 4)
+        self.assertEqual(self.store.compact(), 0)
+        self.assertEqual(self.texts(), lessons)
+
+    def test_compact_merges_and_trims(self):
+        self.store.add("s", ["Always run the tests before committing changes", "Escape quotes in shell arguments"])
+        # Stored before lessons were compared by normalized text
+        with self.store._connect() as conn:
+            conn.execute("INSERT INTO experiences (skill, text, text_hash, hits, created_at, updated_at) "
+                         "VALUES ('s', 'always run the tests before committing changes!', 'legacy', 1, 1, 1)")
+        self.assertEqual(len(self.store.list("s")), 3)
+        self.assertEqual(self.store.compact(), 1)
+        merged = self.store.list("s")
+        self.assertEqual([row["text"] for row in merged],
+                         ["Always run the tests before committing changes", "Escape quotes in shell arguments"])
+        self.assertEqual(merged[0]["hits"], 2)
+
+        original = experience_store.MAX_PER_SKILL
+        experience_store.MAX_PER_SKILL = 2
+        try:
+            self.store.add("t", ["alpha beta", "gamma delta", "epsilon zeta"])
+            self.store.compact("t")
+            self.assertEqual(len(self.store.list("t")), 2)
+        finally:
+            experience_store.MAX_PER_SKILL = original
+
+    def test_semantic_backend_keeps_the_newer_wording(self):
+        store = ExperienceStore(os.path.join(self.tmp, "semantic.sqlite"), backend=SemanticBackend(), clock=self.clock)
+        store.add("s", ["Always run the tests before committing changes"])
+        self.clock.now += 1
+        self.assertEqual(store.add("s", ["Always run the tests before committing your changes"]), 0)
+        self.assertEqual([(row["text"], row["hits"]) for row in store.list("s")],
+                         [("Always run the tests before committing your changes", 2)])
+
+        # Near duplicates stored separately are merged by compact(), newest wording first
+        with store._connect() as conn:
+            conn.execute("INSERT INTO experiences (skill, text, text_hash, hits, created_at, updated_at) "
+                         "VALUES ('s', 'Run the tests before committing your changes', 'h', 1, ?, ?)",
+                         (self.clock.now + 1, self.clock.now + 1))
+        self.assertEqual(store.compact(), 1)
+        self.assertEqual([(row["text"], row["hits"]) for row in store.list("s")],
+                         [("Run the tests before committing your changes", 3)])
+
+    def test_maybe_compact_is_throttled(self):
+        self.assertEqual(self.store.maybe_compact(), 0)
+        self.assertIsNone(self.store.maybe_compact())
+        self.clock.now += experience_store.COMPACT_INTERVAL
+        self.assertEqual(self.store.maybe_compact(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+import os
+import sys
+import time
+import tempfile
+import shutil
+import sqlite3
+from contextlib import closing
+from unittest import mock
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import extraction_cache
+from core.extraction_cache import ExtractionCache
+
+class TestExtractionCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache = ExtractionCache(os.path.join(self.temp_dir, "cache", "extract.sqlite"))
+        self.doc_path = os.path.join(self.temp_dir, "report.pdf")
+        with open(self.doc_path, "wb") as f:
+            f.write(b"%PDF-fake content")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_hit_after_extract(self):
+        calls = []
+        def extract():
+            calls.append(1)
+            return "page text 中文"
+        first = self.cache.document(self.doc_path).get_or_extract("pdf:page:1", extract)
+        second = self.cache.document(self.doc_path).get_or_extract("pdf:page:1", extract)
+        self.assertEqual(first, second)
+        self.assertEqual(len(calls), 1)
+        stats = self.cache.stats()
+        self.assertEqual((stats["session_hits"], stats["session_misses"]), (1, 1))
+        self.assertEqual(stats["entries"], 1)
+
+    def test_content_change_misses_and_copy_hits(self):
+        self.cache.document(self.doc_path).put("pdf:page:1", "old")
+        copy_path = os.path.join(self.temp_dir, "copy.pdf")
+        shutil.copy(self.doc_path, copy_path)
+        self.assertEqual(self.cache.document(copy_path).get("pdf:page:1"), "old")
+
+        with open(self.doc_path, "wb") as f:
+            f.write(b"%PDF-changed content!")
+        self.assertIsNone(self.cache.document(self.doc_path).get("pdf:page:1"))
+
+    def test_lru_eviction(self):
+        cache = ExtractionCache(os.path.join(self.temp_dir, "small.sqlite"), max_bytes=3000)
+        doc = cache.document(self.doc_path)
+        for i in range(5):
+            # Random-ish payload so zlib cannot shrink it below the cap
+            doc.put(f"v{i}", os.urandom(500).hex())
+            time.sleep(0.01)
+        doc.get("v0")  # Touch the oldest entry so it survives
+        doc.put("v5", os.urandom(500).hex())
+        self.assertIsNotNone(doc.get("v0"))
+        self.assertIsNone(doc.get("v1"))
+        self.assertLessEqual(cache.stats()["stored_bytes"], 3000)
+
+    def test_connections_are_closed(self):
+        opened = []
+        real_connect = sqlite3.connect
+        def connect(*args, **kwargs):
+            opened.append(real_connect(*args, **kwargs))
+            return opened[-1]
+        with mock.patch.object(extraction_cache.sqlite3, "connect", side_effect=connect):
+            doc = self.cache.document(self.doc_path)
+            doc.get_or_extract("pdf:page:1", lambda: "text")
+            self.cache.stats()
+        self.assertEqual(len(opened), 4)  # fingerprint, lookup, store, stats
+        for conn in opened:
+            with self.assertRaises(sqlite3.ProgrammingError):
+                conn.execute("SELECT 1")
+        with closing(sqlite3.connect(self.cache.db_path)) as conn:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+
+if __name__ == "__main__":
+    unittest.main()
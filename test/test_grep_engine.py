@@ -0,0 +1,76 @@
+import unittest
+import os
+import sys
+import re
+import tempfile
+import shutil
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import grep_engine
+
+def legacy_scan(file_path, pattern):
+    """Reference implementation: the original readlines() scan."""
+    regex = re.compile(pattern)
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        return [(i + 1, line.strip()) for i, line in enumerate(f.readlines()) if regex.search(line)]
+
+class TestGrepEngine(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _write(self, name, data, mode='w'):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, mode, **({} if 'b' in mode else {'encoding': 'utf-8'})) as f:
+            f.write(data)
+        return path
+
+    def test_matches_legacy_line_semantics(self):
+        path = self._write("a.py", "import os\n\ndef foo():\n    return 'foo'\n# 中文 foo\nlast line foo")
+        for pattern in [r"foo", r"^def", r"foo'$", r"\w+\(\)", r"中文", r"o\s+r", r"line foo$"]:
+            self.assertEqual(grep_engine.scan_file(path, pattern), legacy_scan(path, pattern), pattern)
+
+        # '.', negated classes and repeats count characters, not UTF-8 bytes; \A and \Z are per line
+        path = self._write("cn.txt", "aéb\n文件x\n前缀 foo\nfoo 后缀\n")
+        for pattern in [r"a.b", r"^.{2}x", r"^[^a-z]+x", r"a[^x]b", r"\Afoo", r"后缀\s*\Z", r"前缀\s?foo"]:
+            self.assertNotEqual(legacy_scan(path, pattern), [], pattern)
+            self.assertEqual(grep_engine.scan_file(path, pattern), legacy_scan(path, pattern), pattern)
+
+    def test_empty_matches_end_at_the_last_line(self):
+        # Patterns that match the empty string once looped on the position after the final newline
+        for name, text in [("nl.txt", "a\nb\n"), ("no_nl.txt", "a\nb"), ("blank.txt", "\n\nx\n")]:
+            path = self._write(name, text)
+            for pattern in [r"^", r"$", r"", r".*", r"x*", r"b?"]:
+                expected = grep_engine._scan_lines(path, re.compile(pattern), None)
+                self.assertEqual(grep_engine.scan_file(path, pattern), expected, (name, pattern))
+                self.assertEqual(grep_engine.scan_file(path, pattern, limit=6), expected[:6], (name, pattern))
+
+    def test_crlf_end_anchor(self):
+        path = self._write("crlf.txt", b"alpha\r\nbeta\r\n", mode='wb')
+        self.assertEqual(grep_engine.scan_file(path, r"beta$"), [(2, "beta")])
+
+    def test_skips_binary_and_empty(self):
+        binary = self._write("bin.dat", b"foo\0bar\nfoo\n", mode='wb')
+        empty = self._write("empty.txt", "")
+        results, truncated = grep_engine.search([binary, empty], "foo")
+        self.assertEqual(results, [])
+        self.assertFalse(truncated)
+
+    def test_order_and_early_stop(self):
+        paths = [self._write(f"f{i:03d}.txt", "hit\nmiss\nhit\n") for i in range(50)]
+        results, truncated = grep_engine.search(iter(paths), "hit", max_matches=7, workers=4, batch_size=3)
+        self.assertTrue(truncated)
+        self.assertEqual(len(results), 7)
+        expected = [(p, n, "hit") for p in paths for n in (1, 3)][:7]
+        self.assertEqual(results, expected)
+
+    def test_invalid_pattern_raises(self):
+        with self.assertRaises(re.error):
+            grep_engine.search([], "(")
+
+if __name__ == "__main__":
+    unittest.main()
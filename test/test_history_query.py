@@ -0,0 +1,82 @@
+import os
+import sys
+import json
+import shutil
+import sqlite3
+import tempfile
+import unittest
+import importlib.util
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.chat_storage import ChatStorage
+
+# Load module dynamically because of hyphen in name
+spec = importlib.util.spec_from_file_location(
+    "history_query_impl",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "skills", "history-query", "impl.py"),
+)
+impl = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(impl)
+
+class FakeConfig:
+    def __init__(self, history_dir):
+        self.history_dir = history_dir
+
+    def get_chat_history_dir(self):
+        return self.history_dir
+
+class TestQueryHistory(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.storage = ChatStorage(os.path.join(self.tmp, "chat_history.sqlite"))
+        self.context = {"config_manager": FakeConfig(self.tmp)}
+        self.storage.save_conversation("c1", [
+            {"role": "user", "content": "帮我把数据库迁移到新的服务器"},
+            {"role": "assistant", "content": "数据库迁移完成，新服务器已经上线。"},
+            {"role": "user", "content": "今天的天气怎么样"},
+            {"role": "assistant", "content": "Deploy the migration script tomorrow"},
+        ])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def query(self, keywords, **kwargs):
+        return json.loads(impl.query_history(keywords, _context=self.context, **kwargs))
+
+    def test_chinese_keywords_use_trigram_index(self):
+        self.assertEqual(self.storage.fts_status()["tokenizer"], "trigram")
+        results = self.query("数据库迁移")
+        self.assertEqual(len(results), 2)
+        self.assertTrue(all("[数据库迁移]" in r["snippet"] for r in results))
+        self.assertTrue(all(r["score"] > 0 for r in results))
+
+    def test_bm25_ranks_denser_match_first(self):
+        filler = [{"role": "user", "content": f"第{i}条无关的消息"} for i in range(10)]
+        self.storage.save_conversation("c2", filler + [
+            {"role": "user", "content": "服务器" + "，以及很多无关内容" * 30},
+            {"role": "assistant", "content": "重启服务器"},
+        ])
+        results = self.query("服务器")
+        self.assertEqual(results[0]["content"], "重启服务器")
+        self.assertTrue(results[-1]["content"].startswith("服务器，以及"))
+
+    def test_short_terms_fall_back_to_like(self):
+        results = self.query("天气")
+        self.assertEqual([r["content"] for r in results], ["今天的天气怎么样"])
+        self.assertIn("[天气]", results[0]["snippet"])
+        mixed = self.query(["天气", "migration"])
+        self.assertEqual(len(mixed), 2)
+
+    def test_pending_rebuild_uses_like(self):
+        with sqlite3.connect(self.storage.db_path) as conn:
+            conn.execute("DELETE FROM meta WHERE key = 'fts_tokenizer'")
+        storage = ChatStorage(self.storage.db_path)
+        self.assertTrue(storage.fts_status()["pending"])
+        self.assertEqual(len(self.query("数据库迁移")), 2)
+        storage.rebuild_fts()
+        self.assertEqual(len(self.query("数据库迁移")), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.chat_storage import ChatStorage
+from core.history_search import HistorySearch, ConnectionPool, rrf_fuse, RRF_K
+
+class TestRRF(unittest.TestCase):
+    def test_fusion_rewards_agreement(self):
+        fused = rrf_fuse([["a", "b", "c"], ["c", "d"]])
+        self.assertEqual(fused[0][0], "c")
+        self.assertAlmostEqual(fused[0][1], 1 / (RRF_K + 3) + 1 / (RRF_K + 1))
+        self.assertEqual([i for i, _ in fused], ["c", "a", "b", "d"])
+
+    def test_single_list_keeps_order(self):
+        self.assertEqual([i for i, _ in rrf_fuse([["x", "y"], []])], ["x", "y"])
+
+class TestHistorySearch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp, "chat_history.sqlite")
+        storage = ChatStorage(self.db_path)
+        storage.save_conversation("c1", [
+            {"id": "m1", "role": "user", "content": "帮我把数据库迁移到新的服务器", "created_at": 1000},
+            {"id": "m2", "role": "assistant", "content": "数据库迁移完成", "created_at": 1001},
+        ])
+        storage.save_conversation("c2", [
+            {"id": "m3", "role": "user", "content": "季度销售报表在哪里", "created_at": 5000},
+            {"id": "m4", "role": "assistant", "content": "报表已经发给你了", "created_at": 5001},
+        ])
+        self.engine = HistorySearch(self.db_path)
+
+    def tearDown(self):
+        self.engine.pool.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def fake_vector(self, hits):
+        calls = []
+        def vector(embedding, start_ts=None, end_ts=None, conversation_id=None, limit=10):
+            calls.append(threading.current_thread().name)
+            return hits
+        self.engine.vector = vector
+        return calls
+
+    def test_lexical_only(self):
+        found = self.engine.search("数据库迁移")
+        self.assertEqual(found["retrievers"], ["lexical"])
+        self.assertEqual({r["message_id"] for r in found["results"]}, {"m1", "m2"})
+        self.assertTrue(all(r["vector_rank"] is None for r in found["results"]))
+        self.assertIn("[数据库迁移]", found["results"][0]["snippet"])
+        for stage in ("lexical_ms", "fusion_ms", "total_ms"):
+            self.assertIn(stage, found["timings"])
+
+    def test_hybrid_fuses_both_rankings(self):
+        calls = self.fake_vector([("m4", 0.1), ("m2", 0.3)])
+        self.engine.pool.vec_available = True
+        found = self.engine.search("数据库迁移", embedding=[0.1, 0.2])
+        ids = [r["message_id"] for r in found["results"]]
+        # m2 is found by both retrievers and wins; m4 only comes from the vector side
+        self.assertEqual(ids[0], "m2")
+        self.assertIn("m4", ids)
+        m4 = next(r for r in found["results"] if r["message_id"] == "m4")
+        self.assertEqual((m4["lexical_rank"], m4["vector_rank"], m4["distance"]), (None, 1, 0.1))
+        self.assertEqual(m4["content"], "报表已经发给你了")
+        self.assertIn("vector_ms", found["timings"])
+        self.assertTrue(calls[0].startswith("history-search"))
+
+    def test_filters(self):
+        found = self.engine.search("数据库迁移,报表", conversation_id="c2")
+        self.assertEqual({r["message_id"] for r in found["results"]}, {"m3", "m4"})
+        found = self.engine.search("数据库迁移,报表", start_ts=1001, end_ts=5000)
+        self.assertEqual({r["message_id"] for r in found["results"]}, {"m2", "m3"})
+
+    def test_deleted_message_from_vector_index_is_skipped(self):
+        self.fake_vector([("gone", 0.1)])
+        found = self.engine.search(None, embedding=[0.1])
+        self.assertEqual(found["results"], [])
+
+class TestConnectionPool(unittest.TestCase):
+    def test_connections_are_reused(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            pool = ConnectionPool(os.path.join(tmp, "db.sqlite"), size=2)
+            with pool.connection() as a:
+                with pool.connection() as b:
+                    self.assertIsNot(a, b)
+            with pool.connection() as c:
+                self.assertIn(c, (a, b))
+            self.assertEqual(pool._created, 2)
+            pool.close()
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
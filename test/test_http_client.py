@@ -0,0 +1,181 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import sqlite3
+import threading
+import unittest
+from unittest import mock
+from contextlib import closing
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import http_client
+from core.http_client import HttpClient
+
+class FakeResponse:
+    def __init__(self, status_code=200, content=b"", headers=None, url=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+        self.url = url
+
+class FakeSession:
+    """Serves scripted responses and records request headers."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def get(self, url, headers=None, timeout=None):
+        with self._lock:
+            self.requests.append((url, dict(headers or {}), timeout))
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            response = self.responses.pop(0) if self.responses else FakeResponse(content=b"ok")
+        time.sleep(0.02)
+        with self._lock:
+            self.active -= 1
+        response.url = response.url or url
+        return response
+
+class TestHttpClient(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp, "http_cache.sqlite")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_fresh_entry_served_from_cache(self):
+        session = FakeSession([FakeResponse(content=b"<p>hello</p>")])
+        client = HttpClient(cache_path=self.db_path, session=session)
+        first = client.get("https://example.com/a")
+        second = client.get("https://example.com/a")
+        self.assertFalse(first.from_cache)
+        self.assertTrue(second.from_cache)
+        self.assertEqual(second.text, "<p>hello</p>")
+        self.assertEqual(len(session.requests), 1)
+
+    def test_stale_entry_revalidated_with_etag(self):
+        session = FakeSession([
+            FakeResponse(content=b"v1", headers={"ETag": '"abc"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"}),
+            FakeResponse(status_code=304),
+        ])
+        client = HttpClient(cache_path=self.db_path, session=session)
+        client.get("https://example.com/a", ttl=0)
+        response = client.get("https://example.com/a")
+        self.assertEqual(response.content, b"v1")
+        self.assertTrue(response.from_cache)
+        _, headers, _ = session.requests[1]
+        self.assertEqual(headers.get("If-None-Match"), '"abc"')
+        self.assertIn("If-Modified-Since", headers)
+        # The 304 refreshed the entry, so no third request
+        client.get("https://example.com/a")
+        self.assertEqual(len(session.requests), 2)
+
+    def test_no_store_and_errors_not_cached(self):
+        session = FakeSession([
+            FakeResponse(content=b"secret", headers={"Cache-Control": "no-store"}),
+            FakeResponse(content=b"secret", headers={"Cache-Control": "no-store"}),
+            FakeResponse(status_code=500),
+            FakeResponse(status_code=500),
+        ])
+        client = HttpClient(cache_path=self.db_path, session=session)
+        client.get("https://example.com/private")
+        client.get("https://example.com/private")
+        client.get("https://example.com/broken")
+        client.get("https://example.com/broken")
+        self.assertEqual(len(session.requests), 4)
+
+    def test_no_cache_is_revalidated(self):
+        session = FakeSession([
+            FakeResponse(content=b"v1", headers={"Cache-Control": "no-cache", "ETag": '"v1"'}),
+            FakeResponse(status_code=304),
+            FakeResponse(status_code=304),
+        ])
+        client = HttpClient(cache_path=self.db_path, session=session)
+        client.get("https://example.com/a")
+        # Stored, but every later use asks the server first, even after a 304 without Cache-Control
+        for _ in range(2):
+            response = client.get("https://example.com/a")
+            self.assertTrue(response.from_cache)
+        self.assertEqual([headers.get("If-None-Match") for _, headers, _ in session.requests], [None, '"v1"', '"v1"'])
+
+    def test_request_cache_control(self):
+        session = FakeSession([FakeResponse(content=b"v1", headers={"ETag": '"v1"'}),
+                               FakeResponse(status_code=304),
+                               FakeResponse(content=b"v2")])
+        client = HttpClient(cache_path=self.db_path, session=session)
+        client.get("https://example.com/a")
+        self.assertTrue(client.get("https://example.com/a", headers={"Cache-Control": "no-cache"}).from_cache)
+        self.assertEqual(session.requests[1][1].get("If-None-Match"), '"v1"')
+        fresh = client.get("https://example.com/a", headers={"Cache-Control": "no-store"})
+        self.assertEqual(fresh.content, b"v2")
+        self.assertNotIn("If-None-Match", session.requests[2][1])
+        # A no-store request neither read nor wrote the cache
+        self.assertEqual(client.get("https://example.com/a").content, b"v1")
+        self.assertEqual(len(session.requests), 3)
+
+    def test_cache_connections_are_closed(self):
+        opened = []
+        real_connect = sqlite3.connect
+        def connect(*args, **kwargs):
+            opened.append(real_connect(*args, **kwargs))
+            return opened[-1]
+        session = FakeSession([FakeResponse(content=b"x")])
+        with mock.patch.object(http_client.sqlite3, "connect", side_effect=connect):
+            client = HttpClient(cache_path=self.db_path, session=session)
+            client.get("https://example.com/a")
+            client.get("https://example.com/a")
+        self.assertEqual(len(opened), 4)  # schema, miss, store, hit
+        for conn in opened:
+            with self.assertRaises(sqlite3.ProgrammingError):
+                conn.execute("SELECT 1")
+        with closing(sqlite3.connect(self.db_path)) as conn:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+
+    def test_cache_bounded_by_size(self):
+        pages = [FakeResponse(content=os.urandom(400)) for _ in range(5)]
+        client = HttpClient(cache_path=self.db_path, session=FakeSession(pages), cache_max_bytes=1500)
+        for i in range(5):
+            client.get(f"https://example.com/{i}")
+            time.sleep(0.01)
+        kept = [i for i in range(5) if client.cache.get(f"https://example.com/{i}")]
+        # Random bodies do not compress, so at most three 400 byte entries fit; the oldest go first
+        self.assertLessEqual(len(kept), 3)
+        self.assertEqual(kept, list(range(5 - len(kept), 5)))
+
+    def test_max_age_overrides_default_ttl(self):
+        session = FakeSession([FakeResponse(content=b"x", headers={"Cache-Control": "max-age=0"})])
+        client = HttpClient(cache_path=self.db_path, session=session, default_ttl=3600)
+        client.get("https://example.com/a")
+        client.get("https://example.com/a")
+        self.assertEqual(len(session.requests), 2)
+
+    def test_per_host_limit(self):
+        session = FakeSession([])
+        client = HttpClient(session=session, per_host_limit=2)
+        threads = [threading.Thread(target=client.get, args=(f"https://example.com/{i}",)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(session.requests), 8)
+        self.assertLessEqual(session.peak, 2)
+
+    def test_timeout_passed_to_session(self):
+        session = FakeSession([])
+        client = HttpClient(session=session, timeout=(1, 2))
+        client.get("https://example.com/a")
+        client.get("https://example.com/b", timeout=7)
+        self.assertEqual(session.requests[0][2], (1, 2))
+        self.assertEqual(session.requests[1][2], 7)
+
+if __name__ == '__main__':
+    unittest.main()
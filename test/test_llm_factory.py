@@ -37,5 +37,18 @@ class TestLLMFactory(unittest.TestCase):
         self.assertIsInstance(provider, AnthropicProvider)
         self.assertEqual(provider.model_name, "test-model")
 
+    def test_provider_chain_entries(self):
+        self.config_data["llm_fallbacks"] = [
+            {"llm_provider": "anthropic", "model_name": "claude-x", "api_key": "other_key"},
+            {"model_name": "backup-model"},
+            "ignored",
+        ]
+        self.config_data["llm_max_retries"] = 5
+        chain = LLMFactory.create_provider_chain(self.mock_config)
+        self.assertEqual([(e["provider"], e["model"]) for e in chain.entries],
+                         [("openai", "test-model"), ("anthropic", "claude-x"), ("openai", "backup-model")])
+        self.assertEqual(chain.max_retries, 5)
+        self.assertEqual(chain.model_name, "test-model")
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,49 @@
+import os
+import sys
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.llm.usage import UsageMeter, add_usage
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+class TestUsageMeter(unittest.TestCase):
+    def test_timing_and_throughput(self):
+        clock = FakeClock()
+        meter = UsageMeter(clock=clock)
+        clock.now = 100.5
+        meter.mark_token()
+        clock.now = 101.0
+        meter.mark_token() # only the first token counts for ttft
+        meter.update(prompt_tokens=1000, completion_tokens=200, cached_tokens=512)
+        clock.now = 102.5
+        chunk = meter.chunk()
+        self.assertEqual(chunk["type"], "usage")
+        self.assertAlmostEqual(chunk["ttft"], 0.5)
+        self.assertAlmostEqual(chunk["duration"], 2.5)
+        self.assertAlmostEqual(chunk["tokens_per_sec"], 100.0)
+        self.assertEqual(chunk["cached_tokens"], 512)
+        self.assertIsNone(chunk["reasoning_tokens"])
+
+    def test_unreported_usage(self):
+        chunk = UsageMeter().chunk()
+        self.assertIsNone(chunk["completion_tokens"])
+        self.assertIsNone(chunk["tokens_per_sec"])
+        self.assertIsNone(chunk["ttft"])
+
+    def test_add_usage_skips_unknown(self):
+        totals = add_usage({}, {"prompt_tokens": 10, "completion_tokens": None})
+        add_usage(totals, {"prompt_tokens": 5, "completion_tokens": 3, "reasoning_tokens": 1})
+        self.assertEqual(totals["prompt_tokens"], 15)
+        self.assertEqual(totals["completion_tokens"], 3)
+        self.assertEqual(totals["reasoning_tokens"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
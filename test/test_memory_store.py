@@ -0,0 +1,139 @@
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+import importlib.util
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import memory_store
+from core.memory_store import MemoryStore, parse_memories, get_memory_store
+from core.prompt_builder import load_memories, last_user_text, build_system_prompt, split_stable_prefix
+
+spec = importlib.util.spec_from_file_location(
+    "memory_manager_impl",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "skills", "memory-manager", "impl.py"),
+)
+impl = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(impl)
+
+LEGACY = """# 用户偏好
+- 回答使用中文
+- 代码风格：4 空格缩进
+
+# 项目
+1. 数据库使用 PostgreSQL 15，
+   部署在内网服务器
+说明段落一行
+"""
+
+class FakeConfig:
+    def __init__(self, history_dir, **values):
+        self.history_dir = history_dir
+        self.values = values
+
+    def get_chat_history_dir(self):
+        return self.history_dir
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+class TestMemoryStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp, "chat_history.sqlite")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_parse(self):
+        self.assertEqual(parse_memories(LEGACY), [
+            ("# 用户偏好", "回答使用中文"),
+            ("# 用户偏好", "代码风格：4 空格缩进"),
+            ("# 项目", "数据库使用 PostgreSQL 15，\n部署在内网服务器\n说明段落一行"),
+        ])
+
+    def test_imports_legacy_file_once(self):
+        legacy = os.path.join(self.tmp, "memories.md")
+        with open(legacy, "w", encoding="utf-8") as f:
+            f.write(LEGACY)
+        store = MemoryStore(self.db_path, legacy_path=legacy)
+        self.assertEqual(len(store.rows()), 3)
+        self.assertFalse(os.path.exists(legacy))
+        self.assertTrue(os.path.exists(legacy + ".bak"))
+        text = store.read()
+        self.assertTrue(text.startswith("# 用户偏好\n- 回答使用中文"))
+        self.assertIn("\n\n# 项目\n- 数据库使用", text)
+        # A memories.md written later (e.g. by an older version) is not imported again
+        with open(legacy, "w", encoding="utf-8") as f:
+            f.write("- other")
+        self.assertEqual(len(MemoryStore(self.db_path, legacy_path=legacy).rows()), 3)
+
+    def test_append_dedupes_and_replace(self):
+        store = MemoryStore(self.db_path)
+        self.assertEqual(len(store.add("- likes tea\n- uses vim")), 2)
+        self.assertEqual(store.add("- Likes  tea"), [])
+        self.assertEqual(len(store.rows()), 2)
+        store.replace("- only this")
+        self.assertEqual(store.read(), "- only this")
+
+    def test_select_all_when_within_budget(self):
+        store = MemoryStore(self.db_path)
+        store.add("- a\n- b\n- c")
+        self.assertEqual([r["content"] for r in store.select("anything", budget_tokens=100)], ["a", "b", "c"])
+
+    def test_select_relevant_within_budget(self):
+        store = MemoryStore(self.db_path)
+        store.add("- 数据库使用 PostgreSQL 15，部署在内网服务器\n"
+                  "- 用户喜欢喝茶\n"
+                  "- 季度销售报表每月五号发送\n"
+                  "- 回答使用中文")
+        chosen = store.select("数据库迁移到新的服务器", budget_tokens=12, top_k=5)
+        self.assertEqual(chosen[0]["content"], "数据库使用 PostgreSQL 15，部署在内网服务器")
+        self.assertLessEqual(sum(len(r["content"]) // 4 + 1 for r in chosen), 12)
+        self.assertEqual(len(store.select("数据库", budget_tokens=12, top_k=1)), 1)
+
+    def test_prompt_and_skill_front_ends(self):
+        config = FakeConfig(self.tmp, memory_budget_tokens=5, memory_top_k=1)
+        context = {"config_manager": config}
+        self.assertEqual(impl.read_memories(_context=context), "")
+        self.assertEqual(impl.write_memories("- 数据库使用 PostgreSQL\n- 用户喜欢喝茶", _context=context), "OK")
+        self.assertEqual(impl.write_memories("- 回答使用中文", _context=context), "OK")
+        self.assertEqual(impl.read_memories(_context=context).count("\n- "), 2)
+        self.assertEqual(impl.read_memories(query="喝茶", limit=1, _context=context), "- 用户喜欢喝茶")
+
+        messages = [{"role": "user", "content": "喝什么茶"}, {"role": "assistant", "content": "..."}]
+        self.assertEqual(last_user_text(messages), "喝什么茶")
+        # Over budget: the selection depends on the question, so it goes after the stable prefix
+        self.assertEqual(load_memories(config, last_user_text(messages)), ("", "- 用户喜欢喝茶"))
+        prompt = build_system_prompt("/ws", {}, session_memories_text="- 用户喜欢喝茶")
+        stable, session = split_stable_prefix(prompt)
+        self.assertNotIn("喝茶", stable)
+        self.assertIn("- 用户喜欢喝茶", session)
+        # Within budget: every memory, in the stable prefix
+        config.values["memory_budget_tokens"] = 1000
+        stable_text, per_query = load_memories(config, "喝什么茶")
+        self.assertEqual((stable_text.count("- "), per_query), (3, ""))
+        self.assertIs(get_memory_store(config), get_memory_store(config))
+
+    def test_connections_are_closed(self):
+        opened = []
+        real_connect = sqlite3.connect
+        def connect(*args, **kwargs):
+            opened.append(real_connect(*args, **kwargs))
+            return opened[-1]
+        with mock.patch.object(memory_store.sqlite3, "connect", side_effect=connect):
+            store = MemoryStore(self.db_path)
+            store.add("- 回答使用中文")
+            store.select("中文", budget_tokens=1)
+        self.assertTrue(opened)
+        for conn in opened:
+            with self.assertRaises(sqlite3.ProgrammingError):
+                conn.execute("SELECT 1")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,6 +9,7 @@ from unittest.mock import MagicMock
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from core.skill_manager import SkillManager
+from core.experience_store import ExperienceStore
 
 class TestMetaTools(unittest.TestCase):
     def setUp(self):
@@ -26,7 +27,8 @@ class TestMetaTools(unittest.TestCase):
             f.write("---\nname: test-skill\ndescription: A test skill\n---\n# Test Skill\n\nOriginal content.")
             
         # Initialize SkillManager
-        self.sm = SkillManager(workspace_dir=self.temp_dir)
+        self.store = ExperienceStore(os.path.join(self.temp_dir, "experiences.sqlite"))
+        self.sm = SkillManager(workspace_dir=self.temp_dir, experience_store=self.store)
         # Force override skills_dirs for testing
         self.sm.skills_dirs = [self.skills_dir]
         self.sm.load_skills()
@@ -40,22 +42,24 @@ class TestMetaTools(unittest.TestCase):
         success, msg = self.sm.update_skill_experience(self.skill_name, new_exp)
         self.assertTrue(success, msg)
         
-        # 2. Verify file content
+        # 2. Stored in the experience store, SKILL.md is left alone
+        self.assertEqual([e["text"] for e in self.store.list(self.skill_name)], [new_exp])
         with open(self.skill_md_path, "r", encoding='utf-8') as f:
-            content = f.read()
+            self.assertNotIn("experience:", f.read())
         
-        print(f"DEBUG: Content after update:\n{content}")
-        self.assertIn("experience: [\"Use absolute paths.\"]", content)
-        
-        # 3. Add another experience
+        # 3. Add another experience; the same lesson reworded in case and punctuation only reinforces the first
         success, msg = self.sm.update_skill_experience(self.skill_name, "Another tip.")
         self.assertTrue(success, msg)
+        success, msg = self.sm.update_skill_experience(self.skill_name, "use absolute paths")
+        self.assertTrue(success, msg)
         
-        with open(self.skill_md_path, "r", encoding='utf-8') as f:
-            content = f.read()
-            
-        print(f"DEBUG: Content after 2nd update:\n{content}")
-        self.assertIn("experience: [\"Use absolute paths.\", \"Another tip.\"]", content)
+        experiences = self.store.list(self.skill_name)
+        self.assertEqual([e["text"] for e in experiences], [new_exp, "Another tip."])
+        self.assertEqual(experiences[0]["hits"], 2)
+
+        # 4. Injected into the prompt after reload
+        self.sm.load_skills()
+        self.assertIn("- Another tip.", self.sm.skill_prompt_map[self.skill_name])
 
     def test_load_experience_into_prompt(self):
         # 1. Manually write experience to file
@@ -75,5 +79,27 @@ class TestMetaTools(unittest.TestCase):
         
         self.assertTrue(found, "Experience not injected into skill prompts")
 
+    def test_experience_budget_and_use(self):
+        tools = ["pandas", "openpyxl", "csv", "python-docx", "python-pptx", "pypdf"]
+        lessons = [f"Lesson {i}: when {tools[i % 6]} fails on file {i}, check the encoding, the sheet "
+                   f"or page range and the output path before retrying." for i in range(30)]
+        self.assertEqual(self.store.add(self.skill_name, lessons), 30)
+        self.sm.load_skills()
+        prompt = self.sm.skill_prompt_map[self.skill_name]
+        injected = prompt.split("previous executions:\n", 1)[1]
+        # Default budget of 300 tokens at ~4 characters per token
+        self.assertLessEqual(len(injected), 300 * 4 + 30)
+        self.assertIn("Lesson", injected)
+
+        ids = self.sm.injected_experience[self.skill_name]
+        # Only part of the 30 lessons fits the budget
+        self.assertTrue(1 < len(ids) < 30)
+        self.sm.tools["echo"] = lambda: "ok"
+        self.sm.tool_to_skill_map["echo"] = self.skill_name
+        self.sm.call_tool("echo", {})
+        self.sm.call_tool("echo", {})
+        uses = {e["id"]: e["uses"] for e in self.store.list(self.skill_name)}
+        self.assertTrue(all(uses[i] == 1 for i in ids))
+
 if __name__ == "__main__":
     unittest.main()
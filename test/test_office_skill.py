@@ -47,8 +47,31 @@ def test_office_skill():
     content = impl.read_file(workspace_dir, "test.xlsx")
     print(f"Read Excel (via read_file): \n{content}")
     assert "Alice" in content
+    # Paged read returns a bounded chunk with a continuation cursor
+    content = impl.read_excel(workspace_dir, "test.xlsx", start_row=1, max_rows=2)
+    print(f"Read Excel (rows 1-2): \n{content}")
+    assert "Alice" in content and "Bob" not in content
+    assert "start_row=3" in content
+    content = impl.read_excel(workspace_dir, "test.xlsx", start_row=3, max_rows=2)
+    assert "Bob" in content and "To continue" not in content
 
-    # 4. Plain Text
+    # Chunked writing through a stream cursor
+    res = impl.start_excel_stream(workspace_dir, "stream.xlsx", header=["id", "value"])
+    cursor = res.split("cursor=")[1].split()[0]
+    for chunk in range(3):
+        impl.append_excel_rows(cursor, [[chunk * 100 + i, f"v{i}"] for i in range(100)])
+    res = impl.finish_excel_stream(cursor)
+    print(f"Stream Excel: {res}")
+    assert "301 rows" in res
+    content = impl.read_excel(workspace_dir, "stream.xlsx", start_row=301, max_rows=5)
+    assert "299" in content
+
+    # 4. PPTX paging
+    content = impl.read_pptx(workspace_dir, "test.pptx", start_slide=2, max_slides=1)
+    print(f"Read PPTX (slide 2): {content}")
+    assert "Title 2" in content and "Title 1" not in content
+
+    # 5. Plain Text
     print("\nTesting Plain Text...")
     txt_path = os.path.join(workspace_dir, "test.txt")
     with open(txt_path, 'w') as f:
@@ -61,5 +84,106 @@ def test_office_skill():
     # shutil.rmtree(workspace_dir)
     print("\nTest Complete.")
 
+class GodModeConfig:
+    def get_god_mode(self):
+        return True
+
+    def get(self, key, default=None):
+        return default
+
+def test_write_excel_keeps_formatting():
+    import openpyxl
+    from openpyxl.styles import Font
+    workspace_dir = os.path.abspath("test_workspace_excel")
+    shutil.rmtree(workspace_dir, ignore_errors=True)
+    os.makedirs(workspace_dir)
+    try:
+        path = os.path.join(workspace_dir, "styled.xlsx")
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.title = "Report"
+        ws.append(["Title", None])
+        ws["A1"].font = Font(bold=True)
+        ws.merge_cells("A1:B1")
+        ws.column_dimensions["A"].width = 40
+        wb.save(path)
+
+        # Small files are edited in place: formatting of every sheet survives
+        assert impl.write_excel(workspace_dir, "styled.xlsx", [["x", 1]], sheet_name="Data") == "Success: Written to 'styled.xlsx'."
+        assert impl.write_excel(workspace_dir, "styled.xlsx", [["y", 2]], sheet_name="Report", mode="a").startswith("Success")
+        wb = openpyxl.load_workbook(path)
+        assert wb["Report"]["A1"].font.bold
+        assert "A1:B1" in [str(r) for r in wb["Report"].merged_cells.ranges]
+        assert wb["Report"].column_dimensions["A"].width == 40
+        assert [c.value for c in wb["Report"][2]] == ["y", 2]
+
+        # Opting in to the streamed copy keeps values only
+        res = impl.write_excel(workspace_dir, "styled.xlsx", [["z", 3]], sheet_name="Data", mode="a", stream=True)
+        assert "cell values only" in res
+        wb = openpyxl.load_workbook(path)
+        assert [[c.value for c in row] for row in wb["Data"].iter_rows()] == [["x", 1], ["z", 3]]
+        assert not wb["Report"]["A1"].font.bold
+    finally:
+        shutil.rmtree(workspace_dir, ignore_errors=True)
+
+def test_paged_readers_out_of_range():
+    workspace_dir = os.path.abspath("test_workspace_range")
+    shutil.rmtree(workspace_dir, ignore_errors=True)
+    os.makedirs(workspace_dir)
+    try:
+        from pypdf import PdfWriter
+        writer = PdfWriter()
+        writer.add_blank_page(width=72, height=72)
+        with open(os.path.join(workspace_dir, "one.pdf"), "wb") as f:
+            writer.write(f)
+        impl.write_docx(workspace_dir, "two.docx", "first\nsecond")
+        impl.create_pptx(workspace_dir, "one.pptx", [{"title": "Only", "content": "slide"}])
+        impl.write_excel(workspace_dir, "three.xlsx", [["a"], ["b"], ["c"]])
+
+        # Every paged reader reports a start past the end the same way, with the total
+        assert impl.read_docx(workspace_dir, "two.docx", start_paragraph=5) == \
+            "Error: start_paragraph 5 is beyond the last paragraph (2)."
+        assert impl.read_pptx(workspace_dir, "one.pptx", start_slide=3) == \
+            "Error: start_slide 3 is beyond the last slide (1)."
+        assert impl.read_pdf(workspace_dir, "one.pdf", start_page=2) == \
+            "Error: start_page 2 is beyond the last page (1)."
+        assert impl.read_excel(workspace_dir, "three.xlsx", start_row=9) == \
+            "Error: start_row 9 is beyond the last row (3)."
+        # The last item itself is still readable
+        assert impl.read_docx(workspace_dir, "two.docx", start_paragraph=2) == "second"
+    finally:
+        shutil.rmtree(workspace_dir, ignore_errors=True)
+
+def test_read_file_passes_context():
+    workspace_dir = os.path.abspath("test_workspace")
+    outside_dir = os.path.abspath("test_outside")
+    for d in (workspace_dir, outside_dir):
+        os.makedirs(d, exist_ok=True)
+    context = {"config_manager": GodModeConfig()}
+
+    # An absolute path outside the workspace is only allowed with the context's God Mode
+    impl.write_docx(outside_dir, "outside.docx", "Outside the workspace")
+    outside = os.path.join(outside_dir, "outside.docx")
+    assert "Path Traversal" in impl.read_file(workspace_dir, outside)
+    assert "Outside the workspace" in impl.read_file(workspace_dir, outside, _context=context)
+
+    slides = [{"title": "Outside slide", "content": "Content"}]
+    impl.create_pptx(outside_dir, "outside.pptx", slides)
+    content = impl.read_file(workspace_dir, os.path.join(outside_dir, "outside.pptx"), _context=context)
+    assert "Outside slide" in content
+
+    # Readers get the context as a keyword, never in their start position slot
+    calls = []
+    original = impl.read_pdf
+    impl.read_pdf = lambda workspace_dir, path, start_page=1, max_pages=20, _context=None: calls.append(
+        (start_page, _context)) or ""
+    try:
+        impl.read_file(workspace_dir, "report.pdf", _context=context)
+    finally:
+        impl.read_pdf = original
+    assert calls == [(1, context)]
+    shutil.rmtree(outside_dir, ignore_errors=True)
+
 if __name__ == "__main__":
     test_office_skill()
+    test_read_file_passes_context()
@@ -0,0 +1,50 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+import importlib.util
+
+# Add project root and this directory (for the synthetic PDF writer) to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core import pdf_extract
+from bench_pdf_extract import write_synthetic_pdf
+
+class TestPdfExtract(unittest.TestCase):
+    def test_small_jobs_stay_in_process(self):
+        self.assertEqual(pdf_extract.choose_worker_count(5, cpu_count=16), 1)
+        # read_pdf's default window of 20 pages never starts a pool
+        self.assertEqual(pdf_extract.choose_worker_count(20, cpu_count=16), 1)
+        self.assertEqual(pdf_extract.choose_worker_count(1000, cpu_count=1), 1)
+
+    def test_worker_count_bounded_by_cores_and_pages(self):
+        self.assertEqual(pdf_extract.choose_worker_count(1000, cpu_count=4), 4)
+        self.assertEqual(pdf_extract.choose_worker_count(1000, cpu_count=64), pdf_extract.MAX_WORKERS)
+        self.assertEqual(pdf_extract.choose_worker_count(20, cpu_count=16, min_pages=16), 3)
+
+    def test_split_runs_preserves_all_pages_in_order(self):
+        pages = list(range(5, 105))
+        runs = pdf_extract._split_runs(pages, 8)
+        self.assertLessEqual(len(runs), 8)
+        self.assertEqual([p for run in runs for p in run], pages)
+
+    @unittest.skipUnless(importlib.util.find_spec("pypdf"), "pypdf is not installed")
+    def test_extract_pages_keeps_page_order(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp_dir, "doc.pdf")
+            write_synthetic_pdf(path, 12, lines_per_page=2)
+            pages = [9, 2, 5, 12, 1, 7, 3]
+            sequential = pdf_extract.extract_pages(path, pages, workers=1)
+            parallel = pdf_extract.extract_pages(path, pages, workers=2)
+            self.assertEqual(list(parallel), sorted(pages))
+            self.assertEqual(parallel, sequential)
+            for n, text in parallel.items():
+                self.assertIn(f"Page {n} line 0", text)
+        finally:
+            shutil.rmtree(temp_dir)
+
+if __name__ == "__main__":
+    unittest.main()
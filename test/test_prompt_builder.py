@@ -0,0 +1,77 @@
+import os
+import sys
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.prompt_builder import build_system_prompt, split_stable_prefix, stable_tools
+from core.llm.providers import AnthropicProvider, OpenAIProvider
+
+def tool(name):
+    return {"type": "function", "function": {"name": name, "description": name, "parameters": {}}}
+
+class TestPromptBuilder(unittest.TestCase):
+    def test_prefix_stable_across_time_and_skill_order(self):
+        a = build_system_prompt("/ws", {"b-skill": "B", "a-skill": "A"}, memories_text="likes tea",
+                                now=datetime(2024, 1, 1, 9, 0, 0))
+        b = build_system_prompt("/ws", {"a-skill": "A", "b-skill": "B"}, memories_text="likes tea",
+                                now=datetime(2024, 1, 2, 17, 30, 5))
+        self.assertNotEqual(a, b)
+        stable_a, session_a = split_stable_prefix(a)
+        stable_b, session_b = split_stable_prefix(b)
+        self.assertEqual(stable_a, stable_b)
+        self.assertLess(stable_a.index("A"), stable_a.index("B"))
+        self.assertIn("2024-01-01 09:00:00", session_a)
+        self.assertNotIn("2024", stable_a)
+        self.assertTrue(a.endswith(session_a.split("\n", 1)[1]))
+
+    def test_agent_id_is_volatile(self):
+        prompt = build_system_prompt("/ws", {}, parent_agent_id="Agent-3")
+        stable, session = split_stable_prefix(prompt)
+        self.assertNotIn("Agent-3", stable)
+        self.assertIn("Agent-3", session)
+
+    def test_split_without_session(self):
+        self.assertEqual(split_stable_prefix("plain prompt"), ("plain prompt", ""))
+
+    def test_stable_tools(self):
+        tools = [tool("read_file"), tool("bash"), tool("grep")]
+        self.assertEqual([t["function"]["name"] for t in stable_tools(tools)], ["bash", "grep", "read_file"])
+        self.assertIsNone(stable_tools(None))
+
+class TestProviderCaching(unittest.TestCase):
+    def test_anthropic_breakpoints(self):
+        provider = object.__new__(AnthropicProvider)
+        system = build_system_prompt("/ws", {"s": "skill text"})
+        blocks = provider._system_blocks(system)
+        self.assertEqual(len(blocks), 2)
+        self.assertEqual(blocks[0]["cache_control"], {"type": "ephemeral"})
+        self.assertNotIn("cache_control", blocks[1])
+        self.assertTrue(blocks[1]["text"].startswith("# Session"))
+
+        messages = [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "yo"},
+                    {"role": "user", "content": [{"type": "tool_result", "tool_use_id": "t1", "content": "ok"}]}]
+        provider._mark_last_message(messages)
+        self.assertEqual(messages[-1]["content"][-1]["cache_control"], {"type": "ephemeral"})
+        self.assertEqual(messages[0]["content"], "hi")
+
+        messages = [{"role": "user", "content": "question"}]
+        provider._mark_last_message(messages)
+        self.assertEqual(messages[0]["content"], [{"type": "text", "text": "question", "cache_control": {"type": "ephemeral"}}])
+
+    def test_openai_usage_reports_cache_hits(self):
+        provider = object.__new__(OpenAIProvider)
+        openai_usage = SimpleNamespace(prompt_tokens=1200, completion_tokens=50,
+                                       prompt_tokens_details=SimpleNamespace(cached_tokens=1024))
+        deepseek_usage = SimpleNamespace(prompt_tokens=900, completion_tokens=20, prompt_tokens_details=None,
+                                         prompt_cache_hit_tokens=768, prompt_cache_miss_tokens=132)
+        self.assertEqual(provider._usage_counts(openai_usage)["cached_tokens"], 1024)
+        chunk = provider._usage_counts(deepseek_usage)
+        self.assertEqual(chunk["cached_tokens"], 768)
+        self.assertEqual(chunk["prompt_tokens"], 900)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import sys
+import json
+import asyncio
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from provider_fixtures import (SCENARIOS, parse_sse, provider_classes, wire_format, make_provider,
+                               expected_chunks, normalize, TIMING_FIELDS)
+from core.llm.providers import AnthropicProvider
+
+class TestProviderConformance(unittest.TestCase):
+    def test_every_provider_has_a_wire_format(self):
+        for cls in provider_classes():
+            self.assertIsNotNone(wire_format(cls), f"{cls.__name__} has no recorded fixtures")
+
+    def test_replayed_streams_normalize_identically(self):
+        for cls in provider_classes():
+            wire = wire_format(cls)
+            for name, scenario in SCENARIOS.items():
+                with self.subTest(provider=cls.__name__, scenario=name):
+                    provider = make_provider(cls, parse_sse(scenario[wire]))
+                    chunks = list(provider.chat_stream([{"role": "user", "content": "hi"}]))
+                    self.assertEqual(normalize(chunks), expected_chunks(scenario, wire))
+                    for field in TIMING_FIELDS:
+                        self.assertIn(field, chunks[-1])
+
+    def test_async_streams_match_sync(self):
+        async def collect(provider):
+            return [chunk async for chunk in provider.achat_stream([{"role": "user", "content": "hi"}])]
+
+        for cls in provider_classes():
+            wire = wire_format(cls)
+            for name, scenario in SCENARIOS.items():
+                with self.subTest(provider=cls.__name__, scenario=name):
+                    provider = make_provider(cls, parse_sse(scenario[wire]))
+                    chunks = asyncio.run(collect(provider))
+                    self.assertEqual(normalize(chunks), expected_chunks(scenario, wire))
+                    self.assertEqual(len(provider.async_client.requests), 1)
+                    self.assertEqual(provider.client.requests, [])
+
+    def test_tool_arguments_reassemble(self):
+        for cls in provider_classes():
+            wire = wire_format(cls)
+            provider = make_provider(cls, parse_sse(SCENARIOS["text_then_two_tools"][wire]))
+            calls = {}
+            for chunk in provider.chat_stream([{"role": "user", "content": "hi"}]):
+                if chunk["type"] == "tool_call":
+                    call = calls.setdefault(chunk["index"], {"id": chunk["id"], "name": chunk["function"]["name"], "arguments": ""})
+                    call["arguments"] += chunk["function"]["arguments"]
+            self.assertEqual([c["name"] for c in calls.values()], ["read_file", "list_files"])
+            self.assertEqual(json.loads(calls[0]["arguments"]), {"path": "a.txt"})
+            self.assertEqual(json.loads(calls[1]["arguments"]), {})
+
+    def test_anthropic_request_uses_raw_stream(self):
+        provider = make_provider(AnthropicProvider, parse_sse(SCENARIOS["text_then_two_tools"]["anthropic"]))
+        tools = [{"type": "function", "function": {"name": "read_file", "description": "", "parameters": {}}}]
+        list(provider.chat_stream([{"role": "system", "content": "sys"}, {"role": "user", "content": "hi"}], tools=tools))
+        request = provider.client.requests[0]
+        self.assertTrue(request["stream"])
+        self.assertEqual(request["tools"][0]["name"], "read_file")
+
+    def test_stream_errors_become_error_chunks(self):
+        events = parse_sse('data: {"type":"error","error":{"type":"overloaded_error","message":"Overloaded"}}')
+        chunks = list(make_provider(AnthropicProvider, events).chat_stream([{"role": "user", "content": "hi"}]))
+        self.assertEqual(len(chunks), 1)
+        self.assertEqual(chunks[0]["type"], "error")
+        self.assertEqual(chunks[0]["content"], "Overloaded")
+        self.assertEqual(chunks[0]["status_code"], 529)
+
+    def test_history_tool_call_without_arguments(self):
+        provider = make_provider(AnthropicProvider, [])
+        _, api_messages = provider._prepare_messages([
+            {"role": "assistant", "content": "", "tool_calls": [
+                {"id": "t1", "type": "function", "function": {"name": "list_files", "arguments": ""}}]},
+        ])
+        self.assertEqual(api_messages[0]["content"][0]["input"], {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+import os
+import sys
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.llm.providers import LLMProvider, error_chunk, parse_retry_after
+from core.llm.resilient import ResilientProvider, is_retryable
+
+USAGE = {"type": "usage", "prompt_tokens": 10, "completion_tokens": 2}
+
+def error(message, status=None, retry_after=None):
+    return {"type": "error", "content": message, "status_code": status, "retry_after": retry_after, "retryable": False}
+
+class ScriptedProvider(LLMProvider):
+    """Replays one scripted chunk list per call; an Exception entry is raised mid-stream."""
+
+    def __init__(self, *scripts):
+        self.scripts = list(scripts)
+        self.calls = 0
+
+    def chat_stream(self, messages, tools=None):
+        script = self.scripts[min(self.calls, len(self.scripts) - 1)]
+        self.calls += 1
+        for chunk in script:
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+
+class FakeTime:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+def entry(name, provider):
+    return {"provider": name, "model": name + "-model", "create": lambda: provider}
+
+class TestResilientProvider(unittest.TestCase):
+    def setUp(self):
+        self.time = FakeTime()
+
+    def chain(self, *entries, **kwargs):
+        return ResilientProvider(list(entries), sleep=self.time.sleep, clock=self.time.clock,
+                                 rng=lambda: 1.0, **kwargs)
+
+    def run_chain(self, chain):
+        chunks = list(chain.chat_stream([{"role": "user", "content": "hi"}]))
+        attempts = [c for c in chunks if c["type"] == "attempt"]
+        return [c for c in chunks if c["type"] != "attempt"], attempts
+
+    def test_retries_transient_error_with_backoff(self):
+        primary = ScriptedProvider([error("Error code: 503", status=503)], [{"type": "content", "content": "ok"}, USAGE])
+        chunks, attempts = self.run_chain(self.chain(entry("openai", primary), base_delay=1.0))
+        self.assertEqual([c["type"] for c in chunks], ["content", "usage"])
+        self.assertEqual(chunks[-1]["provider"], "openai")
+        self.assertEqual([a["outcome"] for a in attempts], ["retry", "ok"])
+        self.assertEqual(attempts[0]["status_code"], 503)
+        self.assertAlmostEqual(sum(self.time.sleeps), 1.0)
+
+    def test_honours_retry_after(self):
+        primary = ScriptedProvider([error("rate limited", status=429, retry_after=7.0)], [USAGE])
+        _, attempts = self.run_chain(self.chain(entry("openai", primary)))
+        self.assertEqual(attempts[0]["delay"], 7.0)
+        self.assertAlmostEqual(sum(self.time.sleeps), 7.0)
+
+    def test_long_retry_after_fails_over(self):
+        primary = ScriptedProvider([error("rate limited", status=429, retry_after=3600)])
+        backup = ScriptedProvider([{"type": "content", "content": "from backup"}, USAGE])
+        chunks, attempts = self.run_chain(self.chain(entry("openai", primary), entry("anthropic", backup)))
+        self.assertEqual(chunks[0]["content"], "from backup")
+        self.assertEqual(chunks[-1]["model"], "anthropic-model")
+        self.assertEqual([a["outcome"] for a in attempts], ["failover", "ok"])
+        self.assertEqual(self.time.sleeps, [])
+
+    def test_non_retryable_error_fails_over_immediately(self):
+        primary = ScriptedProvider([error("Error code: 401 - invalid key", status=401)])
+        backup = ScriptedProvider([USAGE])
+        _, attempts = self.run_chain(self.chain(entry("openai", primary), entry("moonshot", backup)))
+        self.assertEqual(primary.calls, 1)
+        self.assertEqual([a["outcome"] for a in attempts], ["failover", "ok"])
+
+    def test_dropped_stream_before_first_token_is_resumed(self):
+        primary = ScriptedProvider([ConnectionResetError("connection reset by peer")], [{"type": "content", "content": "hi"}, USAGE])
+        chunks, attempts = self.run_chain(self.chain(entry("openai", primary)))
+        self.assertEqual([c["type"] for c in chunks], ["content", "usage"])
+        self.assertEqual([a["outcome"] for a in attempts], ["retry", "ok"])
+
+    def test_error_after_output_is_passed_on(self):
+        primary = ScriptedProvider([{"type": "content", "content": "partial"}, error("Error code: 502", status=502)])
+        backup = ScriptedProvider([USAGE])
+        chunks, attempts = self.run_chain(self.chain(entry("openai", primary), entry("anthropic", backup)))
+        self.assertEqual([c["type"] for c in chunks], ["content", "error"])
+        self.assertEqual([a["outcome"] for a in attempts], ["failed"])
+        self.assertEqual(backup.calls, 0)
+
+    def test_all_providers_exhausted(self):
+        primary = ScriptedProvider([error("Error code: 500", status=500)])
+        backup = ScriptedProvider([error("Error code: 529", status=529)])
+        chunks, attempts = self.run_chain(self.chain(entry("openai", primary), entry("anthropic", backup), max_retries=1))
+        self.assertEqual(chunks[-1]["status_code"], 529)
+        self.assertEqual([a["outcome"] for a in attempts], ["retry", "failover", "retry", "failed"])
+
+    def test_stop_interrupts_backoff(self):
+        stopped = []
+        primary = ScriptedProvider([error("overloaded", status=529, retry_after=30)], [USAGE])
+        chain = self.chain(entry("openai", primary), should_stop=lambda: bool(stopped))
+        stream = chain.chat_stream([])
+        self.assertEqual(next(stream)["outcome"], "retry")
+        stopped.append(True)
+        self.assertEqual(next(stream)["type"], "error")
+        self.assertEqual(primary.calls, 1)
+
+    def test_lazy_creation_failure_fails_over(self):
+        def broken():
+            raise ImportError("No module named 'anthropic'")
+        chain = self.chain({"provider": "anthropic", "model": "m", "create": broken}, entry("openai", ScriptedProvider([USAGE])))
+        chunks, attempts = self.run_chain(chain)
+        self.assertEqual(chunks[-1]["provider"], "openai")
+        self.assertEqual(attempts[0]["outcome"], "failover")
+
+    def test_async_retry_and_failover(self):
+        primary = ScriptedProvider([error("Error code: 503", status=503)], [error("Error code: 503", status=503)])
+        backup = ScriptedProvider([{"type": "content", "content": "from backup"}, USAGE])
+        chain = ResilientProvider([entry("openai", primary), entry("anthropic", backup)], max_retries=1,
+                                  base_delay=0.001, rng=lambda: 1.0)
+
+        async def collect():
+            return [c async for c in chain.achat_stream([])]
+
+        chunks = asyncio.run(collect())
+        self.assertEqual([c["outcome"] for c in chunks if c["type"] == "attempt"], ["retry", "failover", "ok"])
+        self.assertEqual(chunks[-2]["provider"], "anthropic")
+
+class TestErrorChunks(unittest.TestCase):
+    def test_status_and_retry_after_from_sdk_error(self):
+        class RateLimitError(Exception):
+            status_code = 429
+            response = SimpleNamespace(status_code=429, headers={"retry-after": "12"})
+        chunk = error_chunk(RateLimitError("Error code: 429"))
+        self.assertEqual((chunk["status_code"], chunk["retry_after"]), (429, 12.0))
+        self.assertTrue(is_retryable(chunk))
+
+    def test_connection_errors_are_retryable(self):
+        class APIConnectionError(Exception):
+            pass
+        self.assertTrue(is_retryable(error_chunk(APIConnectionError("Connection error."))))
+        self.assertFalse(is_retryable(error_chunk(ValueError("bad request body"))))
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after({"retry-after-ms": "1500"}), 1.5)
+        self.assertIsNone(parse_retry_after({}))
+        self.assertEqual(parse_retry_after({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}), 0.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import os
+import sys
+import time
+import unittest
+from unittest import mock
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import search_race
+from core.search_race import SearchRace, EngineStats, make_local_engine, merge_results, normalize_url
+
+def fake_engine(results, delay=0.0, error=None):
+    calls = []
+    def engine(query, max_results=5):
+        calls.append(query)
+        time.sleep(delay)
+        if error:
+            raise RuntimeError(error)
+        return results[:max_results]
+    engine.calls = calls
+    return engine
+
+def doc(url, title="t"):
+    return {"title": title, "href": url, "body": ""}
+
+class TestSearchRace(unittest.TestCase):
+    def test_race_returns_first_good_result(self):
+        race = SearchRace()
+        race.register("slow", fake_engine([doc("https://slow.example/")], delay=0.5))
+        race.register("fast", fake_engine([doc("https://fast.example/")], delay=0.01))
+        start = time.perf_counter()
+        results, info = race.search("q", mode="race", hedge_delay=0.0)
+        self.assertLess(time.perf_counter() - start, 0.4)
+        self.assertEqual(info["engines"], ["fast"])
+        self.assertEqual(results[0]["href"], "https://fast.example/")
+
+    def test_failure_starts_next_engine_without_waiting_for_hedge(self):
+        race = SearchRace()
+        race.register("broken", fake_engine([], error="rate limited"))
+        race.register("backup", fake_engine([doc("https://b.example/")]))
+        start = time.perf_counter()
+        results, info = race.search("q", mode="race", hedge_delay=5.0)
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(info["engines"], ["backup"])
+        self.assertIn("broken", info["errors"])
+
+    def test_hedge_delay_defers_second_engine(self):
+        race = SearchRace()
+        first = fake_engine([doc("https://a.example/")], delay=0.05)
+        second = fake_engine([doc("https://b.example/")])
+        race.register("a", first)
+        race.register("b", second)
+        results, info = race.search("q", mode="race", hedge_delay=1.0)
+        self.assertEqual(info["engines"], ["a"])
+        self.assertEqual(second.calls, [])
+
+    def test_engine_finishing_at_the_hedge_delay_still_wins(self):
+        race = SearchRace()
+        race.register("a", fake_engine([doc("https://a.example/")], delay=0.1))
+        race.register("b", fake_engine([], delay=0.3))
+        real_wait = search_race.wait
+        calls = []
+
+        def late_wait(fs, timeout=None, return_when=search_race.FIRST_COMPLETED):
+            calls.append(timeout)
+            if len(calls) == 1:
+                # 'a' finishes right after wait() timed out on the hedge delay
+                fs = set(fs)
+                real_wait(fs)
+                return set(), fs
+            return real_wait(fs, timeout=timeout, return_when=return_when)
+
+        with mock.patch.object(search_race, "wait", late_wait):
+            results, info = race.search("q", mode="race", hedge_delay=0.1)
+        self.assertEqual(info["engines"], ["a"])
+        self.assertEqual(results[0]["href"], "https://a.example/")
+
+    def test_budget_bounds_latency(self):
+        race = SearchRace()
+        race.register("stuck", fake_engine([doc("https://x.example/")], delay=1.0))
+        start = time.perf_counter()
+        results, info = race.search("q", mode="race", budget=0.1)
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertEqual(results, [])
+
+    def test_merge_dedupes_by_url(self):
+        race = SearchRace()
+        race.register("a", fake_engine([doc("https://www.site.com/page/"), doc("https://a.example/")]))
+        race.register("b", fake_engine([doc("http://site.com/page"), doc("https://b.example/")]))
+        results, info = race.search("q", max_results=10, mode="merge")
+        hrefs = [r["href"] for r in results]
+        self.assertEqual(len(hrefs), 3)
+        self.assertIn("https://a.example/", hrefs)
+        self.assertIn("https://b.example/", hrefs)
+        self.assertEqual(sorted(info["engines"]), ["a", "b"])
+
+    def test_merge_skips_engines_over_budget(self):
+        race = SearchRace()
+        race.register("fast", fake_engine([doc("https://f.example/")]))
+        race.register("slow", fake_engine([doc("https://s.example/")], delay=1.0))
+        results, info = race.search("q", mode="merge", budget=0.2)
+        self.assertEqual([r["href"] for r in results], ["https://f.example/"])
+
+    def test_stats_reorder_engines(self):
+        stats = EngineStats()
+        race = SearchRace(stats=stats)
+        race.register("flaky", fake_engine([], error="boom"))
+        race.register("steady", fake_engine([doc("https://s.example/")]))
+        for _ in range(3):
+            race.search("q", mode="race", hedge_delay=0.0)
+        time.sleep(0.05)
+        self.assertEqual(stats.rank(["flaky", "steady"]), ["steady", "flaky"])
+        self.assertGreater(stats.snapshot()["flaky"]["error_rate"], 0.5)
+
+    def test_local_engine(self):
+        engine = make_local_engine([
+            doc("https://a/", "python asyncio guide"),
+            doc("https://b/", "python"),
+            doc("https://c/", "rust"),
+        ])
+        self.assertEqual([d["href"] for d in engine("python asyncio")], ["https://a/", "https://b/"])
+
+    def test_merge_results_interleaves(self):
+        merged = merge_results([[doc("1"), doc("2")], [doc("3")]], max_results=3)
+        self.assertEqual([d["href"] for d in merged], ["1", "3", "2"])
+        self.assertEqual(normalize_url("https://WWW.Example.com/a/#frag"), "example.com/a")
+
+if __name__ == '__main__':
+    unittest.main()
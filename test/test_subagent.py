@@ -0,0 +1,70 @@
+import os
+import sys
+import json
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.subagent import SubAgentContext, estimate_tokens
+
+class FakeSkillManager:
+    def __init__(self):
+        self.tool_to_skill_map = {
+            "read_file": "file-system",
+            "grep": "system-tools",
+            "search_web": "web-search",
+            "run_python_code": "python-runner",
+            "dispatch_agents": "agent-manager",
+            "write_memories": "memory-manager",
+        }
+        self.skill_prompt_map = {skill: f"# {skill}\nGuidelines for {skill}." for skill in set(self.tool_to_skill_map.values())}
+
+    def get_tool_definitions(self):
+        return [{"type": "function", "function": {"name": name, "description": name, "parameters": {}}}
+                for name in self.tool_to_skill_map]
+
+class TestSubAgentContext(unittest.TestCase):
+    def setUp(self):
+        self.manager = FakeSkillManager()
+
+    def test_prefix_is_byte_identical_and_task_specific_parts_move_to_user_message(self):
+        a = SubAgentContext(self.manager, "/ws", role="general")
+        b = SubAgentContext(self.manager, "/ws", role="general")
+        self.assertEqual(a.system_prompt, b.system_prompt)
+        self.assertEqual(json.dumps(a.tools), json.dumps(b.tools))
+        self.assertNotIn("Agent-1", a.system_prompt)
+        message = a.task_message("Agent-1", "Summarise README")
+        self.assertEqual(message["role"], "user")
+        self.assertIn("Agent-1", message["content"])
+        self.assertIn("Summarise README", message["content"])
+
+    def test_general_role_excludes_spawning_and_memory_tools(self):
+        ctx = SubAgentContext(self.manager, "/ws", role="general")
+        self.assertNotIn("dispatch_agents", ctx.tool_allowlist)
+        self.assertNotIn("write_memories", ctx.tool_allowlist)
+        self.assertIn("search_web", ctx.tool_allowlist)
+        self.assertNotIn("# agent-manager", ctx.system_prompt)
+
+    def test_roles_trim_tools_and_prompts(self):
+        research = SubAgentContext(self.manager, "/ws", role="research")
+        coder = SubAgentContext(self.manager, "/ws", role="coder")
+        self.assertEqual(research.tool_allowlist, ["grep", "read_file", "search_web"])
+        self.assertEqual(coder.tool_allowlist, ["grep", "read_file", "run_python_code"])
+        self.assertNotIn("# web-search", coder.system_prompt)
+        self.assertIn("# python-runner", coder.system_prompt)
+        general = SubAgentContext(self.manager, "/ws", role="general")
+        self.assertLess(coder.prefix_tokens, general.prefix_tokens)
+
+    def test_prompt_size_report(self):
+        ctx = SubAgentContext(self.manager, "/ws", role="coder")
+        size = ctx.prompt_tokens("Agent-2", "x" * 400)
+        self.assertGreaterEqual(size - ctx.prefix_tokens, 100)
+        self.assertEqual(estimate_tokens("abcd" * 10), 10)
+
+    def test_unknown_role(self):
+        with self.assertRaises(ValueError):
+            SubAgentContext(self.manager, "/ws", role="manager")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.tool_cache import ToolResultCache, canonical_args, path_stamp
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestToolResultCache(unittest.TestCase):
+    def setUp(self):
+        self.workspace = tempfile.mkdtemp()
+        self.path = os.path.join(self.workspace, "a.txt")
+        with open(self.path, "w") as f:
+            f.write("hello")
+        self.clock = FakeClock()
+        self.cache = ToolResultCache(clock=self.clock)
+
+    def tearDown(self):
+        shutil.rmtree(self.workspace)
+
+    def remember(self, name, args, result, ttl=600):
+        key, hit, _ = self.cache.lookup(name, args, self.workspace)
+        self.assertFalse(hit)
+        self.cache.store(key, result, args, self.workspace, ttl=ttl)
+        return key
+
+    def test_canonical_args_ignore_order_and_injected(self):
+        a = canonical_args({"path": "a.txt", "limit": 5, "workspace_dir": "/x", "_context": {"k": 1}})
+        b = canonical_args({"limit": 5, "path": "a.txt"})
+        self.assertEqual(a, b)
+
+    def test_hit_until_ttl_expires(self):
+        self.remember("search_web", {"query": "q"}, "results", ttl=30)
+        self.clock.now = 29
+        self.assertTrue(self.cache.lookup("search_web", {"query": "q"}, self.workspace)[1])
+        self.assertFalse(self.cache.lookup("search_web", {"query": "other"}, self.workspace)[1])
+        self.clock.now = 31
+        self.assertFalse(self.cache.lookup("search_web", {"query": "q"}, self.workspace)[1])
+
+    def test_file_change_invalidates(self):
+        args = {"path": "a.txt"}
+        self.remember("read_file", args, "hello")
+        self.assertEqual(self.cache.lookup("read_file", args, self.workspace)[2], "hello")
+
+        stat = os.stat(self.path)
+        with open(self.path, "w") as f:
+            f.write("changed!")
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        self.assertFalse(self.cache.lookup("read_file", args, self.workspace)[1])
+
+    def test_missing_path_stamp(self):
+        self.assertEqual(path_stamp({"path": "nope.txt"}, self.workspace), (("path", None, None),))
+        self.assertEqual(path_stamp({"query": "x"}, self.workspace), ())
+
+    def test_clear(self):
+        self.remember("read_file", {"path": "a.txt"}, "hello")
+        self.cache.clear()
+        self.assertFalse(self.cache.lookup("read_file", {"path": "a.txt"}, self.workspace)[1])
+        self.assertEqual(self.cache.stats(), {"entries": 0, "hits": 0, "misses": 2})
+
+    def test_reference_per_scope(self):
+        key = self.remember("read_file", {"path": "a.txt"}, "hello" * 100)
+        self.assertIsNone(self.cache.reference("Main", key, "hello" * 100, "call_1"))
+        note = self.cache.reference("Main", key, "hello" * 100, "call_2")
+        self.assertIn("call_1", note)
+        # Another agent never saw call_1
+        self.assertIsNone(self.cache.reference("sub-1", key, "hello" * 100, "call_3"))
+        # Different content is delivered in full and becomes the new reference
+        self.assertIsNone(self.cache.reference("Main", key, "bye" * 100, "call_4"))
+        self.assertIn("call_4", self.cache.reference("Main", key, "bye" * 100, "call_5"))
+
+    def test_cached_read_is_faster(self):
+        def slow_read(path):
+            time.sleep(0.05)
+            with open(os.path.join(self.workspace, path)) as f:
+                return f.read()
+
+        args = {"path": "a.txt"}
+        start = time.perf_counter()
+        for _ in range(5):
+            key, hit, result = self.cache.lookup("read_file", args, self.workspace)
+            if not hit:
+                result = slow_read(**args)
+                self.cache.store(key, result, args, self.workspace)
+            self.assertEqual(result, "hello")
+        self.assertLess(time.perf_counter() - start, 0.05 * 3)
+        self.assertEqual(self.cache.stats()["hits"], 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import sys
+import unittest
+import importlib.util
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.tool_router import ToolRouter
+from core.prompt_builder import build_system_prompt
+
+spec = importlib.util.spec_from_file_location(
+    "meta_tools_impl",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "skills", "meta-tools", "impl.py"),
+)
+meta_tools = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(meta_tools)
+
+class FakeSkillManager:
+    def __init__(self):
+        self.tool_to_skill_map = {
+            "read_file": "file-system", "load_skill": "meta-tools",
+            "search_web": "web-search", "run_python_code": "python-runner",
+            "query_history": "history-query", "convert_units": "unit-converter",
+        }
+        self.skill_prompt_map = {skill: f"# {skill} guide" for skill in self.tool_to_skill_map.values()}
+        self.loaded_skills_meta = {
+            "web-search": {"description": "Search the web and read online articles.",
+                           "description_cn": "搜索互联网内容和读取网络文章。", "keywords": ["搜索", "新闻", "search"]},
+            "python-runner": {"description": "Execute Python code.", "keywords": "python, 代码, 计算"},
+            "history-query": {"description": "Query chat history.", "keywords": ["历史", "之前"]},
+            "unit-converter": {"description": "Convert between units of length and weight."},
+        }
+
+    def get_tool_definitions(self):
+        return [{"type": "function", "function": {"name": name, "description": name, "parameters": {}}}
+                for name in self.tool_to_skill_map]
+
+def tool_names(tools):
+    return sorted(t["function"]["name"] for t in tools)
+
+class TestToolRouter(unittest.TestCase):
+    def setUp(self):
+        self.sm = FakeSkillManager()
+        self.router = ToolRouter(self.sm, core_skills=["file-system", "meta-tools"], top_k=1)
+
+    def test_keywords_pick_the_relevant_skill(self):
+        chosen = self.router.route([{"role": "user", "content": "帮我搜索一下今天的新闻"}])
+        self.assertEqual(chosen, {"file-system", "meta-tools", "web-search"})
+        self.assertEqual(tool_names(self.router.filter_tools(self.sm.get_tool_definitions(), chosen)),
+                         ["load_skill", "read_file", "search_web"])
+
+    def test_unrelated_request_gets_core_only(self):
+        self.assertEqual(self.router.route([{"role": "user", "content": "你好"}]), {"file-system", "meta-tools"})
+
+    def test_description_similarity_without_keywords(self):
+        chosen = self.router.route([{"role": "user", "content": "convert 5 miles to km, units of length"}])
+        self.assertIn("unit-converter", chosen)
+
+    def test_recent_tool_use_and_context_are_kept(self):
+        messages = [
+            {"role": "user", "content": "用 python 算一下"},
+            {"role": "assistant", "content": "", "tool_calls": [
+                {"id": "1", "type": "function", "function": {"name": "run_python_code", "arguments": "{}"}}]},
+            {"role": "tool", "tool_call_id": "1", "content": "42"},
+            {"role": "user", "content": "再查一下之前的记录"},
+        ]
+        chosen = self.router.route(messages)
+        self.assertIn("python-runner", chosen)
+        self.assertIn("history-query", chosen)
+
+    def test_load_skill_meta_tool(self):
+        chosen = self.router.route([{"role": "user", "content": "你好"}])
+        catalog = self.router.catalog(chosen)
+        self.assertIn("- unit-converter: Convert between units", catalog)
+        self.assertNotIn("file-system", catalog)
+
+        context = {"tool_router": self.router}
+        result = meta_tools.load_skill("unit-converter", _context=context)
+        self.assertIn("Tools: convert_units", result)
+        self.assertIn("# unit-converter guide", result)
+        self.assertIn("convert_units", tool_names(self.router.filter_tools(self.sm.get_tool_definitions(), chosen)))
+        self.assertIn("unit-converter", self.router.route([{"role": "user", "content": "你好"}]))
+        self.assertTrue(meta_tools.load_skill("nope", _context=context).startswith("Error"))
+        self.assertEqual(meta_tools.load_skill("web-search", _context={"tool_router": None}), "All skills are already loaded.")
+
+    def test_loaded_skills_survive_a_new_router(self):
+        messages = [
+            {"role": "user", "content": "把 5 英里换算成公里"},
+            {"role": "assistant", "content": "", "tool_calls": [
+                {"id": "1", "type": "function",
+                 "function": {"name": "load_skill", "arguments": '{"skill_name": "unit-converter"}'}}]},
+            {"role": "tool", "tool_call_id": "1", "content": "Loaded skill 'unit-converter'."},
+            {"role": "assistant", "content": "约 8 公里"},
+        ] + [{"role": "user", "content": "你好"}, {"role": "assistant", "content": "你好"}] * 5
+        # main.py and the daemon build a new worker, and so a new router, per request
+        router = ToolRouter(self.sm, core_skills=["file-system", "meta-tools"], top_k=1)
+        self.assertIn("unit-converter", router.route(messages + [{"role": "user", "content": "再换算 3 英里"}]))
+        bogus = {"role": "assistant", "content": "", "tool_calls": [
+            {"id": "2", "type": "function", "function": {"name": "load_skill", "arguments": '{"skill_name": "nope"}'}}]}
+        self.assertEqual(ToolRouter.loaded_skills([bogus, messages[1]]), {"nope", "unit-converter"})
+        self.assertNotIn("nope", router.route([bogus]))
+
+    def test_system_prompt_lists_only_routed_skills(self):
+        chosen = self.router.route([{"role": "user", "content": "你好"}])
+        prompt = build_system_prompt("/ws", self.sm.skill_prompt_map, skills=chosen,
+                                     skill_catalog=self.router.catalog(chosen))
+        self.assertIn("# file-system guide", prompt)
+        self.assertNotIn("# web-search guide", prompt)
+        self.assertIn("'load_skill'", prompt)
+        self.assertIn("- web-search: Search the web", prompt)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import sys
+import json
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.tool_stream import ToolCallAssembler, SpeculativeDispatcher
+
+def start(index, call_id, name):
+    return {"type": "tool_call", "index": index, "id": call_id, "function": {"name": name, "arguments": ""}}
+
+def args(index, fragment):
+    return {"type": "tool_call", "index": index, "id": None, "function": {"name": None, "arguments": fragment}}
+
+def legacy_buffer(chunks):
+    """The reconstruction LLMWorker used before the assembler."""
+    buffer = {}
+    for chunk in chunks:
+        index = chunk.get("index", 0)
+        if index not in buffer:
+            buffer[index] = {"id": chunk.get("id"), "type": "function",
+                             "function": {"name": chunk["function"].get("name", ""), "arguments": ""}}
+        if "arguments" in chunk["function"]:
+            buffer[index]["function"]["arguments"] += chunk["function"]["arguments"]
+    return [buffer[i] for i in sorted(buffer)]
+
+STREAM = [
+    start(0, "a", "read_file"), args(0, '{"path": '), args(0, '"a.txt"}'),
+    start(1, "b", "grep"), args(1, '{"pattern": "x{2}'), args(1, '", "path": "."}'),
+    start(2, "c", "write_file"), args(2, '{"path": "out"}'),
+]
+
+class TestToolCallAssembler(unittest.TestCase):
+    def test_completion_points(self):
+        assembler = ToolCallAssembler()
+        completed_at = {}
+        for position, chunk in enumerate(STREAM):
+            for index, call in assembler.feed(chunk):
+                completed_at[call["id"]] = position
+        self.assertEqual(completed_at, {"a": 2, "b": 5, "c": 7})
+        self.assertEqual(assembler.finish(), [])
+
+    def test_next_index_completes_unparsable_arguments(self):
+        assembler = ToolCallAssembler()
+        self.assertEqual(assembler.feed(start(0, "a", "bash")), [])
+        self.assertEqual(assembler.feed(args(0, '{"cmd": "ls')), [])
+        done = assembler.feed(start(1, "b", "bash"))
+        self.assertEqual([i for i, _ in done], [0])
+        self.assertEqual([i for i, _ in assembler.finish()], [1])
+
+    def test_history_identical_to_legacy_buffer(self):
+        assembler = ToolCallAssembler()
+        for chunk in STREAM:
+            assembler.feed(chunk)
+        assembler.finish()
+        self.assertEqual(assembler.calls(), legacy_buffer(STREAM))
+        self.assertFalse(ToolCallAssembler())
+
+class TestSpeculativeDispatcher(unittest.TestCase):
+    def run_stream(self, safe, stream=STREAM):
+        started = []
+        dispatcher = SpeculativeDispatcher(lambda name: name in safe,
+                                           lambda name, a, call_id: started.append((name, a, call_id)) or call_id)
+        assembler = ToolCallAssembler()
+        for chunk in stream:
+            dispatcher.on_complete(assembler.feed(chunk))
+        dispatcher.on_complete(assembler.finish())
+        return started, dispatcher
+
+    def test_safe_prefix_only(self):
+        started, dispatcher = self.run_stream({"read_file", "grep"})
+        self.assertEqual([s[0] for s in started], ["read_file", "grep"])
+        self.assertEqual(started[1][1], {"pattern": "x{2}", "path": "."})
+        self.assertEqual(dispatcher.take("a", '{"path": "a.txt"}'), "a")
+        self.assertIsNone(dispatcher.take("a", '{"path": "a.txt"}'))
+        self.assertIsNone(dispatcher.take("c", '{"path": "out"}'))
+
+    def test_unsafe_call_blocks_later_ones(self):
+        stream = [start(0, "w", "write_file"), args(0, '{"path": "a"}'),
+                  start(1, "r", "read_file"), args(1, '{"path": "a"}')]
+        started, _ = self.run_stream({"read_file"}, stream)
+        self.assertEqual(started, [])
+
+    def test_changed_arguments_are_not_reused(self):
+        _, dispatcher = self.run_stream({"read_file", "grep"})
+        self.assertIsNone(dispatcher.take("a", '{"path": "b.txt"}'))
+
+    def test_results_come_from_executor(self):
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            dispatcher = SpeculativeDispatcher(lambda name: True,
+                                               lambda name, a, call_id: pool.submit(lambda: f"{name}:{json.dumps(a)}"))
+            assembler = ToolCallAssembler()
+            for chunk in STREAM[:3]:
+                dispatcher.on_complete(assembler.feed(chunk))
+            self.assertEqual(dispatcher.take("a", '{"path": "a.txt"}').result(), 'read_file:{"path": "a.txt"}')
+
+if __name__ == '__main__':
+    unittest.main()
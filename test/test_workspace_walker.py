@@ -0,0 +1,69 @@
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.workspace_walker import walk_files, IgnoreRules
+from core.file_index import FileIndex
+
+class TestWorkspaceWalker(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.temp_dir, ".git"))
+        for rel in ["src/app.py", "src/app.log", "data/big.csv", "logs/run.txt",
+                    "build/out.py", "keep/important.log", "docs/readme.md"]:
+            path = os.path.join(self.temp_dir, rel)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write("x" * (5000 if rel.endswith(".csv") else 10))
+        with open(os.path.join(self.temp_dir, ".gitignore"), "w") as f:
+            f.write("# comment\n*.log\n!keep/*.log\nlogs/\n")
+        with open(os.path.join(self.temp_dir, "docs", ".ignore"), "w") as f:
+            f.write("/readme.md\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _rel(self, paths):
+        return sorted(os.path.relpath(p, self.temp_dir).replace(os.sep, "/") for p in paths)
+
+    def test_honours_ignore_files(self):
+        files = self._rel(walk_files(self.temp_dir, max_file_size=None))
+        self.assertEqual(files, [".gitignore", "data/big.csv", "docs/.ignore", "keep/important.log", "src/app.py"])
+
+    def test_ignore_disabled(self):
+        files = self._rel(walk_files(self.temp_dir, max_file_size=None, respect_ignore=False))
+        self.assertIn("src/app.log", files)
+        self.assertIn("logs/run.txt", files)
+        self.assertNotIn("build/out.py", files)  # Default excludes still apply
+
+    def test_size_cap(self):
+        skipped = []
+        files = self._rel(walk_files(self.temp_dir, max_file_size=1000, on_skip=lambda p, r: skipped.append(p)))
+        self.assertNotIn("data/big.csv", files)
+        self.assertEqual(self._rel(skipped), ["data/big.csv"])
+
+    def test_parent_rules_apply_to_subdir_walk(self):
+        files = self._rel(walk_files(os.path.join(self.temp_dir, "src")))
+        self.assertEqual(files, ["src/app.py"])
+
+    def test_double_star_pattern(self):
+        rules = IgnoreRules(self.temp_dir, ["a/**/z.txt\n"])
+        self.assertTrue(rules.match(os.path.join(self.temp_dir, "a", "z.txt"), False))
+        self.assertTrue(rules.match(os.path.join(self.temp_dir, "a", "b", "c", "z.txt"), False))
+        self.assertIsNone(rules.match(os.path.join(self.temp_dir, "b", "z.txt"), False))
+
+    def test_file_index_query(self):
+        index = FileIndex(self.temp_dir)
+        index.start()
+        self.assertTrue(index.ready.wait(5))
+        self.assertEqual(self._rel(index.query("*.py")), ["src/app.py"])
+        self.assertEqual(self._rel(index.query("BIG")), ["data/big.csv"])
+        self.assertEqual(self._rel(index.query("keep/")), ["keep/important.log"])
+
+if __name__ == "__main__":
+    unittest.main()